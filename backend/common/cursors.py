@@ -0,0 +1,32 @@
+"""
+Курсор keyset-пагинации по паре ``(момент, public_id)``.
+
+Формат ``<микросекунды с эпохи>.<public_id>`` — без символов, которые
+нужно экранировать в URL, и без потери точности ``DateTimeField``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+import uuid
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(at: datetime, public_id) -> str:
+    micros = (at - _EPOCH) // _MICROSECOND
+    return f"{micros}.{public_id}"
+
+
+def decode_cursor(raw: str | None) -> tuple[datetime, uuid.UUID] | None:
+    """Пара ``(момент, public_id)`` или ``None`` для битого курсора."""
+    micros, _sep, public_id = (raw or "").partition(".")
+    try:
+        return (
+            _EPOCH + timedelta(microseconds=int(micros)),
+            uuid.UUID(public_id),
+        )
+    except (ValueError, OverflowError):
+        return None
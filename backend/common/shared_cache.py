@@ -0,0 +1,46 @@
+"""
+Cache, общий для всех процессов платформы — alias ``shared`` из ``CACHES``.
+
+В нём лежат данные, которые пишет один процесс, а читает другой: версии
+манифестов и ответов каталога (правка в админке → celery, консьюмер
+Kafka), снимки и отзыв токенов WebSocket (воркеры daphne), счётчик
+запросов к VK API. В docker-compose это Redis; LocMem держит данные в
+памяти процесса, поэтому в продакшене система проверок Django
+предупреждает о нём.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+from django.utils.connection import ConnectionProxy
+
+SHARED_CACHE_ALIAS = "shared"
+
+shared_cache = ConnectionProxy(caches, SHARED_CACHE_ALIAS)
+
+
+def is_process_local(backend=None) -> bool:
+    """Данные cache видны только текущему процессу."""
+    backend = backend or caches[SHARED_CACHE_ALIAS]
+    return isinstance(backend, (LocMemCache, DummyCache))
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs):
+    if settings.DEBUG or not is_process_local():
+        return []
+    return [
+        Warning(
+            "Cache 'shared' хранит данные в памяти процесса.",
+            hint=(
+                "Задайте SHARED_CACHE_BACKEND="
+                "django.core.cache.backends.redis.RedisCache и "
+                "SHARED_CACHE_LOCATION=redis://redis:6379/2."
+            ),
+            id="common.W001",
+        )
+    ]
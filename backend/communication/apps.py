@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CommunicationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "communication"
+
+    def ready(self):
+        from communication.ws_auth import connect_ws_auth_signals
+
+        connect_ws_auth_signals()
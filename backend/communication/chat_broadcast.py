@@ -0,0 +1,307 @@
+"""
+Рассылка событий чата в WebSocket.
+
+Сообщение сериализуется один раз (``render_message_payload``, без
+request: относительные URL медиа, ``is_mine=False``). Тот же словарь
+отдаёт REST — ``payload_for_request`` лишь дописывает абсолютные URL и
+``is_mine`` — и он же уходит в группу диалога готовым компактным JSON
+(``text``): consumer не кодирует событие заново для каждого соединения.
+
+События диалога уходят и в группу диалога (``ChatConsumer``), и в группы
+участников (``UserChatConsumer`` — один сокет на все диалоги; в кадре
+есть ``thread_id``).
+
+В channel layer событие передаётся после commit (``transaction.on_commit``)
+фоновым потоком с ограниченной очередью — запрос не ждёт Redis. Если
+очередь заполнена, событие отправляется в потоке вызова.
+``InMemoryChannelLayer`` (тесты, запуск без Redis) привязан к event loop
+процесса, для него отправка всегда синхронная.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import queue
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_PAYLOAD_ATTR = "_chat_payload"
+_dispatcher: "_Dispatcher | None" = None
+_dispatcher_lock = threading.Lock()
+
+
+def thread_group(thread) -> str:
+    return f"chat_thread_{thread.public_id}"
+
+
+def user_group(user_public_id) -> str:
+    """Группа сокета пользователя (``UserChatConsumer``) — все его диалоги."""
+    return f"chat_user_{user_public_id}"
+
+
+def render_message_payload(message) -> dict:
+    """Сериализовать сообщение заново и запомнить результат на объекте."""
+    from .serializers import ChatMessageSerializer
+
+    payload = ChatMessageSerializer(message).data
+    setattr(message, _PAYLOAD_ATTR, payload)
+    return payload
+
+
+def message_payload(message) -> dict:
+    """Уже отрендеренный payload сообщения (или новый рендер)."""
+    payload = getattr(message, _PAYLOAD_ATTR, None)
+    if payload is None:
+        payload = render_message_payload(message)
+    return payload
+
+
+def _with_absolute_avatar(participant, request):
+    if not participant or not participant.get("avatar"):
+        return participant
+    return {
+        **participant,
+        "avatar": request.build_absolute_uri(participant["avatar"]),
+    }
+
+
+def _with_absolute_ref(ref, request):
+    if not ref:
+        return ref
+    return {**ref, "sender": _with_absolute_avatar(ref["sender"], request)}
+
+
+def payload_for_request(payload: dict, request) -> dict:
+    """
+    Ответ REST из payload события: то же, что ``ChatMessageSerializer``
+    с ``request`` в контексте, без повторной сериализации.
+    """
+    data = dict(payload)
+    user = getattr(request, "user", None)
+    sender = data.get("sender")
+    data["is_mine"] = bool(
+        sender
+        and user is not None
+        and user.is_authenticated
+        and sender["public_id"] == str(user.public_id)
+    )
+    data["sender"] = _with_absolute_avatar(sender, request)
+    data["reply_to"] = _with_absolute_ref(data.get("reply_to"), request)
+    data["forwarded_from"] = _with_absolute_ref(
+        data.get("forwarded_from"), request
+    )
+    data["attachments"] = [
+        {
+            **item,
+            "url": item["url"] and request.build_absolute_uri(item["url"]),
+        }
+        for item in data.get("attachments") or []
+    ]
+    if data.get("attachment_url"):
+        data["attachment_url"] = request.build_absolute_uri(
+            data["attachment_url"]
+        )
+    return data
+
+
+def encode_event(event: str, payload: dict, thread_id=None) -> str:
+    """
+    Кадр WebSocket ``{"event", "payload"}`` — компактный JSON. Для сокета
+    пользователя добавляется ``thread_id``.
+    """
+    frame = {"event": event, "payload": payload}
+    if thread_id is not None:
+        frame["thread_id"] = str(thread_id)
+    return json.dumps(
+        frame,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+async def _send_batch(channel_layer, batch: list[tuple[str, dict]]) -> None:
+    """Группы — параллельно, события одной группы — по порядку."""
+    by_group: dict[str, list[dict]] = {}
+    for group, message in batch:
+        by_group.setdefault(group, []).append(message)
+
+    async def send_group(group: str, messages: list[dict]) -> None:
+        for message in messages:
+            try:
+                await channel_layer.group_send(group, message)
+            except Exception:
+                logger.warning(
+                    "Чат: событие %s в группу %s не отправлено.",
+                    message.get("event"),
+                    group,
+                    exc_info=True,
+                )
+
+    await asyncio.gather(
+        *(send_group(group, messages) for group, messages in by_group.items())
+    )
+
+
+class _Dispatcher:
+    """
+    Фоновый поток со своим event loop: забирает события из ограниченной
+    очереди и отправляет пачками в channel layer.
+    """
+
+    batch_size = 200
+
+    def __init__(self, maxsize: int, start: bool = True) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        if start:
+            self._thread = threading.Thread(
+                target=self._run, name="chat-ws-dispatcher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, group: str, message: dict) -> bool:
+        try:
+            self._queue.put_nowait((group, message))
+        except queue.Full:
+            return False
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once(wait=0.2)
+        self.run_once()
+        if self._loop is not None:
+            self._loop.close()
+
+    def run_once(self, wait: float = 0.0) -> int:
+        """Отправить накопившиеся события; возвращает их число."""
+        batch: list[tuple[str, dict]] = []
+        if wait:
+            try:
+                batch.append(self._queue.get(timeout=wait))
+            except queue.Empty:
+                pass
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return 0
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(_send_batch(channel_layer, batch))
+        except Exception:
+            logger.exception("Чат: сбой фоновой рассылки событий.")
+        return len(batch)
+
+
+def _get_dispatcher() -> _Dispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = _Dispatcher(settings.CHAT_WS_DISPATCH_QUEUE_SIZE)
+        return _dispatcher
+
+
+def _send_now(channel_layer, group: str, message: dict) -> None:
+    async_to_sync(_send_batch)(channel_layer, [(group, message)])
+
+
+def dispatch(group: str, message: dict) -> None:
+    """Передать событие в channel layer, не дожидаясь отправки."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    if (
+        isinstance(channel_layer, InMemoryChannelLayer)
+        or settings.CHAT_WS_DISPATCH_QUEUE_SIZE <= 0
+    ):
+        _send_now(channel_layer, group, message)
+        return
+    if not _get_dispatcher().submit(group, message):
+        logger.warning(
+            "Чат: очередь рассылки заполнена, событие %s отправлено "
+            "синхронно.",
+            message.get("event"),
+        )
+        _send_now(channel_layer, group, message)
+
+
+def broadcast_chat_event(*, thread, event: str, payload: dict) -> None:
+    """
+    Событие диалога — после commit текущей транзакции: в группу диалога
+    и в группы обоих участников.
+    """
+    thread_message = {
+        "type": "chat.event",
+        "event": event,
+        "text": encode_event(event, payload),
+    }
+    user_message = {
+        "type": "chat.event",
+        "event": event,
+        "text": encode_event(event, payload, thread_id=thread.public_id),
+    }
+    groups = [
+        user_group(thread.mentor.public_id),
+        user_group(thread.student.public_id),
+    ]
+
+    def send():
+        dispatch(thread_group(thread), thread_message)
+        for group in groups:
+            dispatch(group, user_message)
+
+    transaction.on_commit(send)
+
+
+def broadcast_user_event(
+    *, user, event: str, payload: dict, thread=None
+) -> None:
+    """Событие только для сокета пользователя — после commit."""
+    message = {
+        "type": "chat.event",
+        "event": event,
+        "text": encode_event(
+            event,
+            payload,
+            thread_id=thread.public_id if thread is not None else None,
+        ),
+    }
+    group = user_group(user.public_id)
+    transaction.on_commit(lambda: dispatch(group, message))
+
+
+def reset_dispatcher() -> None:
+    """Остановить фоновую рассылку (тесты / завершение процесса)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.stop()
+
+
+atexit.register(reset_dispatcher)
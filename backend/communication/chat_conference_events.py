@@ -6,6 +6,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from . import chat_services
+from .chat_broadcast import render_message_payload
 from .models import ChatMessage, Conference, DirectThread
 
 _UNIQUE_EVENTS = {
@@ -132,13 +133,12 @@ def append_conference_chat_event(
             actor=actor,
         ),
     )
-    thread.last_message_at = now
-    thread.save(update_fields=["last_message_at"])
+    chat_services._record_new_message(thread=thread, message=message, at=now)
 
     chat_services.broadcast_chat_event(
         thread=thread,
         event="message.new",
-        payload=chat_services._serialize_message_for_ws(message),
+        payload=render_message_payload(message),
     )
     return message
 
@@ -2,11 +2,20 @@
 
 from __future__ import annotations
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from datetime import datetime
+
+from common import cursors
 from django.contrib.auth import get_user_model
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import (
+    Count,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from rest_framework.exceptions import (
     NotFound,
@@ -17,6 +26,11 @@ from rest_framework.exceptions import (
 from content.models import Course
 from education.models import Enrollment
 
+from .chat_broadcast import (
+    broadcast_chat_event,
+    broadcast_user_event,
+    render_message_payload,
+)
 from .models import (
     ChatMessage,
     ChatMessageAttachment,
@@ -76,21 +90,107 @@ def user_last_read_at(thread: DirectThread, user):
     return getattr(thread, field)
 
 
+_UNREAD_FIELDS = {
+    "mentor_last_read_at": "mentor_unread_count",
+    "student_last_read_at": "student_unread_count",
+}
+
+
 def thread_unread_count(*, thread: DirectThread, user) -> int:
+    """Непрочитанное пользователем — из счётчика диалога, без запроса."""
     if not user_in_thread(user, thread):
         return 0
-    last_read = user_last_read_at(thread, user)
-    qs = thread.messages.filter(is_deleted=False).exclude(sender_id=user.pk)
-    if last_read:
-        qs = qs.filter(created_at__gt=last_read)
-    return qs.count()
+    field = _UNREAD_FIELDS[_last_read_field_for_user(user, thread)]
+    return getattr(thread, field)
 
 
 def total_unread_count(*, user) -> int:
-    total = 0
-    for thread in threads_for_user(user):
-        total += thread_unread_count(thread=thread, user=user)
-    return total
+    """Сумма счётчиков по всем диалогам пользователя (один запрос)."""
+    row = DirectThread.objects.filter(
+        Q(mentor=user) | Q(student=user)
+    ).aggregate(
+        mentor=Sum("mentor_unread_count", filter=Q(mentor=user)),
+        student=Sum("student_unread_count", filter=Q(student=user)),
+    )
+    return (row["mentor"] or 0) + (row["student"] or 0)
+
+
+def _unread_after(*, user_id: int, after):
+    """Подзапрос: непрочитанные ``user_id`` сообщения диалога после ``after``."""
+    qs = ChatMessage.objects.filter(
+        thread=OuterRef("pk"), is_deleted=False
+    ).exclude(sender_id=user_id)
+    if after is not None:
+        qs = qs.filter(created_at__gt=after)
+    counted = (
+        qs.order_by().values("thread").annotate(n=Count("pk")).values("n")
+    )
+    return Coalesce(Subquery(counted), 0)
+
+
+def _record_new_message(
+    *, thread: DirectThread, message: ChatMessage, at
+) -> None:
+    """
+    Новое сообщение: указатель на последнее и +1 к непрочитанному у
+    участников, кроме отправителя (атомарный ``UPDATE``).
+    """
+    updates = {"last_message_at": at, "last_message": message}
+    for field, participant_id in (
+        ("mentor_unread_count", thread.mentor_id),
+        ("student_unread_count", thread.student_id),
+    ):
+        if participant_id != message.sender_id:
+            updates[field] = F(field) + 1
+    DirectThread.objects.filter(pk=thread.pk).update(**updates)
+    thread.last_message_at = at
+    thread.last_message = message
+    thread.refresh_from_db(
+        fields=["mentor_unread_count", "student_unread_count"]
+    )
+    for participant in (thread.mentor, thread.student):
+        if participant.pk != message.sender_id:
+            _broadcast_unread(thread=thread, user=participant)
+
+
+def _broadcast_unread(*, thread: DirectThread, user) -> None:
+    """Счётчик диалога — в сокет пользователя (``thread.unread``)."""
+    broadcast_user_event(
+        user=user,
+        event="thread.unread",
+        payload={
+            "unread_count": thread_unread_count(thread=thread, user=user)
+        },
+        thread=thread,
+    )
+
+
+def _forget_unread_message(*, message: ChatMessage) -> None:
+    """Удалённое сообщение больше не считается непрочитанным собеседником."""
+    thread = message.thread
+    for read_field, participant_id in (
+        ("mentor_last_read_at", thread.mentor_id),
+        ("student_last_read_at", thread.student_id),
+    ):
+        if participant_id == message.sender_id:
+            continue
+        count_field = _UNREAD_FIELDS[read_field]
+        # Условие по ``last_read`` — в самом UPDATE: объект диалога в
+        # памяти мог устареть.
+        updated = DirectThread.objects.filter(
+            Q(**{f"{read_field}__isnull": True})
+            | Q(**{f"{read_field}__lt": message.created_at}),
+            pk=thread.pk,
+            **{f"{count_field}__gt": 0},
+        ).update(**{count_field: F(count_field) - 1})
+        if updated:
+            thread.refresh_from_db(fields=[count_field])
+            participant = (
+                thread.mentor
+                if read_field == "mentor_last_read_at"
+                else thread.student
+            )
+            _broadcast_unread(thread=thread, user=participant)
 
 
 @transaction.atomic
@@ -98,14 +198,54 @@ def mark_thread_read(*, thread: DirectThread, user, at=None) -> DirectThread:
     if not user_in_thread(user, thread):
         raise PermissionDenied("Нет доступа к этому диалогу.")
     field = _last_read_field_for_user(user, thread)
+    count_field = _UNREAD_FIELDS[field]
     now = at or timezone.now()
     current = getattr(thread, field)
     if current is None or now > current:
-        setattr(thread, field, now)
-        thread.save(update_fields=[field])
+        # Счётчик пересчитывается в том же UPDATE: обычно 0, но сообщения
+        # позже ``at`` (или пришедшие параллельно) остаются непрочитанными.
+        DirectThread.objects.filter(pk=thread.pk).update(
+            **{
+                field: now,
+                count_field: _unread_after(user_id=user.pk, after=now),
+            }
+        )
+        thread.refresh_from_db(fields=[field, count_field])
+        # Другие вкладки / устройства читателя обновляют бейдж.
+        _broadcast_unread(thread=thread, user=user)
     return thread
 
 
+def unread_snapshot(*, user) -> dict:
+    """Непрочитанное по диалогам пользователя (один запрос по счётчикам)."""
+    rows = DirectThread.objects.filter(
+        Q(mentor=user, mentor_unread_count__gt=0)
+        | Q(student=user, student_unread_count__gt=0)
+    ).values_list(
+        "public_id", "mentor_id", "mentor_unread_count", "student_unread_count"
+    )
+    unread = {
+        str(public_id): mentor_count if mentor_id == user.pk else student_count
+        for public_id, mentor_id, mentor_count, student_count in rows
+    }
+    return {"unread": unread, "total": sum(unread.values())}
+
+
+def thread_peers(*, user) -> dict[str, str]:
+    """``{public_id диалога: public_id собеседника}`` — одним запросом."""
+    rows = DirectThread.objects.filter(
+        Q(mentor=user) | Q(student=user)
+    ).values_list(
+        "public_id", "mentor_id", "mentor__public_id", "student__public_id"
+    )
+    return {
+        str(public_id): str(
+            student_public_id if mentor_id == user.pk else mentor_public_id
+        )
+        for public_id, mentor_id, mentor_public_id, student_public_id in rows
+    }
+
+
 def student_may_message_mentor(*, student, mentor) -> bool:
     if not is_mentor_user(mentor) or not is_student_user(student):
         return False
@@ -291,7 +431,10 @@ def get_or_create_thread(*, actor, other) -> DirectThread:
 
 def threads_for_user(user):
     return (
-        DirectThread.objects.select_related("mentor", "student")
+        DirectThread.objects.select_related(
+            "mentor", "student", "last_message"
+        )
+        .prefetch_related("last_message__attachments")
         .filter(Q(mentor=user) | Q(student=user))
         .order_by("-last_message_at", "-created_at")
     )
@@ -309,28 +452,6 @@ def thread_for_user(*, user, thread_public_id) -> DirectThread:
     return thread
 
 
-def _serialize_message_for_ws(message: ChatMessage) -> dict:
-    from .serializers import ChatMessageSerializer
-
-    return ChatMessageSerializer(message).data
-
-
-def broadcast_chat_event(
-    *, thread: DirectThread, event: str, payload: dict
-) -> None:
-    channel_layer = get_channel_layer()
-    if channel_layer is None:
-        return
-    async_to_sync(channel_layer.group_send)(
-        f"chat_thread_{thread.public_id}",
-        {
-            "type": "chat.event",
-            "event": event,
-            "payload": payload,
-        },
-    )
-
-
 @transaction.atomic
 def create_text_message(
     *,
@@ -589,8 +710,7 @@ def create_message(
             safe_exts=safe_exts,
         )
 
-    thread.last_message_at = now
-    thread.save(update_fields=["last_message_at"])
+    _record_new_message(thread=thread, message=message, at=now)
 
     message = (
         ChatMessage.objects.select_related(
@@ -609,7 +729,7 @@ def create_message(
     broadcast_chat_event(
         thread=thread,
         event="message.new",
-        payload=_serialize_message_for_ws(message),
+        payload=render_message_payload(message),
     )
 
     # Уведомление собеседнику (ментор → студент и наоборот)
@@ -729,8 +849,7 @@ def forward_message(
             safe_exts=[ext],
         )
 
-    target_thread.last_message_at = now
-    target_thread.save(update_fields=["last_message_at"])
+    _record_new_message(thread=target_thread, message=message, at=now)
 
     message = (
         ChatMessage.objects.select_related(
@@ -745,38 +864,140 @@ def forward_message(
     broadcast_chat_event(
         thread=target_thread,
         event="message.new",
-        payload=_serialize_message_for_ws(message),
+        payload=render_message_payload(message),
     )
     return message
 
 
-def list_thread_messages(
-    *, thread: DirectThread, before=None, limit: int = 50
-):
-    qs = (
-        thread.messages.select_related(
-            "sender",
-            "conference",
-            "conference__whiteboard",
-            "reply_to",
-            "reply_to__sender",
-            "forwarded_from",
-            "forwarded_from__sender",
-        )
-        .prefetch_related("attachments")
-        .order_by("-created_at")
+_HISTORY_RELATED = (
+    "sender",
+    "conference",
+    "conference__whiteboard",
+    "reply_to",
+    "reply_to__sender",
+    "forwarded_from",
+    "forwarded_from__sender",
+)
+
+
+def encode_message_cursor(message: ChatMessage) -> str:
+    """Курсор истории: ``<микросекунды created_at>.<public_id>``."""
+    return cursors.encode_cursor(message.created_at, message.public_id)
+
+
+def decode_message_cursor(raw: str | None) -> tuple | None:
+    return cursors.decode_cursor(raw)
+
+
+def _older_than(key, *, inclusive: bool = False) -> Q:
+    at, public_id = key
+    if public_id is None:
+        # Старый формат ``before`` — только дата.
+        return Q(created_at__lt=at)
+    lookup = "public_id__lte" if inclusive else "public_id__lt"
+    # Избыточное ``created_at <= at`` даёт планировщику диапазон индекса:
+    # одно ``OR`` по ключу БД не превращает в range scan.
+    return Q(created_at__lte=at) & (
+        Q(created_at__lt=at) | Q(created_at=at, **{lookup: public_id})
     )
-    if before:
-        qs = qs.filter(created_at__lt=before)
-    limit = max(1, min(limit, 100))
+
+
+def _newer_than(key) -> Q:
+    at, public_id = key
+    return Q(created_at__gte=at) & (
+        Q(created_at__gt=at) | Q(created_at=at, public_id__gt=public_id)
+    )
+
+
+def _page(qs, *, where, newest_first: bool, limit: int):
+    """Одна сторона страницы: ``limit + 1`` строк по индексу ключа."""
+    if where is not None:
+        qs = qs.filter(where)
+    if newest_first:
+        qs = qs.order_by("-created_at", "-public_id")
+    else:
+        qs = qs.order_by("created_at", "public_id")
     rows = list(qs[: limit + 1])
     has_more = len(rows) > limit
-    if has_more:
-        rows = rows[:limit]
-    rows.reverse()
+    rows = rows[:limit]
+    if newest_first:
+        rows.reverse()
     return rows, has_more
 
 
+def page_thread_messages(
+    *,
+    thread: DirectThread,
+    before=None,
+    after=None,
+    around=None,
+    limit: int = 50,
+):
+    """
+    Страница истории по ключу ``(created_at, public_id)``.
+
+    ``before`` / ``after`` — ключ из ``decode_message_cursor`` (``before``
+    также может быть датой — старый формат), ``around`` — ``public_id``
+    сообщения, вокруг которого строится страница (переход к ответу).
+    Без параметров — последние сообщения. Возвращает
+    ``(rows, has_older, has_newer)``; ``rows`` — от старых к новым.
+    """
+    limit = max(1, min(limit, 100))
+    qs = thread.messages.select_related(*_HISTORY_RELATED).prefetch_related(
+        "attachments"
+    )
+    if around is not None:
+        target = (
+            thread.messages.filter(public_id=around)
+            .values_list("created_at", "public_id")
+            .first()
+        )
+        if target is None:
+            raise NotFound("Сообщение не найдено.")
+        newer_limit = limit // 2
+        older, has_older = _page(
+            qs,
+            where=_older_than(target, inclusive=True),
+            newest_first=True,
+            limit=limit - newer_limit,
+        )
+        if newer_limit:
+            newer, has_newer = _page(
+                qs,
+                where=_newer_than(target),
+                newest_first=False,
+                limit=newer_limit,
+            )
+        else:
+            newer = []
+            has_newer = thread.messages.filter(_newer_than(target)).exists()
+        return older + newer, has_older, has_newer
+    if after is not None:
+        rows, has_newer = _page(
+            qs, where=_newer_than(after), newest_first=False, limit=limit
+        )
+        return rows, True, has_newer
+    rows, has_older = _page(
+        qs,
+        where=_older_than(before) if before is not None else None,
+        newest_first=True,
+        limit=limit,
+    )
+    return rows, has_older, before is not None
+
+
+def list_thread_messages(
+    *, thread: DirectThread, before=None, limit: int = 50
+):
+    """Последние сообщения (или старше ``before``): ``(rows, has_more)``."""
+    if isinstance(before, datetime):
+        before = (before, None)
+    rows, has_older, _has_newer = page_thread_messages(
+        thread=thread, before=before, limit=limit
+    )
+    return rows, has_older
+
+
 def message_for_user(*, user, message_public_id) -> ChatMessage:
     try:
         message = (
@@ -844,7 +1065,7 @@ def update_text_message(
     broadcast_chat_event(
         thread=message.thread,
         event="message.updated",
-        payload=_serialize_message_for_ws(message),
+        payload=render_message_payload(message),
     )
     return message
 
@@ -864,10 +1085,11 @@ def delete_text_message(*, message: ChatMessage, deleter) -> ChatMessage:
     message.body = ""
     message.is_deleted = True
     message.save(update_fields=["is_deleted", "body", "attachment"])
+    _forget_unread_message(message=message)
 
     broadcast_chat_event(
         thread=message.thread,
         event="message.deleted",
-        payload=_serialize_message_for_ws(message),
+        payload=render_message_payload(message),
     )
     return message
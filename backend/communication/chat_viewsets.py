@@ -1,3 +1,5 @@
+import uuid
+
 from common.drf import UUID_LOOKUP_REGEX
 from django.utils.dateparse import parse_datetime
 from rest_framework import mixins, status, viewsets
@@ -8,6 +10,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from . import chat_services
+from .chat_broadcast import message_payload, payload_for_request
 from .models import ChatMessage
 from .serializers import (
     ChatMessageCreateSerializer,
@@ -73,32 +76,55 @@ class ChatThreadViewSet(
 
     @action(detail=True, methods=["get", "post"])
     def messages(self, request, public_id=None):
+        """
+        GET — страница истории: ``?before=<курсор>`` (старее),
+        ``?after=<курсор>`` (новее), ``?around=<public_id>`` (вокруг
+        сообщения). Курсоры — ``before_cursor`` / ``after_cursor`` ответа.
+        """
         thread = chat_services.thread_for_user(
             user=request.user,
             thread_public_id=public_id,
         )
 
         if request.method == "GET":
-            before_raw = request.query_params.get("before")
-            before = None
-            if before_raw:
-                before = parse_datetime(before_raw)
+            params = request.query_params
+            before = after = around = None
+            if params.get("before"):
+                before = chat_services.decode_message_cursor(params["before"])
                 if before is None:
+                    # Старый формат: дата ISO 8601.
+                    before_at = parse_datetime(params["before"])
+                    if before_at is None:
+                        raise ValidationError(
+                            {"before": "Некорректный курсор или дата."}
+                        )
+                    before = (before_at, None)
+            if params.get("after"):
+                after = chat_services.decode_message_cursor(params["after"])
+                if after is None:
+                    raise ValidationError({"after": "Некорректный курсор."})
+            if params.get("around"):
+                try:
+                    around = uuid.UUID(params["around"])
+                except ValueError:
                     raise ValidationError(
-                        {"before": "Некорректная дата ISO 8601."}
+                        {"around": "Некорректный идентификатор сообщения."}
                     )
             try:
-                limit = int(request.query_params.get("limit", 50))
+                limit = int(params.get("limit", 50))
             except (TypeError, ValueError):
                 limit = 50
 
-            rows, has_more = chat_services.list_thread_messages(
+            rows, has_older, has_newer = chat_services.page_thread_messages(
                 thread=thread,
                 before=before,
+                after=after,
+                around=around,
                 limit=limit,
             )
-            mark_read = request.query_params.get("mark_read", "1") != "0"
-            if before is None and mark_read:
+            latest = before is None and after is None and around is None
+            mark_read = params.get("mark_read", "1") != "0"
+            if latest and mark_read:
                 chat_services.mark_thread_read(
                     thread=thread, user=request.user
                 )
@@ -107,7 +133,18 @@ class ChatThreadViewSet(
                     "results": ChatMessageSerializer(
                         rows, many=True, context={"request": request}
                     ).data,
-                    "has_more": has_more,
+                    "has_more": has_older,
+                    "has_newer": has_newer,
+                    "before_cursor": (
+                        chat_services.encode_message_cursor(rows[0])
+                        if rows
+                        else None
+                    ),
+                    "after_cursor": (
+                        chat_services.encode_message_cursor(rows[-1])
+                        if rows
+                        else None
+                    ),
                 }
             )
 
@@ -134,7 +171,7 @@ class ChatThreadViewSet(
             uploads=uploads or None,
         )
         return Response(
-            ChatMessageSerializer(message, context={"request": request}).data,
+            payload_for_request(message_payload(message), request),
             status=status.HTTP_201_CREATED,
         )
 
@@ -159,9 +196,7 @@ class ChatMessageViewSet(viewsets.GenericViewSet):
             editor=request.user,
             body=ser.validated_data.get("body") or "",
         )
-        return Response(
-            ChatMessageSerializer(message, context={"request": request}).data
-        )
+        return Response(payload_for_request(message_payload(message), request))
 
     def destroy(self, request, public_id=None):
         message = chat_services.message_for_user(
@@ -172,9 +207,7 @@ class ChatMessageViewSet(viewsets.GenericViewSet):
             message=message,
             deleter=request.user,
         )
-        return Response(
-            ChatMessageSerializer(message, context={"request": request}).data
-        )
+        return Response(payload_for_request(message_payload(message), request))
 
     @action(detail=True, methods=["post"])
     def forward(self, request, public_id=None):
@@ -194,6 +227,6 @@ class ChatMessageViewSet(viewsets.GenericViewSet):
             target_thread=target,
         )
         return Response(
-            ChatMessageSerializer(message, context={"request": request}).data,
+            payload_for_request(message_payload(message), request),
             status=status.HTTP_201_CREATED,
         )
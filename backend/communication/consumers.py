@@ -1,11 +1,15 @@
-"""WebSocket consumer для чата."""
+"""WebSocket consumers чата: сокет диалога и общий сокет пользователя."""
 
 from __future__ import annotations
 
+import asyncio
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 
-from . import chat_services
+from . import chat_broadcast, chat_services
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -62,6 +66,10 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         )
 
     async def chat_event(self, event):
+        # Кадр уже закодирован при рассылке (chat_broadcast.encode_event).
+        if event.get("text") is not None:
+            await self.send(text_data=event["text"])
+            return
         await self.send_json(
             {
                 "event": event.get("event"),
@@ -76,3 +84,156 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
             user=user,
             thread_public_id=self.thread_public_id,
         )
+
+
+class UserChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ``ws/chat/?token=<JWT>`` — один сокет на пользователя для всех его
+    диалогов (вместо сокета на каждый открытый диалог).
+
+    Сервер: ``connected`` (непрочитанное по диалогам), ``message.new`` /
+    ``message.updated`` / ``message.deleted``, ``thread.unread``,
+    ``typing``, ``pong``; в кадрах диалога — ``thread_id``. Клиент:
+    ``ping`` и ``typing`` (``{"thread_id": ...}``).
+
+    Кадры уходят через ограниченную очередь соединения: «печатает»
+    отбрасывается первым, при переполнении очередь заменяется кадром
+    ``resync`` (клиент перечитывает список диалогов). Без кадров от клиента
+    дольше ``CHAT_WS_IDLE_TIMEOUT_SEC`` сокет закрывается с кодом 4408.
+    """
+
+    group_name = None
+    _RESYNC = '{"event":"resync","payload":{}}'
+    _PEERS_RELOAD_SEC = 10.0
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if (
+            not user
+            or isinstance(user, AnonymousUser)
+            or not user.is_authenticated
+        ):
+            await self.close(code=4401)
+            return
+
+        self.user = user
+        self._loop = asyncio.get_running_loop()
+        self._last_seen = self._loop.time()
+        self._typing_sent: dict[str, float] = {}
+        self._outbox: asyncio.Queue = asyncio.Queue(
+            maxsize=max(2, settings.CHAT_WS_USER_QUEUE_SIZE)
+        )
+        self._peers = await self._load_peers()
+
+        self.group_name = chat_broadcast.user_group(user.public_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self._tasks = [
+            asyncio.create_task(self._writer()),
+            asyncio.create_task(self._watch_idle()),
+        ]
+        snapshot = await database_sync_to_async(chat_services.unread_snapshot)(
+            user=user
+        )
+        self._enqueue(chat_broadcast.encode_event("connected", snapshot))
+
+    async def disconnect(self, code):
+        for task in getattr(self, "_tasks", ()):
+            task.cancel()
+        if self.group_name:
+            await self.channel_layer.group_discard(
+                self.group_name, self.channel_name
+            )
+
+    async def receive_json(self, content, **kwargs):
+        self._last_seen = self._loop.time()
+        event = content.get("event")
+        if event == "ping":
+            self._enqueue(chat_broadcast.encode_event("pong", {}))
+            return
+        if event == "typing":
+            await self._typing(content.get("payload") or {})
+            return
+        self._enqueue(
+            chat_broadcast.encode_event(
+                "error",
+                {"detail": "Используйте REST API для отправки сообщений."},
+            )
+        )
+
+    async def chat_event(self, event):
+        if event.get("event") == "typing" and (
+            self._outbox.qsize() * 2 >= self._outbox.maxsize
+        ):
+            return
+        text = event.get("text")
+        if text is None:
+            text = chat_broadcast.encode_event(
+                event.get("event"), event.get("payload")
+            )
+        self._enqueue(text)
+
+    def _enqueue(self, text: str) -> None:
+        try:
+            self._outbox.put_nowait(text)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: вместо накопления — один resync.
+            while not self._outbox.empty():
+                self._outbox.get_nowait()
+            self._outbox.put_nowait(self._RESYNC)
+
+    async def _writer(self):
+        while True:
+            text = await self._outbox.get()
+            await self.send(text_data=text)
+
+    async def _watch_idle(self):
+        timeout = settings.CHAT_WS_IDLE_TIMEOUT_SEC
+        while True:
+            await asyncio.sleep(max(timeout / 3, 0.05))
+            if self._loop.time() - self._last_seen > timeout:
+                await self.close(code=4408)
+                return
+
+    async def _typing(self, payload: dict) -> None:
+        thread_id = str(payload.get("thread_id") or "")
+        peer = self._peers.get(thread_id)
+        now = self._loop.time()
+        if peer is None and now - self._peers_loaded_at > (
+            self._PEERS_RELOAD_SEC
+        ):
+            # Диалог мог появиться после подключения.
+            self._peers = await self._load_peers()
+            peer = self._peers.get(thread_id)
+        if peer is None:
+            self._enqueue(
+                chat_broadcast.encode_event(
+                    "error", {"detail": "Нет доступа к этому диалогу."}
+                )
+            )
+            return
+        last = self._typing_sent.get(thread_id)
+        if (
+            last is not None
+            and now - last < settings.CHAT_WS_TYPING_INTERVAL_SEC
+        ):
+            return
+        self._typing_sent[thread_id] = now
+        await self.channel_layer.group_send(
+            chat_broadcast.user_group(peer),
+            {
+                "type": "chat.event",
+                "event": "typing",
+                "text": chat_broadcast.encode_event(
+                    "typing",
+                    {"user_id": str(self.user.public_id)},
+                    thread_id=thread_id,
+                ),
+            },
+        )
+
+    async def _load_peers(self) -> dict[str, str]:
+        self._peers_loaded_at = self._loop.time()
+        return await database_sync_to_async(chat_services.thread_peers)(
+            user=self.user
+        )
@@ -0,0 +1,124 @@
+import statistics
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from communication import chat_services
+from communication.models import ChatMessage, DirectThread
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет страницы истории чата на диалоге с большим числом "
+        "сообщений: последние, глубоко в прошлом (before), вперёд (after) и "
+        "вокруг сообщения (around). Данные создаются в транзакции и "
+        "откатываются, если не указан --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=100_000,
+            help="Сообщений в диалоге (по умолчанию 100000).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Размер страницы (по умолчанию 50).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Повторов каждого замера (по умолчанию 20).",
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Показать план запроса страницы в глубине истории.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не откатывать созданный диалог.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            thread = self._seed(max(1, options["messages"]))
+            self._measure(thread, options)
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def _seed(self, total: int) -> DirectThread:
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        mentor = User.objects.create_user(
+            email=f"bench-mentor-{tag}@academy.local",
+            password=None,
+            role="mentor",
+        )
+        student = User.objects.create_user(
+            email=f"bench-student-{tag}@academy.local",
+            password=None,
+            role="student",
+        )
+        thread = DirectThread.objects.create(mentor=mentor, student=student)
+
+        started = time.perf_counter()
+        batch = 5_000
+        for start in range(0, total, batch):
+            ChatMessage.objects.bulk_create(
+                ChatMessage(
+                    thread=thread,
+                    sender=mentor if i % 2 else student,
+                    body=f"msg-{i}",
+                )
+                for i in range(start, min(start + batch, total))
+            )
+            self.stdout.write(f"  {min(start + batch, total)}/{total}")
+        self.stdout.write(
+            f"Создано сообщений: {total} "
+            f"за {time.perf_counter() - started:.1f} с."
+        )
+        return thread
+
+    def _measure(self, thread: DirectThread, options) -> None:
+        limit = options["limit"]
+        repeat = max(1, options["repeat"])
+        ordered = thread.messages.order_by("-created_at", "-public_id")
+        total = ordered.count()
+        deep = ordered[max(0, total * 9 // 10)]
+        middle = ordered[total // 2]
+        deep_key = (deep.created_at, deep.public_id)
+
+        cases = {
+            "последние": {},
+            "before (90% глубины)": {"before": deep_key},
+            "after (90% глубины)": {"after": deep_key},
+            "around (середина)": {"around": middle.public_id},
+        }
+        for title, kwargs in cases.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows, _older, _newer = chat_services.page_thread_messages(
+                    thread=thread, limit=limit, **kwargs
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{title:<24} строк: {len(rows):>3}  "
+                f"медиана: {statistics.median(timings):.2f} мс  "
+                f"макс: {max(timings):.2f} мс"
+            )
+
+        if options["explain"]:
+            qs = thread.messages.filter(
+                chat_services._older_than(deep_key)
+            ).order_by("-created_at", "-public_id")[: limit + 1]
+            self.stdout.write(qs.explain())
@@ -0,0 +1,79 @@
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from communication.ws_auth import authenticate_ws_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Шторм переподключений WebSocket: проверка JWT без кэша и с кэшем "
+        "(WS_AUTH_CACHE_TTL). Печатает число запросов к БД и время. "
+        "Пользователи создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=200,
+            help="Пользователей / токенов (по умолчанию 200).",
+        )
+        parser.add_argument(
+            "--connects",
+            type=int,
+            default=5000,
+            help="Подключений в шторме (по умолчанию 5000).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            tokens = self._seed(max(1, options["users"]))
+            rng = random.Random(0)
+            storm = [
+                rng.choice(tokens) for _ in range(max(1, options["connects"]))
+            ]
+            ttl = settings.WS_AUTH_CACHE_TTL or 60
+            for title, cache_ttl in (("без кэша", 0), ("с кэшем", ttl)):
+                with override_settings(WS_AUTH_CACHE_TTL=cache_ttl):
+                    self._measure(title, storm)
+            transaction.set_rollback(True)
+
+    def _seed(self, count: int) -> list[str]:
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(
+                email=f"bench-ws-{tag}-{i}@academy.local",
+                password=None,
+                role="student",
+            )
+            for i in range(count)
+        ]
+        return [str(AccessToken.for_user(user)) for user in users]
+
+    def _measure(self, title: str, storm: list[str]) -> None:
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            anonymous = sum(
+                not authenticate_ws_token(token).is_authenticated
+                for token in storm
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{title:<10} подключений: {len(storm)}  "
+            f"запросов к БД: {len(queries)}  "
+            f"время: {elapsed * 1000:.0f} мс  "
+            f"({elapsed / len(storm) * 1e6:.0f} мкс / подключение)"
+        )
+        if anonymous:
+            self.stdout.write(
+                self.style.WARNING(f"Не аутентифицировано: {anonymous}")
+            )
@@ -0,0 +1,74 @@
+# Generated by Django 4.2 on 2026-10-18 22:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_thread_counters(apps, schema_editor):
+    DirectThread = apps.get_model("communication", "DirectThread")
+    ChatMessage = apps.get_model("communication", "ChatMessage")
+
+    def unread(thread, user_id, last_read):
+        qs = ChatMessage.objects.filter(
+            thread=thread, is_deleted=False
+        ).exclude(sender_id=user_id)
+        if last_read:
+            qs = qs.filter(created_at__gt=last_read)
+        return qs.count()
+
+    for thread in DirectThread.objects.iterator():
+        thread.last_message = (
+            ChatMessage.objects.filter(thread=thread)
+            .order_by("-created_at")
+            .first()
+        )
+        thread.mentor_unread_count = unread(
+            thread, thread.mentor_id, thread.mentor_last_read_at
+        )
+        thread.student_unread_count = unread(
+            thread, thread.student_id, thread.student_last_read_at
+        )
+        thread.save(
+            update_fields=[
+                "last_message",
+                "mentor_unread_count",
+                "student_unread_count",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("communication", "0012_vk_oauth_drop_telegram"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="directthread",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="communication.chatmessage",
+                verbose_name="Последнее сообщение (ссылка)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="directthread",
+            name="mentor_unread_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Непрочитано ментором"
+            ),
+        ),
+        migrations.AddField(
+            model_name="directthread",
+            name="student_unread_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Непрочитано студентом"
+            ),
+        ),
+        migrations.RunPython(fill_thread_counters, migrations.RunPython.noop),
+    ]
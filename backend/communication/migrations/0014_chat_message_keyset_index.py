@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("communication", "0013_chat_thread_unread_counters"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="chatmessage",
+            name="communicati_thread__chat_idx",
+        ),
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(
+                fields=["thread", "created_at", "public_id"],
+                name="communicati_thread__keyset_idx",
+            ),
+        ),
+    ]
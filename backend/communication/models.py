@@ -211,6 +211,24 @@ class DirectThread(UUIDPublicIdMixin, models.Model):
         blank=True,
         verbose_name=_("Студент прочитал до"),
     )
+    # Денормализация для списка диалогов и счётчиков непрочитанного;
+    # поддерживается в communication.chat_services.
+    last_message = models.ForeignKey(
+        "ChatMessage",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Последнее сообщение (ссылка)"),
+    )
+    mentor_unread_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Непрочитано ментором"),
+    )
+    student_unread_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Непрочитано студентом"),
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -381,9 +399,11 @@ class ChatMessage(UUIDPublicIdMixin, models.Model):
         verbose_name_plural = _("Сообщения чата")
         ordering = ("created_at",)
         indexes = [
+            # Ключ keyset-пагинации истории (``page_thread_messages``):
+            # страница — диапазон индекса в любом направлении.
             models.Index(
-                fields=["thread", "-created_at"],
-                name="communicati_thread__chat_idx",
+                fields=["thread", "created_at", "public_id"],
+                name="communicati_thread__keyset_idx",
             ),
         ]
 
@@ -4,6 +4,7 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    re_path(r"^ws/chat/$", consumers.UserChatConsumer.as_asgi()),
     re_path(
         rf"^ws/chat/threads/(?P<thread_public_id>{UUID_LOOKUP_REGEX})/$",
         consumers.ChatConsumer.as_asgi(),
@@ -380,11 +380,9 @@ class DirectThreadSerializer(serializers.ModelSerializer):
     def get_last_message_preview(self, obj):
         from . import chat_services
 
-        msg = (
-            obj.messages.select_related("sender")
-            .order_by("-created_at")
-            .first()
-        )
+        # ``last_message`` поддерживается в chat_services; в списке —
+        # select_related (см. ``threads_for_user``).
+        msg = obj.last_message
         if not msg:
             return None
         return chat_services.message_preview_text(msg)
@@ -0,0 +1,146 @@
+"""Рассылка событий чата: один рендер, отправка после commit."""
+
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from communication import chat_broadcast, chat_services
+from communication.serializers import ChatMessageSerializer
+
+PNG = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01"
+    b"\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00\x00"
+    b"\x00\x0cIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05"
+    b"\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+class FakeLayer:
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+@pytest.fixture
+def thread(mentor_user, student_user):
+    return chat_services.get_or_create_thread(
+        actor=mentor_user, other=student_user
+    )
+
+
+@pytest.fixture
+def fake_layer(monkeypatch):
+    layer = FakeLayer()
+    monkeypatch.setattr(chat_broadcast, "get_channel_layer", lambda: layer)
+    return layer
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("viewer", ["mentor_user", "student_user"])
+def test_rest_payload_matches_serializer(request, thread, mentor_user, viewer):
+    mentor_user.avatar = SimpleUploadedFile("a.png", PNG, "image/png")
+    mentor_user.save()
+    question = chat_services.create_text_message(
+        thread=thread, sender=mentor_user, body="Вопрос"
+    )
+    message = chat_services.create_message(
+        thread=thread,
+        sender=mentor_user,
+        body="альбом",
+        reply_to=question,
+        uploads=[
+            SimpleUploadedFile("a.png", PNG, content_type="image/png"),
+            SimpleUploadedFile("b.png", PNG, content_type="image/png"),
+        ],
+    )
+    http_request = APIRequestFactory().get("/")
+    http_request.user = request.getfixturevalue(viewer)
+
+    payload = chat_broadcast.payload_for_request(
+        chat_broadcast.message_payload(message), http_request
+    )
+
+    expected = ChatMessageSerializer(
+        message, context={"request": http_request}
+    ).data
+    assert payload == expected
+    assert payload["attachments"][0]["url"].startswith("http://")
+
+
+@pytest.mark.django_db
+def test_event_is_dispatched_after_commit_as_encoded_frame(
+    thread,
+    mentor_user,
+    student_user,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    dispatched = []
+    monkeypatch.setattr(
+        chat_broadcast,
+        "dispatch",
+        lambda group, message: dispatched.append((group, message)),
+    )
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        chat_services.create_text_message(
+            thread=thread, sender=mentor_user, body="после commit"
+        )
+        assert dispatched == []
+    for callback in callbacks:
+        callback()
+
+    frames = {
+        (group, json.loads(message["text"])["event"]): json.loads(
+            message["text"]
+        )
+        for group, message in dispatched
+    }
+    thread_group = f"chat_thread_{thread.public_id}"
+    mentor_group = f"chat_user_{mentor_user.public_id}"
+    student_group = f"chat_user_{student_user.public_id}"
+    assert set(frames) == {
+        (thread_group, "message.new"),
+        (mentor_group, "message.new"),
+        (student_group, "message.new"),
+        (student_group, "thread.unread"),
+    }
+    frame = frames[(thread_group, "message.new")]
+    assert frame["payload"]["body"] == "после commit"
+    assert "thread_id" not in frame
+    user_frame = frames[(student_group, "message.new")]
+    assert user_frame["thread_id"] == str(thread.public_id)
+    assert user_frame["payload"] == frame["payload"]
+    unread = frames[(student_group, "thread.unread")]
+    assert unread["payload"] == {"unread_count": 1}
+
+
+def test_dispatcher_keeps_order_within_group(fake_layer):
+    dispatcher = chat_broadcast._Dispatcher(10, start=False)
+    for group, n in (("a", 1), ("b", 1), ("a", 2), ("a", 3), ("b", 2)):
+        assert dispatcher.submit(group, {"type": "chat.event", "n": n})
+
+    assert dispatcher.run_once() == 5
+
+    by_group = {}
+    for group, message in fake_layer.sent:
+        by_group.setdefault(group, []).append(message["n"])
+    assert by_group == {"a": [1, 2, 3], "b": [1, 2]}
+    assert dispatcher.run_once() == 0
+
+
+def test_full_queue_sends_in_caller_thread(fake_layer, monkeypatch, settings):
+    settings.CHAT_WS_DISPATCH_QUEUE_SIZE = 1
+    dispatcher = chat_broadcast._Dispatcher(1, start=False)
+    monkeypatch.setattr(chat_broadcast, "_get_dispatcher", lambda: dispatcher)
+
+    chat_broadcast.dispatch("g", {"type": "chat.event", "n": 1})
+    chat_broadcast.dispatch("g", {"type": "chat.event", "n": 2})
+
+    assert [m["n"] for _g, m in fake_layer.sent] == [2]
+    dispatcher.run_once()
+    assert [m["n"] for _g, m in fake_layer.sent] == [2, 1]
@@ -0,0 +1,111 @@
+"""Keyset-пагинация истории чата."""
+
+from django.utils import timezone
+import pytest
+
+from communication import chat_services
+
+
+@pytest.fixture
+def thread(mentor_user, student_user):
+    return chat_services.get_or_create_thread(
+        actor=mentor_user, other=student_user
+    )
+
+
+def _fill(thread, sender, count, *, same_time=False):
+    for idx in range(count):
+        chat_services.create_text_message(
+            thread=thread, sender=sender, body=f"msg-{idx}"
+        )
+    if same_time:
+        thread.messages.update(created_at=timezone.now())
+    return list(thread.messages.order_by("created_at", "public_id"))
+
+
+def _url(thread):
+    return f"/api/communication/chat/threads/{thread.public_id}/messages/"
+
+
+@pytest.mark.django_db
+def test_cursor_pages_do_not_skip_equal_timestamps(
+    thread, mentor_user, mentor_client
+):
+    expected = _fill(thread, mentor_user, 7, same_time=True)
+
+    seen = []
+    params = {"limit": 3}
+    while True:
+        resp = mentor_client.get(_url(thread), params)
+        assert resp.status_code == 200
+        seen = [m["public_id"] for m in resp.data["results"]] + seen
+        if not resp.data["has_more"]:
+            break
+        params = {"limit": 3, "before": resp.data["before_cursor"]}
+
+    assert seen == [str(m.public_id) for m in expected]
+
+
+@pytest.mark.django_db
+def test_after_cursor_pages_forward(thread, mentor_user, mentor_client):
+    expected = _fill(thread, mentor_user, 5, same_time=True)
+    first = chat_services.encode_message_cursor(expected[0])
+
+    resp = mentor_client.get(_url(thread), {"limit": 2, "after": first})
+
+    assert [m["public_id"] for m in resp.data["results"]] == [
+        str(m.public_id) for m in expected[1:3]
+    ]
+    assert resp.data["has_more"] is True
+    assert resp.data["has_newer"] is True
+
+
+@pytest.mark.django_db
+def test_around_centers_page_on_message(thread, mentor_user, mentor_client):
+    expected = _fill(thread, mentor_user, 9)
+    target = expected[4]
+
+    resp = mentor_client.get(
+        _url(thread), {"limit": 4, "around": str(target.public_id)}
+    )
+
+    assert [m["public_id"] for m in resp.data["results"]] == [
+        str(m.public_id) for m in expected[3:7]
+    ]
+    assert resp.data["has_more"] is True
+    assert resp.data["has_newer"] is True
+
+
+@pytest.mark.django_db
+def test_cursor_page_does_not_mark_read(
+    thread, mentor_user, student_user, student_client
+):
+    messages = _fill(thread, mentor_user, 3)
+    cursor = chat_services.encode_message_cursor(messages[-1])
+
+    student_client.get(_url(thread), {"before": cursor})
+
+    thread.refresh_from_db()
+    assert thread.student_unread_count == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"before": "not-a-cursor"},
+        {"after": "123.bad"},
+        {"around": "nope"},
+    ],
+)
+def test_invalid_cursor_is_rejected(thread, mentor_client, params):
+    resp = mentor_client.get(_url(thread), params)
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_around_unknown_message_is_404(thread, mentor_client):
+    resp = mentor_client.get(
+        _url(thread), {"around": "00000000-0000-0000-0000-000000000001"}
+    )
+    assert resp.status_code == 404
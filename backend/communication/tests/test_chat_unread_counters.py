@@ -0,0 +1,134 @@
+"""Денормализованные счётчики непрочитанного и последнее сообщение."""
+
+from unittest.mock import patch
+
+import pytest
+
+from communication import chat_services
+from communication.models import DirectThread
+from users.models import User
+
+
+def _student(n: int) -> User:
+    return User.objects.create_user(
+        email=f"unread-{n}@academy.com",
+        phone=f"+7900222{n:04d}",
+        password="password",
+        first_name=f"Студент{n}",
+        last_name="Счётчик",
+        role="student",
+    )
+
+
+def _thread(mentor, student) -> DirectThread:
+    return chat_services.get_or_create_thread(actor=mentor, other=student)
+
+
+def _send(thread, sender, body="Привет"):
+    return chat_services.create_message(
+        thread=thread, sender=sender, body=body
+    )
+
+
+@pytest.mark.django_db
+def test_send_counts_only_for_recipient(mentor_user, student_user):
+    thread = _thread(mentor_user, student_user)
+    _send(thread, mentor_user)
+    _send(thread, mentor_user, "Ещё")
+    _send(thread, student_user, "Ответ")
+
+    thread = DirectThread.objects.get(pk=thread.pk)
+    assert thread.student_unread_count == 2
+    assert thread.mentor_unread_count == 1
+    assert thread.last_message.body == "Ответ"
+    assert (
+        chat_services.thread_unread_count(thread=thread, user=student_user)
+        == 2
+    )
+    assert chat_services.total_unread_count(user=student_user) == 2
+
+
+@pytest.mark.django_db
+def test_mark_read_resets_and_keeps_later_messages(mentor_user, student_user):
+    thread = _thread(mentor_user, student_user)
+    first = _send(thread, mentor_user)
+    _send(thread, mentor_user, "Позже")
+
+    chat_services.mark_thread_read(
+        thread=thread, user=student_user, at=first.created_at
+    )
+    assert thread.student_unread_count == 1
+
+    chat_services.mark_thread_read(thread=thread, user=student_user)
+    thread.refresh_from_db()
+    assert thread.student_unread_count == 0
+    assert thread.mentor_unread_count == 0
+
+
+@pytest.mark.django_db
+def test_delete_unread_message_decrements(mentor_user, student_user):
+    thread = _thread(mentor_user, student_user)
+    read = _send(thread, mentor_user, "Прочитано")
+    chat_services.mark_thread_read(thread=thread, user=student_user)
+    unread = _send(thread, mentor_user, "Не прочитано")
+
+    chat_services.delete_text_message(message=read, deleter=mentor_user)
+    thread.refresh_from_db()
+    assert thread.student_unread_count == 1
+
+    chat_services.delete_text_message(message=unread, deleter=mentor_user)
+    thread.refresh_from_db()
+    assert thread.student_unread_count == 0
+
+
+@pytest.mark.django_db
+def test_forward_counts_in_target_thread(mentor_user, student_user):
+    source_thread = _thread(mentor_user, student_user)
+    other = _student(1)
+    target = _thread(mentor_user, other)
+    message = _send(source_thread, mentor_user)
+
+    forwarded = chat_services.forward_message(
+        source=message, actor=mentor_user, target_thread=target
+    )
+
+    target.refresh_from_db()
+    assert target.student_unread_count == 1
+    assert target.last_message_id == forwarded.pk
+
+
+@pytest.mark.django_db
+def test_thread_list_query_count_is_constant(
+    mentor_user, mentor_client, django_assert_max_num_queries
+):
+    for n in range(2):
+        student = _student(n)
+        _send(_thread(mentor_user, student), student)
+    with django_assert_max_num_queries(8) as small:
+        mentor_client.get("/api/communication/chat/threads/")
+
+    for n in range(2, 12):
+        student = _student(n)
+        _send(_thread(mentor_user, student), student)
+    with django_assert_max_num_queries(len(small)):
+        resp = mentor_client.get("/api/communication/chat/threads/")
+
+    assert len(resp.data) == 12
+    assert {row["unread_count"] for row in resp.data} == {1}
+    assert {row["last_message_preview"] for row in resp.data} == {"Привет"}
+
+
+@pytest.mark.django_db
+def test_vk_unread_command_uses_counters(mentor_user, student_user):
+    from notify.vk_handlers import _cmd_unread
+
+    thread = _thread(mentor_user, student_user)
+    for _ in range(3):
+        _send(thread, mentor_user)
+
+    with patch("notify.vk_handlers.send_message") as send:
+        _cmd_unread(1, student_user)
+
+    text = send.call_args.args[1]
+    assert text.startswith("Непрочитанных: 3")
+    assert "Ментор Созвон: 3" in text
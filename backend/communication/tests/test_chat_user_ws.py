@@ -0,0 +1,180 @@
+"""Общий WebSocket пользователя для всех диалогов (``ws/chat/``)."""
+
+import asyncio
+from urllib.parse import quote
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+import pytest
+from rest_framework_simplejwt.tokens import AccessToken
+from school_platform.asgi import application
+
+from communication import chat_services
+from communication.consumers import UserChatConsumer
+from users.models import User
+
+
+def _ws_path(user):
+    token = str(AccessToken.for_user(user))
+    return f"/ws/chat/?token={quote(token, safe='')}"
+
+
+def _run(coro):
+    return async_to_sync(coro)()
+
+
+def _committed(fn, capture):
+    def call(**kwargs):
+        with capture(execute=True):
+            return fn(**kwargs)
+
+    return sync_to_async(call)
+
+
+async def _connect(user):
+    communicator = WebsocketCommunicator(application, _ws_path(user))
+    connected, _ = await communicator.connect()
+    assert connected
+    hello = await communicator.receive_json_from()
+    assert hello["event"] == "connected"
+    return communicator, hello["payload"]
+
+
+@pytest.fixture
+def second_student(db):
+    return User.objects.create_user(
+        email="student-two@academy.com",
+        password="password",
+        first_name="Второй",
+        role="student",
+    )
+
+
+@pytest.mark.django_db
+def test_anonymous_rejected():
+    async def run():
+        communicator = WebsocketCommunicator(application, "/ws/chat/")
+        connected, _ = await communicator.connect()
+        assert not connected
+
+    _run(run)
+
+
+@pytest.mark.django_db
+def test_events_from_all_threads_on_one_socket(
+    mentor_user,
+    student_user,
+    second_student,
+    django_capture_on_commit_callbacks,
+):
+    first = chat_services.get_or_create_thread(
+        actor=mentor_user, other=student_user
+    )
+    second = chat_services.get_or_create_thread(
+        actor=mentor_user, other=second_student
+    )
+    chat_services.create_text_message(
+        thread=first, sender=student_user, body="раньше"
+    )
+    send = _committed(
+        chat_services.create_text_message, django_capture_on_commit_callbacks
+    )
+
+    async def run():
+        communicator, snapshot = await _connect(mentor_user)
+        assert snapshot == {"unread": {str(first.public_id): 1}, "total": 1}
+
+        await send(thread=first, sender=student_user, body="из первого")
+        await send(thread=second, sender=second_student, body="из второго")
+
+        frames = [await communicator.receive_json_from() for _ in range(4)]
+        messages = [f for f in frames if f["event"] == "message.new"]
+        unread = [f for f in frames if f["event"] == "thread.unread"]
+        assert [(f["thread_id"], f["payload"]["body"]) for f in messages] == [
+            (str(first.public_id), "из первого"),
+            (str(second.public_id), "из второго"),
+        ]
+        assert {
+            f["thread_id"]: f["payload"]["unread_count"] for f in unread
+        } == {
+            str(first.public_id): 2,
+            str(second.public_id): 1,
+        }
+        await communicator.disconnect()
+
+    _run(run)
+
+
+@pytest.mark.django_db
+def test_typing_is_forwarded_to_peer_and_throttled(
+    mentor_user, student_user, second_student
+):
+    thread = chat_services.get_or_create_thread(
+        actor=mentor_user, other=student_user
+    )
+    foreign = chat_services.get_or_create_thread(
+        actor=mentor_user, other=second_student
+    )
+
+    async def run():
+        mentor_ws, _ = await _connect(mentor_user)
+        student_ws, _ = await _connect(student_user)
+
+        for _ in range(3):
+            await student_ws.send_json_to(
+                {
+                    "event": "typing",
+                    "payload": {"thread_id": str(thread.public_id)},
+                }
+            )
+        typing = await mentor_ws.receive_json_from()
+        assert typing == {
+            "event": "typing",
+            "payload": {"user_id": str(student_user.public_id)},
+            "thread_id": str(thread.public_id),
+        }
+        assert await mentor_ws.receive_nothing(timeout=0.2)
+
+        await student_ws.send_json_to(
+            {
+                "event": "typing",
+                "payload": {"thread_id": str(foreign.public_id)},
+            }
+        )
+        error = await student_ws.receive_json_from()
+        assert error["event"] == "error"
+
+        await mentor_ws.disconnect()
+        await student_ws.disconnect()
+
+    _run(run)
+
+
+@pytest.mark.django_db
+def test_idle_socket_is_closed(mentor_user, settings):
+    settings.CHAT_WS_IDLE_TIMEOUT_SEC = 0.2
+
+    async def run():
+        communicator, _ = await _connect(mentor_user)
+        await communicator.send_json_to({"event": "ping"})
+        assert (await communicator.receive_json_from())["event"] == "pong"
+        closed = await communicator.receive_output(timeout=2)
+        assert closed == {"type": "websocket.close", "code": 4408}
+
+    _run(run)
+
+
+def test_overflow_replaces_backlog_with_resync():
+    async def run():
+        consumer = UserChatConsumer()
+        consumer._outbox = asyncio.Queue(maxsize=2)
+        for n in range(3):
+            await consumer.chat_event({"event": "message.new", "text": str(n)})
+        await consumer.chat_event({"event": "typing", "text": "typing"})
+
+        frames = []
+        while not consumer._outbox.empty():
+            frames.append(consumer._outbox.get_nowait())
+        assert frames == [UserChatConsumer._RESYNC]
+
+    asyncio.run(run())
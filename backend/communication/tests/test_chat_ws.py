@@ -1,5 +1,6 @@
 """WebSocket integration tests for chat."""
 
+import json
 from urllib.parse import quote
 
 from asgiref.sync import async_to_sync, sync_to_async
@@ -21,6 +22,16 @@ def _run(coro):
     return async_to_sync(coro)()
 
 
+def _committed(fn, capture):
+    """Вызов сервиса с выполнением on_commit (рассылка идёт после commit)."""
+
+    def call(**kwargs):
+        with capture(execute=True):
+            return fn(**kwargs)
+
+    return sync_to_async(call)
+
+
 class TestChatWebSocket:
     def test_unauthorized_connection_rejected(self, db):
         async def run():
@@ -74,7 +85,9 @@ class TestChatWebSocket:
 
         _run(run)
 
-    def test_message_new_broadcast_to_peer(self, mentor_user, student_user):
+    def test_message_new_broadcast_to_peer(
+        self, mentor_user, student_user, django_capture_on_commit_callbacks
+    ):
         async def run():
             thread = await sync_to_async(chat_services.get_or_create_thread)(
                 actor=mentor_user,
@@ -88,7 +101,10 @@ class TestChatWebSocket:
             assert connected
             await communicator.receive_json_from()
 
-            await sync_to_async(chat_services.create_text_message)(
+            await _committed(
+                chat_services.create_text_message,
+                django_capture_on_commit_callbacks,
+            )(
                 thread=thread,
                 sender=mentor_user,
                 body="Привет по WS",
@@ -102,7 +118,7 @@ class TestChatWebSocket:
         _run(run)
 
     def test_message_updated_and_deleted_events(
-        self, mentor_user, student_user
+        self, mentor_user, student_user, django_capture_on_commit_callbacks
     ):
         from channels.layers import get_channel_layer
 
@@ -123,7 +139,10 @@ class TestChatWebSocket:
                 channel_name,
             )
 
-            message = await sync_to_async(chat_services.update_text_message)(
+            message = await _committed(
+                chat_services.update_text_message,
+                django_capture_on_commit_callbacks,
+            )(
                 message=message,
                 editor=mentor_user,
                 body="Стало",
@@ -131,20 +150,23 @@ class TestChatWebSocket:
             assert message.body == "Стало"
             updated = await channel_layer.receive(channel_name)
             assert updated["event"] == "message.updated"
-            assert updated["payload"]["body"] == "Стало"
+            assert json.loads(updated["text"])["payload"]["body"] == "Стало"
 
-            await sync_to_async(chat_services.delete_text_message)(
+            await _committed(
+                chat_services.delete_text_message,
+                django_capture_on_commit_callbacks,
+            )(
                 message=message,
                 deleter=mentor_user,
             )
             deleted = await channel_layer.receive(channel_name)
             assert deleted["event"] == "message.deleted"
-            assert deleted["payload"]["is_deleted"] is True
+            assert json.loads(deleted["text"])["payload"]["is_deleted"]
 
         _run(run)
 
     def test_channel_layer_receives_message_new(
-        self, mentor_user, student_user
+        self, mentor_user, student_user, django_capture_on_commit_callbacks
     ):
         from channels.layers import get_channel_layer
 
@@ -159,7 +181,10 @@ class TestChatWebSocket:
                 f"chat_thread_{thread.public_id}",
                 channel_name,
             )
-            await sync_to_async(chat_services.create_text_message)(
+            await _committed(
+                chat_services.create_text_message,
+                django_capture_on_commit_callbacks,
+            )(
                 thread=thread,
                 sender=mentor_user,
                 body="layer-test",
@@ -167,7 +192,9 @@ class TestChatWebSocket:
             event = await channel_layer.receive(channel_name)
             assert event["type"] == "chat.event"
             assert event["event"] == "message.new"
-            assert event["payload"]["body"] == "layer-test"
+            frame = json.loads(event["text"])
+            assert frame["event"] == "message.new"
+            assert frame["payload"]["body"] == "layer-test"
 
         _run(run)
 
@@ -0,0 +1,67 @@
+"""Кэш JWT-аутентификации WebSocket и его отзыв."""
+
+from django.contrib.auth.models import AnonymousUser
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from communication.ws_auth import authenticate_ws_token
+
+
+@pytest.mark.django_db
+def test_repeated_connects_do_not_hit_db(
+    student_user, django_assert_num_queries
+):
+    token = str(AccessToken.for_user(student_user))
+    assert authenticate_ws_token(token).pk == student_user.pk
+
+    with django_assert_num_queries(0):
+        for _ in range(5):
+            user = authenticate_ws_token(token)
+
+    assert user.pk == student_user.pk
+    assert user.is_authenticated
+
+
+@pytest.mark.django_db
+def test_disabled_cache_reads_user_each_time(
+    student_user, settings, django_assert_num_queries
+):
+    settings.WS_AUTH_CACHE_TTL = 0
+    token = str(AccessToken.for_user(student_user))
+
+    with django_assert_num_queries(3):
+        for _ in range(3):
+            authenticate_ws_token(token)
+
+
+@pytest.mark.django_db
+def test_logout_revokes_cached_access_token(student_user):
+    token = AccessToken.for_user(student_user)
+    assert authenticate_ws_token(str(token)).pk == student_user.pk
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    resp = client.post("/api/auth/logout/", {}, format="json")
+    assert resp.status_code == 200
+
+    assert isinstance(authenticate_ws_token(str(token)), AnonymousUser)
+    other = AccessToken.for_user(student_user)
+    assert authenticate_ws_token(str(other)).pk == student_user.pk
+
+
+@pytest.mark.django_db
+def test_deactivated_user_snapshot_is_dropped(student_user):
+    token = str(AccessToken.for_user(student_user))
+    assert authenticate_ws_token(token).is_authenticated
+
+    student_user.is_active = False
+    student_user.save(update_fields=["is_active"])
+
+    assert isinstance(authenticate_ws_token(token), AnonymousUser)
+
+
+@pytest.mark.django_db
+def test_invalid_token_is_anonymous(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        assert isinstance(authenticate_ws_token("garbage"), AnonymousUser)
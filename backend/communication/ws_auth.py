@@ -1,28 +1,119 @@
-"""JWT-аутентификация для WebSocket."""
+"""
+JWT-аутентификация для WebSocket.
+
+Клиенты на нестабильной сети переподключаются часто, поэтому результат
+проверки токена кэшируется: ``jti`` access-токена → снимок пользователя,
+TTL — ``WS_AUTH_CACHE_TTL``, но не дольше жизни токена. Подпись и срок
+токена проверяются при каждом подключении (без БД).
+
+Снимки, отзыв и поколения лежат в cache ``shared``
+(``common.shared_cache``; в docker-compose — Redis), поэтому их видят все
+воркеры daphne и процессы, где пользователь меняется (админка, celery).
+
+Отзыв:
+
+* выход (``user_logged_out``) помечает текущий access-токен отозванным до
+  истечения его срока;
+* сохранение или удаление пользователя (блокировка, смена роли / пароля)
+  увеличивает его поколение — снимки со старым поколением не читаются.
+"""
 
 from __future__ import annotations
 
+import time
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
+from common.shared_cache import shared_cache as cache
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
 from users.models import User
 
+_SNAPSHOT_KEY = "ws_auth:user:{jti}"
+_REVOKED_KEY = "ws_auth:revoked:{jti}"
+_GENERATION_KEY = "ws_auth:gen:{user_id}"
+
+
+def _claims(token) -> tuple[str, str]:
+    jwt = settings.SIMPLE_JWT
+    return (
+        str(token[jwt.get("JTI_CLAIM", "jti")]),
+        str(token[jwt.get("USER_ID_CLAIM", "user_id")]),
+    )
+
+
+def _seconds_left(token) -> int:
+    return max(0, int(token["exp"] - time.time()))
+
 
-@database_sync_to_async
-def _user_from_token(token_str: str):
+def _cache_ttl(token) -> int:
+    ttl = int(getattr(settings, "WS_AUTH_CACHE_TTL", 0) or 0)
+    return min(ttl, _seconds_left(token))
+
+
+def _load_user(user_id: str):
+    user = User.objects.filter(public_id=user_id).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+def authenticate_ws_token(token_str: str):
+    """Пользователь по access-токену (или ``AnonymousUser``)."""
     try:
         token = AccessToken(token_str)
-        claim = settings.SIMPLE_JWT.get("USER_ID_CLAIM", "user_id")
-        user_id = token[claim]
-        return User.objects.get(public_id=user_id)
-    except (InvalidToken, TokenError, User.DoesNotExist, KeyError):
+        jti, user_id = _claims(token)
+    except (InvalidToken, TokenError, KeyError):
+        return AnonymousUser()
+
+    snapshot_key = _SNAPSHOT_KEY.format(jti=jti)
+    revoked_key = _REVOKED_KEY.format(jti=jti)
+    generation_key = _GENERATION_KEY.format(user_id=user_id)
+    cached = cache.get_many([snapshot_key, revoked_key, generation_key])
+    if cached.get(revoked_key):
+        return AnonymousUser()
+    generation = cached.get(generation_key)
+    snapshot = cached.get(snapshot_key)
+    if snapshot is not None and snapshot["generation"] == generation:
+        return snapshot["user"]
+
+    user = _load_user(user_id)
+    if user is None:
         return AnonymousUser()
+    ttl = _cache_ttl(token)
+    if ttl > 0:
+        cache.set(snapshot_key, {"generation": generation, "user": user}, ttl)
+    return user
+
+
+_user_from_token = database_sync_to_async(authenticate_ws_token)
+
+
+def revoke_access_token(token) -> None:
+    """Отозвать access-токен до конца срока его жизни."""
+    try:
+        jti, _user_id = _claims(token)
+    except KeyError:
+        return
+    ttl = _seconds_left(token)
+    if ttl > 0:
+        cache.set(_REVOKED_KEY.format(jti=jti), True, ttl)
+    cache.delete(_SNAPSHOT_KEY.format(jti=jti))
+
+
+def invalidate_user_tokens(user_public_id) -> None:
+    """Снимки всех токенов пользователя больше не действуют."""
+    key = _GENERATION_KEY.format(user_id=user_public_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
 
 
 class JWTAuthMiddleware(BaseMiddleware):
@@ -39,3 +130,28 @@ class JWTAuthMiddleware(BaseMiddleware):
 
 def JWTAuthMiddlewareStack(inner):
     return JWTAuthMiddleware(inner)
+
+
+# --- Сигналы ---------------------------------------------------------------
+
+
+def _on_logged_out(sender, request=None, user=None, **kwargs):
+    token = getattr(request, "auth", None)
+    if isinstance(token, AccessToken):
+        revoke_access_token(token)
+
+
+def _on_user_changed(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.public_id)
+
+
+def connect_ws_auth_signals() -> None:
+    user_logged_out.connect(
+        _on_logged_out, dispatch_uid="ws_auth_revoke_on_logout"
+    )
+    post_save.connect(
+        _on_user_changed, sender=User, dispatch_uid="ws_auth_user_saved"
+    )
+    post_delete.connect(
+        _on_user_changed, sender=User, dispatch_uid="ws_auth_user_deleted"
+    )
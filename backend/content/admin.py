@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin, TabularInline
 from unfold.decorators import action, display
 
+from content.lesson_manifest import update_with_manifest_invalidation
 from content.models import (
     CheckBoxAnswerOption,
     CodingChallenge,
@@ -459,7 +460,7 @@ class CourseAdmin(ModelAdmin):
 
     @action(description=_("Активировать курсы ✅"), permissions=["change"])
     def activate_courses(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request,
             _(f"{updated} курсов активировано ✅"),
@@ -468,7 +469,7 @@ class CourseAdmin(ModelAdmin):
 
     @action(description=_("Деактивировать курсы ❌"), permissions=["change"])
     def deactivate_courses(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request,
             _(f"{updated} курсов деактивировано ❌"),
@@ -842,7 +843,7 @@ class ModuleAdmin(ModelAdmin):
 
     @action(description=_("Активировать модули ✅"), permissions=["change"])
     def activate_modules(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request,
             _(f"{updated} модулей активировано ✅"),
@@ -851,7 +852,7 @@ class ModuleAdmin(ModelAdmin):
 
     @action(description=_("Деактивировать модули ❌"), permissions=["change"])
     def deactivate_modules(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request,
             _(f"{updated} модулей деактивировано ❌"),
@@ -985,7 +986,7 @@ class LessonTheoryAdmin(ModelAdmin):
 
     @action(description=_("Активировать уроки ✅"), permissions=["change"])
     def activate_lessons(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request,
             _(f"{updated} уроков активировано ✅"),
@@ -994,7 +995,7 @@ class LessonTheoryAdmin(ModelAdmin):
 
     @action(description=_("Деактивировать уроки ❌"), permissions=["change"])
     def deactivate_lessons(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request,
             _(f"{updated} уроков деактивировано ❌"),
@@ -1254,7 +1255,7 @@ class LessonRadioQuestionAdmin(ModelAdmin):
 
     @action(description=_("Активировать вопросы ✅"), permissions=["change"])
     def activate_questions(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request,
             _(f"{updated} радио-вопросов активировано ✅"),
@@ -1263,7 +1264,7 @@ class LessonRadioQuestionAdmin(ModelAdmin):
 
     @action(description=_("Деактивировать вопросы ❌"), permissions=["change"])
     def deactivate_questions(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request,
             _(f"{updated} радио-вопросов деактивировано ❌"),
@@ -1272,7 +1273,9 @@ class LessonRadioQuestionAdmin(ModelAdmin):
 
     @action(description=_("Установить 1 балл"), permissions=["change"])
     def set_points_one(self, request, queryset):
-        updated = queryset.update(points=1)
+        updated = update_with_manifest_invalidation(
+            queryset, structure=False, points=1
+        )
         self.message_user(
             request,
             _(f"{updated} вопросов обновлено до 1 балла"),
@@ -1281,7 +1284,9 @@ class LessonRadioQuestionAdmin(ModelAdmin):
 
     @action(description=_("Установить 5 баллов"), permissions=["change"])
     def set_points_five(self, request, queryset):
-        updated = queryset.update(points=5)
+        updated = update_with_manifest_invalidation(
+            queryset, structure=False, points=5
+        )
         self.message_user(
             request,
             _(f"{updated} вопросов обновлено до 5 баллов"),
@@ -1519,7 +1524,7 @@ class LessonCheckBoxQuestionAdmin(ModelAdmin):
 
     @action(description=_("Активировать вопросы ✅"), permissions=["change"])
     def activate_questions(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request,
             _(f"{updated} чекбокс-вопросов активировано ✅"),
@@ -1528,7 +1533,7 @@ class LessonCheckBoxQuestionAdmin(ModelAdmin):
 
     @action(description=_("Деактивировать вопросы ❌"), permissions=["change"])
     def deactivate_questions(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request,
             _(f"{updated} чекбокс-вопросов деактивировано ❌"),
@@ -1715,14 +1720,14 @@ class CodingChallengeAdmin(ModelAdmin):
 
     @action(description=_("Активировать"), permissions=["change"])
     def activate_challenges(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_with_manifest_invalidation(queryset, is_active=True)
         self.message_user(
             request, _(f"{updated} задач активировано ✅"), messages.SUCCESS
         )
 
     @action(description=_("Деактивировать"), permissions=["change"])
     def deactivate_challenges(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_with_manifest_invalidation(queryset, is_active=False)
         self.message_user(
             request, _(f"{updated} задач деактивировано ❌"), messages.WARNING
         )
@@ -6,3 +6,10 @@ class ContentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "content"
     verbose_name = _("Контент")
+
+    def ready(self):
+        from content.lesson_manifest import connect_manifest_signals
+        from content.response_cache import connect_response_cache_signals
+
+        connect_manifest_signals()
+        connect_response_cache_signals()
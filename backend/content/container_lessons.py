@@ -69,6 +69,23 @@ def next_order_in_container(container_kind: str, container_id: int) -> int:
     return max_order_in_container(container_kind, container_id) + 1
 
 
+def _invalidate_container(container_kind: str, container_id: int) -> None:
+    """Сбросить манифест курса после массового ``update`` порядка."""
+    from content.lesson_manifest import invalidate_course_manifests
+    from content.models import Exam, Module
+
+    if container_kind == CONTAINER_MODULE:
+        qs = Module.objects.filter(pk=container_id)
+    elif container_kind == CONTAINER_EXAM:
+        qs = Exam.objects.filter(pk=container_id)
+    else:
+        invalidate_course_manifests([container_id], structure=False)
+        return
+    invalidate_course_manifests(
+        qs.values_list("course_id", flat=True), structure=False
+    )
+
+
 def shift_orders_after_delete(
     container_kind: str, container_id: int, deleted_index: int
 ):
@@ -77,6 +94,7 @@ def shift_orders_after_delete(
         model.objects.filter(**filters, order_index__gt=deleted_index).update(
             order_index=F("order_index") - 1
         )
+    _invalidate_container(container_kind, container_id)
 
 
 def order_index_conflict(
@@ -98,59 +116,33 @@ def order_index_conflict(
 
 
 def iter_container_lessons(container, active_only: bool = False):
-    """Уроки контейнера в порядке order_index: (type, instance)."""
-    from content.models import Exam, Module
+    """
+    Уроки контейнера в порядке order_index: (type, instance).
+
+    Состав берётся из манифеста курса: запросы идут только в таблицы тех
+    типов, что реально есть в контейнере (по одному ``pk__in`` на тип).
+    """
+    from content.lesson_manifest import (
+        KIND_BY_MODEL_NAME,
+        get_container_manifest,
+    )
 
-    if isinstance(container, Module):
-        kind = CONTAINER_MODULE
-    elif isinstance(container, Exam):
-        kind = CONTAINER_EXAM
-    else:
-        kind = CONTAINER_COURSE
+    manifest, kind, container_id = get_container_manifest(container)
+    entries = manifest.container_lessons(
+        kind, container_id, active_only=active_only
+    )
+    pks_by_kind: dict[str, list[int]] = {}
+    for entry in entries:
+        pks_by_kind.setdefault(entry.kind, []).append(entry.pk)
 
     items = []
-    if kind == CONTAINER_MODULE:
-        theories = container.lessons_theories.all()
-        radios = container.lessons_radio_questions.all()
-        checkboxes = container.lessons_checkbox_questions.all()
-        short_answers = container.lessons_short_answers.all()
-        challenges = container.challenges.all()
-    elif kind == CONTAINER_EXAM:
-        theories = container.lessons_theories.all()
-        radios = container.lessons_radio_questions.all()
-        checkboxes = container.lessons_checkbox_questions.all()
-        short_answers = container.lessons_short_answers.all()
-        challenges = container.challenges.all()
-    else:
-        from content.models import CodingChallenge
-
-        theories = container.course_lessons_theories.all()
-        radios = container.course_lessons_radio_questions.all()
-        checkboxes = container.course_lessons_checkbox_questions.all()
-        short_answers = container.course_lessons_short_answers.all()
-        challenges = CodingChallenge.objects.filter(
-            course_id=container.id,
-            module__isnull=True,
-            exam__isnull=True,
-        )
-
-    if active_only:
-        theories = theories.filter(is_active=True)
-        radios = radios.filter(is_active=True)
-        checkboxes = checkboxes.filter(is_active=True)
-        short_answers = short_answers.filter(is_active=True)
-        challenges = challenges.filter(is_active=True)
-
-    for obj in theories:
-        items.append(("theory", obj))
-    for obj in radios:
-        items.append(("radio", obj))
-    for obj in checkboxes:
-        items.append(("checkbox", obj))
-    for obj in short_answers:
-        items.append(("short_answer", obj))
-    for obj in challenges:
-        items.append(("coding", obj))
+    for model in _lesson_models():
+        lesson_kind = KIND_BY_MODEL_NAME[model.__name__]
+        pks = pks_by_kind.get(lesson_kind)
+        if not pks:
+            continue
+        for obj in model.objects.filter(pk__in=pks):
+            items.append((lesson_kind, obj))
     items.sort(key=lambda pair: (pair[1].order_index, pair[0]))
     return items
 
@@ -0,0 +1,460 @@
+"""
+Манифест уроков курса: компактный список шагов без обхода пяти таблиц.
+
+Для каждого курса храним кортежи ``LessonEntry`` (тип, public_id,
+контейнер, порядок, баллы, активность) и активность модулей / КР. Манифест
+лежит в cache ``shared`` (``common.shared_cache``, общий для web, celery и
+консьюмера Kafka) и в локальном LRU процесса; ключ включает версию курса.
+Любое изменение урока, модуля, КР или курса увеличивает версию (сигналы
+ниже), старые записи просто перестают читаться. Версия увеличивается сразу
+и ещё раз после ``COMMIT``: манифест, собранный другим процессом из старых
+строк до коммита, тоже перестаёт читаться.
+
+Для массовых ``queryset.update()`` используйте
+``update_with_manifest_invalidation(...)`` или вызывайте
+``invalidate_course_manifests(...)`` вручную — сигналы там не срабатывают.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+import time
+from typing import NamedTuple
+from uuid import UUID
+
+from common.shared_cache import shared_cache as cache
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal
+
+from content.container_lessons import (
+    CONTAINER_COURSE,
+    CONTAINER_EXAM,
+    CONTAINER_MODULE,
+    _lesson_models,
+)
+
+KIND_BY_MODEL_NAME = {
+    "LessonTheory": "theory",
+    "LessonRadioQuestion": "radio",
+    "LessonCheckBoxQuestion": "checkbox",
+    "LessonShortAnswer": "short_answer",
+    "CodingChallenge": "coding",
+}
+LESSON_KINDS = tuple(KIND_BY_MODEL_NAME.values())
+
+# Изменилась структура курса (набор / активность / контейнер шагов).
+# Аргументы: course_ids — множество id курсов.
+course_structure_changed = Signal()
+
+_VERSION_KEY = "lesson_manifest:v:{course_id}"
+_DATA_KEY = "lesson_manifest:{course_id}:{version}"
+
+
+class LessonEntry(NamedTuple):
+    kind: str
+    public_id: UUID
+    container: str
+    container_id: int
+    order_index: int
+    points: int
+    is_active: bool
+    title: str
+    pk: int
+
+    @property
+    def key(self) -> str:
+        """Ключ шага в формате фронта: ``theory-<uuid>``, ``radio-<uuid>``…"""
+        return f"{self.kind}-{self.public_id}"
+
+
+class CourseManifest(NamedTuple):
+    course_id: int
+    version: int
+    # id → is_active
+    modules: dict[int, bool]
+    exams: dict[int, bool]
+    lessons: tuple[LessonEntry, ...]
+
+    def _container_active(self, entry: LessonEntry) -> bool:
+        if entry.container == CONTAINER_MODULE:
+            return self.modules.get(entry.container_id, False)
+        if entry.container == CONTAINER_EXAM:
+            return self.exams.get(entry.container_id, False)
+        return True
+
+    def active_lessons(self) -> list[LessonEntry]:
+        """Шаги, которые идут в зачёт курса (как в прогрессе)."""
+        return [
+            e
+            for e in self.lessons
+            if e.is_active and self._container_active(e)
+        ]
+
+    def container_lessons(
+        self, container: str, container_id: int, active_only: bool = False
+    ) -> list[LessonEntry]:
+        """Шаги контейнера в порядке ``(order_index, kind)``."""
+        items = [
+            e
+            for e in self.lessons
+            if e.container == container
+            and e.container_id == container_id
+            and (e.is_active or not active_only)
+        ]
+        items.sort(key=lambda e: (e.order_index, e.kind))
+        return items
+
+    def counts(self) -> dict[str, int]:
+        result = {kind: 0 for kind in LESSON_KINDS}
+        for entry in self.active_lessons():
+            result[entry.kind] += 1
+        result["total"] = sum(result[kind] for kind in LESSON_KINDS)
+        return result
+
+    def active_pks(self) -> dict[str, list[int]]:
+        result: dict[str, list[int]] = {kind: [] for kind in LESSON_KINDS}
+        for entry in self.active_lessons():
+            result[entry.kind].append(entry.pk)
+        return result
+
+
+class _LocalLRU:
+    """Небольшой LRU процесса поверх общего cache."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[int, CourseManifest] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, course_id: int, version: int) -> CourseManifest | None:
+        with self._lock:
+            manifest = self._data.get(course_id)
+            if manifest is None or manifest.version != version:
+                return None
+            self._data.move_to_end(course_id)
+            return manifest
+
+    def put(self, manifest: CourseManifest) -> None:
+        with self._lock:
+            self._data[manifest.course_id] = manifest
+            self._data.move_to_end(manifest.course_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, course_id: int) -> None:
+        with self._lock:
+            self._data.pop(course_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local = _LocalLRU(getattr(settings, "LESSON_MANIFEST_LRU_SIZE", 128))
+
+
+def _current_version(course_id: int) -> int:
+    key = _VERSION_KEY.format(course_id=course_id)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия от времени: после очистки cache не совпадёт
+        # со старыми записями локального LRU.
+        version = time.time_ns() // 1000
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def _container_of(module_id, exam_id, course_id) -> tuple[str, int]:
+    if module_id:
+        return CONTAINER_MODULE, module_id
+    if exam_id:
+        return CONTAINER_EXAM, exam_id
+    return CONTAINER_COURSE, course_id
+
+
+def _build_manifest(course_id: int, version: int) -> CourseManifest:
+    from content.models import Exam, Module
+
+    modules = dict(
+        Module.objects.filter(course_id=course_id).values_list(
+            "id", "is_active"
+        )
+    )
+    exams = dict(
+        Exam.objects.filter(course_id=course_id).values_list("id", "is_active")
+    )
+    scope = (
+        Q(module_id__in=list(modules))
+        | Q(exam_id__in=list(exams))
+        | Q(course_id=course_id, module__isnull=True, exam__isnull=True)
+    )
+
+    lessons: list[LessonEntry] = []
+    for model in _lesson_models():
+        kind = KIND_BY_MODEL_NAME[model.__name__]
+        has_points = kind != "theory"
+        fields = [
+            "pk",
+            "public_id",
+            "module_id",
+            "exam_id",
+            "order_index",
+            "is_active",
+            "title",
+        ]
+        if has_points:
+            fields.append("points")
+        for row in model.objects.filter(scope).values_list(*fields):
+            pk, public_id, module_id, exam_id, order, active, title = row[:7]
+            container, container_id = _container_of(
+                module_id, exam_id, course_id
+            )
+            lessons.append(
+                LessonEntry(
+                    kind=kind,
+                    public_id=public_id,
+                    container=container,
+                    container_id=container_id,
+                    order_index=order,
+                    points=row[7] if has_points else 0,
+                    is_active=active,
+                    title=title,
+                    pk=pk,
+                )
+            )
+    lessons.sort(key=lambda e: (e.container, e.container_id, e.order_index))
+    return CourseManifest(
+        course_id=course_id,
+        version=version,
+        modules=modules,
+        exams=exams,
+        lessons=tuple(lessons),
+    )
+
+
+def get_course_manifest(course) -> CourseManifest:
+    """Манифест курса (``Course`` или его id) из LRU / cache / БД."""
+    course_id = getattr(course, "pk", course)
+    version = _current_version(course_id)
+
+    manifest = _local.get(course_id, version)
+    if manifest is not None:
+        return manifest
+
+    data_key = _DATA_KEY.format(course_id=course_id, version=version)
+    manifest = cache.get(data_key)
+    if manifest is None:
+        manifest = _build_manifest(course_id, version)
+        cache.set(
+            data_key,
+            manifest,
+            timeout=getattr(settings, "LESSON_MANIFEST_CACHE_TTL", 86400),
+        )
+    _local.put(manifest)
+    return manifest
+
+
+def get_container_manifest(container) -> tuple[CourseManifest, str, int]:
+    """Манифест курса контейнера + (тип, id) контейнера внутри него."""
+    from content.models import Exam, Module
+
+    if isinstance(container, Module):
+        return (
+            get_course_manifest(container.course_id),
+            CONTAINER_MODULE,
+            container.pk,
+        )
+    if isinstance(container, Exam):
+        return (
+            get_course_manifest(container.course_id),
+            CONTAINER_EXAM,
+            container.pk,
+        )
+    return get_course_manifest(container.pk), CONTAINER_COURSE, container.pk
+
+
+def container_lesson_entries(
+    container, active_only: bool = False
+) -> list[LessonEntry]:
+    """Шаги модуля / КР / курса из манифеста, без запросов к урокам."""
+    manifest, kind, container_id = get_container_manifest(container)
+    return manifest.container_lessons(
+        kind, container_id, active_only=active_only
+    )
+
+
+def _bump_versions(course_ids) -> None:
+    for course_id in course_ids:
+        key = _VERSION_KEY.format(course_id=course_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Версии ещё нет — при чтении создастся новая.
+            pass
+        _local.discard(course_id)
+
+
+def invalidate_course_manifests(course_ids, structure: bool = True) -> None:
+    """
+    Сбросить манифесты курсов (увеличить версию).
+
+    ``structure=True`` — изменился состав / активность шагов: подписчики
+    ``course_structure_changed`` (сводки прогресса) пересчитают своё.
+    """
+    from content.response_cache import invalidate_course_responses
+
+    course_ids = {cid for cid in course_ids if cid}
+    # Отрендеренные ответы курса (content.response_cache) зависят от тех же
+    # строк — массовые ``update`` сбрасывают их здесь же.
+    invalidate_course_responses(course_ids)
+    _bump_versions(course_ids)
+    if course_ids:
+        transaction.on_commit(lambda: _bump_versions(course_ids))
+    if course_ids and structure:
+        course_structure_changed.send(
+            sender=invalidate_course_manifests, course_ids=course_ids
+        )
+
+
+def _queryset_course_ids(queryset) -> set[int]:
+    name = queryset.model.__name__
+    if name == "Course":
+        return set(queryset.values_list("pk", flat=True))
+    if name in ("Module", "Exam"):
+        return set(queryset.values_list("course_id", flat=True))
+    course_ids = set()
+    for row in queryset.values_list(
+        "module__course_id", "exam__course_id", "course_id"
+    ):
+        course_ids.add(next((cid for cid in row if cid), None))
+    return course_ids
+
+
+def update_with_manifest_invalidation(
+    queryset, structure: bool = True, **values
+) -> int:
+    """
+    ``queryset.update(**values)`` со сбросом манифестов затронутых курсов.
+
+    Курсы собираются до ``update``: фильтр queryset (например, по
+    ``is_active`` в changelist админки) после обновления может не
+    совпасть ни с одной строкой.
+    """
+    course_ids = _queryset_course_ids(queryset)
+    updated = queryset.update(**values)
+    if queryset.model.__name__ == "Course":
+        from content.response_cache import invalidate_catalog_responses
+
+        invalidate_catalog_responses()
+    invalidate_course_manifests(course_ids, structure=structure)
+    return updated
+
+
+def lesson_course_id(lesson) -> int | None:
+    """Курс урока с учётом контейнера (модуль / КР / курс)."""
+    if lesson.module_id:
+        return lesson.module.course_id
+    if getattr(lesson, "exam_id", None):
+        return lesson.exam.course_id
+    return lesson.course_id
+
+
+# --- Сигналы ---------------------------------------------------------------
+
+# Поля, попадающие в манифест; первая группа меняет структуру курса.
+_STRUCTURE_FIELDS = ("is_active", "module_id", "exam_id", "course_id")
+_MANIFEST_FIELDS = {
+    "Course": ("is_active",),
+    "Module": ("is_active", "course_id"),
+    "Exam": ("is_active", "course_id"),
+    "LessonTheory": _STRUCTURE_FIELDS + ("order_index", "title"),
+    "LessonRadioQuestion": _STRUCTURE_FIELDS
+    + ("order_index", "title", "points"),
+    "LessonCheckBoxQuestion": _STRUCTURE_FIELDS
+    + ("order_index", "title", "points"),
+    "LessonShortAnswer": _STRUCTURE_FIELDS
+    + ("order_index", "title", "points"),
+    "CodingChallenge": _STRUCTURE_FIELDS + ("order_index", "title", "points"),
+}
+
+
+def _course_ids_of(sender, instance) -> set[int]:
+    name = sender.__name__
+    if name == "Course":
+        return {instance.pk}
+    if name in ("Module", "Exam"):
+        return {instance.course_id}
+    return {lesson_course_id(instance)}
+
+
+def _snapshot(sender, instance) -> tuple:
+    return tuple(
+        getattr(instance, field) for field in _MANIFEST_FIELDS[sender.__name__]
+    )
+
+
+def _remember_manifest_fields(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or not instance.pk:
+        return
+    old = sender.objects.filter(pk=instance.pk).first()
+    if old is None:
+        return
+    instance._manifest_snapshot = _snapshot(sender, old)
+    instance._manifest_course_ids = _course_ids_of(sender, old)
+
+
+def _on_content_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fields = _MANIFEST_FIELDS[sender.__name__]
+    current = _snapshot(sender, instance)
+    previous = getattr(instance, "_manifest_snapshot", None)
+    if not created and previous == current:
+        return
+    structure = created or previous is None
+    if not structure:
+        structure = any(
+            old != new
+            for field, old, new in zip(fields, previous, current)
+            if field in _STRUCTURE_FIELDS
+        )
+    course_ids = _course_ids_of(sender, instance)
+    course_ids |= getattr(instance, "_manifest_course_ids", set())
+    invalidate_course_manifests(course_ids, structure=structure)
+
+
+def _on_content_deleted(sender, instance, **kwargs):
+    try:
+        course_ids = _course_ids_of(sender, instance)
+    except ObjectDoesNotExist:
+        # Родитель удалён каскадом — его курс сброшен его же сигналом.
+        course_ids = {getattr(instance, "course_id", None)}
+    invalidate_course_manifests(course_ids)
+
+
+def connect_manifest_signals() -> None:
+    from content.models import Course, Exam, Module
+
+    for model in (Course, Module, Exam, *_lesson_models()):
+        label = model._meta.label
+        pre_save.connect(
+            _remember_manifest_fields,
+            sender=model,
+            dispatch_uid=f"lesson_manifest_pre_{label}",
+        )
+        post_save.connect(
+            _on_content_saved,
+            sender=model,
+            dispatch_uid=f"lesson_manifest_save_{label}",
+        )
+        post_delete.connect(
+            _on_content_deleted,
+            sender=model,
+            dispatch_uid=f"lesson_manifest_delete_{label}",
+        )
@@ -1,6 +1,33 @@
 """Фильтры queryset для публичного API уроков (модуль, КР, курс)."""
 
-from django.db.models import Q
+from django.db.models import Prefetch, Q
+
+from .models import (
+    CodingChallenge,
+    Exam,
+    LessonCheckBoxQuestion,
+    LessonRadioQuestion,
+    LessonShortAnswer,
+    LessonTheory,
+    Module,
+)
+
+# Связи контейнера с уроками, которые выводят короткие сериализаторы
+# (``ModuleShortSerializer`` / ``ModuleDetailSerializer``,
+# ``ExamShortSerializer``).
+MODULE_LESSON_RELATIONS = {
+    "lessons_theories": LessonTheory,
+    "lessons_radio_questions": LessonRadioQuestion,
+    "lessons_checkbox_questions": LessonCheckBoxQuestion,
+    "lessons_short_answers": LessonShortAnswer,
+    "challenges": CodingChallenge,
+}
+EXAM_LESSON_RELATIONS = {
+    "lessons_theories": LessonTheory,
+    "lessons_radio_questions": LessonRadioQuestion,
+    "lessons_checkbox_questions": LessonCheckBoxQuestion,
+    "challenges": CodingChallenge,
+}
 
 
 def public_lesson_parent_q() -> Q:
@@ -22,3 +49,34 @@ def public_lesson_parent_q() -> Q:
         course__is_active=True,
     )
     return module_q | exam_q | course_q
+
+
+def active_ordered_prefetch(lookup: str, model) -> Prefetch:
+    """
+    Prefetch только активных строк по ``order_index``: сериализатор читает
+    ``relation.all()`` и фильтрует в памяти, без повторного запроса.
+    """
+    return Prefetch(
+        lookup,
+        queryset=model.objects.filter(is_active=True).order_by("order_index"),
+    )
+
+
+def container_lessons_prefetches(
+    relations: dict, prefix: str = ""
+) -> list[Prefetch]:
+    """Prefetch уроков контейнера; ``prefix`` — путь до контейнера."""
+    return [
+        active_ordered_prefetch(f"{prefix}{name}", model)
+        for name, model in relations.items()
+    ]
+
+
+def course_structure_prefetches() -> list[Prefetch]:
+    """Модули и КР курса с их уроками — для ``CourseDetailSerializer``."""
+    return [
+        active_ordered_prefetch("modules", Module),
+        *container_lessons_prefetches(MODULE_LESSON_RELATIONS, "modules__"),
+        active_ordered_prefetch("exams", Exam),
+        *container_lessons_prefetches(EXAM_LESSON_RELATIONS, "exams__"),
+    ]
@@ -0,0 +1,247 @@
+"""
+Кэш отрендеренных ответов каталога курсов и оглавления курса
+(``GET /api/content/courses/`` и ``/courses/{public_id}/``) для анонимных
+запросов — у них ответ одинаков для всех.
+
+Ключ включает версии содержимого: оглавление — версию курса и версию
+технологий, каталог — версию каталога и версию технологий; а также язык,
+хост и строку запроса (фильтр ``?technology=``, абсолютные URL картинок).
+Версии увеличиваются сигналами сохранения / удаления контентных моделей
+(любое поле, а не только поля манифеста), изменением технологий курса и
+вместе со сбросом манифестов (``invalidate_course_manifests`` — массовые
+действия админки, перестановка уроков) — сразу и ещё раз после ``COMMIT``,
+чтобы ответ, собранный до коммита из старых строк, не читался. Версии и
+ответы лежат в cache ``shared`` (``common.shared_cache``): правки из
+celery и консьюмера Kafka видны веб-процессам. Старые записи перестают
+читаться и истекают по TTL. Изменения профиля автора курса (имя, аватар)
+отслеживаются только через TTL.
+
+ETag — хэш отрендеренного тела; он хранится вместе с данными, поэтому
+``If-None-Match`` проверяется одним чтением cache без запросов к БД. Ответ,
+пересобранный после истечения TTL (например, с новым профилем автора),
+получает новый ETag, если тело изменилось.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+
+from common.shared_cache import shared_cache as cache
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import translation
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+_COURSE_VERSION_KEY = "content_response:v:course:{course_id}"
+_CATALOG_VERSION_KEY = "content_response:v:catalog"
+_TECHNOLOGY_VERSION_KEY = "content_response:v:technology"
+_COURSE_PK_KEY = "content_response:course_pk:{public_id}"
+_DATA_KEY = "content_response:{digest}"
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "CONTENT_RESPONSE_CACHE_TTL", 0) or 0)
+
+
+def _version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия от времени: после очистки cache не совпадёт
+        # со старыми ETag клиентов.
+        version = time.time_ns() // 1000
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def _incr_versions(keys) -> None:
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Версии ещё нет — при чтении создастся новая.
+            pass
+
+
+def _bump(*keys: str) -> None:
+    _incr_versions(keys)
+    transaction.on_commit(lambda: _incr_versions(keys))
+
+
+def invalidate_course_responses(course_ids) -> None:
+    keys = [
+        _COURSE_VERSION_KEY.format(course_id=course_id)
+        for course_id in {cid for cid in course_ids if cid}
+    ]
+    if keys:
+        _bump(*keys)
+
+
+def invalidate_catalog_responses() -> None:
+    _bump(_CATALOG_VERSION_KEY)
+
+
+def _course_pk(public_id) -> int | None:
+    """id курса по public_id (неизменяемая пара — кэшируется навсегда)."""
+    from content.models import Course
+
+    key = _COURSE_PK_KEY.format(public_id=public_id)
+    pk = cache.get(key)
+    if pk is None:
+        pk = (
+            Course.objects.filter(public_id=public_id)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is not None:
+            cache.set(key, pk, timeout=None)
+    return pk
+
+
+def _if_none_match(request) -> set[str]:
+    raw = request.META.get("HTTP_IF_NONE_MATCH") or ""
+    return {
+        tag.strip().removeprefix("W/") for tag in raw.split(",") if tag.strip()
+    }
+
+
+def _cached_response(request, parts: tuple, build) -> Response:
+    if _ttl() <= 0 or request.user.is_authenticated:
+        return build()
+
+    raw_key = ":".join(
+        str(part)
+        for part in (
+            *parts,
+            translation.get_language(),
+            request.scheme,
+            request.get_host(),
+            request.META.get("QUERY_STRING", ""),
+        )
+    )
+    digest = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+    data_key = _DATA_KEY.format(digest=digest)
+    cached = cache.get(data_key)
+    if cached is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        body = JSONRenderer().render(response.data)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cache.set(data_key, (etag, response.data), timeout=_ttl())
+    else:
+        etag, data = cached
+        response = None
+
+    if etag in _if_none_match(request):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    elif response is None:
+        response = Response(data)
+    response["ETag"] = etag
+    return response
+
+
+def cached_catalog_response(request, build) -> Response:
+    """Список курсов: ``build()`` — обычный ответ ``list``."""
+    return _cached_response(
+        request,
+        (
+            "catalog",
+            _version(_CATALOG_VERSION_KEY),
+            _version(_TECHNOLOGY_VERSION_KEY),
+        ),
+        build,
+    )
+
+
+def cached_course_response(request, public_id, build) -> Response:
+    """Оглавление курса: ``build()`` — обычный ответ ``retrieve``."""
+    course_id = _course_pk(public_id)
+    if course_id is None:
+        return build()
+    return _cached_response(
+        request,
+        (
+            "course",
+            course_id,
+            _version(_COURSE_VERSION_KEY.format(course_id=course_id)),
+            _version(_TECHNOLOGY_VERSION_KEY),
+        ),
+        build,
+    )
+
+
+# --- Сигналы ---------------------------------------------------------------
+
+
+def _on_course_content_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from content.lesson_manifest import _course_ids_of
+
+    try:
+        course_ids = _course_ids_of(sender, instance)
+    except ObjectDoesNotExist:
+        # Родитель удалён каскадом — его курс сброшен его же сигналом.
+        course_ids = {getattr(instance, "course_id", None)}
+    # Перенос модуля / урока в другой курс: старый курс тоже меняется.
+    course_ids |= getattr(instance, "_manifest_course_ids", set())
+    invalidate_course_responses(course_ids)
+    if sender.__name__ == "Course":
+        invalidate_catalog_responses()
+
+
+def _on_technology_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _bump(_TECHNOLOGY_VERSION_KEY)
+
+
+def _on_course_technology_changed(sender, instance, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    from content.models import Course
+
+    if isinstance(instance, Course):
+        invalidate_course_responses([instance.pk])
+    else:
+        _bump(_TECHNOLOGY_VERSION_KEY)
+    invalidate_catalog_responses()
+
+
+def connect_response_cache_signals() -> None:
+    from content.container_lessons import _lesson_models
+    from content.models import Course, Exam, Module, Technology
+
+    for model in (Course, Module, Exam, *_lesson_models()):
+        label = model._meta.label
+        post_save.connect(
+            _on_course_content_changed,
+            sender=model,
+            dispatch_uid=f"content_response_save_{label}",
+        )
+        post_delete.connect(
+            _on_course_content_changed,
+            sender=model,
+            dispatch_uid=f"content_response_delete_{label}",
+        )
+    post_save.connect(
+        _on_technology_changed,
+        sender=Technology,
+        dispatch_uid="content_response_save_technology",
+    )
+    post_delete.connect(
+        _on_technology_changed,
+        sender=Technology,
+        dispatch_uid="content_response_delete_technology",
+    )
+    m2m_changed.connect(
+        _on_course_technology_changed,
+        sender=Course.technology.through,
+        dispatch_uid="content_response_course_technology",
+    )
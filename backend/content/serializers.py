@@ -33,6 +33,17 @@ from .video_utils import build_video_payload
 User = get_user_model()
 
 
+def active_sorted(related_manager) -> list:
+    """
+    Активные строки связи по ``order_index``. С prefetch (см.
+    ``content.lesson_querysets``) — без запроса; без него — один запрос.
+    """
+    return sorted(
+        (row for row in related_manager.all() if row.is_active),
+        key=lambda row: row.order_index,
+    )
+
+
 class CourseMentorBriefSerializer(serializers.ModelSerializer):
     public_id = serializers.UUIDField(read_only=True)
 
@@ -184,34 +195,29 @@ class ModuleShortSerializer(serializers.ModelSerializer):
     lessons_coding = serializers.SerializerMethodField()
 
     def get_lessons_theories(self, obj):
-        queryset = obj.lessons_theories.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonTheoryShortSerializer(queryset, many=True).data
+        return LessonTheoryShortSerializer(
+            active_sorted(obj.lessons_theories), many=True
+        ).data
 
     def get_lessons_radio(self, obj):
-        queryset = obj.lessons_radio_questions.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonRadioShortSerializer(queryset, many=True).data
+        return LessonRadioShortSerializer(
+            active_sorted(obj.lessons_radio_questions), many=True
+        ).data
 
     def get_lessons_checkbox(self, obj):
-        queryset = obj.lessons_checkbox_questions.filter(
-            is_active=True
-        ).order_by("order_index")
-        return LessonCheckBoxShortSerializer(queryset, many=True).data
+        return LessonCheckBoxShortSerializer(
+            active_sorted(obj.lessons_checkbox_questions), many=True
+        ).data
 
     def get_lessons_short_answer(self, obj):
-        queryset = obj.lessons_short_answers.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonShortAnswerShortSerializer(queryset, many=True).data
+        return LessonShortAnswerShortSerializer(
+            active_sorted(obj.lessons_short_answers), many=True
+        ).data
 
     def get_lessons_coding(self, obj):
-        queryset = obj.challenges.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return CodingChallengeShortSerializer(queryset, many=True).data
+        return CodingChallengeShortSerializer(
+            active_sorted(obj.challenges), many=True
+        ).data
 
     class Meta:
         model = Module
@@ -258,34 +264,29 @@ class ModuleDetailSerializer(serializers.ModelSerializer):
     lessons_coding = serializers.SerializerMethodField()
 
     def get_lessons_theories(self, obj):
-        queryset = obj.lessons_theories.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonTheoryShortSerializer(queryset, many=True).data
+        return LessonTheoryShortSerializer(
+            active_sorted(obj.lessons_theories), many=True
+        ).data
 
     def get_lessons_radio(self, obj):
-        queryset = obj.lessons_radio_questions.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonRadioShortSerializer(queryset, many=True).data
+        return LessonRadioShortSerializer(
+            active_sorted(obj.lessons_radio_questions), many=True
+        ).data
 
     def get_lessons_checkbox(self, obj):
-        queryset = obj.lessons_checkbox_questions.filter(
-            is_active=True
-        ).order_by("order_index")
-        return LessonCheckBoxShortSerializer(queryset, many=True).data
+        return LessonCheckBoxShortSerializer(
+            active_sorted(obj.lessons_checkbox_questions), many=True
+        ).data
 
     def get_lessons_short_answer(self, obj):
-        queryset = obj.lessons_short_answers.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return LessonShortAnswerShortSerializer(queryset, many=True).data
+        return LessonShortAnswerShortSerializer(
+            active_sorted(obj.lessons_short_answers), many=True
+        ).data
 
     def get_lessons_coding(self, obj):
-        queryset = obj.challenges.filter(is_active=True).order_by(
-            "order_index"
-        )
-        return CodingChallengeShortSerializer(queryset, many=True).data
+        return CodingChallengeShortSerializer(
+            active_sorted(obj.challenges), many=True
+        ).data
 
     class Meta:
         model = Module
@@ -330,29 +331,27 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     course_lessons = serializers.SerializerMethodField()
 
     def get_modules(self, obj):
-        queryset = obj.modules.filter(is_active=True).order_by("order_index")
-        return ModuleShortSerializer(queryset, many=True).data
+        return ModuleShortSerializer(
+            active_sorted(obj.modules), many=True
+        ).data
 
     def get_exams(self, obj):
         from exams.serializers import ExamShortSerializer
 
-        queryset = obj.exams.filter(is_active=True).order_by("order_index")
-        return ExamShortSerializer(queryset, many=True).data
+        return ExamShortSerializer(active_sorted(obj.exams), many=True).data
 
     def get_course_lessons(self, obj):
-        from content.container_lessons import iter_container_lessons
-
-        items = []
-        for kind, lesson in iter_container_lessons(obj, active_only=True):
-            items.append(
-                {
-                    "kind": kind,
-                    "public_id": str(lesson.public_id),
-                    "title": lesson.title,
-                    "order_index": lesson.order_index,
-                }
-            )
-        return items
+        from content.lesson_manifest import container_lesson_entries
+
+        return [
+            {
+                "kind": entry.kind,
+                "public_id": str(entry.public_id),
+                "title": entry.title,
+                "order_index": entry.order_index,
+            }
+            for entry in container_lesson_entries(obj, active_only=True)
+        ]
 
     class Meta:
         model = Course
@@ -0,0 +1,158 @@
+"""Число запросов детального курса / модуля / списка КР не растёт с курсом."""
+
+from common.shared_cache import shared_cache as cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+from rest_framework.test import APIClient
+
+from content.models import (
+    CodingChallenge,
+    Course,
+    Exam,
+    LessonCheckBoxQuestion,
+    LessonRadioQuestion,
+    LessonShortAnswer,
+    LessonTheory,
+    Module,
+)
+from users.models import User
+
+
+def _lessons(container_kwargs, n, short_answers=True):
+    for i in range(1, n + 1):
+        LessonTheory.objects.create(
+            **container_kwargs, title=f"T{i}", content="x", order_index=i
+        )
+        LessonRadioQuestion.objects.create(
+            **container_kwargs,
+            title=f"R{i}",
+            question_text="?",
+            order_index=i,
+        )
+        LessonCheckBoxQuestion.objects.create(
+            **container_kwargs,
+            title=f"C{i}",
+            question_text="?",
+            order_index=i,
+        )
+        if short_answers:
+            LessonShortAnswer.objects.create(
+                **container_kwargs,
+                title=f"S{i}",
+                question_text="?",
+                correct_answer="1",
+                order_index=i,
+            )
+        CodingChallenge.objects.create(
+            **container_kwargs,
+            title=f"K{i}",
+            description="d",
+            instructions="i",
+            solution_template="pass",
+            order_index=i,
+        )
+    # Неактивный урок в конце не должен попасть в ответ.
+    LessonTheory.objects.create(
+        **container_kwargs,
+        title="hidden",
+        content="x",
+        order_index=n + 1,
+        is_active=False,
+    )
+
+
+def _course(slug, modules, lessons):
+    course = Course.objects.create(
+        title=slug, slug=slug, description="", is_active=True
+    )
+    for m in range(1, modules + 1):
+        module = Module.objects.create(
+            course=course, title=f"M{m}", order_index=m
+        )
+        _lessons({"module": module}, lessons)
+    Module.objects.create(
+        course=course, title="off", order_index=modules + 1, is_active=False
+    )
+    for e in range(1, modules + 1):
+        exam = Exam.objects.create(course=course, title=f"E{e}", order_index=e)
+        _lessons({"exam": exam}, lessons, short_answers=False)
+    return course
+
+
+def _count(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries), response.json()
+
+
+@pytest.fixture
+def small_and_large(db):
+    return _course("small", 1, 1), _course("large", 4, 5)
+
+
+@pytest.mark.django_db
+def test_course_detail_constant_queries(small_and_large):
+    small, large = small_and_large
+    client = APIClient()
+
+    n_small, _ = _count(client, f"/api/content/courses/{small.public_id}/")
+    n_large, data = _count(client, f"/api/content/courses/{large.public_id}/")
+
+    assert n_small == n_large
+    assert [m["title"] for m in data["modules"]] == ["M1", "M2", "M3", "M4"]
+    module = data["modules"][0]
+    assert [t["title"] for t in module["lessons_theories"]] == [
+        f"T{i}" for i in range(1, 6)
+    ]
+    assert len(module["lessons_short_answer"]) == 5
+    assert len(data["exams"]) == 4
+    assert len(data["exams"][0]["lessons_coding"]) == 5
+
+
+@pytest.mark.django_db
+def test_module_detail_constant_queries(small_and_large):
+    small, large = small_and_large
+    client = APIClient()
+    small_module = small.modules.get(order_index=1)
+    large_module = large.modules.get(order_index=1)
+
+    n_small, _ = _count(
+        client, f"/api/content/modules/{small_module.public_id}/"
+    )
+    n_large, data = _count(
+        client, f"/api/content/modules/{large_module.public_id}/"
+    )
+
+    assert n_small == n_large
+    assert len(data["lessons_theories"]) == 5
+    assert [c["title"] for c in data["lessons_coding"]] == [
+        f"K{i}" for i in range(1, 6)
+    ]
+
+
+@pytest.mark.django_db
+def test_exam_list_constant_queries(small_and_large):
+    small, large = small_and_large
+    client = APIClient()
+    client.force_authenticate(
+        User.objects.create_user(
+            email="exam-queries@academy.com",
+            phone="+79005550011",
+            password="password",
+            role="student",
+        )
+    )
+
+    n_small, _ = _count(
+        client, f"/api/exams/?course_public_id={small.public_id}"
+    )
+    n_large, data = _count(
+        client, f"/api/exams/?course_public_id={large.public_id}"
+    )
+
+    assert n_small == n_large
+    assert len(data) == 4
+    assert all(len(e["lessons_theories"]) == 5 for e in data)
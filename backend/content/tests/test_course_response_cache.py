@@ -0,0 +1,173 @@
+"""Кэш анонимных ответов каталога и оглавления курса (ETag, инвалидация)."""
+
+import time
+
+from common.shared_cache import shared_cache as cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pytest
+from rest_framework.test import APIClient
+
+from content.lesson_manifest import update_with_manifest_invalidation
+from content.models import Course, LessonTheory, Module, Technology
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def _detail_url(course):
+    return f"/api/content/courses/{course.public_id}/"
+
+
+@pytest.mark.django_db
+def test_outline_served_from_cache_with_etag(
+    client, course, theory_lesson, django_assert_num_queries
+):
+    first = client.get(_detail_url(course))
+    assert first.status_code == 200
+    etag = first["ETag"]
+
+    with django_assert_num_queries(0):
+        second = client.get(_detail_url(course))
+        not_modified = client.get(_detail_url(course), HTTP_IF_NONE_MATCH=etag)
+
+    assert second.json() == first.json()
+    assert second["ETag"] == etag
+    assert not_modified.status_code == 304
+    assert not_modified["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_outline_invalidated_by_any_content_field(
+    client, course, module, theory_lesson
+):
+    etag = client.get(_detail_url(course))["ETag"]
+
+    # Описание модуля не входит в манифест, но выводится в оглавлении.
+    module.description = "Новое описание"
+    module.save()
+    response = client.get(_detail_url(course), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["modules"][0]["description"] == "Новое описание"
+
+    etag = response["ETag"]
+    theory_lesson.title = "Переименован"
+    theory_lesson.save()
+    data = client.get(_detail_url(course), HTTP_IF_NONE_MATCH=etag).json()
+    assert data["modules"][0]["lessons_theories"][0]["title"] == "Переименован"
+
+
+@pytest.mark.django_db
+def test_commit_invalidates_outline_cached_before_it(
+    client, course, module, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        module.description = "Новое описание"
+        module.save()
+        # Ответ, собранный до COMMIT (другим процессом — из старых строк).
+        client.get(_detail_url(course))
+
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(_detail_url(course))
+    assert ctx.captured_queries
+
+
+@pytest.mark.django_db
+def test_outline_invalidated_by_bulk_update(client, course, module):
+    client.get(_detail_url(course))
+
+    # как changelist с фильтром по активности: после update qs пуст
+    qs = Module.objects.filter(pk=module.pk, is_active=True)
+    update_with_manifest_invalidation(qs, is_active=False)
+
+    assert client.get(_detail_url(course)).json()["modules"] == []
+
+
+@pytest.mark.django_db
+def test_catalog_keyed_by_filter_and_invalidated(client, course, technology):
+    other = Technology.objects.create(name="Go")
+    by_python = client.get("/api/content/courses/?technology=Python").json()
+    by_go = client.get("/api/content/courses/?technology=Go").json()
+    assert [c["slug"] for c in by_python] == ["test-course"]
+    assert by_go == []
+
+    course.technology.add(other)
+    assert len(client.get("/api/content/courses/?technology=Go").json()) == 1
+
+    Course.objects.create(title="Второй", slug="second", is_active=True)
+    assert len(client.get("/api/content/courses/").json()) == 2
+
+    technology.name = "Python 3"
+    technology.save()
+    names = {
+        t["name"]
+        for t in client.get("/api/content/courses/").json()[1]["technology"]
+    }
+    assert "Python 3" in names
+
+
+@pytest.mark.django_db
+def test_authenticated_requests_bypass_cache(client, course):
+    user = User.objects.create_user(
+        email="catalog-auth@academy.com",
+        phone="+79005550022",
+        password="password",
+        role="student",
+    )
+    client.force_authenticate(user)
+
+    response = client.get(_detail_url(course))
+
+    assert response.status_code == 200
+    assert not response.has_header("ETag")
+
+
+@pytest.mark.django_db
+def test_new_lesson_visible_after_create(client, course, module):
+    client.get(_detail_url(course))
+
+    LessonTheory.objects.create(
+        module=module, title="Новая", content="x", order_index=5
+    )
+
+    lessons = client.get(_detail_url(course)).json()["modules"][0][
+        "lessons_theories"
+    ]
+    assert [lesson["title"] for lesson in lessons] == ["Новая"]
+
+
+@pytest.mark.django_db
+def test_etag_follows_body_after_ttl_refresh(client, course, settings):
+    settings.CONTENT_RESPONSE_CACHE_TTL = 1
+    mentor = User.objects.create_user(
+        email="outline-mentor@academy.com",
+        phone="+79005550023",
+        password="password",
+        role="mentor",
+        first_name="Иван",
+    )
+    Course.objects.filter(pk=course.pk).update(mentor=mentor)
+    etag = client.get(_detail_url(course))["ETag"]
+
+    # Тело не изменилось — после истечения TTL ETag тот же.
+    time.sleep(1.1)
+    response = client.get(_detail_url(course), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Профиль ментора сбрасывается только по TTL.
+    User.objects.filter(pk=mentor.pk).update(first_name="Пётр")
+    time.sleep(1.1)
+    response = client.get(_detail_url(course), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()["mentor"]["first_name"] == "Пётр"
+    assert response["ETag"] != etag
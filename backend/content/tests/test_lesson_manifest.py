@@ -0,0 +1,128 @@
+"""Манифест уроков курса: состав, инвалидация, чтение без запросов."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from exams.services import exam_max_score
+import pytest
+
+from content.container_lessons import iter_container_lessons
+from content.lesson_manifest import get_course_manifest
+from content.models import Exam, LessonRadioQuestion, LessonTheory
+from progress.stats import _course_lesson_counts
+
+
+@pytest.mark.django_db
+class TestLessonManifest:
+    def test_counts_only_active_lessons(
+        self, course, module, theory_lesson, radio_question, checkbox_question
+    ):
+        LessonTheory.objects.create(
+            module=module,
+            title="Скрытый урок",
+            content="…",
+            order_index=3,
+            is_active=False,
+        )
+
+        counts = _course_lesson_counts(course)
+
+        assert counts["theory"] == 1
+        assert counts["radio"] == 1
+        assert counts["checkbox"] == 1
+        assert counts["total"] == 3
+
+    def test_cached_read_makes_no_queries(self, course, theory_lesson):
+        get_course_manifest(course)
+
+        with CaptureQueriesContext(connection) as ctx:
+            manifest = get_course_manifest(course)
+
+        assert len(ctx.captured_queries) == 0
+        assert [e.public_id for e in manifest.lessons] == [
+            theory_lesson.public_id
+        ]
+
+    def test_lesson_save_invalidates(self, course, module, theory_lesson):
+        before = get_course_manifest(course)
+
+        theory_lesson.is_active = False
+        theory_lesson.save()
+
+        after = get_course_manifest(course)
+        assert after.version != before.version
+        assert after.counts()["total"] == 0
+
+    def test_unrelated_save_keeps_version(self, course, theory_lesson):
+        before = get_course_manifest(course)
+
+        theory_lesson.content = "Новый текст"
+        theory_lesson.save()
+
+        assert get_course_manifest(course).version == before.version
+
+    def test_commit_bumps_version_again(
+        self, course, theory_lesson, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            theory_lesson.is_active = False
+            theory_lesson.save()
+            # Манифест, собранный до COMMIT (другим процессом — из старых
+            # строк), после коммита читаться не должен.
+            inside = get_course_manifest(course)
+
+        assert get_course_manifest(course).version != inside.version
+
+    def test_raw_save_keeps_version(self, course, theory_lesson):
+        before = get_course_manifest(course)
+
+        # Так сохраняет loaddata.
+        theory_lesson.is_active = False
+        theory_lesson.save_base(raw=True)
+
+        assert get_course_manifest(course).version == before.version
+
+    def test_module_deactivation_hides_lessons(
+        self, course, module, theory_lesson
+    ):
+        assert get_course_manifest(course).counts()["total"] == 1
+
+        module.is_active = False
+        module.save()
+
+        assert get_course_manifest(course).counts()["total"] == 0
+
+    def test_delete_shifts_order_and_refreshes(
+        self, module, theory_lesson, checkbox_question
+    ):
+        assert len(iter_container_lessons(module)) == 2
+
+        theory_lesson.delete()
+
+        items = iter_container_lessons(module)
+        assert [(kind, obj.order_index) for kind, obj in items] == [
+            ("checkbox", 1)
+        ]
+
+    def test_exam_max_score(self, course):
+        exam = Exam.objects.create(
+            course=course, title="КР", duration_minutes=45, is_active=True
+        )
+        LessonRadioQuestion.objects.create(
+            exam=exam,
+            title="Вопрос",
+            question_text="2+2?",
+            order_index=1,
+            points=3,
+            is_active=True,
+        )
+        assert exam_max_score(exam) == 3
+
+        LessonRadioQuestion.objects.create(
+            exam=exam,
+            title="Вопрос 2",
+            question_text="3+3?",
+            order_index=2,
+            points=4,
+            is_active=True,
+        )
+        assert exam_max_score(exam) == 7
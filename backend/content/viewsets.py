@@ -11,7 +11,12 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from content.challenge_stats import get_course_challenge_stats
-from content.lesson_querysets import public_lesson_parent_q
+from content.lesson_querysets import (
+    MODULE_LESSON_RELATIONS,
+    container_lessons_prefetches,
+    course_structure_prefetches,
+    public_lesson_parent_q,
+)
 from content.models import (
     CodingChallenge,
     Course,
@@ -21,6 +26,10 @@ from content.models import (
     LessonTheory,
     Module,
 )
+from content.response_cache import (
+    cached_catalog_response,
+    cached_course_response,
+)
 from content.serializers import (
     CodingChallengeDetailSerializer,
     CodingChallengeListSerializer,
@@ -86,7 +95,11 @@ class CourseViewSet(
     - При детальном просмотре — структура (заголовки), без HTML уроков
     - Автоматическая генерация slug из названия
     - Сортировка по дате создания (новые сверху)
-    - Используется prefetch_related для оптимизации запросов
+    - Детальный просмотр — Prefetch только активных модулей, КР и уроков
+      (``course_structure_prefetches``): число запросов не зависит от
+      размера курса
+    - Анонимные ответы списка и детального просмотра кэшируются целиком
+      с ETag / If-None-Match (``content.response_cache``)
 
     Поля курса:
     - title — название курса
@@ -107,31 +120,20 @@ class CourseViewSet(
     def get_queryset(self):
         """
         Возвращает queryset активных курсов с оптимизацией запросов.
-        Предварительно загружаются технологии, модули и уроки модулей.
+        Список загружает только технологии; детальный просмотр — ещё
+        ментора, модули, КР и их уроки.
 
         Фильтр list: ``?technology=Python`` — по названию технологии (без учёта регистра).
         """
         qs = (
             Course.objects.filter(is_active=True)
-            .prefetch_related(
-                "technology",
-                "modules",
-                "exams",
-                "modules__lessons_theories",
-                "modules__lessons_radio_questions",
-                "modules__lessons_radio_questions__answers",
-                "modules__lessons_checkbox_questions",
-                "modules__lessons_checkbox_questions__answers",
-                "modules__lessons_short_answers",
-                "modules__challenges",
-                "exams__lessons_theories",
-                "exams__lessons_radio_questions",
-                "exams__lessons_checkbox_questions",
-                "exams__lessons_short_answers",
-                "exams__challenges",
-            )
+            .prefetch_related("technology")
             .order_by("-created_at")
         )
+        if self.action == "retrieve":
+            qs = qs.select_related("mentor").prefetch_related(
+                *course_structure_prefetches()
+            )
         if self.action == "list":
             tech = (self.request.query_params.get("technology") or "").strip()
             if tech:
@@ -148,6 +150,18 @@ class CourseViewSet(
             return CourseDetailSerializer
         return CourseListSerializer
 
+    def list(self, request, *args, **kwargs):
+        return cached_catalog_response(
+            request, lambda: super(CourseViewSet, self).list(request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_course_response(
+            request,
+            kwargs[self.lookup_field],
+            lambda: super(CourseViewSet, self).retrieve(request, **kwargs),
+        )
+
 
 class ModuleViewSet(
     mixins.ListModelMixin,
@@ -194,14 +208,11 @@ class ModuleViewSet(
         course_pub = self.request.query_params.get("course_public_id")
         if course_pub:
             queryset = queryset.filter(course__public_id=course_pub)
-        return queryset.prefetch_related(
-            "lessons_theories",
-            "lessons_radio_questions",
-            "lessons_radio_questions__answers",
-            "lessons_checkbox_questions",
-            "lessons_checkbox_questions__answers",
-            "challenges",
-        ).order_by("course_id", "order_index")
+        if self.action == "retrieve":
+            queryset = queryset.prefetch_related(
+                *container_lessons_prefetches(MODULE_LESSON_RELATIONS)
+            )
+        return queryset.order_by("course_id", "order_index")
 
     def get_serializer_class(self):
         """
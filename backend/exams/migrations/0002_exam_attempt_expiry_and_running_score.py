@@ -0,0 +1,38 @@
+# Generated by Django 4.2 on 2026-10-18 23:25
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_running_scores(apps, schema_editor):
+    """Текущая сумма баллов для незавершённых попыток."""
+    ExamAttempt = apps.get_model("exams", "ExamAttempt")
+    ExamAttemptStep = apps.get_model("exams", "ExamAttemptStep")
+    points = (
+        ExamAttemptStep.objects.filter(attempt=OuterRef("pk"))
+        .values("attempt")
+        .annotate(total=Sum("points_earned"))
+        .values("total")
+    )
+    ExamAttempt.objects.filter(status="in_progress").update(
+        score=Coalesce(Subquery(points), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0001_exam_system"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="examattempt",
+            index=models.Index(
+                fields=["status", "expires_at"],
+                name="exams_attempt_expiry_idx",
+            ),
+        ),
+        migrations.RunPython(fill_running_scores, migrations.RunPython.noop),
+    ]
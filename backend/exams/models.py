@@ -50,6 +50,7 @@ class ExamAttempt(UUIDPublicIdMixin, models.Model):
         choices=SubmitReason.choices,
         blank=True,
     )
+    # Текущая сумма баллов: обновляется при каждом ответе (record_*).
     score = models.PositiveIntegerField(default=0)
     max_score = models.PositiveIntegerField(default=0)
     passed = models.BooleanField(default=False)
@@ -62,6 +63,11 @@ class ExamAttempt(UUIDPublicIdMixin, models.Model):
         indexes = [
             models.Index(fields=["user", "exam", "-started_at"]),
             models.Index(fields=["exam", "status", "-started_at"]),
+            # Сканер истёкших попыток (expire_overdue_attempts).
+            models.Index(
+                fields=["status", "expires_at"],
+                name="exams_attempt_expiry_idx",
+            ),
         ]
 
     def __str__(self):
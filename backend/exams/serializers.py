@@ -15,36 +15,44 @@ class ExamShortSerializer(serializers.ModelSerializer):
     lessons_coding = serializers.SerializerMethodField()
 
     def get_lessons_theories(self, obj):
-        from content.serializers import LessonTheoryShortSerializer
-
-        queryset = obj.lessons_theories.filter(is_active=True).order_by(
-            "order_index"
+        from content.serializers import (
+            LessonTheoryShortSerializer,
+            active_sorted,
         )
-        return LessonTheoryShortSerializer(queryset, many=True).data
 
-    def get_lessons_radio(self, obj):
-        from content.serializers import LessonRadioShortSerializer
+        return LessonTheoryShortSerializer(
+            active_sorted(obj.lessons_theories), many=True
+        ).data
 
-        queryset = obj.lessons_radio_questions.filter(is_active=True).order_by(
-            "order_index"
+    def get_lessons_radio(self, obj):
+        from content.serializers import (
+            LessonRadioShortSerializer,
+            active_sorted,
         )
-        return LessonRadioShortSerializer(queryset, many=True).data
+
+        return LessonRadioShortSerializer(
+            active_sorted(obj.lessons_radio_questions), many=True
+        ).data
 
     def get_lessons_checkbox(self, obj):
-        from content.serializers import LessonCheckBoxShortSerializer
+        from content.serializers import (
+            LessonCheckBoxShortSerializer,
+            active_sorted,
+        )
 
-        queryset = obj.lessons_checkbox_questions.filter(
-            is_active=True
-        ).order_by("order_index")
-        return LessonCheckBoxShortSerializer(queryset, many=True).data
+        return LessonCheckBoxShortSerializer(
+            active_sorted(obj.lessons_checkbox_questions), many=True
+        ).data
 
     def get_lessons_coding(self, obj):
-        from content.serializers import CodingChallengeShortSerializer
-
-        queryset = obj.challenges.filter(is_active=True).order_by(
-            "order_index"
+        from content.serializers import (
+            CodingChallengeShortSerializer,
+            active_sorted,
         )
-        return CodingChallengeShortSerializer(queryset, many=True).data
+
+        return CodingChallengeShortSerializer(
+            active_sorted(obj.challenges), many=True
+        ).data
 
     class Meta:
         model = Exam
@@ -85,22 +93,18 @@ class ExamDetailSerializer(ExamShortSerializer):
         return [str(m.public_id) for m in obj.prerequisite_modules.all()]
 
     def get_lessons(self, obj):
-        from content.container_lessons import iter_container_lessons
-
-        items = []
-        for kind, lesson in iter_container_lessons(obj, active_only=True):
-            items.append(
-                {
-                    "kind": kind,
-                    "public_id": str(lesson.public_id),
-                    "title": lesson.title,
-                    "order_index": lesson.order_index,
-                    "points": (
-                        getattr(lesson, "points", 0) if kind != "theory" else 0
-                    ),
-                }
-            )
-        return items
+        from content.lesson_manifest import container_lesson_entries
+
+        return [
+            {
+                "kind": entry.kind,
+                "public_id": str(entry.public_id),
+                "title": entry.title,
+                "order_index": entry.order_index,
+                "points": entry.points,
+            }
+            for entry in container_lesson_entries(obj, active_only=True)
+        ]
 
     def get_access(self, obj):
         request = self.context.get("request")
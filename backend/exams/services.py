@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+from collections import Counter
 from datetime import timedelta
 
 from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
 from django.utils import timezone
 from exams.models import (
     ExamAccessGrant,
@@ -14,6 +16,7 @@ from exams.models import (
 )
 
 from content.container_lessons import iter_container_lessons
+from content.lesson_manifest import container_lesson_entries
 from content.models import (
     CheckBoxAnswerOption,
     CodingChallenge,
@@ -24,6 +27,7 @@ from content.models import (
     Module,
     RadioAnswerOption,
 )
+from progress.activity import bump_activity, recompute_activity_day
 from progress.models import (
     CodeSubmission,
     UserAnswerCheckBox,
@@ -31,6 +35,12 @@ from progress.models import (
     UserLessonTheoryRead,
 )
 from progress.stats import build_completed_lesson_keys
+from progress.summary import (
+    KIND_CHECKBOX,
+    KIND_RADIO,
+    KIND_THEORY,
+    apply_progress_changes,
+)
 
 
 class ExamAccessError(Exception):
@@ -49,25 +59,21 @@ def exam_lesson_items(exam: Exam, active_only: bool = True):
 
 
 def exam_max_score(exam: Exam) -> int:
-    total = 0
-    for kind, item in exam_lesson_items(exam):
-        if kind in ("radio", "checkbox"):
-            total += item.points
-        elif kind == "coding":
-            total += item.points
-    return total
+    return sum(
+        entry.points
+        for entry in container_lesson_entries(exam, active_only=True)
+        if entry.kind in ("radio", "checkbox", "coding")
+    )
 
 
 def _module_completed(user, module: Module) -> bool:
-    [module.id]
-    keys = build_completed_lesson_keys(user, module.course)
-    from content.container_lessons import iter_container_lessons
-
-    required = set()
-    for kind, lesson in iter_container_lessons(module, active_only=True):
-        required.add(_lesson_key(kind, lesson.public_id))
+    required = {
+        entry.key
+        for entry in container_lesson_entries(module, active_only=True)
+    }
     if not required:
         return True
+    keys = build_completed_lesson_keys(user, module.course)
     return required.issubset(keys)
 
 
@@ -85,23 +91,42 @@ def _has_active_grant(
     return qs.exists()
 
 
-def _latest_finished_attempt(user, exam: Exam):
-    return (
-        ExamAttempt.objects.filter(
-            user=user,
-            exam=exam,
-            status__in=(
-                ExamAttempt.Status.SUBMITTED,
-                ExamAttempt.Status.EXPIRED,
-            ),
-        )
-        .order_by("-submitted_at", "-started_at")
-        .first()
-    )
+_FINISHED_STATUSES = (
+    ExamAttempt.Status.SUBMITTED,
+    ExamAttempt.Status.EXPIRED,
+)
 
 
-def get_exam_access(user, exam: Exam) -> dict:
-    """Проверка, может ли ученик начать КР."""
+def exam_attempt_states(user, exams) -> dict[int, tuple]:
+    """
+    ``{exam_id: (активная попытка, последняя завершённая)}`` для набора КР
+    одним запросом.
+    """
+    states: dict[int, tuple] = {}
+    attempts = ExamAttempt.objects.filter(
+        user=user,
+        exam__in=exams,
+        status__in=(ExamAttempt.Status.IN_PROGRESS, *_FINISHED_STATUSES),
+    ).order_by("exam_id", "-started_at")
+    for attempt in attempts:
+        active, finished = states.get(attempt.exam_id, (None, None))
+        if attempt.status == ExamAttempt.Status.IN_PROGRESS:
+            active = active or attempt
+        elif finished is None or (
+            attempt.submitted_at,
+            attempt.started_at,
+        ) > (finished.submitted_at, finished.started_at):
+            finished = attempt
+        states[attempt.exam_id] = (active, finished)
+    return states
+
+
+def get_exam_access(user, exam: Exam, attempt_state=None) -> dict:
+    """
+    Проверка, может ли ученик начать КР.
+
+    ``attempt_state`` — готовая пара из ``exam_attempt_states`` (списки КР).
+    """
     reasons = []
 
     for module in exam.prerequisite_modules.filter(is_active=True):
@@ -114,13 +139,11 @@ def get_exam_access(user, exam: Exam) -> dict:
                 }
             )
 
-    active = ExamAttempt.objects.filter(
-        user=user,
-        exam=exam,
-        status=ExamAttempt.Status.IN_PROGRESS,
-    ).first()
-
-    finished = _latest_finished_attempt(user, exam)
+    if attempt_state is None:
+        attempt_state = exam_attempt_states(user, [exam]).get(
+            exam.pk, (None, None)
+        )
+    active, finished = attempt_state
 
     if exam.mentor_unlock_required and not active:
         if not _has_active_grant(
@@ -250,8 +273,6 @@ def get_attempt_steps_payload(attempt: ExamAttempt) -> list[dict]:
 def serialize_attempt(attempt: ExamAttempt) -> dict:
     attempt = expire_attempt_if_needed(attempt)
     exam = attempt.exam
-    live_score = sum(s.points_earned for s in attempt.steps.all())
-    display_score = live_score if attempt.is_active else attempt.score
     return {
         "public_id": str(attempt.public_id),
         "exam_public_id": str(exam.public_id),
@@ -265,7 +286,7 @@ def serialize_attempt(attempt: ExamAttempt) -> dict:
         ),
         "submit_reason": attempt.submit_reason or None,
         "remaining_seconds": remaining_seconds(attempt),
-        "score": display_score,
+        "score": attempt.score,
         "max_score": attempt.max_score or exam_max_score(exam),
         "passed": attempt.passed if not attempt.is_active else None,
         "focus_warn_count": attempt.focus_warn_count,
@@ -296,6 +317,41 @@ def _get_exam_lesson(kind: str, public_id, exam: Exam):
     raise ValueError(f"Unknown step kind: {kind}")
 
 
+def _save_step(
+    attempt: ExamAttempt, kind: str, public_id, defaults: dict
+) -> ExamAttemptStep:
+    """
+    Записать ответ на шаг и сдвинуть текущую сумму баллов попытки на
+    разницу с прошлым ответом. Строка попытки блокируется, чтобы
+    параллельные ответы не теряли изменения суммы.
+    """
+    list(
+        ExamAttempt.objects.select_for_update()
+        .filter(pk=attempt.pk)
+        .values_list("pk", flat=True)
+    )
+    previous = (
+        ExamAttemptStep.objects.filter(
+            attempt=attempt, step_kind=kind, content_public_id=public_id
+        )
+        .values_list("points_earned", flat=True)
+        .first()
+    ) or 0
+    step, _ = ExamAttemptStep.objects.update_or_create(
+        attempt=attempt,
+        step_kind=kind,
+        content_public_id=public_id,
+        defaults=defaults,
+    )
+    delta = step.points_earned - previous
+    if delta:
+        ExamAttempt.objects.filter(pk=attempt.pk).update(
+            score=F("score") + delta
+        )
+        attempt.score += delta
+    return step
+
+
 def _linear_allows(attempt: ExamAttempt, kind: str, public_id) -> bool:
     if attempt.exam.navigation_mode != Exam.NavigationMode.LINEAR:
         return True
@@ -327,11 +383,11 @@ def record_theory_read(
             "linear_locked", "Сначала завершите предыдущие задания"
         )
 
-    step, _ = ExamAttemptStep.objects.update_or_create(
-        attempt=attempt,
-        step_kind=ExamAttemptStep.StepKind.THEORY,
-        content_public_id=lesson.public_id,
-        defaults={
+    return _save_step(
+        attempt,
+        ExamAttemptStep.StepKind.THEORY,
+        lesson.public_id,
+        {
             "order_index": lesson.order_index,
             "is_correct": True,
             "points_earned": 0,
@@ -339,7 +395,6 @@ def record_theory_read(
             "payload": {"read": True},
         },
     )
-    return step
 
 
 @transaction.atomic
@@ -358,11 +413,11 @@ def record_radio_answer(
 
     is_correct = selected.is_correct
     points = question.points if is_correct else 0
-    step, _ = ExamAttemptStep.objects.update_or_create(
-        attempt=attempt,
-        step_kind=ExamAttemptStep.StepKind.RADIO,
-        content_public_id=question.public_id,
-        defaults={
+    return _save_step(
+        attempt,
+        ExamAttemptStep.StepKind.RADIO,
+        question.public_id,
+        {
             "order_index": question.order_index,
             "is_correct": is_correct,
             "points_earned": points,
@@ -373,7 +428,6 @@ def record_radio_answer(
             },
         },
     )
-    return step
 
 
 @transaction.atomic
@@ -394,11 +448,11 @@ def record_checkbox_answer(
     selected = set(selected_options)
     is_correct = selected == correct
     points = question.points if is_correct else 0
-    step, _ = ExamAttemptStep.objects.update_or_create(
-        attempt=attempt,
-        step_kind=ExamAttemptStep.StepKind.CHECKBOX,
-        content_public_id=question.public_id,
-        defaults={
+    return _save_step(
+        attempt,
+        ExamAttemptStep.StepKind.CHECKBOX,
+        question.public_id,
+        {
             "order_index": question.order_index,
             "is_correct": is_correct,
             "points_earned": points,
@@ -410,7 +464,6 @@ def record_checkbox_answer(
             },
         },
     )
-    return step
 
 
 @transaction.atomic
@@ -418,39 +471,56 @@ def record_coding_submission(
     attempt: ExamAttempt,
     submission: CodeSubmission,
 ) -> ExamAttemptStep:
+    return record_coding_submissions(attempt, [submission])[0]
+
+
+@transaction.atomic
+def record_coding_submissions(
+    attempt: ExamAttempt,
+    submissions,
+) -> list[ExamAttemptStep]:
+    """
+    Учесть в попытке несколько проверенных отправок (пачка consumer'а
+    результатов): истечение попытки проверяется один раз, шаги пишутся
+    в порядке отправок — поздняя отправка той же задачи побеждает.
+    """
     attempt = expire_attempt_if_needed(attempt)
     if attempt.status != ExamAttempt.Status.IN_PROGRESS:
         raise ExamAccessError("not_in_progress", "Попытка уже завершена")
-    challenge = submission.challenge
-    if not _linear_allows(attempt, "coding", challenge.public_id):
-        raise ExamAccessError(
-            "linear_locked", "Сначала завершите предыдущие задания"
-        )
 
-    passed = (
-        submission.status == CodeSubmission.STATUS_COMPLETED
-        and submission.total_tests > 0
-        and submission.tests_passed >= submission.total_tests
-    )
-    points = challenge.points if passed else 0
-    step, _ = ExamAttemptStep.objects.update_or_create(
-        attempt=attempt,
-        step_kind=ExamAttemptStep.StepKind.CODING,
-        content_public_id=challenge.public_id,
-        defaults={
-            "order_index": challenge.order_index,
-            "is_correct": passed,
-            "points_earned": points,
-            "max_points": challenge.points,
-            "payload": {
-                "submission_public_id": str(submission.public_id),
-                "tests_passed": submission.tests_passed,
-                "total_tests": submission.total_tests,
+    steps: list[ExamAttemptStep] = []
+    for submission in submissions:
+        challenge = submission.challenge
+        if not _linear_allows(attempt, "coding", challenge.public_id):
+            raise ExamAccessError(
+                "linear_locked", "Сначала завершите предыдущие задания"
+            )
+
+        passed = (
+            submission.status == CodeSubmission.STATUS_COMPLETED
+            and submission.total_tests > 0
+            and submission.tests_passed >= submission.total_tests
+        )
+        points = challenge.points if passed else 0
+        step = _save_step(
+            attempt,
+            ExamAttemptStep.StepKind.CODING,
+            challenge.public_id,
+            {
+                "order_index": challenge.order_index,
+                "is_correct": passed,
+                "points_earned": points,
+                "max_points": challenge.points,
+                "payload": {
+                    "submission_public_id": str(submission.public_id),
+                    "tests_passed": submission.tests_passed,
+                    "total_tests": submission.total_tests,
+                },
+                "code_submission": submission,
             },
-            "code_submission": submission,
-        },
-    )
-    return step
+        )
+        steps.append(step)
+    return steps
 
 
 @transaction.atomic
@@ -485,70 +555,253 @@ def record_focus_event(
     }
 
 
-def _compute_attempt_score(attempt: ExamAttempt) -> tuple[int, int]:
-    score = 0
-    max_score = attempt.max_score or exam_max_score(attempt.exam)
-    for step in attempt.steps.all():
-        score += step.points_earned
-    return score, max_score
-
-
-def _sync_attempt_to_course_progress(attempt: ExamAttempt):
-    user = attempt.user
-    for step in attempt.steps.filter(is_correct=True):
-        kind = step.step_kind
-        pid = step.content_public_id
-        if kind == ExamAttemptStep.StepKind.THEORY:
-            lesson = LessonTheory.objects.filter(public_id=pid).first()
-            if lesson:
-                UserLessonTheoryRead.objects.get_or_create(
-                    user=user, lesson=lesson
-                )
-        elif kind == ExamAttemptStep.StepKind.RADIO:
-            question = LessonRadioQuestion.objects.filter(
-                public_id=pid
-            ).first()
-            if (
-                question
-                and not UserAnswerRadio.objects.filter(
-                    user=user, question=question, is_correct=True
-                ).exists()
-            ):
-                payload = step.payload or {}
-                ans_pid = payload.get("selected_answer_public_id")
-                if ans_pid:
-                    option = RadioAnswerOption.objects.filter(
-                        public_id=ans_pid
-                    ).first()
-                    if option:
-                        UserAnswerRadio.objects.create(
-                            user=user,
-                            question=question,
-                            selected_answer=option,
-                        )
-        elif kind == ExamAttemptStep.StepKind.CHECKBOX:
-            question = LessonCheckBoxQuestion.objects.filter(
-                public_id=pid
-            ).first()
-            if question:
-                obj, created = UserAnswerCheckBox.objects.get_or_create(
-                    user=user,
-                    question=question,
+def _sync_attempt_to_course_progress(attempt: ExamAttempt) -> None:
+    _sync_attempts_to_course_progress([attempt])
+
+
+def _sync_attempts_to_course_progress(attempts) -> None:
+    """
+    Перенести верные шаги завершённых попыток в прогресс курса.
+
+    Уроки и варианты ответов загружаются одним запросом ``public_id__in``
+    на тип, строки прогресса создаются ``bulk_create``, M2M ответов
+    checkbox — одной вставкой в промежуточную таблицу. ``bulk_create`` и
+    ``bulk_update`` не вызывают ``post_save``, поэтому сводка прогресса и
+    дневная активность обновляются здесь явно.
+    """
+    user_by_attempt = {a.pk: a.user_id for a in attempts}
+    by_kind: dict[str, dict[tuple[int, str], ExamAttemptStep]] = {}
+    for step in ExamAttemptStep.objects.filter(
+        attempt_id__in=list(user_by_attempt), is_correct=True
+    ).exclude(step_kind=ExamAttemptStep.StepKind.CODING):
+        # CodeSubmission по шагу кода уже записана в прогресс пользователя.
+        key = (user_by_attempt[step.attempt_id], str(step.content_public_id))
+        by_kind.setdefault(step.step_kind, {})[key] = step
+    if not by_kind:
+        return
+
+    solved_today: Counter = Counter()
+    _sync_theory_reads(
+        by_kind.get(ExamAttemptStep.StepKind.THEORY, {}), solved_today
+    )
+    _sync_radio_answers(
+        by_kind.get(ExamAttemptStep.StepKind.RADIO, {}), solved_today
+    )
+    recount = _sync_checkbox_answers(
+        by_kind.get(ExamAttemptStep.StepKind.CHECKBOX, {}), solved_today
+    )
+    # Пересчёт дня точен и уже учитывает новые строки — прибавлять к нему
+    # не нужно.
+    for user_id, day in recount:
+        recompute_activity_day(user_id, day)
+    today = timezone.localdate()
+    for user_id, delta in solved_today.items():
+        if (user_id, today) not in recount:
+            bump_activity(user_id, today, delta)
+
+
+def _lessons_by_public_id(model, steps: dict) -> dict:
+    public_ids = {public_id for _user_id, public_id in steps}
+    return {
+        str(lesson.public_id): lesson
+        for lesson in model.objects.filter(
+            public_id__in=public_ids
+        ).select_related("module", "exam")
+    }
+
+
+def _sync_theory_reads(steps: dict, solved_today: Counter) -> None:
+    if not steps:
+        return
+    lessons = _lessons_by_public_id(LessonTheory, steps)
+    wanted = {
+        (user_id, lessons[pid]) for user_id, pid in steps if pid in lessons
+    }
+    read = set(
+        UserLessonTheoryRead.objects.filter(
+            user_id__in={user_id for user_id, _lesson in wanted},
+            lesson__in={lesson for _user_id, lesson in wanted},
+        ).values_list("user_id", "lesson_id")
+    )
+    new = [
+        (user_id, lesson)
+        for user_id, lesson in wanted
+        if (user_id, lesson.pk) not in read
+    ]
+    UserLessonTheoryRead.objects.bulk_create(
+        [
+            UserLessonTheoryRead(user_id=user_id, lesson=lesson)
+            for user_id, lesson in new
+        ],
+        ignore_conflicts=True,
+    )
+    apply_progress_changes(KIND_THEORY, new)
+    solved_today.update(user_id for user_id, _lesson in new)
+
+
+def _sync_radio_answers(steps: dict, solved_today: Counter) -> None:
+    if not steps:
+        return
+    questions = _lessons_by_public_id(LessonRadioQuestion, steps)
+    solved = set(
+        UserAnswerRadio.objects.filter(
+            user_id__in={user_id for user_id, _pid in steps},
+            question__in=questions.values(),
+            is_correct=True,
+        ).values_list("user_id", "question_id")
+    )
+    options = {
+        str(option.public_id): option
+        for option in RadioAnswerOption.objects.filter(
+            public_id__in={
+                (step.payload or {}).get("selected_answer_public_id")
+                for step in steps.values()
+            }
+            - {None}
+        )
+    }
+    answers = []
+    for (user_id, pid), step in steps.items():
+        question = questions.get(pid)
+        option = options.get(
+            (step.payload or {}).get("selected_answer_public_id")
+        )
+        if question is None or option is None:
+            continue
+        if (user_id, question.pk) in solved:
+            continue
+        answers.append(
+            UserAnswerRadio(
+                user_id=user_id,
+                question=question,
+                selected_answer=option,
+                is_correct=option.is_correct,
+                points_earned=question.points if option.is_correct else 0,
+            )
+        )
+    UserAnswerRadio.objects.bulk_create(answers, ignore_conflicts=True)
+    new = [(a.user_id, a.question) for a in answers if a.is_correct]
+    apply_progress_changes(KIND_RADIO, new)
+    solved_today.update(user_id for user_id, _question in new)
+
+
+def _sync_checkbox_answers(steps: dict, solved_today: Counter) -> set:
+    """Возвращает ``(user_id, день)`` исправленных ответов для пересчёта."""
+    if not steps:
+        return set()
+    questions = _lessons_by_public_id(LessonCheckBoxQuestion, steps)
+    user_ids = {user_id for user_id, _pid in steps}
+    existing = {
+        (a.user_id, a.question_id): a
+        for a in UserAnswerCheckBox.objects.filter(
+            user_id__in=user_ids, question__in=questions.values()
+        )
+    }
+    options = {
+        str(option.public_id): option
+        for option in CheckBoxAnswerOption.objects.filter(
+            public_id__in={
+                option_pid
+                for step in steps.values()
+                for option_pid in (step.payload or {}).get(
+                    "selected_answer_public_ids"
                 )
-                if created or not obj.is_correct:
-                    pids = (step.payload or {}).get(
-                        "selected_answer_public_ids"
-                    ) or []
-                    options = list(
-                        CheckBoxAnswerOption.objects.filter(public_id__in=pids)
-                    )
-                    obj.selected_answers.set(options)
-                    obj.is_correct = step.is_correct
-                    obj.points_earned = step.points_earned
-                    obj.save()
-        elif kind == ExamAttemptStep.StepKind.CODING:
-            if step.code_submission_id and step.is_correct:
-                pass  # CodeSubmission already exists for user
+                or []
+            }
+        )
+    }
+
+    now = timezone.now()
+    created, updated, selected = [], [], {}
+    for (user_id, pid), step in steps.items():
+        question = questions.get(pid)
+        if question is None:
+            continue
+        answer = existing.get((user_id, question.pk))
+        if answer is not None and answer.is_correct:
+            continue
+        if answer is None:
+            answer = UserAnswerCheckBox(user_id=user_id, question=question)
+            created.append(answer)
+        else:
+            answer.question = question
+            updated.append(answer)
+        answer.is_correct = step.is_correct
+        answer.points_earned = step.points_earned
+        answer.updated_at = now
+        selected[(user_id, question.pk)] = [
+            options[option_pid]
+            for option_pid in (step.payload or {}).get(
+                "selected_answer_public_ids"
+            )
+            or []
+            if option_pid in options
+        ]
+    if not selected:
+        return set()
+
+    UserAnswerCheckBox.objects.bulk_create(created, ignore_conflicts=True)
+    if updated:
+        UserAnswerCheckBox.objects.bulk_update(
+            updated, ["is_correct", "points_earned", "updated_at"]
+        )
+    # bulk_create с ignore_conflicts не возвращает pk — дочитываем их.
+    answer_ids = {
+        (user_id, question_id): pk
+        for pk, user_id, question_id in UserAnswerCheckBox.objects.filter(
+            user_id__in=user_ids,
+            question_id__in={question_id for _uid, question_id in selected},
+        ).values_list("pk", "user_id", "question_id")
+        if (user_id, question_id) in selected
+    }
+    through = UserAnswerCheckBox.selected_answers.through
+    through.objects.filter(
+        useranswercheckbox_id__in=answer_ids.values()
+    ).delete()
+    through.objects.bulk_create(
+        [
+            through(
+                useranswercheckbox_id=answer_ids[key],
+                checkboxansweroption_id=option.pk,
+            )
+            for key, chosen in selected.items()
+            if key in answer_ids
+            for option in chosen
+        ],
+        ignore_conflicts=True,
+    )
+
+    new = [(a.user_id, a.question) for a in created + updated if a.is_correct]
+    apply_progress_changes(KIND_CHECKBOX, new)
+    solved_today.update(a.user_id for a in created if a.is_correct)
+    return {
+        (a.user_id, timezone.localdate(a.created_at))
+        for a in updated
+        if a.is_correct
+    }
+
+
+_FINAL_FIELDS = [
+    "status",
+    "submit_reason",
+    "submitted_at",
+    "max_score",
+    "passed",
+]
+
+
+def _apply_final_state(attempt: ExamAttempt, reason: str, now) -> None:
+    """Перевести попытку в итоговое состояние (без записи в БД)."""
+    max_score = attempt.max_score or exam_max_score(attempt.exam)
+    percent = round(100 * attempt.score / max_score) if max_score else 0
+    if reason == ExamAttempt.SubmitReason.TIMEOUT:
+        attempt.status = ExamAttempt.Status.EXPIRED
+    else:
+        attempt.status = ExamAttempt.Status.SUBMITTED
+    attempt.submit_reason = reason
+    attempt.submitted_at = now
+    attempt.max_score = max_score
+    attempt.passed = percent >= attempt.exam.pass_score_percent
 
 
 @transaction.atomic
@@ -559,27 +812,65 @@ def finalize_attempt(
     if attempt.status != ExamAttempt.Status.IN_PROGRESS:
         return attempt
 
-    score, max_score = _compute_attempt_score(attempt)
-    percent = round(100 * score / max_score) if max_score else 0
-    passed = percent >= attempt.exam.pass_score_percent
-
-    if reason == ExamAttempt.SubmitReason.TIMEOUT:
-        status = ExamAttempt.Status.EXPIRED
-    else:
-        status = ExamAttempt.Status.SUBMITTED
+    # Повторное чтение под блокировкой: сумма баллов могла вырасти, а
+    # попытку мог уже завершить сканер истёкших попыток.
+    current = (
+        ExamAttempt.objects.select_for_update()
+        .filter(pk=attempt.pk)
+        .values("status", "score", "focus_warn_count")
+        .first()
+    )
+    if current is None:
+        return attempt
+    attempt.score = current["score"]
+    attempt.focus_warn_count = current["focus_warn_count"]
+    if current["status"] != ExamAttempt.Status.IN_PROGRESS:
+        attempt.refresh_from_db()
+        return attempt
 
-    attempt.status = status
-    attempt.submit_reason = reason
-    attempt.submitted_at = timezone.now()
-    attempt.score = score
-    attempt.max_score = max_score
-    attempt.passed = passed
-    attempt.save()
+    _apply_final_state(attempt, reason, timezone.now())
+    attempt.save(update_fields=_FINAL_FIELDS)
 
     _sync_attempt_to_course_progress(attempt)
     return attempt
 
 
+def expire_overdue_attempts(*, batch_size: int = 200) -> int:
+    """
+    Завершить попытки с истёкшим временем пачками (индекс status +
+    expires_at). Каждая пачка — отдельная транзакция: строки берутся с
+    ``SKIP LOCKED`` и записываются одним ``bulk_update``. Возвращает число
+    завершённых попыток.
+    """
+    batch_size = max(1, batch_size)
+    expired = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                ExamAttempt.objects.select_for_update(
+                    skip_locked=True, of=("self",)
+                )
+                .filter(
+                    status=ExamAttempt.Status.IN_PROGRESS,
+                    expires_at__lte=now,
+                )
+                .select_related("exam", "user")
+                .order_by("expires_at")[:batch_size]
+            )
+            if not batch:
+                return expired
+            for attempt in batch:
+                _apply_final_state(
+                    attempt, ExamAttempt.SubmitReason.TIMEOUT, now
+                )
+            ExamAttempt.objects.bulk_update(batch, _FINAL_FIELDS)
+            _sync_attempts_to_course_progress(batch)
+        expired += len(batch)
+        if len(batch) < batch_size:
+            return expired
+
+
 @transaction.atomic
 def grant_exam_access(
     user,
@@ -598,36 +889,42 @@ def grant_exam_access(
 
 
 def get_course_exam_summary(user, course) -> dict:
-    exams = Exam.objects.filter(course=course, is_active=True).order_by(
-        "order_index"
-    )
-    items = []
-    passed = 0
-    for exam in exams:
-        latest = _latest_finished_attempt(user, exam)
-        active = ExamAttempt.objects.filter(
-            user=user,
-            exam=exam,
-            status=ExamAttempt.Status.IN_PROGRESS,
-        ).first()
-        if latest and latest.passed:
-            passed += 1
-        items.append(
-            {
-                "public_id": str(exam.public_id),
-                "title": exam.title,
-                "order_index": exam.order_index,
-                "duration_minutes": exam.duration_minutes,
-                "passed": bool(latest and latest.passed),
-                "latest_score": latest.score if latest else None,
-                "latest_max_score": latest.max_score if latest else None,
-                "active_attempt_public_id": (
-                    str(active.public_id) if active else None
-                ),
-            }
+    """Сводка по КР курса: один запрос с подзапросами по попыткам."""
+    latest = ExamAttempt.objects.filter(
+        user=user, exam=OuterRef("pk"), status__in=_FINISHED_STATUSES
+    ).order_by("-submitted_at", "-started_at")
+    active = ExamAttempt.objects.filter(
+        user=user, exam=OuterRef("pk"), status=ExamAttempt.Status.IN_PROGRESS
+    ).order_by("-started_at")
+    exams = list(
+        Exam.objects.filter(course=course, is_active=True)
+        .annotate(
+            latest_passed=Subquery(latest.values("passed")[:1]),
+            latest_score=Subquery(latest.values("score")[:1]),
+            latest_max_score=Subquery(latest.values("max_score")[:1]),
+            active_attempt_public_id=Subquery(active.values("public_id")[:1]),
         )
+        .order_by("order_index")
+    )
+    items = [
+        {
+            "public_id": str(exam.public_id),
+            "title": exam.title,
+            "order_index": exam.order_index,
+            "duration_minutes": exam.duration_minutes,
+            "passed": bool(exam.latest_passed),
+            "latest_score": exam.latest_score,
+            "latest_max_score": exam.latest_max_score,
+            "active_attempt_public_id": (
+                str(exam.active_attempt_public_id)
+                if exam.active_attempt_public_id
+                else None
+            ),
+        }
+        for exam in exams
+    ]
     return {
-        "total": exams.count(),
-        "passed": passed,
+        "total": len(exams),
+        "passed": sum(item["passed"] for item in items),
         "items": items,
     }
@@ -0,0 +1,14 @@
+"""Celery: завершение контрольных с истёкшим временем."""
+
+from __future__ import annotations
+
+from celery import shared_task
+from django.conf import settings
+
+
+@shared_task(name="exams.expire_overdue_attempts")
+def expire_overdue_attempts() -> dict:
+    from exams.services import expire_overdue_attempts as expire
+
+    batch_size = getattr(settings, "EXAM_EXPIRY_BATCH_SIZE", 200)
+    return {"expired": expire(batch_size=batch_size)}
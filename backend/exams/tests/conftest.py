@@ -0,0 +1,89 @@
+# Общие фикстуры тестов подсчёта баллов и синхронизации прогресса КР;
+# test_exam_api объявляет такие же у себя.
+import pytest
+from rest_framework.test import APIClient
+
+from content.models import (
+    Course,
+    Exam,
+    LessonRadioQuestion,
+    LessonTheory,
+    Module,
+    RadioAnswerOption,
+)
+
+
+@pytest.fixture
+def exam_course(db):
+    course = Course.objects.create(
+        title="ЕГЭ тест",
+        slug="ege-exam-test",
+        description="",
+        is_active=True,
+    )
+    mod1 = Module.objects.create(
+        course=course, title="Модуль 1", is_active=True
+    )
+    exam = Exam.objects.create(
+        course=course,
+        title="КР 1",
+        duration_minutes=30,
+        pass_score_percent=50,
+        is_active=True,
+    )
+    LessonTheory.objects.create(
+        exam=exam,
+        title="Мини-теория",
+        content="Текст",
+        order_index=1,
+    )
+    question = LessonRadioQuestion.objects.create(
+        exam=exam,
+        title="Вопрос 1",
+        question_text="2+2?",
+        points=10,
+        order_index=2,
+    )
+    correct = RadioAnswerOption.objects.create(
+        question=question,
+        text="4",
+        is_correct=True,
+        order_index=1,
+    )
+    RadioAnswerOption.objects.create(
+        question=question,
+        text="5",
+        is_correct=False,
+        order_index=2,
+    )
+    return {
+        "course": course,
+        "module1": mod1,
+        "exam": exam,
+        "question": question,
+        "correct": correct,
+    }
+
+
+@pytest.fixture
+def student_client(exam_course, django_user_model):
+    user = django_user_model.objects.create_user(
+        email="student-exam@test.com",
+        password="pass",
+        role="student",
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, user
+
+
+@pytest.fixture
+def mentor_client(django_user_model):
+    user = django_user_model.objects.create_user(
+        email="mentor-exam@test.com",
+        password="pass",
+        role="mentor",
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client, user
@@ -0,0 +1,114 @@
+"""Текущая сумма баллов, сканер просроченных попыток, сводка по курсу."""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from exams import services
+from exams.models import ExamAttempt
+from exams.tasks import expire_overdue_attempts
+import pytest
+
+from content.models import Exam, RadioAnswerOption
+from progress.models import UserAnswerRadio
+
+
+def _wrong(question):
+    return RadioAnswerOption.objects.get(question=question, is_correct=False)
+
+
+@pytest.mark.django_db
+def test_score_is_running_total_of_answers(student_client, exam_course):
+    _, user = student_client
+    question = exam_course["question"]
+    attempt = services.start_attempt(user, exam_course["exam"])
+    theory = exam_course["exam"].lessons_theories.first()
+    services.record_theory_read(attempt, theory)
+
+    services.record_radio_answer(attempt, question, exam_course["correct"])
+    assert attempt.score == 10
+    services.record_radio_answer(attempt, question, _wrong(question))
+    assert attempt.score == 0
+    services.record_radio_answer(attempt, question, exam_course["correct"])
+    attempt.refresh_from_db()
+    assert attempt.score == 10
+
+    services.finalize_attempt(attempt, ExamAttempt.SubmitReason.MANUAL)
+    attempt.refresh_from_db()
+    assert attempt.status == ExamAttempt.Status.SUBMITTED
+    assert (attempt.score, attempt.max_score, attempt.passed) == (
+        10,
+        10,
+        True,
+    )
+
+
+@pytest.mark.django_db
+def test_scanner_expires_overdue_attempts_in_batches(
+    exam_course, django_user_model, settings
+):
+    settings.EXAM_EXPIRY_BATCH_SIZE = 2
+    exam = exam_course["exam"]
+    question = exam_course["question"]
+    past = timezone.now() - timedelta(minutes=1)
+    attempts = []
+    for n in range(5):
+        user = django_user_model.objects.create_user(
+            email=f"overdue-{n}@test.com", password="pass", role="student"
+        )
+        attempt = services.start_attempt(user, exam)
+        if n == 0:
+            services.record_radio_answer(
+                attempt, question, exam_course["correct"]
+            )
+        attempts.append(attempt)
+    ExamAttempt.objects.filter(pk__in=[a.pk for a in attempts[:4]]).update(
+        expires_at=past
+    )
+
+    assert expire_overdue_attempts() == {"expired": 4}
+    assert expire_overdue_attempts() == {"expired": 0}
+
+    statuses = dict(ExamAttempt.objects.values_list("pk", "status"))
+    assert [statuses[a.pk] for a in attempts] == [
+        ExamAttempt.Status.EXPIRED
+    ] * 4 + [ExamAttempt.Status.IN_PROGRESS]
+    first = ExamAttempt.objects.get(pk=attempts[0].pk)
+    assert first.submit_reason == ExamAttempt.SubmitReason.TIMEOUT
+    assert (first.score, first.passed) == (10, True)
+    assert UserAnswerRadio.objects.filter(
+        user=attempts[0].user, question=question, is_correct=True
+    ).exists()
+
+
+@pytest.mark.django_db
+def test_course_summary_is_one_query(student_client, exam_course):
+    _, user = student_client
+    course = exam_course["course"]
+    first = exam_course["exam"]
+    second = Exam.objects.create(
+        course=course,
+        title="КР 2",
+        duration_minutes=30,
+        order_index=2,
+        is_active=True,
+    )
+    done = services.start_attempt(user, first)
+    services.record_radio_answer(
+        done, exam_course["question"], exam_course["correct"]
+    )
+    services.finalize_attempt(done, ExamAttempt.SubmitReason.MANUAL)
+    active = services.start_attempt(user, second)
+
+    with CaptureQueriesContext(connection) as ctx:
+        summary = services.get_course_exam_summary(user, course)
+
+    assert len(ctx.captured_queries) == 1
+    assert summary["total"] == 2
+    assert summary["passed"] == 1
+    first_item, second_item = summary["items"]
+    assert (first_item["latest_score"], first_item["passed"]) == (10, True)
+    assert first_item["active_attempt_public_id"] is None
+    assert second_item["latest_score"] is None
+    assert second_item["active_attempt_public_id"] == str(active.public_id)
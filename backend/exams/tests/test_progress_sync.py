@@ -0,0 +1,151 @@
+"""Перенос верных шагов КР в прогресс курса пачкой."""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from exams import services
+from exams.models import ExamAttempt
+import pytest
+
+from content.models import (
+    CheckBoxAnswerOption,
+    LessonCheckBoxQuestion,
+    LessonRadioQuestion,
+    RadioAnswerOption,
+)
+from progress.models import (
+    UserAnswerCheckBox,
+    UserAnswerRadio,
+    UserDailyActivity,
+    UserLessonTheoryRead,
+)
+from progress.summary import get_progress_summary
+
+
+def _add_questions(exam, count, start):
+    radios, checkboxes = [], []
+    for n in range(count):
+        radio = LessonRadioQuestion.objects.create(
+            exam=exam,
+            title=f"R{n}",
+            question_text="?",
+            points=1,
+            order_index=start + 2 * n,
+        )
+        radios.append(
+            (
+                radio,
+                RadioAnswerOption.objects.create(
+                    question=radio, text="да", is_correct=True
+                ),
+            )
+        )
+        checkbox = LessonCheckBoxQuestion.objects.create(
+            exam=exam,
+            title=f"C{n}",
+            question_text="?",
+            points=2,
+            order_index=start + 2 * n + 1,
+        )
+        options = [
+            CheckBoxAnswerOption.objects.create(
+                question=checkbox, text=text, is_correct=True
+            )
+            for text in ("a", "b")
+        ]
+        CheckBoxAnswerOption.objects.create(
+            question=checkbox, text="c", is_correct=False
+        )
+        checkboxes.append((checkbox, options))
+    return radios, checkboxes
+
+
+def _solve_all(user, exam_course, count):
+    exam = exam_course["exam"]
+    radios, checkboxes = _add_questions(exam, count, start=10)
+    attempt = services.start_attempt(user, exam)
+    services.record_theory_read(attempt, exam.lessons_theories.first())
+    services.record_radio_answer(
+        attempt, exam_course["question"], exam_course["correct"]
+    )
+    for radio, option in radios:
+        services.record_radio_answer(attempt, radio, option)
+    for checkbox, options in checkboxes:
+        services.record_checkbox_answer(attempt, checkbox, options)
+    return attempt, radios, checkboxes
+
+
+def _sync_queries(attempt) -> int:
+    with CaptureQueriesContext(connection) as ctx:
+        services._sync_attempt_to_course_progress(attempt)
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_sync_writes_progress_in_bulk(student_client, exam_course):
+    _, user = student_client
+    attempt, radios, checkboxes = _solve_all(user, exam_course, count=5)
+    # неверный ответ вне КР исправляется верным из попытки
+    wrong = UserAnswerCheckBox.objects.create(
+        user=user, question=checkboxes[0][0]
+    )
+    get_progress_summary(user)
+
+    services.finalize_attempt(attempt, ExamAttempt.SubmitReason.MANUAL)
+
+    assert UserLessonTheoryRead.objects.filter(user=user).count() == 1
+    assert (
+        UserAnswerRadio.objects.filter(user=user, is_correct=True).count() == 6
+    )
+    answers = UserAnswerCheckBox.objects.filter(user=user)
+    assert answers.count() == 5
+    assert all(a.is_correct and a.points_earned == 2 for a in answers)
+    wrong.refresh_from_db()
+    assert wrong.is_correct
+    assert set(wrong.selected_answers.all()) == set(checkboxes[0][1])
+
+    summary = get_progress_summary(user)
+    assert (
+        summary.theories_read,
+        summary.radio_solved,
+        summary.checkbox_solved,
+    ) == (1, 6, 5)
+    assert (
+        UserDailyActivity.objects.get(
+            user=user, date=timezone.localdate()
+        ).count
+        == 12
+    )
+
+    # повтор ничего не дублирует
+    services._sync_attempt_to_course_progress(attempt)
+    assert UserAnswerRadio.objects.filter(user=user).count() == 6
+    assert (
+        UserAnswerCheckBox.selected_answers.through.objects.filter(
+            useranswercheckbox__user=user
+        ).count()
+        == 10
+    )
+
+
+@pytest.mark.django_db
+def test_sync_query_count_does_not_grow_with_questions(
+    exam_course, django_user_model
+):
+    counts = []
+    for n, size in enumerate((2, 20)):
+        user = django_user_model.objects.create_user(
+            email=f"sync-{n}@test.com", password="pass", role="student"
+        )
+        get_progress_summary(user)
+        attempt, _radios, _checkboxes = _solve_all(user, exam_course, size)
+        counts.append(_sync_queries(attempt))
+        ExamAttempt.objects.filter(pk=attempt.pk).update(
+            status=ExamAttempt.Status.SUBMITTED
+        )
+        exam_course["exam"].lessons_radio_questions.exclude(
+            pk=exam_course["question"].pk
+        ).delete()
+        exam_course["exam"].lessons_checkbox_questions.all().delete()
+
+    assert counts[0] == counts[1]
@@ -18,6 +18,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from content.lesson_querysets import (
+    EXAM_LESSON_RELATIONS,
+    container_lessons_prefetches,
+)
 from content.models import (
     CheckBoxAnswerOption,
     Exam,
@@ -43,10 +47,17 @@ class ExamListView(APIView):
                 {"detail": "Укажите course_public_id."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        qs = Exam.objects.filter(
-            course__public_id=course_pid,
-            is_active=True,
-        ).order_by("order_index")
+        qs = (
+            Exam.objects.filter(
+                course__public_id=course_pid,
+                is_active=True,
+            )
+            .select_related("course")
+            .prefetch_related(
+                *container_lessons_prefetches(EXAM_LESSON_RELATIONS)
+            )
+            .order_by("order_index")
+        )
         data = ExamShortSerializer(
             qs, many=True, context={"request": request}
         ).data
@@ -58,7 +69,10 @@ class ExamDetailView(APIView):
 
     def get(self, request, exam_public_id):
         exam = get_object_or_404(
-            Exam.objects.prefetch_related("prerequisite_modules"),
+            Exam.objects.select_related("course").prefetch_related(
+                "prerequisite_modules",
+                *container_lessons_prefetches(EXAM_LESSON_RELATIONS),
+            ),
             public_id=exam_public_id,
             is_active=True,
         )
@@ -103,6 +103,52 @@ def resolve_student_mentor(student) -> tuple[User | None, str]:
     return None, "none"
 
 
+def resolve_student_mentors(students) -> dict[int, tuple[User | None, str]]:
+    """
+    ``resolve_student_mentor`` для списка пользователей:
+    ``{user_id: (mentor, source)}`` за постоянное число запросов.
+    """
+    result: dict[int, tuple[User | None, str]] = {}
+    pending = []
+    for student in students:
+        if getattr(student, "role", None) != "student":
+            result[student.pk] = (None, "none")
+            continue
+        profile = getattr(student, "student_profile", None)
+        mentor = profile.assigned_mentor if profile else None
+        if mentor and mentor.is_active and mentor.role in ("mentor", "admin"):
+            result[student.pk] = (mentor, "assigned")
+            continue
+        pending.append(student.pk)
+    if not pending:
+        return result
+
+    course_mentors: dict[int, User] = {}
+    for enrollment in (
+        Enrollment.objects.filter(
+            user_id__in=pending,
+            course__is_active=True,
+            course__mentor__isnull=False,
+            course__mentor__is_active=True,
+        )
+        .select_related("course__mentor")
+        .order_by("user_id", "-last_activity_at")
+    ):
+        course_mentors.setdefault(enrollment.user_id, enrollment.course.mentor)
+
+    admin = None
+    if len(course_mentors) < len(pending):
+        admin = default_admin_mentor()
+    for user_id in pending:
+        if user_id in course_mentors:
+            result[user_id] = (course_mentors[user_id], "course")
+        elif admin:
+            result[user_id] = (admin, "default_admin")
+        else:
+            result[user_id] = (None, "none")
+    return result
+
+
 def list_assignable_mentors():
     return User.objects.filter(
         role__in=("mentor", "admin"), is_active=True
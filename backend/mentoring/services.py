@@ -13,7 +13,7 @@ from progress.models import (
     UserAnswerCheckBox,
     UserAnswerRadio,
 )
-from progress.stats import get_course_progress_detail
+from progress.stats import get_course_progress_bulk
 
 
 def normalize_window_days(raw, default: int = 7) -> int:
@@ -63,27 +63,37 @@ def build_courses_overview(user=None) -> list[dict]:
     qs = Course.objects.filter(is_active=True).order_by("title")
     if user is not None and getattr(user, "role", None) == "mentor":
         qs = qs.filter(mentor=user)
+    courses = list(qs)
+
+    # Записи всех курсов одним запросом: course_id → [(user_id, status)].
+    enrollments: dict[int, list[tuple[int, str]]] = {
+        course.id: [] for course in courses
+    }
+    for course_id, user_id, status in Enrollment.objects.filter(
+        course__in=courses
+    ).values_list("course_id", "user_id", "status"):
+        enrollments[course_id].append((user_id, status))
 
     results = []
-    for course in qs:
-        enrollments = Enrollment.objects.filter(course=course)
-        percents = []
-        for enrollment in enrollments.select_related("user"):
-            detail = get_course_progress_detail(enrollment.user, course)
-            percents.append(detail["percent"])
+    for course in courses:
+        rows = enrollments[course.id]
+        progress = get_course_progress_bulk(
+            course, [user_id for user_id, _status in rows]
+        )
+        percents = [progress[user_id]["percent"] for user_id, _s in rows]
 
         results.append(
             {
                 "course_public_id": str(course.public_id),
                 "course_title": course.title,
                 "course_slug": course.slug,
-                "students_count": enrollments.count(),
-                "active_count": enrollments.filter(
-                    status=Enrollment.Status.ACTIVE
-                ).count(),
-                "completed_count": enrollments.filter(
-                    status=Enrollment.Status.COMPLETED
-                ).count(),
+                "students_count": len(rows),
+                "active_count": sum(
+                    1 for _u, st in rows if st == Enrollment.Status.ACTIVE
+                ),
+                "completed_count": sum(
+                    1 for _u, st in rows if st == Enrollment.Status.COMPLETED
+                ),
                 "avg_percent": (
                     round(sum(percents) / len(percents)) if percents else 0
                 ),
@@ -93,11 +103,10 @@ def build_courses_overview(user=None) -> list[dict]:
 
 
 def build_course_students(course: Course) -> list[dict]:
-    from mentoring.assignment import mentor_brief, resolve_student_mentor
+    from mentoring.assignment import mentor_brief, resolve_student_mentors
     from users.models import Student
 
-    rows = []
-    enrollments = (
+    enrollments = list(
         Enrollment.objects.filter(course=course)
         .select_related(
             "user",
@@ -106,14 +115,19 @@ def build_course_students(course: Course) -> list[dict]:
         )
         .order_by("-last_activity_at")
     )
+    users = [enrollment.user for enrollment in enrollments]
+    progress = get_course_progress_bulk(course, [u.pk for u in users])
+    mentors = resolve_student_mentors(users)
+
+    rows = []
     for enrollment in enrollments:
         user = enrollment.user
-        detail = get_course_progress_detail(user, course)
+        detail = progress[user.pk]
         assigned = None
         profile = getattr(user, "student_profile", None)
         if isinstance(profile, Student) and profile.assigned_mentor_id:
             assigned = mentor_brief(profile.assigned_mentor)
-        resolved, source = resolve_student_mentor(user)
+        resolved, source = mentors[user.pk]
         rows.append(
             {
                 "user_public_id": str(user.public_id),
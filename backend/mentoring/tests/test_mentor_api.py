@@ -79,6 +79,51 @@ class TestMentorApiAccess:
         )
         assert row["students_count"] == 1
 
+    def test_course_students_progress_in_constant_queries(
+        self,
+        mentor_client,
+        course,
+        student_user,
+        radio_question,
+        radio_answers,
+    ):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from users.models import User
+
+        correct = next(a for a in radio_answers if a.is_correct)
+        Enrollment.objects.create(user=student_user, course=course)
+        UserAnswerRadio.objects.create(
+            user=student_user,
+            question=radio_question,
+            selected_answer=correct,
+            is_correct=True,
+        )
+        url = f"/api/mentoring/courses/{course.public_id}/students/"
+
+        with CaptureQueriesContext(connection) as single:
+            resp = mentor_client.get(url)
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.data["students"][0]["percent"] == 100
+
+        for i in range(5):
+            other = User.objects.create_user(
+                email=f"bulk-{i}@academy.com",
+                phone=f"+7900777000{i}",
+                password="password",
+                role="student",
+            )
+            Enrollment.objects.create(user=other, course=course)
+
+        with CaptureQueriesContext(connection) as many:
+            resp = mentor_client.get(url)
+        assert len(resp.data["students"]) == 6
+        assert sorted(r["percent"] for r in resp.data["students"]) == [
+            0
+        ] * 5 + [100]
+        assert len(many.captured_queries) == len(single.captured_queries)
+
     def test_mentor_sees_code_submission(
         self, mentor_client, student_user, coding_challenge
     ):
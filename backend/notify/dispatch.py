@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import Any, Iterable
 
 from django.conf import settings
 
@@ -19,6 +19,12 @@ def site_url(path: str = "") -> str:
     return f"{base}{path}" if base else path
 
 
+def _title(title: str) -> str:
+    # UserNotification.title is varchar(255); baker/long names can exceed it.
+    # SQLite ignores the limit; PostgreSQL (CI) rejects → truncate defensively.
+    return (title or "")[:255]
+
+
 def create_and_deliver(
     *,
     user,
@@ -31,9 +37,7 @@ def create_and_deliver(
     skip_vk: bool = False,
 ) -> Any:
     """Создать in-app уведомление (опционально) и поставить доставку в очередь."""
-    # UserNotification.title is varchar(255); baker/long names can exceed it.
-    # SQLite ignores the limit; PostgreSQL (CI) rejects → truncate defensively.
-    title = (title or "")[:255]
+    title = _title(title)
     body = body or ""
     note = None
     if persist:
@@ -64,3 +68,65 @@ def create_and_deliver(
             getattr(user, "pk", None),
         )
     return note
+
+
+def create_and_deliver_many(
+    users: Iterable,
+    *,
+    kind: str,
+    title: str,
+    body: str = "",
+    url: str = "",
+    persist: bool = True,
+    skip_vk: bool = False,
+) -> list:
+    """
+    Одно уведомление многим пользователям (кампании, напоминания).
+
+    ``users`` — пользователи или их pk (повторы отбрасываются).
+
+    In-app уведомления создаются одним ``bulk_create``, доставка в VK и
+    Web Push ставится пачками по ``NOTIFY_DELIVERY_BATCH_SIZE`` получателей
+    на задачу ``deliver_outbound_batch``.
+    """
+    title = _title(title)
+    body = body or ""
+    user_ids = list(dict.fromkeys(getattr(u, "pk", u) for u in users))
+    if not user_ids:
+        return []
+
+    notes = []
+    if persist:
+        from communication.models import UserNotification
+
+        notes = UserNotification.objects.bulk_create(
+            [
+                UserNotification(
+                    user_id=user_id, kind=kind, title=title, body=body
+                )
+                for user_id in user_ids
+            ],
+            batch_size=1000,
+        )
+
+    from notify.tasks import deliver_outbound_batch
+
+    size = max(1, int(getattr(settings, "NOTIFY_DELIVERY_BATCH_SIZE", 500)))
+    for start in range(0, len(user_ids), size):
+        batch = user_ids[start : start + size]
+        try:
+            deliver_outbound_batch.delay(
+                user_ids=batch,
+                title=title,
+                body=body,
+                url=url or "",
+                kind=kind,
+                skip_vk=skip_vk,
+            )
+        except Exception:
+            logger.exception(
+                "Не удалось поставить deliver_outbound_batch в очередь "
+                "(получателей: %s)",
+                len(batch),
+            )
+    return notes
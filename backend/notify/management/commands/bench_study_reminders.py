@@ -0,0 +1,100 @@
+from datetime import timedelta
+import time
+from unittest.mock import patch
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from notify.study_reminders import send_abandoned_and_streak_reminders
+
+from content.models import Course
+from education.models import Enrollment
+from progress.models import UserDailyActivity
+
+
+class Command(BaseCommand):
+    help = (
+        "Ночной обход напоминаний об учёбе на большом числе учеников: "
+        "печатает время этапов и число запросов к БД. Доставка в очередь "
+        "не ставится; данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--students",
+            type=int,
+            default=100_000,
+            help="Учеников (по умолчанию 100000).",
+        )
+        parser.add_argument(
+            "--streak-days",
+            type=int,
+            default=5,
+            help="Длина streak каждого ученика (по умолчанию 5).",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(max(1, options["students"]), options["streak_days"])
+            self._measure()
+            transaction.set_rollback(True)
+
+    def _seed(self, total: int, streak_days: int) -> None:
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        course = Course.objects.create(
+            title="Bench", slug=f"bench-{tag}", description="bench"
+        )
+        today = timezone.localdate()
+        stale = timezone.now() - timedelta(days=5)
+        batch = 5_000
+        for start in range(0, total, batch):
+            users = User.objects.bulk_create(
+                User(
+                    email=f"bench-sweep-{tag}-{i}@academy.local",
+                    password="!",
+                    role="student",
+                )
+                for i in range(start, min(start + batch, total))
+            )
+            UserDailyActivity.objects.bulk_create(
+                UserDailyActivity(
+                    user=user, date=today - timedelta(days=d), count=1
+                )
+                for user in users
+                for d in range(1, streak_days + 1)
+            )
+            Enrollment.objects.bulk_create(
+                Enrollment(
+                    user=user,
+                    course=course,
+                    status=Enrollment.Status.ACTIVE,
+                )
+                for user in users[::2]
+            )
+            self.stdout.write(f"  {min(start + batch, total)}/{total}")
+        # last_activity_at — auto_now: «забрасываем» курс отдельным UPDATE.
+        Enrollment.objects.filter(course=course).update(last_activity_at=stale)
+        self.stdout.write(
+            f"Создано учеников: {total} "
+            f"за {time.perf_counter() - started:.1f} с."
+        )
+
+    def _measure(self) -> None:
+        started = time.perf_counter()
+        with (
+            patch("notify.tasks.deliver_outbound_batch.delay"),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            result = send_abandoned_and_streak_reminders()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"study: {result['study']}  streak: {result['streak']}  "
+            f"запросов к БД: {len(queries)}  время: {elapsed:.2f} с"
+        )
+        for stage, ms in result["timings_ms"].items():
+            self.stdout.write(f"  {stage:<15} {ms:>10.1f} мс")
@@ -1,92 +1,147 @@
-"""Напоминания о заброшенных курсах и риске сорвать streak."""
+"""
+Напоминания о заброшенных курсах и риске сорвать streak.
+
+Ночной обход работает множествами: кандидаты и их streak выбираются
+несколькими сгруппированными запросами, уже отправленные сегодня
+напоминания отсекаются подзапросом, а рассылка уходит через
+``create_and_deliver_many`` — по одному вызову на группу получателей с
+одинаковым текстом. Итог содержит время каждого этапа (``timings_ms``).
+"""
 
 from __future__ import annotations
 
-from datetime import timedelta
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import logging
+from time import perf_counter
 
-from django.contrib.auth import get_user_model
-from django.db.models import Max
+from django.db.models import Q
 from django.utils import timezone
-from notify.dispatch import create_and_deliver, site_url
+from notify.dispatch import create_and_deliver_many, site_url
 
 from communication.models import UserNotification
 from education.models import Enrollment
-from progress.stats import compute_streak_days
+from progress.activity import streaks_by_user
+from progress.models import UserDailyActivity
 
-User = get_user_model()
+logger = logging.getLogger(__name__)
 
 ABANDONED_DAYS = 2
 STREAK_WARN_IF_STREAK_GE = 2
+_UPDATE_CHUNK = 900
 
 
-def send_abandoned_and_streak_reminders() -> dict:
-    now = timezone.now()
-    abandoned_cutoff = now - timedelta(days=ABANDONED_DAYS)
-    today = timezone.localdate()
-    sent_study = 0
-    sent_streak = 0
+class _Stages:
+    """Замер длительности этапов обхода, мс."""
 
-    # Заброшенные активные курсы (не чаще раза в 2 дня на enrollment)
-    ens = (
+    def __init__(self):
+        self.timings_ms: dict[str, float] = {}
+
+    @contextmanager
+    def __call__(self, name: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.timings_ms[name] = round((perf_counter() - started) * 1000, 1)
+
+
+def _day_bounds(day) -> tuple[datetime, datetime]:
+    """Границы локального дня ``[start, end)``."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _abandoned_groups(cutoff) -> dict[tuple, list[tuple[int, int]]]:
+    """
+    Самое свежее подходящее зачисление каждого ученика, сгруппированное по
+    курсу: ``{(название, public_id): [(enrollment_pk, user_id), ...]}``.
+    """
+    rows = (
         Enrollment.objects.filter(
             status=Enrollment.Status.ACTIVE,
-            last_activity_at__lt=abandoned_cutoff,
+            last_activity_at__lt=cutoff,
+        )
+        .filter(
+            Q(last_study_reminder_at__isnull=True)
+            | Q(last_study_reminder_at__lte=cutoff)
         )
-        .select_related("user", "course")
         .order_by("user_id", "-last_activity_at")
+        .values_list("pk", "user_id", "course__title", "course__public_id")
     )
+    groups: dict[tuple, list[tuple[int, int]]] = defaultdict(list)
     seen_users: set[int] = set()
-    for e in ens:
-        if e.user_id in seen_users:
+    for pk, user_id, title, course_public_id in rows.iterator(chunk_size=2000):
+        if user_id in seen_users:
             continue
-        if (
-            e.last_study_reminder_at
-            and e.last_study_reminder_at > abandoned_cutoff
-        ):
-            continue
-        seen_users.add(e.user_id)
-        title = e.course.title if e.course_id else "курс"
-        create_and_deliver(
-            user=e.user,
+        seen_users.add(user_id)
+        groups[(title, course_public_id)].append((pk, user_id))
+    return groups
+
+
+def _send_study_reminders(groups, now) -> int:
+    sent = 0
+    for (title, course_public_id), rows in groups.items():
+        create_and_deliver_many(
+            [user_id for _pk, user_id in rows],
             kind=UserNotification.Kind.STUDY_REMINDER,
             title="Пора вернуться к учёбе",
             body=(
-                f"Курс «{title}» ждёт тебя уже "
+                f"Курс «{title or 'курс'}» ждёт тебя уже "
                 f"{ABANDONED_DAYS}+ дня. "
                 "Небольшой урок сегодня — и streak в безопасности."
             ),
             url=site_url(
-                f"/learn?course={e.course.public_id}"
-                if getattr(e.course, "public_id", None)
+                f"/learn?course={course_public_id}"
+                if course_public_id
                 else "/catalog"
             ),
         )
-        Enrollment.objects.filter(pk=e.pk).update(last_study_reminder_at=now)
-        sent_study += 1
+        pks = [pk for pk, _user_id in rows]
+        for start in range(0, len(pks), _UPDATE_CHUNK):
+            Enrollment.objects.filter(
+                pk__in=pks[start : start + _UPDATE_CHUNK]
+            ).update(last_study_reminder_at=now)
+        sent += len(rows)
+    return sent
 
-    # Streak под угрозой: был streak, сегодня ещё не было активности
-    # (упрощённо: streak>=2 и max enrollment activity не сегодня)
-    for user in User.objects.filter(is_active=True, role="student").iterator(
-        chunk_size=200
-    ):
-        streak = compute_streak_days(user)
-        if streak < STREAK_WARN_IF_STREAK_GE:
-            continue
-        last = Enrollment.objects.filter(user=user).aggregate(
-            m=Max("last_activity_at")
-        )["m"]
-        if last and timezone.localdate(last) == today:
-            continue
-        # не спамим: одно streak-напоминание в сутки
-        already = UserNotification.objects.filter(
-            user=user,
-            kind=UserNotification.Kind.STREAK_REMINDER,
-            created_at__date=today,
-        ).exists()
-        if already:
-            continue
-        create_and_deliver(
-            user=user,
+
+def _streak_candidates(today) -> list[int]:
+    """
+    Ученики с активностью вчера, но без активности и streak-напоминания
+    сегодня — один запрос.
+    """
+    day_start, day_end = _day_bounds(today)
+    active_today = Enrollment.objects.filter(
+        last_activity_at__gte=day_start, last_activity_at__lt=day_end
+    ).values("user_id")
+    reminded_today = UserNotification.objects.filter(
+        kind=UserNotification.Kind.STREAK_REMINDER,
+        created_at__gte=day_start,
+        created_at__lt=day_end,
+    ).values("user_id")
+    return list(
+        UserDailyActivity.objects.filter(
+            date=today - timedelta(days=1),
+            count__gt=0,
+            user__is_active=True,
+            user__role="student",
+        )
+        .exclude(user_id__in=active_today)
+        .exclude(user_id__in=reminded_today)
+        .values_list("user_id", flat=True)
+    )
+
+
+def _send_streak_reminders(streaks: dict[int, int]) -> int:
+    by_streak: dict[int, list[int]] = defaultdict(list)
+    for user_id, streak in streaks.items():
+        if streak >= STREAK_WARN_IF_STREAK_GE:
+            by_streak[streak].append(user_id)
+    for streak, user_ids in sorted(by_streak.items()):
+        create_and_deliver_many(
+            user_ids,
             kind=UserNotification.Kind.STREAK_REMINDER,
             title=f"Streak {streak} под угрозой",
             body=(
@@ -95,6 +150,40 @@ def send_abandoned_and_streak_reminders() -> dict:
             ),
             url=site_url("/catalog"),
         )
-        sent_streak += 1
+    return sum(len(ids) for ids in by_streak.values())
+
+
+def send_abandoned_and_streak_reminders() -> dict:
+    now = timezone.now()
+    abandoned_cutoff = now - timedelta(days=ABANDONED_DAYS)
+    today = timezone.localdate()
+    stage = _Stages()
 
-    return {"study": sent_study, "streak": sent_streak}
+    # Заброшенные активные курсы (не чаще раза в 2 дня на enrollment)
+    with stage("study_select"):
+        groups = _abandoned_groups(abandoned_cutoff)
+    with stage("study_send"):
+        sent_study = _send_study_reminders(groups, now)
+
+    # Streak под угрозой: был streak, сегодня ещё не было активности
+    # (упрощённо: streak>=2 и max enrollment activity не сегодня).
+    # Streak >= 2 невозможен без активности вчера — кандидаты берутся из
+    # дневной сводки; не чаще одного streak-напоминания в сутки.
+    with stage("streak_select"):
+        candidate_ids = _streak_candidates(today)
+    with stage("streak_compute"):
+        streaks = streaks_by_user(candidate_ids, today)
+    with stage("streak_send"):
+        sent_streak = _send_streak_reminders(streaks)
+
+    logger.info(
+        "Напоминания об учёбе: study=%s streak=%s, этапы (мс): %s",
+        sent_study,
+        sent_streak,
+        stage.timings_ms,
+    )
+    return {
+        "study": sent_study,
+        "streak": sent_streak,
+        "timings_ms": stage.timings_ms,
+    }
@@ -9,6 +9,94 @@ from celery import shared_task
 logger = logging.getLogger(__name__)
 
 
+def _outbound_text(title: str, body: str, url: str) -> str:
+    text = title if not body else f"{title}\n\n{body}"
+    if url:
+        text = f"{text}\n\n{url}"
+    return text
+
+
+def _open_link_keyboard(url: str) -> dict | None:
+    if not url:
+        return None
+    return {
+        "inline": True,
+        "buttons": [
+            [
+                {
+                    "action": {
+                        "type": "open_link",
+                        "link": url,
+                        "label": "Открыть",
+                    }
+                }
+            ]
+        ],
+    }
+
+
+def _deliver_to_users(
+    user_ids: list[int],
+    *,
+    title: str,
+    body: str,
+    url: str,
+    skip_vk: bool,
+) -> tuple[dict[int, dict], dict]:
+    """
+    VK + Web Push для группы пользователей: два запроса к БД на группу.
+
+    VK уходит пачками ``peer_ids`` (``vk_api.send_message_many``), Web Push
+    — асинхронно (``webpush_api.send_web_push_many``). Возвращает итог по
+    каждому найденному пользователю (``{"vk": bool, "web_push": int}``) и
+    метрики Web Push пачки.
+    """
+    from django.contrib.auth import get_user_model
+    from notify import vk_api
+    from notify.models import PushSubscription
+    from notify.webpush_api import send_web_push_many
+
+    User = get_user_model()
+    users = list(
+        User.objects.filter(pk__in=user_ids).only(
+            "pk", "vk_id", "vk_messages_allowed"
+        )
+    )
+    if not users:
+        return {}, {}
+
+    vk_sent: dict[int, bool] = {}
+    if not skip_vk:
+        peers = {
+            user.pk: user.vk_id
+            for user in users
+            if user.vk_id and getattr(user, "vk_messages_allowed", False)
+        }
+        delivered = vk_api.send_message_many(
+            peers.values(),
+            _outbound_text(title, body, url),
+            keyboard=_open_link_keyboard(url),
+        )
+        vk_sent = {
+            pk: delivered.get(peer, False) for pk, peer in peers.items()
+        }
+
+    pushed = send_web_push_many(
+        PushSubscription.objects.filter(user_id__in=[u.pk for u in users]),
+        title=title,
+        body=body,
+        url=url,
+    )
+    results = {
+        user.pk: {
+            "vk": vk_sent.get(user.pk, False),
+            "web_push": pushed.delivered.get(user.pk, 0),
+        }
+        for user in users
+    }
+    return results, pushed.stats
+
+
 @shared_task(name="notify.deliver_outbound")
 def deliver_outbound(
     user_id: int,
@@ -18,50 +106,36 @@ def deliver_outbound(
     kind: str = "",
     skip_vk: bool = False,
 ) -> dict:
-    from django.contrib.auth import get_user_model
-    from notify.models import PushSubscription
-    from notify.vk_api import send_message
-    from notify.webpush_api import send_web_push
-
-    User = get_user_model()
-    user = User.objects.filter(pk=user_id).first()
-    if not user:
+    results, _stats = _deliver_to_users(
+        [user_id], title=title, body=body, url=url, skip_vk=skip_vk
+    )
+    result = results.get(user_id)
+    if result is None:
         return {"ok": False, "reason": "no_user"}
+    return {"ok": True, **result, "kind": kind}
 
-    text = title if not body else f"{title}\n\n{body}"
-    if url:
-        text = f"{text}\n\n{url}"
 
-    vk_ok = False
-    if (
-        not skip_vk
-        and user.vk_id
-        and getattr(user, "vk_messages_allowed", False)
-    ):
-        keyboard = None
-        if url:
-            keyboard = {
-                "inline": True,
-                "buttons": [
-                    [
-                        {
-                            "action": {
-                                "type": "open_link",
-                                "link": url,
-                                "label": "Открыть",
-                            }
-                        }
-                    ]
-                ],
-            }
-        vk_ok = send_message(user.vk_id, text, keyboard=keyboard)
-
-    push_ok = 0
-    for sub in PushSubscription.objects.filter(user=user):
-        if send_web_push(subscription=sub, title=title, body=body, url=url):
-            push_ok += 1
-
-    return {"ok": True, "vk": vk_ok, "web_push": push_ok, "kind": kind}
+@shared_task(name="notify.deliver_outbound_batch")
+def deliver_outbound_batch(
+    user_ids: list[int],
+    title: str,
+    body: str = "",
+    url: str = "",
+    kind: str = "",
+    skip_vk: bool = False,
+) -> dict:
+    """Одна задача доставки на пачку получателей массовой рассылки."""
+    results, push_stats = _deliver_to_users(
+        user_ids, title=title, body=body, url=url, skip_vk=skip_vk
+    )
+    return {
+        "ok": True,
+        "users": len(results),
+        "vk": sum(r["vk"] for r in results.values()),
+        "web_push": sum(r["web_push"] for r in results.values()),
+        "web_push_stats": push_stats,
+        "kind": kind,
+    }
 
 
 @shared_task(name="notify.send_study_reminders")
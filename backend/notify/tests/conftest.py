@@ -8,3 +8,26 @@ def _inmemory_channel_layer(settings):
     }
     settings.CELERY_TASK_ALWAYS_EAGER = True
     settings.CELERY_TASK_EAGER_PROPAGATES = True
+
+
+@pytest.fixture
+def vapid_keys(settings):
+    """Настоящая пара ключей VAPID (кэш разобранного ключа сбрасывается)."""
+    from cryptography.hazmat.primitives import serialization
+    from notify import webpush_api
+    from py_vapid import Vapid02
+    from py_vapid.utils import b64urlencode
+
+    vapid = Vapid02()
+    vapid.generate_keys()
+    private = vapid.private_key.private_numbers().private_value
+    settings.VAPID_PRIVATE_KEY = b64urlencode(private.to_bytes(32, "big"))
+    settings.VAPID_PUBLIC_KEY = b64urlencode(
+        vapid.public_key.public_bytes(
+            serialization.Encoding.X962,
+            serialization.PublicFormat.UncompressedPoint,
+        )
+    )
+    webpush_api._vapid_key = None
+    yield vapid
+    webpush_api._vapid_key = None
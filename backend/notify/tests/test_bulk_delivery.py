@@ -0,0 +1,135 @@
+"""Массовая рассылка: один bulk_create и доставка пачками."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from model_bakery import baker
+from notify import webpush_api
+from notify.dispatch import create_and_deliver_many
+from notify.models import PushSubscription
+from notify.tasks import deliver_outbound_batch
+import pytest
+
+from communication.models import UserNotification
+
+
+@pytest.fixture
+def students(db):
+    return [
+        baker.make(
+            "users.User",
+            role="student",
+            email=f"bulk-{i}@ex.com",
+            vk_id=9100 + i,
+            vk_messages_allowed=i % 2 == 0,
+        )
+        for i in range(5)
+    ]
+
+
+def _subscribe(user, n):
+    return baker.make(
+        PushSubscription,
+        user=user,
+        endpoint=f"https://push.example/{user.pk}/{n}",
+        p256dh="k",
+        auth="a",
+    )
+
+
+@pytest.mark.django_db
+def test_many_inserts_once_and_enqueues_batches(
+    students, settings, django_assert_num_queries
+):
+    settings.NOTIFY_DELIVERY_BATCH_SIZE = 2
+    with patch("notify.tasks.deliver_outbound_batch.delay") as delay:
+        with django_assert_num_queries(1):
+            notes = create_and_deliver_many(
+                students + students[:1],
+                kind=UserNotification.Kind.STUDY_REMINDER,
+                title="Т" * 300,
+                body="Вернись к урокам",
+                url="https://academy.test/catalog",
+            )
+
+    assert len(notes) == 5
+    assert (
+        UserNotification.objects.filter(
+            kind=UserNotification.Kind.STUDY_REMINDER, title="Т" * 255
+        ).count()
+        == 5
+    )
+    batches = [call.kwargs["user_ids"] for call in delay.call_args_list]
+    assert batches == [
+        [students[0].pk, students[1].pk],
+        [students[2].pk, students[3].pk],
+        [students[4].pk],
+    ]
+    assert delay.call_args.kwargs["url"] == "https://academy.test/catalog"
+
+
+@pytest.mark.django_db
+def test_batch_sends_vk_and_push_and_prunes_gone(
+    students, settings, vapid_keys, django_assert_max_num_queries
+):
+    settings.VK_GROUP_TOKEN = "tok"
+    settings.VK_GROUP_ID = "1"
+    ok = [_subscribe(user, 0) for user in students]
+    gone = _subscribe(students[1], 1)
+
+    async def fake_push(session, sub, payload, headers):
+        assert headers["Authorization"].startswith("vapid t=")
+        if sub.pk == gone.pk:
+            return webpush_api.PUSH_GONE
+        return webpush_api.PUSH_OK
+
+    def fake_vk(method, params):
+        return [
+            (
+                {"peer_id": int(peer), "message_id": 1}
+                if peer != "9102"
+                else {"peer_id": 9102, "error": {"code": 901}}
+            )
+            for peer in params["peer_ids"].split(",")
+        ]
+
+    with (
+        patch("notify.vk_api._api", side_effect=fake_vk) as vk,
+        patch.object(webpush_api, "_push", side_effect=fake_push),
+        django_assert_max_num_queries(4),
+    ):
+        result = deliver_outbound_batch(
+            user_ids=[u.pk for u in students],
+            title="Кампания",
+            body="тело",
+            kind="study_reminder",
+        )
+
+    stats = result.pop("web_push_stats")
+    assert result == {
+        "ok": True,
+        "users": 5,
+        "vk": 2,
+        "web_push": 5,
+        "kind": "study_reminder",
+    }
+    assert (stats["sent"], stats["ok"], stats["gone"]) == (6, 5, 1)
+    assert vk.call_count == 1
+    peers = vk.call_args.args[1]["peer_ids"].split(",")
+    assert sorted(peers) == ["9100", "9102", "9104"]
+    assert not PushSubscription.objects.filter(pk=gone.pk).exists()
+    assert PushSubscription.objects.filter(
+        pk__in=[s.pk for s in ok], last_success_at__isnull=False
+    ).count() == len(ok)
+
+
+@pytest.mark.django_db
+def test_batch_without_vapid_skips_push(students):
+    _subscribe(students[0], 0)
+    with patch.object(webpush_api, "_push") as push:
+        result = deliver_outbound_batch(
+            user_ids=[students[0].pk], title="Без ключей", skip_vk=True
+        )
+    assert result["web_push"] == 0
+    assert not push.called
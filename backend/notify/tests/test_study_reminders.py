@@ -0,0 +1,108 @@
+"""Ночной обход напоминаний об учёбе: множества вместо цикла по ученикам."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.utils import timezone
+from model_bakery import baker
+from notify.study_reminders import send_abandoned_and_streak_reminders
+import pytest
+
+from communication.models import UserNotification
+from education.models import Enrollment
+from progress.models import UserDailyActivity
+
+
+def _student(n):
+    return baker.make("users.User", role="student", email=f"sweep-{n}@ex.com")
+
+
+def _streak(user, days):
+    today = timezone.localdate()
+    for offset in range(1, days + 1):
+        UserDailyActivity.objects.create(
+            user=user, date=today - timedelta(days=offset), count=1
+        )
+
+
+def _enroll(user, course, days_ago):
+    en = baker.make(
+        Enrollment, user=user, course=course, status=Enrollment.Status.ACTIVE
+    )
+    Enrollment.objects.filter(pk=en.pk).update(
+        last_activity_at=timezone.now() - timedelta(days=days_ago),
+        last_study_reminder_at=None,
+    )
+    return en
+
+
+@pytest.mark.django_db
+def test_streak_sweep_groups_by_streak_and_skips_done_today():
+    two = [_student(i) for i in range(3)]
+    three = _student(3)
+    active_today = _student(4)
+    reminded = _student(5)
+    for user in [*two, active_today, reminded]:
+        _streak(user, 2)
+    _streak(three, 3)
+    _enroll(active_today, baker.make("content.Course"), 0)
+    baker.make(
+        UserNotification,
+        user=reminded,
+        kind=UserNotification.Kind.STREAK_REMINDER,
+    )
+
+    result = send_abandoned_and_streak_reminders()
+
+    assert result["streak"] == 4
+    titles = dict(
+        UserNotification.objects.filter(
+            kind=UserNotification.Kind.STREAK_REMINDER,
+            user__in=[*two, three, active_today],
+        ).values_list("user_id", "title")
+    )
+    assert titles == {
+        **{u.pk: "Streak 2 под угрозой" for u in two},
+        three.pk: "Streak 3 под угрозой",
+    }
+    assert set(result["timings_ms"]) == {
+        "study_select",
+        "study_send",
+        "streak_select",
+        "streak_compute",
+        "streak_send",
+    }
+
+
+@pytest.mark.django_db
+def test_abandoned_sweep_uses_latest_course_once(
+    django_assert_max_num_queries,
+):
+    python = baker.make("content.Course", title="Python")
+    sql = baker.make("content.Course", title="SQL")
+    users = [_student(i) for i in range(4)]
+    for user in users:
+        _enroll(user, sql, 10)
+        _enroll(user, python, 5)
+
+    with django_assert_max_num_queries(6):
+        result = send_abandoned_and_streak_reminders()
+
+    assert result["study"] == 4
+    bodies = set(
+        UserNotification.objects.filter(
+            kind=UserNotification.Kind.STUDY_REMINDER
+        ).values_list("body", flat=True)
+    )
+    assert len(bodies) == 1 and "«Python»" in bodies.pop()
+    assert (
+        Enrollment.objects.filter(
+            course=python, last_study_reminder_at__isnull=False
+        ).count()
+        == 4
+    )
+
+    # Следующий обход напоминает о другом заброшенном курсе, потом — тишина.
+    assert send_abandoned_and_streak_reminders()["study"] == 4
+    assert send_abandoned_and_streak_reminders()["study"] == 0
@@ -0,0 +1,159 @@
+"""Клиент VK API против локального HTTP-стаба."""
+
+from __future__ import annotations
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+from common.shared_cache import shared_cache
+from notify import vk_api
+import pytest
+
+
+class _StubVK(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode())
+        params = {key: values[0] for key, values in form.items()}
+        server = self.server
+        server.calls.append(
+            {
+                "path": self.path,
+                "params": params,
+                "port": self.client_address[1],
+            }
+        )
+        payload = server.replies.pop(0) if server.replies else None
+        if payload is None:
+            payload = _ok(params)
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _ok(params):
+    if "peer_ids" in params:
+        return {
+            "response": [
+                {"peer_id": int(peer), "message_id": n}
+                for n, peer in enumerate(params["peer_ids"].split(","))
+            ]
+        }
+    return {"response": 1}
+
+
+def _error(code):
+    return {"error": {"error_code": code, "error_msg": "stub"}}
+
+
+@pytest.fixture
+def vk_stub(settings):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubVK)
+    server.calls = []
+    server.replies = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.VK_API_URL = f"http://127.0.0.1:{server.server_port}/method"
+    settings.VK_GROUP_TOKEN = "tok"
+    settings.VK_GROUP_ID = "1"
+    settings.VK_API_RATE_PER_SEC = 0
+    settings.VK_API_RETRY_BACKOFF_SEC = 0
+    settings.VK_API_MAX_RETRIES = 2
+    yield server
+    server.shutdown()
+    server.server_close()
+    vk_api.http_session().close()
+
+
+def test_send_message_over_pooled_session(vk_stub):
+    for n in range(3):
+        assert vk_api.send_message(100 + n, f"привет {n}")
+
+    assert [c["path"] for c in vk_stub.calls] == ["/method/messages.send"] * 3
+    assert [c["params"]["peer_id"] for c in vk_stub.calls] == [
+        "100",
+        "101",
+        "102",
+    ]
+    assert vk_stub.calls[0]["params"]["access_token"] == "tok"
+    # keep-alive: все запросы по одному соединению
+    assert len({c["port"] for c in vk_stub.calls}) == 1
+
+
+def test_many_packs_peer_ids_and_reads_per_peer_errors(vk_stub):
+    peers = list(range(1, 151))
+    vk_stub.replies.append(
+        {
+            "response": [
+                (
+                    {"peer_id": peer, "message_id": peer}
+                    if peer != 7
+                    else {"peer_id": 7, "error": {"code": 901}}
+                )
+                for peer in range(1, 101)
+            ]
+        }
+    )
+
+    sent = vk_api.send_message_many(peers, "кампания")
+
+    assert [
+        len(c["params"]["peer_ids"].split(",")) for c in vk_stub.calls
+    ] == [100, 50]
+    assert "peer_id" not in vk_stub.calls[0]["params"]
+    assert sum(sent.values()) == 149
+    assert sent[7] is False
+
+
+@pytest.mark.parametrize("code", [6, 9])
+def test_rate_and_flood_errors_are_retried(vk_stub, code):
+    vk_stub.replies.extend([_error(code), _error(code)])
+
+    assert vk_api.send_message(5, "повтор")
+    assert len(vk_stub.calls) == 3
+
+
+def test_retries_are_bounded_and_other_errors_fail_fast(vk_stub):
+    vk_stub.replies.extend([_error(6)] * 3)
+    assert not vk_api.send_message(5, "лимит")
+    assert len(vk_stub.calls) == 3
+
+    vk_stub.calls.clear()
+    vk_stub.replies.append(_error(901))
+    assert not vk_api.send_message(5, "запрещено")
+    assert len(vk_stub.calls) == 1
+
+
+def test_rate_limit_is_shared_per_group_token(settings):
+    settings.VK_GROUP_TOKEN = "tok"
+    settings.VK_API_RATE_PER_SEC = 50
+    limit = vk_api._window_limit(50)
+    started = time.monotonic()
+    for _ in range(limit * 3):
+        vk_api._acquire_rate_slot()
+    # Три полных окна не помещаются в одно: пришлось ждать следующих.
+    assert time.monotonic() - started >= vk_api._RATE_WINDOW_SEC
+
+    # Счётчик в общем cache, ключ — хэш токена, а не сам токен.
+    window = int(time.time() / vk_api._RATE_WINDOW_SEC)
+    token = hashlib.sha256(b"tok").hexdigest()[:16]
+    key = vk_api._RATE_KEY.format(token=token, window=window)
+    assert 1 <= shared_cache.get(key) <= limit
+
+
+def test_window_limit_never_exceeds_rate():
+    for rate in (5, 20, 50, 100):
+        windows = 1 / vk_api._RATE_WINDOW_SEC + 1
+        assert vk_api._window_limit(rate) * windows <= rate
@@ -0,0 +1,123 @@
+"""Асинхронная рассылка Web Push против локального push-сервиса."""
+
+from __future__ import annotations
+
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from model_bakery import baker
+from notify import webpush_api
+from notify.models import PushSubscription
+import pytest
+
+
+class _StubPush(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.server.auth.append(self.headers.get("Authorization"))
+        status = 201
+        if self.path.startswith("/gone/"):
+            status = 410
+        elif self.path.startswith("/fail/"):
+            status = 500
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _browser_keys() -> tuple[str, str]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = key.public_key().public_bytes(
+        serialization.Encoding.X962,
+        serialization.PublicFormat.UncompressedPoint,
+    )
+    return _b64(p256dh), _b64(os.urandom(16))
+
+
+@pytest.fixture
+def push_service():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPush)
+    server.auth = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", server
+    server.shutdown()
+    server.server_close()
+
+
+def _subscriptions(base, user, paths):
+    subs = []
+    for n, path in enumerate(paths):
+        p256dh, auth = _browser_keys()
+        subs.append(
+            baker.make(
+                PushSubscription,
+                user=user,
+                endpoint=f"{base}/{path}/{n}",
+                p256dh=p256dh,
+                auth=auth,
+            )
+        )
+    return subs
+
+
+@pytest.mark.django_db
+def test_batch_is_sent_concurrently_and_prunes_dead(
+    push_service, vapid_keys, settings
+):
+    settings.NOTIFY_PUSH_WORKERS = 4
+    base, server = push_service
+    user = baker.make("users.User", role="student", email="wp@ex.com")
+    subs = _subscriptions(base, user, ["ok"] * 4 + ["gone", "fail"])
+
+    with patch.object(
+        webpush_api, "_parse_vapid", wraps=webpush_api._parse_vapid
+    ) as parse:
+        first = webpush_api.send_web_push_many(subs, title="Т", body="б")
+        second = webpush_api.send_web_push_many(subs[:4], title="Т", body="б")
+
+    assert first.delivered == {user.pk: 4}
+    assert {k: first.stats[k] for k in ("sent", "ok", "gone", "failed")} == {
+        "sent": 6,
+        "ok": 4,
+        "gone": 1,
+        "failed": 1,
+    }
+    assert first.stats["per_sec"] > 0
+    assert second.stats["ok"] == 4
+    # ключ разобран один раз, JWT подписан один раз на push-сервис
+    assert parse.call_count == 1
+    assert len(set(server.auth)) == 1
+    assert server.auth[0].startswith("vapid t=")
+    assert not PushSubscription.objects.filter(pk=subs[4].pk).exists()
+    assert (
+        PushSubscription.objects.filter(last_success_at__isnull=False).count()
+        == 4
+    )
+
+
+def test_vapid_jwt_is_resigned_before_expiry(vapid_keys):
+    aud = "https://push.example"
+    first = webpush_api.vapid_headers(vapid_keys, aud)
+    assert webpush_api.vapid_headers(vapid_keys, aud) is first
+
+    exp, headers = webpush_api._vapid_headers[aud]
+    webpush_api._vapid_headers[aud] = (int(time.time()) + 10, headers)
+    assert webpush_api.vapid_headers(vapid_keys, aud) is not first
+    assert webpush_api._vapid_headers[aud][0] >= exp
@@ -1,17 +1,76 @@
-"""Тонкий клиент VK API (messages.send + скачивание вложений)."""
+"""
+Клиент VK API (messages.send + скачивание вложений).
+
+Запросы идут через общую keep-alive сессию. Лимит VK для ключа сообщества
+(``VK_API_RATE_PER_SEC`` запросов в секунду) один на все процессы — воркеры
+celery и daphne (ответы бота из ``vk_handlers``): счётчик запросов по ключу
+лежит в cache ``shared`` (``common.shared_cache``). Ошибки 6 («слишком
+много запросов в секунду») и 9 (flood control), а также сетевые сбои
+повторяются с экспоненциальной паузой (``VK_API_MAX_RETRIES``,
+``VK_API_RETRY_BACKOFF_SEC``). Один текст многим получателям уходит
+пачками через ``peer_ids`` (``send_message_many``). Адрес API —
+``VK_API_URL``.
+"""
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import random
+import threading
+import time
 from typing import Any
 
+from common.shared_cache import shared_cache as cache
 from django.conf import settings
 import requests
 
 logger = logging.getLogger(__name__)
 
 VK_API_VERSION = "5.199"
+# messages.send: не больше 100 получателей в peer_ids.
+PEER_IDS_LIMIT = 100
+# (connect, read), сек.
+_TIMEOUT = (5, 15)
+_RETRY_ERROR_CODES = frozenset({6, 9})
+
+# Окно общего счётчика запросов, сек. Любая секунда задевает не больше
+# 1 / окно + 1 окон, поэтому на окно приходится rate · w / (1 + w)
+# запросов (не меньше одного; при 20/с — 4) — лимит VK не превышается и
+# на стыке окон.
+_RATE_WINDOW_SEC = 0.25
+_RATE_KEY = "vk_api:rate:{token}:{window}"
+_RATE_KEY_TTL = 5
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _window_limit(rate: float) -> int:
+    return max(1, int(rate * _RATE_WINDOW_SEC / (1 + _RATE_WINDOW_SEC)))
+
+
+def _acquire_rate_slot() -> None:
+    """Дождаться свободного места в текущем окне счётчика."""
+    rate = float(getattr(settings, "VK_API_RATE_PER_SEC", 0) or 0)
+    if rate <= 0:
+        return
+    limit = _window_limit(rate)
+    token = hashlib.sha256(_token().encode()).hexdigest()[:16]
+    while True:
+        now = time.time()
+        window = int(now / _RATE_WINDOW_SEC)
+        key = _RATE_KEY.format(token=token, window=window)
+        cache.add(key, 0, timeout=_RATE_KEY_TTL)
+        try:
+            used = cache.incr(key)
+        except ValueError:
+            # Окно истекло между add и incr.
+            continue
+        if used <= limit:
+            return
+        time.sleep(max(0.0, (window + 1) * _RATE_WINDOW_SEC - now))
 
 
 def is_configured() -> bool:
@@ -37,7 +96,35 @@ def _token() -> str:
     return (getattr(settings, "VK_GROUP_TOKEN", "") or "").strip()
 
 
-def _api(method: str, params: dict[str, Any]) -> dict[str, Any] | None:
+def _api_url(method: str) -> str:
+    base = getattr(settings, "VK_API_URL", "") or "https://api.vk.com/method"
+    return f"{base.rstrip('/')}/{method}"
+
+
+def http_session() -> requests.Session:
+    """Общая сессия с пулом keep-alive соединений к VK."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool = max(1, int(getattr(settings, "NOTIFY_PUSH_WORKERS", 1)))
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=2, pool_maxsize=pool
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _backoff(attempt: int) -> None:
+    base = float(getattr(settings, "VK_API_RETRY_BACKOFF_SEC", 0) or 0)
+    if base > 0:
+        time.sleep(base * 2**attempt * random.uniform(1, 1.5))
+
+
+def _api(method: str, params: dict[str, Any]) -> Any:
     token = _token()
     if not token:
         return None
@@ -46,21 +133,50 @@ def _api(method: str, params: dict[str, Any]) -> dict[str, Any] | None:
         "access_token": token,
         "v": VK_API_VERSION,
     }
-    try:
-        resp = requests.post(
-            f"https://api.vk.com/method/{method}",
-            data=data,
-            timeout=20,
-        )
-        resp.raise_for_status()
-        payload = resp.json()
-    except Exception:
-        logger.exception("VK API %s failed", method)
+    retries = max(0, int(getattr(settings, "VK_API_MAX_RETRIES", 0) or 0))
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        _acquire_rate_slot()
+        try:
+            resp = http_session().post(
+                _api_url(method), data=data, timeout=_TIMEOUT
+            )
+            resp.raise_for_status()
+            payload = resp.json()
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                logger.exception("VK API %s failed", method)
+                return None
+            _backoff(attempt)
+            continue
+        except Exception:
+            logger.exception("VK API %s failed", method)
+            return None
+        error = payload.get("error")
+        if not error:
+            return payload.get("response")
+        if error.get("error_code") in _RETRY_ERROR_CODES and not last:
+            logger.info(
+                "VK API %s: код %s, повтор %s",
+                method,
+                error.get("error_code"),
+                attempt + 1,
+            )
+            _backoff(attempt)
+            continue
+        logger.warning("VK API %s error: %s", method, error)
         return None
-    if "error" in payload:
-        logger.warning("VK API %s error: %s", method, payload["error"])
-        return None
-    return payload.get("response")
+    return None
+
+
+def _send_params(text: str, keyboard: dict | None) -> dict[str, Any]:
+    params: dict[str, Any] = {
+        "message": (text or "")[:4096],
+        "random_id": random.randint(1, 2**31 - 1),
+    }
+    if keyboard:
+        params["keyboard"] = json.dumps(keyboard, ensure_ascii=False)
+    return params
 
 
 def send_message(
@@ -71,24 +187,50 @@ def send_message(
 ) -> bool:
     if not is_configured() or not peer_id:
         return False
-    params: dict[str, Any] = {
-        "peer_id": int(peer_id),
-        "message": (text or "")[:4096],
-        "random_id": random.randint(1, 2**31 - 1),
-    }
-    if keyboard:
-        import json
-
-        params["keyboard"] = json.dumps(keyboard, ensure_ascii=False)
+    params = _send_params(text, keyboard)
+    params["peer_id"] = int(peer_id)
     return _api("messages.send", params) is not None
 
 
+def send_message_many(
+    peer_ids,
+    text: str,
+    *,
+    keyboard: dict | None = None,
+) -> dict[int, bool]:
+    """
+    Один текст многим получателям: ``messages.send`` с ``peer_ids`` по
+    ``PEER_IDS_LIMIT`` за запрос. Возвращает ``{peer_id: доставлено}``.
+    """
+    peers = list(dict.fromkeys(int(p) for p in peer_ids if p))
+    if not peers or not is_configured():
+        return {peer: False for peer in peers}
+    if len(peers) == 1:
+        return {peers[0]: send_message(peers[0], text, keyboard=keyboard)}
+
+    sent: dict[int, bool] = {}
+    for start in range(0, len(peers), PEER_IDS_LIMIT):
+        chunk = peers[start : start + PEER_IDS_LIMIT]
+        params = _send_params(text, keyboard)
+        params["peer_ids"] = ",".join(str(peer) for peer in chunk)
+        response = _api("messages.send", params)
+        delivered = {
+            int(item["peer_id"])
+            for item in response or []
+            if isinstance(item, dict)
+            and "peer_id" in item
+            and "error" not in item
+        }
+        sent.update({peer: peer in delivered for peer in chunk})
+    return sent
+
+
 def download_photo_url(url: str) -> tuple[bytes, str] | None:
     """Скачать фото по URL; вернуть (content, content_type)."""
     if not url:
         return None
     try:
-        resp = requests.get(url, timeout=30)
+        resp = http_session().get(url, timeout=30)
         resp.raise_for_status()
         ctype = (
             (resp.headers.get("Content-Type") or "image/jpeg")
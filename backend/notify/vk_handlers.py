@@ -295,25 +295,30 @@ def _relay_to_thread(
 
 
 def _cmd_unread(peer: int, user) -> None:
+    from django.db.models import Q
+
     from communication.chat_services import (
         thread_unread_count,
         threads_for_user,
+        total_unread_count,
     )
 
-    threads = threads_for_user(user)
+    # Счётчики денормализованы в диалоге: фильтр и сумма — в БД,
+    # без подсчёта сообщений по каждому диалогу.
+    threads = threads_for_user(user).filter(
+        Q(mentor=user, mentor_unread_count__gt=0)
+        | Q(student=user, student_unread_count__gt=0)
+    )
     lines = []
-    total = 0
     for th in threads[:10]:
         n = thread_unread_count(thread=th, user=user)
-        if n <= 0:
-            continue
-        total += n
         other = th.mentor if th.student_id == user.pk else th.student
         name = f"{other.first_name} {other.last_name}".strip() or "Диалог"
         lines.append(f"• {name}: {n}")
     if not lines:
         send_message(peer, "Непрочитанных нет.")
         return
+    total = total_unread_count(user=user)
     send_message(
         peer,
         f"Непрочитанных: {total}\n"
@@ -341,15 +346,20 @@ def _cmd_calls(peer: int, user) -> None:
 
 def _cmd_progress(peer: int, user) -> None:
     from education.models import Enrollment
-    from progress.stats import compute_streak_days
+    from progress.stats import get_user_progress_stats
 
-    streak = compute_streak_days(user)
+    stats = get_user_progress_stats(user)
     ens = (
         Enrollment.objects.filter(user=user, status=Enrollment.Status.ACTIVE)
         .select_related("course")
         .order_by("-last_activity_at")[:5]
     )
-    lines = [f"Streak: {streak} дн."]
+    lines = [
+        f"Streak: {stats['streak_days']} дн.",
+        f"Решено задач: {stats['tasks_solved']}, "
+        f"теорий прочитано: {stats['theories_read']}, "
+        f"курсов завершено: {stats['courses_completed']}.",
+    ]
     if not ens:
         lines.append("Активных курсов нет.")
     else:
@@ -1,15 +1,52 @@
-"""Web Push через pywebpush."""
+"""
+Web Push через pywebpush.
+
+Ключ VAPID разбирается один раз (до смены ``VAPID_PRIVATE_KEY``), а JWT
+подписывается один раз на push-сервис (``aud`` — origin endpoint) и живёт
+``VAPID_JWT_TTL``; заново подписываем, когда до ``exp`` остаётся меньше
+``VAPID_JWT_REFRESH``. Рассылка идёт асинхронно: все endpoint пачки
+параллельно (не больше ``NOTIFY_PUSH_WORKERS`` одновременно) через одну
+aiohttp-сессию с пулом соединений. Подписки, на которые сервис ответил
+404/410, удаляются одним запросом.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import threading
+import time
+from typing import Any, NamedTuple
+from urllib.parse import urlparse
 
 from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+PUSH_OK = "ok"
+PUSH_GONE = "gone"
+PUSH_FAILED = "failed"
+
+VAPID_JWT_TTL = 12 * 60 * 60
+VAPID_JWT_REFRESH = 60 * 60
+# Общий таймаут одного push, сек.
+_PUSH_TIMEOUT = 15
+
+_cache_lock = threading.Lock()
+# (значение VAPID_PRIVATE_KEY, разобранный ключ)
+_vapid_key: tuple[str, Any] | None = None
+# aud → (exp, заголовки Authorization)
+_vapid_headers: dict[str, tuple[int, dict]] = {}
+
+
+class PushBatchResult(NamedTuple):
+    """Итог рассылки пачки: доставлено по ``user_id`` и метрики пачки."""
+
+    delivered: dict[int, int]
+    stats: dict[str, float]
+
 
 def vapid_public_key() -> str:
     return (getattr(settings, "VAPID_PUBLIC_KEY", "") or "").strip()
@@ -36,23 +73,68 @@ def is_configured() -> bool:
     return bool(vapid_public_key() and _private_key_material())
 
 
-def send_web_push(
-    *,
-    subscription,
-    title: str,
-    body: str,
-    url: str = "",
-) -> bool:
-    private_key = _private_key_material()
-    if not vapid_public_key() or not private_key:
-        return False
+def _parse_vapid(material: str):
+    from pywebpush import Vapid
+
+    if "-----BEGIN" in material:
+        return Vapid.from_pem(material.encode())
+    return Vapid.from_string(material)
+
+
+def _vapid():
+    """Разобранный ключ VAPID (кэш до смены настройки) или ``None``."""
+    global _vapid_key
+    raw = (getattr(settings, "VAPID_PRIVATE_KEY", "") or "").strip()
+    cached = _vapid_key
+    if cached is not None and cached[0] == raw:
+        return cached[1]
+    if not vapid_public_key():
+        return None
+    material = _private_key_material()
+    if not material:
+        return None
     try:
-        from pywebpush import WebPushException, webpush
+        vapid = _parse_vapid(material)
     except ImportError:
         logger.warning("pywebpush не установлен")
-        return False
+        return None
+    except Exception:
+        logger.exception("Не удалось разобрать VAPID_PRIVATE_KEY")
+        return None
+    with _cache_lock:
+        _vapid_key = (raw, vapid)
+        _vapid_headers.clear()
+    return vapid
+
 
-    payload = json.dumps(
+def _audience(endpoint: str) -> str:
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def vapid_headers(vapid, audience: str) -> dict:
+    """Заголовок ``Authorization`` для push-сервиса (подпись из кэша)."""
+    now = int(time.time())
+    cached = _vapid_headers.get(audience)
+    if cached is not None and cached[0] - now > VAPID_JWT_REFRESH:
+        return cached[1]
+    exp = now + VAPID_JWT_TTL
+    headers = vapid.sign(
+        {
+            "sub": getattr(
+                settings, "VAPID_ADMIN_EMAIL", "mailto:admin@example.com"
+            ),
+            "aud": audience,
+            "exp": exp,
+        }
+    )
+    with _cache_lock:
+        _vapid_headers[audience] = (exp, headers)
+    return headers
+
+
+def _payload(title: str, body: str, url: str) -> str:
+    return json.dumps(
         {
             "title": title,
             "body": body,
@@ -60,37 +142,127 @@ def send_web_push(
         },
         ensure_ascii=False,
     )
+
+
+def _workers() -> int:
+    return max(1, int(getattr(settings, "NOTIFY_PUSH_WORKERS", 1) or 1))
+
+
+async def _push(session, subscription, payload: str, headers: dict) -> str:
+    """Один push без записи в БД: ``ok`` / ``gone`` / ``failed``."""
+    import aiohttp
+    from pywebpush import WebPusher
+
     try:
-        webpush(
-            subscription_info={
+        resp = await WebPusher(
+            {
                 "endpoint": subscription.endpoint,
                 "keys": {
                     "p256dh": subscription.p256dh,
                     "auth": subscription.auth,
                 },
             },
-            data=payload,
-            vapid_private_key=private_key,
-            vapid_claims={
-                "sub": getattr(
-                    settings, "VAPID_ADMIN_EMAIL", "mailto:admin@example.com"
-                )
-            },
-        )
-        subscription.last_success_at = timezone.now()
-        subscription.save(update_fields=["last_success_at"])
-        return True
-    except WebPushException as exc:
-        status = getattr(getattr(exc, "response", None), "status_code", None)
-        logger.warning(
-            "WebPush failed user=%s status=%s: %s",
-            subscription.user_id,
-            status,
-            exc,
+            aiohttp_session=session,
+        ).send_async(
+            payload,
+            dict(headers),
+            content_encoding="aes128gcm",
+            timeout=aiohttp.ClientTimeout(total=_PUSH_TIMEOUT),
         )
-        if status in (404, 410):
-            subscription.delete()
-        return False
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        logger.warning("WebPush failed user=%s: %r", subscription.user_id, exc)
+        return PUSH_FAILED
     except Exception:
         logger.exception("WebPush error user=%s", subscription.user_id)
-        return False
+        return PUSH_FAILED
+    if resp.status <= 202:
+        return PUSH_OK
+    logger.warning(
+        "WebPush failed user=%s status=%s",
+        subscription.user_id,
+        resp.status,
+    )
+    return PUSH_GONE if resp.status in (404, 410) else PUSH_FAILED
+
+
+async def _push_all(subscriptions, payload: str, vapid) -> list[str]:
+    import aiohttp
+
+    workers = _workers()
+    gate = asyncio.Semaphore(workers)
+    connector = aiohttp.TCPConnector(limit=workers)
+
+    async def one(subscription) -> str:
+        async with gate:
+            headers = vapid_headers(vapid, _audience(subscription.endpoint))
+            return await _push(session, subscription, payload, headers)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(one(sub) for sub in subscriptions))
+
+
+def send_web_push_many(
+    subscriptions,
+    *,
+    title: str,
+    body: str,
+    url: str = "",
+) -> PushBatchResult:
+    """
+    Разослать один push по многим подпискам.
+
+    Итоги пишутся двумя запросами: ``last_success_at`` для доставленных,
+    удаление подписок, на которые сервис ответил 404/410. Метрики пачки:
+    ``sent``, ``ok``, ``gone``, ``failed``, ``elapsed_ms``, ``per_sec``.
+    """
+    from notify.models import PushSubscription
+
+    subscriptions = list(subscriptions)
+    vapid = _vapid() if subscriptions else None
+    if vapid is None:
+        return PushBatchResult({}, {})
+
+    started = time.perf_counter()
+    results = asyncio.run(
+        _push_all(subscriptions, _payload(title, body, url), vapid)
+    )
+    elapsed = time.perf_counter() - started
+
+    delivered: dict[int, int] = {}
+    ok_ids, gone_ids = [], []
+    for sub, result in zip(subscriptions, results):
+        if result == PUSH_OK:
+            ok_ids.append(sub.pk)
+            delivered[sub.user_id] = delivered.get(sub.user_id, 0) + 1
+        elif result == PUSH_GONE:
+            gone_ids.append(sub.pk)
+    if ok_ids:
+        PushSubscription.objects.filter(pk__in=ok_ids).update(
+            last_success_at=timezone.now()
+        )
+    if gone_ids:
+        PushSubscription.objects.filter(pk__in=gone_ids).delete()
+
+    stats = {
+        "sent": len(results),
+        "ok": len(ok_ids),
+        "gone": len(gone_ids),
+        "failed": len(results) - len(ok_ids) - len(gone_ids),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "per_sec": round(len(results) / elapsed, 1) if elapsed else 0.0,
+    }
+    logger.info("WebPush пачка: %s", stats)
+    return PushBatchResult(delivered, stats)
+
+
+def send_web_push(
+    *,
+    subscription,
+    title: str,
+    body: str,
+    url: str = "",
+) -> bool:
+    result = send_web_push_many(
+        [subscription], title=title, body=body, url=url
+    )
+    return bool(result.delivered)
@@ -0,0 +1,233 @@
+"""
+Дневная активность пользователя (``UserDailyActivity``).
+
+Строка на (пользователь, локальная дата) с числом засчитанных действий:
+верные ответы (по ``created_at``), принятые решения кода (по
+``completed_at``), прочитанные теории (по ``read_at``). Новая засчитанная
+строка прогресса увеличивает счётчик дня; изменение «правильности» или
+удаление пересчитывает один день. Streak, календарь профиля и напоминания
+читают только эти строки. Заполнение по истории —
+``manage.py backfill_daily_activity``.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    CodeSubmission,
+    UserAnswerCheckBox,
+    UserAnswerRadio,
+    UserAnswerShort,
+    UserDailyActivity,
+    UserLessonTheoryRead,
+)
+
+# Модель строки прогресса → поле даты, по которому засчитывается действие.
+_DATE_FIELDS = {
+    UserAnswerRadio: "created_at",
+    UserAnswerCheckBox: "created_at",
+    UserAnswerShort: "created_at",
+    CodeSubmission: "completed_at",
+    UserLessonTheoryRead: "read_at",
+}
+
+
+def _counted_queryset(model):
+    """Строки модели, которые идут в активность."""
+    if model is UserLessonTheoryRead:
+        return model.objects.all()
+    if model is CodeSubmission:
+        return model.objects.filter(
+            status=CodeSubmission.STATUS_COMPLETED,
+            completed_at__isnull=False,
+        )
+    return model.objects.filter(is_correct=True)
+
+
+def _activity_day(instance) -> date | None:
+    value = getattr(instance, _DATE_FIELDS[type(instance)])
+    if value is None:
+        return None
+    return timezone.localdate(value)
+
+
+def count_activity_on(user_id: int, day: date) -> int:
+    """Число действий пользователя за день по исходным таблицам."""
+    total = 0
+    for model, field in _DATE_FIELDS.items():
+        total += (
+            _counted_queryset(model)
+            .filter(user_id=user_id, **{f"{field}__date": day})
+            .count()
+        )
+    return total
+
+
+def recompute_activity_day(user_id: int, day: date) -> int:
+    """Точный пересчёт одного дня; пустой день удаляется."""
+    count = count_activity_on(user_id, day)
+    if count:
+        UserDailyActivity.objects.update_or_create(
+            user_id=user_id, date=day, defaults={"count": count}
+        )
+    else:
+        UserDailyActivity.objects.filter(user_id=user_id, date=day).delete()
+    return count
+
+
+def bump_activity(user_id: int, day: date, delta: int = 1) -> None:
+    """Атомарно увеличить счётчик дня (создаёт строку при необходимости)."""
+    qs = UserDailyActivity.objects.filter(user_id=user_id, date=day)
+    if qs.update(count=F("count") + delta):
+        return
+    try:
+        with transaction.atomic():
+            UserDailyActivity.objects.create(
+                user_id=user_id, date=day, count=delta
+            )
+    except IntegrityError:
+        # Параллельная запись успела создать строку.
+        qs.update(count=F("count") + delta)
+
+
+def handle_activity_row_saved(instance, created: bool, update_fields) -> None:
+    """
+    ``post_save`` строки прогресса: новая засчитанная строка — +1 к дню;
+    изменение правильности / статуса — пересчёт дня.
+    """
+    from .summary import _TRACKED, _is_solved
+
+    _kind, _lesson_attr, correctness_fields = _TRACKED[type(instance)]
+    day = _activity_day(instance)
+    if day is None:
+        return
+    if created:
+        if _is_solved(instance):
+            bump_activity(instance.user_id, day)
+        return
+    watched = set(correctness_fields) | {_DATE_FIELDS[type(instance)]}
+    if update_fields is not None and not set(update_fields) & watched:
+        return
+    recompute_activity_day(instance.user_id, day)
+
+
+def handle_activity_row_deleted(instance) -> None:
+    day = _activity_day(instance)
+    if day is not None:
+        recompute_activity_day(instance.user_id, day)
+
+
+def rebuild_daily_activity(user_ids) -> int:
+    """
+    Полный пересчёт дневной активности для пачки пользователей.
+
+    Пять сгруппированных запросов (пользователь × день), затем замена
+    строк пачки. Возвращает число созданных строк.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return 0
+
+    counts: dict[tuple[int, date], int] = {}
+    for model, field in _DATE_FIELDS.items():
+        rows = (
+            _counted_queryset(model)
+            .filter(user_id__in=user_ids)
+            .annotate(day=TruncDate(field))
+            .values("user_id", "day")
+            .annotate(n=Count("pk"))
+            .order_by()
+        )
+        for row in rows:
+            key = (row["user_id"], row["day"])
+            counts[key] = counts.get(key, 0) + row["n"]
+
+    rows = [
+        UserDailyActivity(user_id=uid, date=day, count=n)
+        for (uid, day), n in counts.items()
+    ]
+    with transaction.atomic():
+        UserDailyActivity.objects.filter(user_id__in=user_ids).delete()
+        UserDailyActivity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def streak_from_dates(dates, today: date) -> int:
+    """Streak по датам активности (по убыванию, не позже ``today``)."""
+    dates = iter(dates)
+    first = next(dates, None)
+    if first is None:
+        return 0
+    if first == today:
+        cursor = today
+    elif first == today - timedelta(days=1):
+        cursor = first
+    else:
+        return 0
+
+    streak = 1
+    for day in dates:
+        if day != cursor - timedelta(days=1):
+            break
+        cursor = day
+        streak += 1
+    return streak
+
+
+# Окно дат для ``streaks_by_user``: длиннее серии дочитываются отдельно.
+STREAK_WINDOW_DAYS = 32
+# Размер пачки ``user_id IN (...)`` (лимит параметров SQLite).
+_USER_CHUNK = 900
+
+
+def streaks_by_user(user_ids, today: date | None = None) -> dict[int, int]:
+    """
+    Streak для набора пользователей сгруппированными запросами.
+
+    Читаются только строки за последние ``STREAK_WINDOW_DAYS`` дней; для
+    тех, чья серия упирается в начало окна, окно удваивается.
+    """
+    today = today or timezone.localdate()
+    pending = list(dict.fromkeys(user_ids))
+    result: dict[int, int] = {}
+    window = STREAK_WINDOW_DAYS
+    while pending:
+        since = today - timedelta(days=window - 1)
+        dates: dict[int, list[date]] = {uid: [] for uid in pending}
+        for start in range(0, len(pending), _USER_CHUNK):
+            rows = (
+                UserDailyActivity.objects.filter(
+                    user_id__in=pending[start : start + _USER_CHUNK],
+                    date__gte=since,
+                    date__lte=today,
+                    count__gt=0,
+                )
+                .order_by("user_id", "-date")
+                .values_list("user_id", "date")
+            )
+            for uid, day in rows.iterator(chunk_size=2000):
+                dates[uid].append(day)
+        pending = []
+        for uid, days in dates.items():
+            streak = streak_from_dates(days, today)
+            if streak and days[streak - 1] == since:
+                pending.append(uid)
+            else:
+                result[uid] = streak
+        window *= 2
+    return result
+
+
+def daily_activity_counts(user, start: date, end: date) -> dict[date, int]:
+    """``{дата: count}`` за период ``[start, end]`` (один запрос)."""
+    return dict(
+        UserDailyActivity.objects.filter(
+            user=user, date__gte=start, date__lte=end
+        ).values_list("date", "count")
+    )
@@ -0,0 +1,98 @@
+"""WebSocket consumer потока вердиктов проверки кода."""
+
+from __future__ import annotations
+
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+
+from . import submission_events
+
+
+class CodeSubmissionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ``ws/progress/code/?token=<JWT>[&since=<cursor>]`` — события
+    ``submission.updated`` по отправкам текущего пользователя.
+
+    Сначала ``connected`` (с курсором последнего вердикта), затем при
+    ``since`` — пропущенные вердикты и ``synced``. Подписка на группу
+    оформляется до чтения БД, поэтому вердикт, пришедший во время
+    догрузки, может прийти дважды — клиент сверяет по ``public_id``.
+    """
+
+    group_name = None
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if (
+            not user
+            or isinstance(user, AnonymousUser)
+            or not user.is_authenticated
+        ):
+            await self.close(code=4401)
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        raw_since = (query.get("since") or [None])[0]
+        since = None
+        if raw_since:
+            since = submission_events.decode_cursor(raw_since)
+            if since is None:
+                await self.close(code=4400)
+                return
+
+        self.group_name = submission_events.user_group(user.public_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        if since is None:
+            cursor = await database_sync_to_async(
+                submission_events.latest_cursor
+            )(user)
+            await self.send_json(
+                {"event": "connected", "payload": {"cursor": cursor}}
+            )
+            return
+
+        await self.send_json(
+            {"event": "connected", "payload": {"cursor": raw_since}}
+        )
+        events, has_more = await database_sync_to_async(
+            submission_events.missed_events
+        )(user, since, settings.CODE_SUBMISSION_WS_REPLAY_LIMIT)
+        for event in events:
+            await self.send_json(event)
+        await self.send_json(
+            {
+                "event": "synced",
+                "payload": {
+                    "cursor": (
+                        events[-1]["payload"]["cursor"]
+                        if events
+                        else raw_since
+                    ),
+                    "has_more": has_more,
+                },
+            }
+        )
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(
+                self.group_name, self.channel_name
+            )
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("event") == "ping":
+            await self.send_json({"event": "pong", "payload": {}})
+
+    async def submission_event(self, event):
+        await self.send_json(
+            {
+                "event": event.get("event"),
+                "payload": event.get("payload"),
+            }
+        )
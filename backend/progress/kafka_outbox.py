@@ -0,0 +1,133 @@
+"""
+Outbox отправок кода для Kafka: запись в транзакции отправки и relay.
+
+Быстрый путь — фоновая публикация сразу после commit
+(``progress.kafka_publisher``). ``relay_outbox`` (Celery beat) досылает
+строки, которые быстрый путь не подтвердил: брокер был недоступен,
+процесс перезапустился, очередь была полна. Доставка «хотя бы один раз»:
+повтор сообщения для воркера безопасен, вердикт по завершённой отправке
+не перезаписывается.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from progress.models import CodeSubmissionOutbox
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повтором: 5 с, 10 с, 20 с … но не больше 5 минут.
+_BACKOFF_BASE_SEC = 5
+_BACKOFF_MAX_SEC = 300
+# Строку, взятую relay, другие запуски не трогают это время.
+_RELAY_LEASE_SEC = 60
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = _BACKOFF_BASE_SEC * 2 ** max(0, attempts - 1)
+    return timedelta(seconds=min(seconds, _BACKOFF_MAX_SEC))
+
+
+def add_to_outbox(submission, payload: dict) -> CodeSubmissionOutbox:
+    """Строка outbox в текущей транзакции (вместе с отправкой)."""
+    return CodeSubmissionOutbox.objects.create(
+        submission=submission, payload=payload
+    )
+
+
+def mark_delivered(outbox_ids) -> None:
+    CodeSubmissionOutbox.objects.filter(pk__in=list(outbox_ids)).delete()
+
+
+def mark_failed(outbox_id: int, error: str) -> None:
+    row = (
+        CodeSubmissionOutbox.objects.filter(pk=outbox_id)
+        .only("attempts")
+        .first()
+    )
+    if row is None:
+        return
+    attempts = row.attempts + 1
+    CodeSubmissionOutbox.objects.filter(pk=outbox_id).update(
+        attempts=attempts,
+        last_error=(error or "")[:2000],
+        next_attempt_at=timezone.now() + _backoff(attempts),
+    )
+
+
+def _claim_batch(limit: int) -> list[CodeSubmissionOutbox]:
+    now = timezone.now()
+    grace = timedelta(seconds=settings.KAFKA_OUTBOX_RELAY_GRACE_SEC)
+    with transaction.atomic():
+        rows = list(
+            CodeSubmissionOutbox.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, created_at__lte=now - grace)
+            .order_by("id")[:limit]
+        )
+        if rows:
+            CodeSubmissionOutbox.objects.filter(
+                pk__in=[row.pk for row in rows]
+            ).update(next_attempt_at=now + timedelta(seconds=_RELAY_LEASE_SEC))
+    return rows
+
+
+def relay_outbox(limit: int | None = None) -> dict[str, int]:
+    """
+    Дослать неподтверждённые строки outbox одной пачкой: асинхронные
+    ``send``, один ``flush``, затем удаление подтверждённых.
+    """
+    from progress.kafka_publisher import (
+        get_kafka_producer,
+        send_code_submission,
+    )
+
+    if not settings.KAFKA_BOOTSTRAP_SERVERS:
+        return {"sent": 0, "failed": 0}
+    rows = _claim_batch(limit or settings.KAFKA_OUTBOX_BATCH_SIZE)
+    if not rows:
+        return {"sent": 0, "failed": 0}
+
+    failed: dict[int, str] = {}
+    futures = []
+    try:
+        producer = get_kafka_producer()
+        for row in rows:
+            try:
+                futures.append(
+                    (row, send_code_submission(producer, row.payload))
+                )
+            except Exception as e:
+                failed[row.pk] = repr(e)
+        producer.flush(timeout=settings.KAFKA_OUTBOX_FLUSH_TIMEOUT_SEC)
+    except Exception as e:
+        logger.warning("Kafka relay: брокер недоступен (%r).", e)
+        for row in rows:
+            failed.setdefault(row.pk, repr(e))
+        futures = []
+
+    delivered: list[int] = []
+    for row, future in futures:
+        if future.is_done and future.succeeded():
+            delivered.append(row.pk)
+        elif row.pk not in failed:
+            failed[row.pk] = (
+                repr(future.exception)
+                if future.is_done
+                else "нет подтверждения брокера"
+            )
+    mark_delivered(delivered)
+    for outbox_id, error in failed.items():
+        mark_failed(outbox_id, error)
+    if delivered or failed:
+        logger.info(
+            "Kafka relay: дослано %s, с ошибкой %s.",
+            len(delivered),
+            len(failed),
+        )
+    return {"sent": len(delivered), "failed": len(failed)}
@@ -2,19 +2,33 @@
 Публикация отправок кода в Kafka (kafka-python).
 
 При пустом ``KAFKA_BOOTSTRAP_SERVERS`` в настройках — не вызывается брокер.
+
+Поток запроса брокер не ждёт: после commit сообщение кладётся в
+ограниченную локальную очередь (``enqueue_code_submission``), фоновый
+поток отправляет его асинхронно (батчи, сжатие) и по подтверждению
+брокера удаляет строку ``CodeSubmissionOutbox``. Если очередь полна,
+процесс упал или брокер недоступен — строка остаётся в outbox и её
+дошлёт ``progress.kafka_outbox.relay_outbox``.
 """
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
+import queue
+import threading
 from typing import Any
 
 from django.conf import settings
+from django.db import close_old_connections
 
 logger = logging.getLogger(__name__)
 
 _producer: Any = None
+_producer_lock = threading.Lock()
+_publisher: "_BackgroundPublisher | None" = None
+_publisher_lock = threading.Lock()
 
 
 def _producer_kwargs() -> dict[str, Any]:
@@ -26,7 +40,13 @@ def _producer_kwargs() -> dict[str, Any]:
     return {
         "bootstrap_servers": hosts,
         "value_serializer": lambda v: json.dumps(v).encode("utf-8"),
-        "linger_ms": 50,
+        "key_serializer": lambda k: k.encode("utf-8") if k else None,
+        "acks": "all",
+        "linger_ms": settings.KAFKA_PRODUCER_LINGER_MS,
+        "batch_size": settings.KAFKA_PRODUCER_BATCH_BYTES,
+        "compression_type": settings.KAFKA_PRODUCER_COMPRESSION or None,
+        # Ждать метаданные брокера — только в фоновых потоках, не в запросе.
+        "max_block_ms": settings.KAFKA_PRODUCER_MAX_BLOCK_MS,
     }
 
 
@@ -35,51 +55,184 @@ def get_kafka_producer():
     global _producer
     if not settings.KAFKA_BOOTSTRAP_SERVERS:
         return None
-    if _producer is None:
-        from kafka import KafkaProducer
+    with _producer_lock:
+        if _producer is None:
+            from kafka import KafkaProducer
+
+            _producer = KafkaProducer(**_producer_kwargs())
+        return _producer
+
 
-        _producer = KafkaProducer(**_producer_kwargs())
-    return _producer
+def send_code_submission(producer, payload: dict):
+    """Асинхронная отправка; ключ — отправка (порядок в одной партиции)."""
+    return producer.send(
+        settings.KAFKA_TOPIC_CODE_SUBMISSIONS,
+        key=str(payload.get("submission_public_id") or ""),
+        value=payload,
+    )
 
 
-def publish_code_submission_to_kafka(payload: dict) -> None:
+class _BackgroundPublisher:
     """
-    Отправить JSON в топик. Сбои брокера только в лог — HTTP не падает.
+    Фоновый поток: забирает сообщения из ограниченной очереди, отправляет
+    без ожидания, а подтверждения / ошибки брокера (приходят из потока
+    kafka-python) применяет к outbox пачками.
+    """
+
+    def __init__(self, maxsize: int, start: bool = True) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._results: queue.SimpleQueue = queue.SimpleQueue()
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if start:
+            self._thread = threading.Thread(
+                target=self._run, name="kafka-code-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, outbox_id: int, payload: dict) -> bool:
+        try:
+            self._queue.put_nowait((outbox_id, payload))
+        except queue.Full:
+            return False
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._step(wait=0.2)
+        # Остановка: дослать очередь и дождаться подтверждений брокера.
+        self._step()
+        producer = _producer
+        if self._in_flight and producer is not None:
+            producer.flush(timeout=5)
+        self._step()
+
+    def _step(self, wait: float = 0.0) -> None:
+        try:
+            self.run_once(wait)
+        except Exception:
+            logger.exception("Kafka: сбой фоновой публикации отправок.")
+        finally:
+            close_old_connections()
+
+    def run_once(self, wait: float = 0.0) -> None:
+        """Отправить накопившиеся сообщения и записать результаты."""
+        batch: list[tuple[int, dict]] = []
+        if wait:
+            try:
+                batch.append(self._queue.get(timeout=wait))
+            except queue.Empty:
+                pass
+        while len(batch) < settings.KAFKA_OUTBOX_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._send(batch)
+        self.record_results()
+
+    def _send(self, batch: list[tuple[int, dict]]) -> None:
+        try:
+            producer = get_kafka_producer()
+        except Exception as e:
+            for outbox_id, _payload in batch:
+                self._results.put((outbox_id, repr(e)))
+            return
+        if producer is None:
+            return
+        for outbox_id, payload in batch:
+            try:
+                future = send_code_submission(producer, payload)
+            except Exception as e:
+                self._results.put((outbox_id, repr(e)))
+                continue
+            self._in_flight += 1
+            future.add_callback(self._on_delivered, outbox_id)
+            future.add_errback(self._on_failed, outbox_id)
+
+    def _on_delivered(self, outbox_id: int, _metadata) -> None:
+        self._results.put((outbox_id, None))
+
+    def _on_failed(self, outbox_id: int, exc) -> None:
+        self._results.put((outbox_id, repr(exc)))
+
+    def record_results(self) -> None:
+        from progress.kafka_outbox import mark_delivered, mark_failed
+
+        delivered: list[int] = []
+        failed: dict[int, str] = {}
+        while True:
+            try:
+                outbox_id, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight = max(0, self._in_flight - 1)
+            if error is None:
+                delivered.append(outbox_id)
+            else:
+                failed[outbox_id] = error
+        if delivered:
+            mark_delivered(delivered)
+        for outbox_id, error in failed.items():
+            logger.warning(
+                "Kafka: отправка из outbox %s не опубликована (%s), "
+                "дошлёт relay.",
+                outbox_id,
+                error,
+            )
+            mark_failed(outbox_id, error)
+
+
+def _get_publisher() -> _BackgroundPublisher:
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = _BackgroundPublisher(
+                settings.KAFKA_PUBLISH_QUEUE_SIZE
+            )
+        return _publisher
+
+
+def enqueue_code_submission(outbox_id: int, payload: dict) -> None:
+    """
+    Передать сообщение фоновой публикации (вызывается после commit).
+    Не блокируется: при переполненной очереди строка outbox просто ждёт
+    relay.
     """
     if not settings.KAFKA_BOOTSTRAP_SERVERS:
         return
-    producer = get_kafka_producer()
-    if producer is None:
-        return
-    topic = settings.KAFKA_TOPIC_CODE_SUBMISSIONS
-    try:
-        future = producer.send(topic, value=payload)
-        future.get(timeout=10)
-    except Exception:
-        logger.exception(
-            "Не удалось опубликовать отправку в Kafka (submission_public_id=%s, "
-            "топик=%s).",
-            payload.get("submission_public_id"),
-            topic,
-        )
-    else:
-        logger.info(
-            "Сообщение об отправке кода отправлено в Kafka: "
-            "submission_public_id=%s, топик=%s.",
+    if not _get_publisher().submit(outbox_id, payload):
+        logger.warning(
+            "Kafka: очередь публикации заполнена, отправка %s уйдёт через "
+            "relay outbox.",
             payload.get("submission_public_id"),
-            topic,
         )
 
 
 def reset_kafka_producer() -> None:
-    """Закрыть producer (тесты / смена настроек)."""
-    global _producer
-    if _producer is not None:
+    """Остановить фоновую публикацию и закрыть producer (тесты / смена настроек)."""
+    global _producer, _publisher
+    with _publisher_lock:
+        publisher, _publisher = _publisher, None
+    if publisher is not None:
+        publisher.stop()
+    with _producer_lock:
+        producer, _producer = _producer, None
+    if producer is not None:
         try:
-            _producer.close()
+            producer.close()
         except Exception:
             logger.debug(
                 "Не удалось корректно закрыть Kafka producer.",
                 exc_info=True,
             )
-        _producer = None
+
+
+atexit.register(reset_kafka_producer)
@@ -8,16 +8,30 @@
 
 from __future__ import annotations
 
+from collections import Counter
 import json
 import logging
+import time
 from typing import Any
 import uuid
 
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 _MAX_FEEDBACK_STORE = 8000
+# Поля вердикта, которые пачка записывает одним ``bulk_update``.
+_RESULT_FIELDS = (
+    "status",
+    "tests_passed",
+    "total_tests",
+    "error_message",
+    "test_results",
+    "completed_at",
+    "verdict_at",
+)
 
 
 def _feedback_rows_from_kafka(payload: dict[str, Any]) -> dict[str, Any]:
@@ -41,36 +55,10 @@ def _feedback_rows_from_kafka(payload: dict[str, Any]) -> dict[str, Any]:
     return out
 
 
-def apply_code_submission_result_payload(
-    payload: dict[str, Any],
-) -> tuple[bool, str]:
-    """
-    Обновить отправку по сообщению из топика результатов.
-
-    Вердикт ``accepted`` из воркера отображается в модели как ``completed``
-    (успешное завершение проверки).
-
-    Returns:
-        (успех, причина пропуска или ошибки на русском — для логов и отладки)
-    """
+def _set_verdict(sub, payload: dict[str, Any]) -> None:
+    """Поля вердикта воркера → поля отправки (без записи в БД)."""
     from progress.models import CodeSubmission
 
-    raw_id = payload.get("submission_public_id")
-    if not raw_id:
-        return False, "нет поля submission_public_id"
-    try:
-        uid = uuid.UUID(str(raw_id))
-    except (ValueError, TypeError):
-        return False, f"некорректный submission_public_id: {raw_id!r}"
-
-    try:
-        sub = CodeSubmission.objects.get(public_id=uid)
-    except CodeSubmission.DoesNotExist:
-        return False, f"отправка не найдена: {uid}"
-
-    if sub.status == CodeSubmission.STATUS_COMPLETED:
-        return True, "уже завершена"
-
     verdict = (payload.get("status") or "").strip().lower()
     if verdict == "accepted":
         django_status = CodeSubmission.STATUS_COMPLETED
@@ -86,6 +74,7 @@ def apply_code_submission_result_payload(
         total = 0
 
     sub.status = django_status
+    sub.verdict_at = timezone.now()
     sub.tests_passed = passed
     sub.total_tests = total
     if django_status == "error":
@@ -94,26 +83,188 @@ def apply_code_submission_result_payload(
     else:
         sub.error_message = ""
         sub.test_results = {}
+        if not sub.completed_at:
+            sub.completed_at = timezone.now()
+
+
+def apply_verdict_to_submission(sub, payload: dict[str, Any]) -> None:
+    """
+    Записать вердикт проверки (формат сообщения воркера) в отправку и
+    учесть её в попытке КР.
+    """
+    _set_verdict(sub, payload)
     sub.save()
     if sub.exam_attempt_id:
         from exams.services import record_coding_submission
 
         record_coding_submission(sub.exam_attempt, sub)
-    logger.info(
-        "Отправка кода %s: из Kafka verdict=%r → статус Django=%s, "
-        "тесты %s/%s, сообщение=%r",
-        uid,
-        verdict,
-        django_status,
-        passed,
-        total,
-        (message or "")[:500],
+
+
+def _parse_public_id(payload: dict[str, Any]) -> tuple[uuid.UUID | None, str]:
+    raw_id = payload.get("submission_public_id")
+    if not raw_id:
+        return None, "нет поля submission_public_id"
+    try:
+        return uuid.UUID(str(raw_id)), ""
+    except (ValueError, TypeError):
+        return None, f"некорректный submission_public_id: {raw_id!r}"
+
+
+def _record_exam_attempts(subs) -> None:
+    """Шаги КР: одна группа (и одна проверка истечения) на попытку."""
+    from exams.services import ExamAccessError, record_coding_submissions
+
+    by_attempt: dict[int, list] = {}
+    for sub in subs:
+        if sub.exam_attempt_id:
+            by_attempt.setdefault(sub.exam_attempt_id, []).append(sub)
+    for group in by_attempt.values():
+        attempt = group[0].exam_attempt
+        try:
+            with transaction.atomic():
+                record_coding_submissions(attempt, group)
+        except ExamAccessError as e:
+            logger.warning(
+                "Результаты Kafka: попытка КР %s не обновлена (%s), "
+                "отправки %s.",
+                attempt.public_id,
+                e.code,
+                [str(sub.public_id) for sub in group],
+            )
+
+
+def _apply_progress_side_effects(subs) -> None:
+    """
+    Сводка прогресса и дневная активность: ``bulk_update`` не вызывает
+    ``post_save``, поэтому принятые решения учитываются здесь явно.
+    """
+    from progress.activity import bump_activity
+    from progress.models import CodeSubmission
+    from progress.summary import KIND_CODING, apply_progress_changes
+
+    solved = [s for s in subs if s.status == CodeSubmission.STATUS_COMPLETED]
+    if not solved:
+        return
+    apply_progress_changes(
+        KIND_CODING, [(sub.user_id, sub.challenge) for sub in solved]
+    )
+    days = Counter(
+        (sub.user_id, timezone.localdate(sub.completed_at)) for sub in solved
     )
-    return True, ""
+    for (user_id, day), delta in days.items():
+        bump_activity(user_id, day, delta)
+
+
+def apply_code_submission_results_batch(
+    payloads: list[dict[str, Any]],
+) -> list[tuple[bool, str]]:
+    """
+    Применить пачку сообщений из топика результатов.
+
+    Отправки загружаются одним запросом ``public_id__in``, вердикты
+    записываются одним ``bulk_update`` в общей транзакции вместе со
+    сводкой, активностью и шагами КР (сгруппированными по попытке).
+    Сообщения применяются в порядке пачки: повтор по уже завершённой
+    отправке пропускается, как и при поштучной обработке.
+
+    Returns:
+        ``(успех, причина)`` для каждого сообщения в порядке ``payloads``.
+    """
+    from progress.models import CodeSubmission
+    from progress.submission_events import broadcast_submission_updates
+    from progress.verdict_cache import remember_verdict
+
+    results: list[tuple[bool, str]] = []
+    parsed: list[uuid.UUID | None] = []
+    for payload in payloads:
+        uid, reason = _parse_public_id(payload)
+        parsed.append(uid)
+        results.append((False, reason))
+
+    wanted = {uid for uid in parsed if uid is not None}
+    subs = {
+        sub.public_id: sub
+        for sub in CodeSubmission.objects.filter(
+            public_id__in=wanted
+        ).select_related("challenge", "exam_attempt__exam", "user")
+    }
+
+    changed: dict[int, Any] = {}
+    applied: list[tuple[Any, dict[str, Any]]] = []
+    for i, (uid, payload) in enumerate(zip(parsed, payloads)):
+        if uid is None:
+            continue
+        sub = subs.get(uid)
+        if sub is None:
+            results[i] = (False, f"отправка не найдена: {uid}")
+            continue
+        if sub.status == CodeSubmission.STATUS_COMPLETED:
+            results[i] = (True, "уже завершена")
+            continue
+        _set_verdict(sub, payload)
+        changed[sub.pk] = sub
+        applied.append((sub, payload))
+        results[i] = (True, "")
+
+    if not changed:
+        return results
+
+    with transaction.atomic():
+        CodeSubmission.objects.bulk_update(
+            list(changed.values()), _RESULT_FIELDS
+        )
+        _apply_progress_side_effects(list(changed.values()))
+        _record_exam_attempts(list(changed.values()))
+        updated = list(changed.values())
+        transaction.on_commit(lambda: broadcast_submission_updates(updated))
+
+    for sub, payload in applied:
+        logger.info(
+            "Отправка кода %s: из Kafka verdict=%r → статус Django=%s, "
+            "тесты %s/%s, сообщение=%r",
+            sub.public_id,
+            payload.get("status"),
+            sub.status,
+            sub.tests_passed,
+            sub.total_tests,
+            (payload.get("message") or "")[:500],
+        )
+        remember_verdict(sub, payload)
+    return results
+
+
+def apply_code_submission_result_payload(
+    payload: dict[str, Any],
+) -> tuple[bool, str]:
+    """
+    Обновить отправку по сообщению из топика результатов.
+
+    Вердикт ``accepted`` из воркера отображается в модели как ``completed``
+    (успешное завершение проверки).
+
+    Returns:
+        (успех, причина пропуска или ошибки на русском — для логов и отладки)
+    """
+    return apply_code_submission_results_batch([payload])[0]
+
+
+def _rewind(consumer, batch) -> None:
+    """Вернуть позиции партиций к началу несохранённой пачки."""
+    for tp, records in batch.items():
+        if records:
+            consumer.seek(tp, records[0].offset)
 
 
 def run_results_consumer_forever() -> None:
-    """Блокирующий цикл ``KafkaConsumer`` (для management-команды / отдельного процесса)."""
+    """
+    Блокирующий цикл ``KafkaConsumer`` (для management-команды / отдельного
+    процесса).
+
+    Сообщения читаются пачками до ``KAFKA_RESULTS_BATCH_SIZE``; offset
+    фиксируется вручную только после commit транзакции БД. Если пачку
+    записать не удалось, позиции откатываются к её началу и пачка
+    читается снова после паузы.
+    """
     if not settings.KAFKA_BOOTSTRAP_SERVERS:
         raise RuntimeError(
             "KAFKA_BOOTSTRAP_SERVERS пуст — consumer результатов не запускается."
@@ -129,26 +280,31 @@ def run_results_consumer_forever() -> None:
     topic = settings.KAFKA_TOPIC_CODE_RESULTS
     group = settings.KAFKA_GROUP_CODE_RESULTS
     offset_reset = settings.KAFKA_RESULTS_AUTO_OFFSET_RESET
+    batch_size = max(1, settings.KAFKA_RESULTS_BATCH_SIZE)
 
     consumer = KafkaConsumer(
         topic,
         bootstrap_servers=hosts,
         group_id=group,
-        enable_auto_commit=True,
+        enable_auto_commit=False,
         auto_offset_reset=offset_reset,
+        max_poll_records=batch_size,
         value_deserializer=lambda b: json.loads(b.decode("utf-8")),
         consumer_timeout_ms=1000,
     )
     logger.info(
-        "Запущен consumer результатов Kafka: топик=%s, группа=%s",
+        "Запущен consumer результатов Kafka: топик=%s, группа=%s, "
+        "пачка до %s сообщений",
         topic,
         group,
+        batch_size,
     )
     try:
         while True:
-            batch = consumer.poll(timeout_ms=1000)
+            batch = consumer.poll(timeout_ms=1000, max_records=batch_size)
             if not batch:
                 continue
+            payloads: list[dict[str, Any]] = []
             for _tp, records in batch.items():
                 for record in records:
                     value = record.value
@@ -158,14 +314,38 @@ def run_results_consumer_forever() -> None:
                             type(value),
                         )
                         continue
-                    ok, reason = apply_code_submission_result_payload(value)
-                    if not ok:
-                        logger.warning(
-                            "Результаты Kafka: сообщение пропущено (%s), "
-                            "тело=%s",
-                            reason,
-                            value,
-                        )
+                    payloads.append(value)
+            try:
+                results = apply_code_submission_results_batch(payloads)
+            except Exception:
+                logger.exception(
+                    "Результаты Kafka: пачка из %s сообщений не записана, "
+                    "повтор через %s с.",
+                    len(payloads),
+                    settings.KAFKA_RESULTS_RETRY_BACKOFF_SEC,
+                )
+                _rewind(consumer, batch)
+                time.sleep(settings.KAFKA_RESULTS_RETRY_BACKOFF_SEC)
+                continue
+            finally:
+                close_old_connections()
+            for value, (ok, reason) in zip(payloads, results):
+                if not ok:
+                    logger.warning(
+                        "Результаты Kafka: сообщение пропущено (%s), "
+                        "тело=%s",
+                        reason,
+                        value,
+                    )
+            try:
+                consumer.commit()
+            except Exception:
+                # Пачка уже в БД; при повторной доставке завершённые
+                # отправки пропускаются.
+                logger.warning(
+                    "Результаты Kafka: не удалось зафиксировать offset.",
+                    exc_info=True,
+                )
     finally:
         consumer.close()
         logger.info("Consumer результатов Kafka остановлен.")
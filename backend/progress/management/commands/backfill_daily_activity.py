@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from progress.activity import rebuild_daily_activity
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет UserDailyActivity по истории ответов, отправок кода и "
+        "прочтений теории. Строки пачки пользователей пересоздаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Пользователей в одной пачке (по умолчанию 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        user_ids = list(
+            get_user_model()
+            .objects.order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        done = 0
+        rows = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            rows += rebuild_daily_activity(batch)
+            done += len(batch)
+            self.stdout.write(f"  {done}/{len(user_ids)}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово: пользователей — {done}, дневных строк — {rows}."
+            )
+        )
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from progress.models import UserProgressSummary
+from progress.summary import rebuild_progress_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает UserProgressSummary (решено / прочитано / завершено "
+        "курсов) пачками. Без флагов — для всех пользователей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Пользователей в одной пачке (по умолчанию 500).",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Только пользователи без сводки (дозаполнение).",
+        )
+        parser.add_argument(
+            "--stale-only",
+            action="store_true",
+            help="Только сводки с устаревшим списком завершённых курсов.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        users = get_user_model().objects.order_by("pk")
+        if options["missing_only"]:
+            users = users.filter(progress_summary__isnull=True)
+        if options["stale_only"]:
+            users = users.filter(
+                pk__in=UserProgressSummary.objects.exclude(
+                    stale_course_ids=[]
+                ).values("user_id")
+            )
+        user_ids = list(users.values_list("pk", flat=True))
+
+        done = 0
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            with transaction.atomic():
+                rebuild_progress_summaries(batch)
+            done += len(batch)
+            self.stdout.write(f"  {done}/{len(user_ids)}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово: пересчитано сводок — {done}.")
+        )
@@ -0,0 +1,95 @@
+# Generated by Django 4.2 on 2026-10-18 21:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("progress", "0014_promo_and_certificates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserProgressSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "coding_solved",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Решено задач с кодом"
+                    ),
+                ),
+                (
+                    "radio_solved",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Решено radio-вопросов"
+                    ),
+                ),
+                (
+                    "checkbox_solved",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Решено checkbox-вопросов"
+                    ),
+                ),
+                (
+                    "short_answer_solved",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Решено кратких вопросов"
+                    ),
+                ),
+                (
+                    "theories_read",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Прочитано теорий"
+                    ),
+                ),
+                (
+                    "completed_course_ids",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        verbose_name="Завершённые курсы (id)",
+                    ),
+                ),
+                (
+                    "courses_stale",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Структура курсов изменилась — список завершённых курсов будет пересчитан при следующем чтении",
+                        verbose_name="Завершённые курсы устарели",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Обновлено"
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="progress_summary",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка прогресса",
+                "verbose_name_plural": "Сводки прогресса",
+            },
+        ),
+    ]
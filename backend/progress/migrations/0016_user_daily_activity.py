@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-18 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("progress", "0015_user_progress_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDailyActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Действий за день"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_activity",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Активность за день",
+                "verbose_name_plural": "Активность по дням",
+                "ordering": ("user", "-date"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="userdailyactivity",
+            index=models.Index(
+                fields=["date", "user"], name="progress_us_date_015539_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="userdailyactivity",
+            unique_together={("user", "date")},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0016_user_daily_activity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="codesubmission",
+            name="verdict_cache_key",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="Ключ кэша вердикта",
+            ),
+        ),
+    ]
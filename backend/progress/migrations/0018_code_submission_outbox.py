@@ -0,0 +1,76 @@
+# Generated by Django 4.2 on 2026-10-18 21:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0017_code_submission_verdict_cache_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodeSubmissionOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("payload", models.JSONField(verbose_name="Сообщение")),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Неудачных попыток"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, verbose_name="Последняя ошибка"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Создано"
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Следующая попытка",
+                    ),
+                ),
+                (
+                    "submission",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="kafka_outbox",
+                        to="progress.codesubmission",
+                        verbose_name="Отправка решения",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Исходящее сообщение Kafka",
+                "verbose_name_plural": "Исходящие сообщения Kafka",
+                "ordering": ("id",),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="codesubmissionoutbox",
+            index=models.Index(
+                fields=["next_attempt_at"],
+                name="progress_co_next_at_7b2a7e_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 22:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0018_code_submission_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="codesubmission",
+            name="verdict_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Время вердикта",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="codesubmission",
+            index=models.Index(
+                fields=["user", "verdict_at"],
+                name="progress_co_user_id_680aea_idx",
+            ),
+        ),
+    ]
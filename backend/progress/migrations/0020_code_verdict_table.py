@@ -0,0 +1,57 @@
+# Generated by Django 4.2 on 2026-10-19 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0019_code_submission_verdict_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodeVerdict",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="Ключ"
+                    ),
+                ),
+                ("verdict", models.JSONField(verbose_name="Вердикт")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Создано"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        db_index=True, verbose_name="Истекает"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Вердикт проверки кода",
+                "verbose_name_plural": "Вердикты проверки кода",
+            },
+        ),
+        migrations.AddField(
+            model_name="codesubmission",
+            name="verdict_from_cache",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="Вердикт из кэша"
+            ),
+        ),
+    ]
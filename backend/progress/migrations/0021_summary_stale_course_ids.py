@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-19 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0020_code_verdict_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprogresssummary",
+            name="stale_course_ids",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Структура этих курсов изменилась — их завершённость будет пересчитана при следующем чтении",
+                verbose_name="Курсы к пересчёту (id)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="userprogresssummary",
+            name="courses_stale",
+            field=models.BooleanField(
+                default=False,
+                help_text="Список завершённых курсов будет полностью пересчитан при следующем чтении",
+                verbose_name="Завершённые курсы устарели",
+            ),
+        ),
+    ]
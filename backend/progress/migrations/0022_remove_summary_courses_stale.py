@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-19 02:11
+
+from django.db import migrations
+
+
+def drop_stale_summaries(apps, schema_editor):
+    # Сводки с флагом полного пересчёта удаляются — они строятся заново
+    # при следующем чтении.
+    UserProgressSummary = apps.get_model("progress", "UserProgressSummary")
+    UserProgressSummary.objects.filter(courses_stale=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("progress", "0021_summary_stale_course_ids"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_stale_summaries, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="userprogresssummary",
+            name="courses_stale",
+        ),
+    ]
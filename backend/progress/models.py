@@ -302,6 +302,27 @@ class CodeSubmission(UUIDPublicIdMixin, models.Model):
         related_name="code_submissions",
         verbose_name=_("Попытка КР"),
     )
+    # Ключ кэша вердиктов (progress.verdict_cache): хэш кода, тестов и
+    # лимитов на момент отправки.
+    verdict_cache_key = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name=_("Ключ кэша вердикта"),
+    )
+    verdict_from_cache = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Вердикт из кэша"),
+    )
+    # Момент записи вердикта (любого) — курсор потока
+    # ``submission.updated`` (progress.submission_events).
+    verdict_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_("Время вердикта"),
+    )
 
     class Meta:
         verbose_name = _("Отправка решения")
@@ -311,6 +332,7 @@ class CodeSubmission(UUIDPublicIdMixin, models.Model):
             models.Index(fields=["user", "challenge", "-submitted_at"]),
             models.Index(fields=["challenge", "status", "-submitted_at"]),
             models.Index(fields=["user", "status"]),
+            models.Index(fields=["user", "verdict_at"]),
         ]
 
     def __str__(self):
@@ -332,6 +354,72 @@ class CodeSubmission(UUIDPublicIdMixin, models.Model):
         return 0
 
 
+class CodeSubmissionOutbox(models.Model):
+    """
+    Сообщение о новой отправке кода для Kafka (transactional outbox).
+
+    Строка создаётся в одной транзакции с ``CodeSubmission`` и удаляется,
+    когда брокер подтвердил запись; неподтверждённые строки дошлёт
+    ``progress.kafka_outbox.relay_outbox``.
+    """
+
+    submission = models.OneToOneField(
+        CodeSubmission,
+        on_delete=models.CASCADE,
+        related_name="kafka_outbox",
+        verbose_name=_("Отправка решения"),
+    )
+    payload = models.JSONField(verbose_name=_("Сообщение"))
+    attempts = models.PositiveIntegerField(
+        default=0, verbose_name=_("Неудачных попыток")
+    )
+    last_error = models.TextField(
+        blank=True, verbose_name=_("Последняя ошибка")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("Создано")
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Следующая попытка")
+    )
+
+    class Meta:
+        verbose_name = _("Исходящее сообщение Kafka")
+        verbose_name_plural = _("Исходящие сообщения Kafka")
+        ordering = ("id",)
+        indexes = [
+            models.Index(fields=["next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"outbox {self.submission_id} (попыток: {self.attempts})"
+
+
+class CodeVerdict(models.Model):
+    """
+    Кэш вердиктов проверки кода (``progress.verdict_cache``).
+
+    Хранится в БД: вердикт записывает процесс консьюмера результатов Kafka,
+    а читает веб-процесс при создании отправки.
+    """
+
+    key = models.CharField(max_length=64, unique=True, verbose_name=_("Ключ"))
+    verdict = models.JSONField(verbose_name=_("Вердикт"))
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("Создано")
+    )
+    expires_at = models.DateTimeField(
+        db_index=True, verbose_name=_("Истекает")
+    )
+
+    class Meta:
+        verbose_name = _("Вердикт проверки кода")
+        verbose_name_plural = _("Вердикты проверки кода")
+
+    def __str__(self):
+        return f"{self.key[:12]}: {self.verdict.get('status')}"
+
+
 class UserLessonTheoryRead(UUIDPublicIdMixin, models.Model):
     """Фиксация факта, что пользователь открыл (прочитал) теорию."""
 
@@ -367,6 +455,101 @@ class UserLessonTheoryRead(UUIDPublicIdMixin, models.Model):
         return f"{self.user} - {self.lesson.title}"
 
 
+class UserProgressSummary(models.Model):
+    """
+    Материализованная сводка прогресса пользователя.
+
+    Счётчики обновляются сигналами при записи ответов / отправок
+    (см. ``progress.summary``); профиль, достижения и VK-бот читают одну
+    строку вместо DISTINCT-подсчётов по всей истории.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="progress_summary",
+        verbose_name=_("Пользователь"),
+    )
+    coding_solved = models.PositiveIntegerField(
+        default=0, verbose_name=_("Решено задач с кодом")
+    )
+    radio_solved = models.PositiveIntegerField(
+        default=0, verbose_name=_("Решено radio-вопросов")
+    )
+    checkbox_solved = models.PositiveIntegerField(
+        default=0, verbose_name=_("Решено checkbox-вопросов")
+    )
+    short_answer_solved = models.PositiveIntegerField(
+        default=0, verbose_name=_("Решено кратких вопросов")
+    )
+    theories_read = models.PositiveIntegerField(
+        default=0, verbose_name=_("Прочитано теорий")
+    )
+    completed_course_ids = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Завершённые курсы (id)"),
+    )
+    stale_course_ids = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name=_("Курсы к пересчёту (id)"),
+        help_text=_(
+            "Структура этих курсов изменилась — их завершённость будет "
+            "пересчитана при следующем чтении"
+        ),
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Обновлено"),
+    )
+
+    class Meta:
+        verbose_name = _("Сводка прогресса")
+        verbose_name_plural = _("Сводки прогресса")
+
+    def __str__(self):
+        return f"{self.user} — сводка прогресса"
+
+    @property
+    def courses_completed(self) -> int:
+        return len(self.completed_course_ids or [])
+
+
+class UserDailyActivity(models.Model):
+    """
+    Активность пользователя за день (локальная дата).
+
+    ``count`` — число засчитанных действий: верные ответы, принятые
+    решения кода, прочитанные теории. Обновляется при записи строк
+    прогресса (см. ``progress.activity``); streak, календарь профиля и
+    напоминания читают несколько строк вместо всей истории.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="daily_activity",
+        verbose_name=_("Пользователь"),
+    )
+    date = models.DateField(verbose_name=_("Дата"))
+    count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Действий за день")
+    )
+
+    class Meta:
+        verbose_name = _("Активность за день")
+        verbose_name_plural = _("Активность по дням")
+        ordering = ("user", "-date")
+        unique_together = ("user", "date")
+        indexes = [
+            models.Index(fields=["date", "user"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.date}: {self.count}"
+
+
 class Achievement(UUIDPublicIdMixin, models.Model):
     """Шаблон достижения (порог по типу активности)."""
 
@@ -0,0 +1,9 @@
+from django.urls import re_path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(
+        r"^ws/progress/code/$", consumers.CodeSubmissionConsumer.as_asgi()
+    ),
+]
@@ -340,6 +340,15 @@ class CodeSubmissionSerializer(serializers.ModelSerializer):
         return v if isinstance(v, str) else str(v)
 
 
+class CodeSubmissionEventSerializer(CodeSubmissionSerializer):
+    """Отправка в событии ``submission.updated`` (WebSocket) — без кода."""
+
+    class Meta(CodeSubmissionSerializer.Meta):
+        fields = tuple(
+            f for f in CodeSubmissionSerializer.Meta.fields if f != "code"
+        )
+
+
 class CodeSubmissionCreateSerializer(serializers.ModelSerializer):
     """
     Тело запроса при отправке кода: активная задача по public_id и текст решения.
@@ -2,12 +2,15 @@ import logging
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from content.lesson_manifest import course_structure_changed
+from progress.kafka_outbox import add_to_outbox
 from progress.kafka_payloads import build_code_submission_kafka_payload
-from progress.kafka_publisher import publish_code_submission_to_kafka
+from progress.kafka_publisher import enqueue_code_submission
 from progress.models import CodeSubmission
+from progress.verdict_cache import complete_from_cache
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +18,10 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=CodeSubmission)
 def enqueue_new_code_submission_to_kafka(sender, instance, created, **kwargs):
     """
-    После успешного commit новой отправки — сообщение в топик для воркера
-    проверки кода.
+    Новая отправка — строка outbox в той же транзакции, после commit —
+    фоновая публикация в топик воркера проверки кода. Если вердикт для
+    того же кода и тестов уже есть в кэше (``progress.verdict_cache``),
+    отправка завершается сразу.
     """
     if not created:
         return
@@ -32,10 +37,79 @@ def enqueue_new_code_submission_to_kafka(sender, instance, created, **kwargs):
         )
         return
 
+    if complete_from_cache(instance, payload):
+        return
+
+    outbox = add_to_outbox(instance, payload)
     transaction.on_commit(
-        lambda p=payload: publish_code_submission_to_kafka(p)
+        lambda pk=outbox.pk, p=payload: enqueue_code_submission(pk, p)
     )
     logger.info(
         "Kafka: отправка %s будет опубликована после commit транзакции.",
         instance.public_id,
     )
+
+
+def _on_progress_row_saved(sender, instance, created, update_fields, **kwargs):
+    from progress.activity import handle_activity_row_saved
+    from progress.summary import handle_progress_row_saved
+
+    if created and getattr(instance, "_progress_counted", False):
+        # Вердикт из кэша уже учтён (progress.verdict_cache).
+        return
+
+    handle_progress_row_saved(instance, created, update_fields)
+    handle_activity_row_saved(instance, created, update_fields)
+
+
+def _on_progress_row_deleted(sender, instance, **kwargs):
+    from progress.activity import handle_activity_row_deleted
+    from progress.summary import handle_progress_row_deleted
+
+    handle_progress_row_deleted(instance)
+    handle_activity_row_deleted(instance)
+
+
+def _enqueue_stale_courses(course_ids: list[int]) -> None:
+    from progress.tasks import mark_completed_courses_stale
+
+    try:
+        mark_completed_courses_stale.delay(course_ids)
+    except Exception:
+        logger.exception(
+            "Не удалось поставить пометку сводок прогресса в очередь "
+            "(курсы %s)",
+            course_ids,
+        )
+
+
+def _on_course_structure_changed(sender, course_ids, **kwargs):
+    """
+    Сводки учеников помечаются в Celery после коммита: у популярного курса
+    их тысячи, а правка курса идёт в запросе редактора.
+    """
+    ids = sorted(course_ids)
+    transaction.on_commit(lambda: _enqueue_stale_courses(ids))
+
+
+def _connect_progress_summary_signals():
+    from progress.summary import TRACKED_MODELS
+
+    for model in TRACKED_MODELS:
+        post_save.connect(
+            _on_progress_row_saved,
+            sender=model,
+            dispatch_uid=f"progress_summary_save_{model._meta.label}",
+        )
+        post_delete.connect(
+            _on_progress_row_deleted,
+            sender=model,
+            dispatch_uid=f"progress_summary_delete_{model._meta.label}",
+        )
+    course_structure_changed.connect(
+        _on_course_structure_changed,
+        dispatch_uid="progress_summary_course_structure",
+    )
+
+
+_connect_progress_summary_signals()
@@ -4,18 +4,13 @@ from __future__ import annotations
 
 from datetime import timedelta
 
-from django.db.models import Q
+from django.db.models import Count
 from django.utils import timezone
 
-from content.models import (
-    CodingChallenge,
-    Course,
-    LessonCheckBoxQuestion,
-    LessonRadioQuestion,
-    LessonShortAnswer,
-    LessonTheory,
-)
+from content.lesson_manifest import get_course_manifest
+from content.models import Course
 
+from .activity import daily_activity_counts, streaks_by_user
 from .models import (
     CodeSubmission,
     UserAnswerCheckBox,
@@ -25,281 +20,109 @@ from .models import (
 )
 
 
-def _distinct_coding_solved(user) -> int:
-    return (
-        CodeSubmission.objects.filter(
-            user=user,
-            status=CodeSubmission.STATUS_COMPLETED,
-        )
-        .values("challenge_id")
-        .distinct()
-        .count()
-    )
-
-
-def _distinct_radio_solved(user) -> int:
-    return (
-        UserAnswerRadio.objects.filter(user=user, is_correct=True)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-
-
-def _distinct_checkbox_solved(user) -> int:
-    return (
-        UserAnswerCheckBox.objects.filter(user=user, is_correct=True)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-
-
-def _distinct_short_answer_solved(user) -> int:
-    return (
-        UserAnswerShort.objects.filter(user=user, is_correct=True)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-
-
-def _theories_read(user) -> int:
-    return UserLessonTheoryRead.objects.filter(user=user).count()
-
-
-def _activity_dates(user) -> set:
-    dates: set = set()
-    for row in UserAnswerRadio.objects.filter(
-        user=user, is_correct=True
-    ).dates("created_at", "day"):
-        dates.add(row)
-    for row in UserAnswerCheckBox.objects.filter(
-        user=user, is_correct=True
-    ).dates("created_at", "day"):
-        dates.add(row)
-    for row in UserAnswerShort.objects.filter(
-        user=user, is_correct=True
-    ).dates("created_at", "day"):
-        dates.add(row)
-    for row in CodeSubmission.objects.filter(
-        user=user,
-        status=CodeSubmission.STATUS_COMPLETED,
-        completed_at__isnull=False,
-    ).dates("completed_at", "day"):
-        dates.add(row)
-    for row in UserLessonTheoryRead.objects.filter(user=user).dates(
-        "read_at", "day"
-    ):
-        dates.add(row)
-    return dates
-
-
 def compute_streak_days(user) -> int:
-    dates = _activity_dates(user)
-    if not dates:
-        return 0
+    """Дней подряд с активностью (по ``UserDailyActivity``)."""
+    return streaks_by_user([user.pk]).get(user.pk, 0)
 
-    today = timezone.localdate()
-    if today in dates:
-        cursor = today
-    elif (today - timedelta(days=1)) in dates:
-        cursor = today - timedelta(days=1)
-    else:
-        return 0
 
-    streak = 0
-    while cursor in dates:
-        streak += 1
-        cursor -= timedelta(days=1)
-    return streak
+def _course_lesson_counts(course: Course) -> dict[str, int]:
+    """Число активных шагов курса по типам (из манифеста курса)."""
+    return get_course_manifest(course).counts()
+
+
+def _solved_sources(user_ids, pks: dict[str, list[int]]):
+    """
+    (queryset, поле урока) решённых строк по типам с непустым набором;
+    ``user_ids=None`` — без фильтра по пользователям.
+    """
+    sources = (
+        (UserLessonTheoryRead.objects.all(), "lesson_id", "theory"),
+        (
+            UserAnswerRadio.objects.filter(is_correct=True),
+            "question_id",
+            "radio",
+        ),
+        (
+            UserAnswerCheckBox.objects.filter(is_correct=True),
+            "question_id",
+            "checkbox",
+        ),
+        (
+            UserAnswerShort.objects.filter(is_correct=True),
+            "question_id",
+            "short_answer",
+        ),
+        (
+            CodeSubmission.objects.filter(
+                status=CodeSubmission.STATUS_COMPLETED
+            ),
+            "challenge_id",
+            "coding",
+        ),
+    )
+    for qs, field, kind in sources:
+        if not pks[kind]:
+            continue
+        qs = qs.filter(**{f"{field}__in": pks[kind]})
+        if user_ids is not None:
+            qs = qs.filter(user_id__in=user_ids)
+        yield qs, field, kind
 
 
-def _course_lesson_counts(course: Course) -> dict[str, int]:
-    module_ids = list(
-        course.modules.filter(is_active=True).values_list("id", flat=True)
-    )
-    exam_ids = list(
-        course.exams.filter(is_active=True).values_list("id", flat=True)
-    )
+def course_done_counts_by_user(course: Course, user_ids) -> dict[int, int]:
+    """
+    Пройденные шаги курса для набора пользователей: ``{user_id: done}``.
 
-    theory = (
-        LessonTheory.objects.filter(is_active=True)
-        .filter(
-            Q(module_id__in=module_ids)
-            | Q(exam_id__in=exam_ids)
-            | Q(course_id=course.id, module__isnull=True, exam__isnull=True)
-        )
-        .count()
-    )
-    radio = (
-        LessonRadioQuestion.objects.filter(is_active=True)
-        .filter(
-            Q(module_id__in=module_ids)
-            | Q(exam_id__in=exam_ids)
-            | Q(course_id=course.id, module__isnull=True, exam__isnull=True)
-        )
-        .count()
-    )
-    checkbox = (
-        LessonCheckBoxQuestion.objects.filter(is_active=True)
-        .filter(
-            Q(module_id__in=module_ids)
-            | Q(exam_id__in=exam_ids)
-            | Q(course_id=course.id, module__isnull=True, exam__isnull=True)
-        )
-        .count()
-    )
-    short_answer = (
-        LessonShortAnswer.objects.filter(is_active=True)
-        .filter(
-            Q(module_id__in=module_ids)
-            | Q(exam_id__in=exam_ids)
-            | Q(course_id=course.id, module__isnull=True, exam__isnull=True)
-        )
-        .count()
-    )
-    coding = (
-        CodingChallenge.objects.filter(is_active=True)
-        .filter(
-            Q(module_id__in=module_ids)
-            | Q(exam_id__in=exam_ids)
-            | Q(course_id=course.id, module__isnull=True, exam__isnull=True)
+    Не больше пяти сгруппированных запросов независимо от числа
+    пользователей; id шагов курса берутся из манифеста.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    pks = get_course_manifest(course).active_pks()
+
+    done: dict[int, int] = {}
+    for qs, field, _kind in _solved_sources(user_ids, pks):
+        rows = (
+            qs.values("user_id")
+            .annotate(n=Count(field, distinct=True))
+            .order_by()
         )
-        .count()
-    )
-    return {
-        "theory": theory,
-        "radio": radio,
-        "checkbox": checkbox,
-        "short_answer": short_answer,
-        "coding": coding,
-        "total": theory + radio + checkbox + short_answer + coding,
-    }
+        for row in rows:
+            done[row["user_id"]] = done.get(row["user_id"], 0) + row["n"]
+    return done
 
 
 def _course_done_counts(user, course: Course) -> int:
-    module_ids = list(
-        course.modules.filter(is_active=True).values_list("id", flat=True)
-    )
-    exam_ids = list(
-        course.exams.filter(is_active=True).values_list("id", flat=True)
-    )
-    if not module_ids and not exam_ids:
-        pass
-
-    theory_filter = Q(lesson__is_active=True) & (
-        Q(lesson__module_id__in=module_ids)
-        | Q(lesson__exam_id__in=exam_ids)
-        | Q(
-            lesson__course_id=course.id,
-            lesson__module__isnull=True,
-            lesson__exam__isnull=True,
-        )
-    )
-    theory_done = (
-        UserLessonTheoryRead.objects.filter(user=user)
-        .filter(theory_filter)
-        .count()
-    )
-
-    radio_filter = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    radio_done = (
-        UserAnswerRadio.objects.filter(user=user)
-        .filter(radio_filter)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-    checkbox_filter = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    checkbox_done = (
-        UserAnswerCheckBox.objects.filter(user=user)
-        .filter(checkbox_filter)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-    short_filter = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    short_done = (
-        UserAnswerShort.objects.filter(user=user)
-        .filter(short_filter)
-        .values("question_id")
-        .distinct()
-        .count()
-    )
-    coding_filter = Q(
-        status=CodeSubmission.STATUS_COMPLETED, challenge__is_active=True
-    ) & (
-        Q(challenge__module_id__in=module_ids)
-        | Q(challenge__exam_id__in=exam_ids)
-        | Q(
-            challenge__course_id=course.id,
-            challenge__module__isnull=True,
-            challenge__exam__isnull=True,
-        )
-    )
-    coding_done = (
-        CodeSubmission.objects.filter(user=user)
-        .filter(coding_filter)
-        .values("challenge_id")
-        .distinct()
-        .count()
-    )
-    return theory_done + radio_done + checkbox_done + short_done + coding_done
+    return course_done_counts_by_user(course, [user.pk]).get(user.pk, 0)
 
 
 def count_courses_completed(user) -> int:
-    completed = 0
-    for course in Course.objects.filter(is_active=True).only("id"):
-        counts = _course_lesson_counts(course)
-        if counts["total"] == 0:
-            continue
-        if _course_done_counts(user, course) >= counts["total"]:
-            completed += 1
-    return completed
+    from .summary import get_progress_summary
+
+    return get_progress_summary(user).courses_completed
 
 
 def get_user_progress_stats(user) -> dict[str, int]:
-    coding = _distinct_coding_solved(user)
-    radio = _distinct_radio_solved(user)
-    checkbox = _distinct_checkbox_solved(user)
-    short_answer = _distinct_short_answer_solved(user)
-    theories = _theories_read(user)
+    """Статистика профиля: читает ``UserProgressSummary`` (одна строка)."""
+    from .summary import get_progress_summary
+
+    summary = get_progress_summary(user)
+    coding = summary.coding_solved
+    radio = summary.radio_solved
+    checkbox = summary.checkbox_solved
+    short_answer = summary.short_answer_solved
     quizzes = radio + checkbox + short_answer
 
     return {
-        "tasks_solved": coding + radio + checkbox + short_answer,
+        "tasks_solved": coding + quizzes,
         "coding_solved": coding,
         "quizzes_solved": quizzes,
         "radio_solved": radio,
         "checkbox_solved": checkbox,
         "short_answer_solved": short_answer,
-        "theories_read": theories,
-        "courses_completed": count_courses_completed(user),
+        "theories_read": summary.theories_read,
+        "courses_completed": summary.courses_completed,
         "streak_days": compute_streak_days(user),
     }
 
@@ -310,110 +133,44 @@ def _lesson_key(step_type: str, public_id) -> str:
 
 def build_completed_lesson_keys(user, course: Course) -> set[str]:
     """Ключи пройденных шагов курса (формат фронта: theory-uuid, radio-uuid, …)."""
-    module_ids = list(
-        course.modules.filter(is_active=True).values_list("id", flat=True)
-    )
-    exam_ids = list(
-        course.exams.filter(is_active=True).values_list("id", flat=True)
-    )
-    if not module_ids and not exam_ids and not course.id:
-        return set()
+    manifest = get_course_manifest(course)
+    entries = {(e.kind, e.pk): e for e in manifest.active_lessons()}
+    pks = manifest.active_pks()
 
     keys: set[str] = set()
-    theory_q = Q(lesson__is_active=True) & (
-        Q(lesson__module_id__in=module_ids)
-        | Q(lesson__exam_id__in=exam_ids)
-        | Q(
-            lesson__course_id=course.id,
-            lesson__module__isnull=True,
-            lesson__exam__isnull=True,
-        )
-    )
-    for row in (
-        UserLessonTheoryRead.objects.filter(user=user)
-        .filter(theory_q)
-        .values_list("lesson__public_id", flat=True)
-    ):
-        keys.add(_lesson_key("theory", row))
-
-    radio_q = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    for row in (
-        UserAnswerRadio.objects.filter(user=user)
-        .filter(radio_q)
-        .values_list("question__public_id", flat=True)
-        .distinct()
-    ):
-        keys.add(_lesson_key("radio", row))
-
-    checkbox_q = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    for row in (
-        UserAnswerCheckBox.objects.filter(user=user)
-        .filter(checkbox_q)
-        .values_list("question__public_id", flat=True)
-        .distinct()
-    ):
-        keys.add(_lesson_key("checkbox", row))
-
-    short_q = Q(is_correct=True, question__is_active=True) & (
-        Q(question__module_id__in=module_ids)
-        | Q(question__exam_id__in=exam_ids)
-        | Q(
-            question__course_id=course.id,
-            question__module__isnull=True,
-            question__exam__isnull=True,
-        )
-    )
-    for row in (
-        UserAnswerShort.objects.filter(user=user)
-        .filter(short_q)
-        .values_list("question__public_id", flat=True)
-        .distinct()
-    ):
-        keys.add(_lesson_key("short_answer", row))
-
-    coding_q = Q(
-        status=CodeSubmission.STATUS_COMPLETED, challenge__is_active=True
-    ) & (
-        Q(challenge__module_id__in=module_ids)
-        | Q(challenge__exam_id__in=exam_ids)
-        | Q(
-            challenge__course_id=course.id,
-            challenge__module__isnull=True,
-            challenge__exam__isnull=True,
-        )
-    )
-    for row in (
-        CodeSubmission.objects.filter(user=user)
-        .filter(coding_q)
-        .values_list("challenge__public_id", flat=True)
-        .distinct()
-    ):
-        keys.add(_lesson_key("coding", row))
-
+    for qs, field, kind in _solved_sources([user.pk], pks):
+        for pk in qs.values_list(field, flat=True).distinct():
+            keys.add(entries[(kind, pk)].key)
     return keys
 
 
+def _progress_row(done: int, total: int) -> dict[str, int]:
+    return {
+        "total_steps": total,
+        "completed_steps": done,
+        "percent": round(100 * done / total) if total else 0,
+    }
+
+
+def get_course_progress_bulk(course: Course, user_ids) -> dict[int, dict]:
+    """
+    Прогресс по курсу для набора пользователей.
+
+    ``{user_id: {"total_steps", "completed_steps", "percent"}}`` — состав
+    курса из манифеста и не больше пяти сгруппированных запросов по
+    ответам, сколько бы пользователей ни было.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    total = _course_lesson_counts(course)["total"]
+    done = course_done_counts_by_user(course, user_ids) if total else {}
+    return {uid: _progress_row(done.get(uid, 0), total) for uid in user_ids}
+
+
 def get_course_progress_detail(user, course: Course) -> dict:
     counts = _course_lesson_counts(course)
     total = counts["total"]
     done = _course_done_counts(user, course) if total else 0
-    percent = round(100 * done / total) if total else 0
+    row = _progress_row(done, total)
     completed_keys = sorted(build_completed_lesson_keys(user, course))
 
     from exams.services import get_course_exam_summary
@@ -421,9 +178,7 @@ def get_course_progress_detail(user, course: Course) -> dict:
     return {
         "course_public_id": str(course.public_id),
         "course_title": course.title,
-        "total_steps": total,
-        "completed_steps": done,
-        "percent": percent,
+        **row,
         "completed": completed_keys,
         "breakdown": {
             "theory": counts["theory"],
@@ -438,38 +193,10 @@ def get_course_progress_detail(user, course: Course) -> dict:
 
 def get_daily_activity_counts(user, days: int = 30) -> list[dict]:
     """Активность по дням за последние ``days`` дней (для графика профиля)."""
-    from collections import defaultdict
-
-    counts: dict = defaultdict(int)
-
-    for dt in UserAnswerRadio.objects.filter(
-        user=user, is_correct=True
-    ).values_list("created_at", flat=True):
-        counts[timezone.localtime(dt).date()] += 1
-
-    for dt in UserAnswerCheckBox.objects.filter(
-        user=user, is_correct=True
-    ).values_list("created_at", flat=True):
-        counts[timezone.localtime(dt).date()] += 1
-
-    for dt in UserAnswerShort.objects.filter(
-        user=user, is_correct=True
-    ).values_list("created_at", flat=True):
-        counts[timezone.localtime(dt).date()] += 1
-
-    for dt in CodeSubmission.objects.filter(
-        user=user,
-        status=CodeSubmission.STATUS_COMPLETED,
-        completed_at__isnull=False,
-    ).values_list("completed_at", flat=True):
-        counts[timezone.localtime(dt).date()] += 1
-
-    for dt in UserLessonTheoryRead.objects.filter(user=user).values_list(
-        "read_at", flat=True
-    ):
-        counts[timezone.localtime(dt).date()] += 1
-
     today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    counts = daily_activity_counts(user, start, today)
+
     result = []
     for offset in range(days - 1, -1, -1):
         day = today - timedelta(days=offset)
@@ -0,0 +1,111 @@
+"""
+Поток вердиктов проверки кода в браузер (Channels) вместо опроса
+``GET /api/progress/code/{public_id}/``.
+
+Consumer результатов Kafka после commit пачки рассылает событие
+``submission.updated`` в группу пользователя; ``CodeSubmissionConsumer``
+передаёт его в открытые вкладки. Курсор события — ``verdict_at`` и
+``public_id`` отправки: переподключившийся клиент передаёт последний
+полученный курсор в ``?since=`` и получает пропущенные вердикты из БД.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from common import cursors
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+EVENT_SUBMISSION_UPDATED = "submission.updated"
+_GROUP = "code_submissions_user_{user_public_id}"
+
+
+def user_group(user_public_id) -> str:
+    return _GROUP.format(user_public_id=user_public_id)
+
+
+def encode_cursor(submission) -> str:
+    """``<микросекунды verdict_at>.<public_id>`` — безопасно для URL."""
+    return cursors.encode_cursor(submission.verdict_at, submission.public_id)
+
+
+def decode_cursor(raw: str | None) -> tuple[datetime, uuid.UUID] | None:
+    return cursors.decode_cursor(raw)
+
+
+def submission_event(submission) -> dict:
+    from progress.serializers import CodeSubmissionEventSerializer
+
+    payload = dict(CodeSubmissionEventSerializer(submission).data)
+    payload["cursor"] = encode_cursor(submission)
+    return {"event": EVENT_SUBMISSION_UPDATED, "payload": payload}
+
+
+def _with_verdicts(user):
+    from progress.models import CodeSubmission
+
+    return CodeSubmission.objects.filter(
+        user=user, verdict_at__isnull=False
+    ).select_related("challenge")
+
+
+def latest_cursor(user) -> str | None:
+    last = _with_verdicts(user).order_by("-verdict_at", "-public_id").first()
+    return encode_cursor(last) if last else None
+
+
+def missed_events(
+    user, cursor: tuple[datetime, uuid.UUID], limit: int
+) -> tuple[list[dict], bool]:
+    """
+    Вердикты после курсора в порядке записи (не больше ``limit``) и флаг
+    «есть ещё» — тогда клиент дочитывает список через REST.
+    """
+    verdict_at, public_id = cursor
+    rows = list(
+        _with_verdicts(user)
+        .filter(
+            Q(verdict_at__gt=verdict_at)
+            | Q(verdict_at=verdict_at, public_id__gt=public_id)
+        )
+        .order_by("verdict_at", "public_id")[: limit + 1]
+    )
+    return [submission_event(sub) for sub in rows[:limit]], len(rows) > limit
+
+
+async def _group_send_all(channel_layer, messages) -> None:
+    for group, message in messages:
+        await channel_layer.group_send(group, message)
+
+
+def broadcast_submission_updates(submissions) -> None:
+    """
+    Разослать ``submission.updated`` владельцам отправок (вызывать после
+    commit). Сбой channel layer не критичен: клиент догонит по курсору.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not submissions:
+        return
+    messages = []
+    for sub in submissions:
+        event = submission_event(sub)
+        messages.append(
+            (
+                user_group(sub.user.public_id),
+                {"type": "submission.event", **event},
+            )
+        )
+    try:
+        async_to_sync(_group_send_all)(channel_layer, messages)
+    except Exception:
+        logger.warning(
+            "Не удалось разослать %s событий submission.updated.",
+            len(messages),
+            exc_info=True,
+        )
@@ -0,0 +1,379 @@
+"""
+Материализованная сводка прогресса (``UserProgressSummary``).
+
+Счётчики «решено / прочитано» обновляются точечно при записи ответа,
+отправки кода или прочтения теории (см. ``progress.signals``): пересчитывается
+только затронутый тип урока и курс этого урока. Профиль, достижения и VK-бот
+читают одну строку. Полный пересчёт пачками —
+``manage.py rebuild_progress_summaries``.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from content.lesson_manifest import (
+    LESSON_KINDS,
+    get_course_manifest,
+    lesson_course_id,
+)
+from content.models import Course
+
+from .models import (
+    CodeSubmission,
+    UserAnswerCheckBox,
+    UserAnswerRadio,
+    UserAnswerShort,
+    UserLessonTheoryRead,
+    UserProgressSummary,
+)
+from .stats import (
+    _course_lesson_counts,
+    _solved_sources,
+    course_done_counts_by_user,
+)
+
+logger = logging.getLogger(__name__)
+
+KIND_THEORY = "theory"
+KIND_RADIO = "radio"
+KIND_CHECKBOX = "checkbox"
+KIND_SHORT_ANSWER = "short_answer"
+KIND_CODING = "coding"
+
+COUNTER_FIELDS = {
+    KIND_THEORY: "theories_read",
+    KIND_RADIO: "radio_solved",
+    KIND_CHECKBOX: "checkbox_solved",
+    KIND_SHORT_ANSWER: "short_answer_solved",
+    KIND_CODING: "coding_solved",
+}
+
+# Модель строки прогресса → (тип урока, FK на урок, поля «правильности»).
+_TRACKED = {
+    UserLessonTheoryRead: (KIND_THEORY, "lesson", ()),
+    UserAnswerRadio: (KIND_RADIO, "question", ("is_correct",)),
+    UserAnswerCheckBox: (KIND_CHECKBOX, "question", ("is_correct",)),
+    UserAnswerShort: (KIND_SHORT_ANSWER, "question", ("is_correct",)),
+    CodeSubmission: (KIND_CODING, "challenge", ("status",)),
+}
+
+TRACKED_MODELS = tuple(_TRACKED)
+
+
+def _solved_queryset(kind: str):
+    if kind == KIND_THEORY:
+        return UserLessonTheoryRead.objects.all(), "lesson_id"
+    if kind == KIND_RADIO:
+        return UserAnswerRadio.objects.filter(is_correct=True), "question_id"
+    if kind == KIND_CHECKBOX:
+        return (
+            UserAnswerCheckBox.objects.filter(is_correct=True),
+            "question_id",
+        )
+    if kind == KIND_SHORT_ANSWER:
+        return UserAnswerShort.objects.filter(is_correct=True), "question_id"
+    if kind == KIND_CODING:
+        return (
+            CodeSubmission.objects.filter(
+                status=CodeSubmission.STATUS_COMPLETED
+            ),
+            "challenge_id",
+        )
+    raise ValueError(f"Unknown progress kind: {kind}")
+
+
+def count_solved_by_user(kind: str, user_ids) -> dict[int, int]:
+    """Число различных решённых уроков типа ``kind``: ``{user_id: n}``."""
+    qs, field = _solved_queryset(kind)
+    rows = (
+        qs.filter(user_id__in=list(user_ids))
+        .values("user_id")
+        .annotate(n=Count(field, distinct=True))
+        .order_by()
+    )
+    return {row["user_id"]: row["n"] for row in rows}
+
+
+def completed_course_ids_by_user(user_ids) -> dict[int, list[int]]:
+    """Завершённые (100%) активные курсы для набора пользователей."""
+    user_ids = list(user_ids)
+    result: dict[int, list[int]] = {uid: [] for uid in user_ids}
+    if not user_ids:
+        return result
+    for course in Course.objects.filter(is_active=True).only("id"):
+        total = _course_lesson_counts(course)["total"]
+        if not total:
+            continue
+        for uid, done in course_done_counts_by_user(course, user_ids).items():
+            if done >= total:
+                result[uid].append(course.id)
+    return result
+
+
+def rebuild_progress_summaries(user_ids) -> list[UserProgressSummary]:
+    """
+    Полный пересчёт сводок для пачки пользователей.
+
+    Сгруппированные запросы по каждому типу урока и курсу, затем
+    ``bulk_create`` / ``bulk_update`` — число запросов не зависит от
+    размера пачки.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return []
+
+    counters = {
+        kind: count_solved_by_user(kind, user_ids) for kind in COUNTER_FIELDS
+    }
+    completed = completed_course_ids_by_user(user_ids)
+    existing = {
+        s.user_id: s
+        for s in UserProgressSummary.objects.filter(user_id__in=user_ids)
+    }
+
+    now = timezone.now()
+    to_create: list[UserProgressSummary] = []
+    to_update: list[UserProgressSummary] = []
+    for uid in user_ids:
+        summary = existing.get(uid)
+        if summary is None:
+            summary = UserProgressSummary(user_id=uid)
+            to_create.append(summary)
+        else:
+            to_update.append(summary)
+        for kind, field in COUNTER_FIELDS.items():
+            setattr(summary, field, counters[kind].get(uid, 0))
+        summary.completed_course_ids = completed[uid]
+        summary.stale_course_ids = []
+        summary.updated_at = now
+
+    if to_create:
+        UserProgressSummary.objects.bulk_create(
+            to_create, ignore_conflicts=True
+        )
+    if to_update:
+        UserProgressSummary.objects.bulk_update(
+            to_update,
+            [
+                *COUNTER_FIELDS.values(),
+                "completed_course_ids",
+                "stale_course_ids",
+                "updated_at",
+            ],
+        )
+    return to_create + to_update
+
+
+def get_progress_summary(user) -> UserProgressSummary:
+    """Сводка пользователя; строится при первом обращении."""
+    summary = UserProgressSummary.objects.filter(user_id=user.pk).first()
+    if summary is None:
+        rebuild_progress_summaries([user.pk])
+        return UserProgressSummary.objects.get(user_id=user.pk)
+    if summary.stale_course_ids:
+        for course_id in sorted(set(summary.stale_course_ids)):
+            _refresh_course(summary, course_id)
+        summary.stale_course_ids = []
+        summary.save(
+            update_fields=[
+                "completed_course_ids",
+                "stale_course_ids",
+                "updated_at",
+            ]
+        )
+    return summary
+
+
+def _refresh_course(summary: UserProgressSummary, course_id: int) -> bool:
+    course = Course.objects.filter(pk=course_id, is_active=True).first()
+    completed = False
+    if course is not None:
+        total = _course_lesson_counts(course)["total"]
+        if total:
+            done = course_done_counts_by_user(course, [summary.user_id])
+            completed = done.get(summary.user_id, 0) >= total
+
+    ids = list(summary.completed_course_ids or [])
+    if completed == (course_id in ids):
+        return False
+    if completed:
+        ids.append(course_id)
+    else:
+        ids.remove(course_id)
+    summary.completed_course_ids = ids
+    return True
+
+
+def apply_progress_change(user_id: int, kind: str, lesson=None) -> None:
+    """
+    Точечное обновление сводки после изменения строки прогресса.
+
+    Пересчитывается один счётчик (один запрос по строкам пользователя);
+    если он изменился — и завершённость курса, к которому относится урок.
+    """
+    summary = UserProgressSummary.objects.filter(user_id=user_id).first()
+    if summary is None:
+        rebuild_progress_summaries([user_id])
+        return
+
+    field = COUNTER_FIELDS[kind]
+    value = count_solved_by_user(kind, [user_id]).get(user_id, 0)
+    if value == getattr(summary, field):
+        return
+
+    setattr(summary, field, value)
+    update_fields = [field, "updated_at"]
+    course_id = lesson_course_id(lesson) if lesson is not None else None
+    if course_id:
+        if _refresh_course(summary, course_id):
+            update_fields.append("completed_course_ids")
+    summary.save(update_fields=update_fields)
+
+
+def apply_progress_changes(kind: str, changes) -> None:
+    """
+    ``apply_progress_change`` для пачки пар ``(user_id, lesson)`` — после
+    ``bulk_update``, который ``post_save`` не вызывает.
+
+    Один сгруппированный запрос счётчика на всю пачку; курсы
+    пересчитываются только у пользователей, чей счётчик изменился.
+    """
+    lessons_by_user: dict[int, list] = {}
+    for user_id, lesson in changes:
+        lessons_by_user.setdefault(user_id, []).append(lesson)
+    if not lessons_by_user:
+        return
+
+    summaries = {
+        s.user_id: s
+        for s in UserProgressSummary.objects.filter(
+            user_id__in=list(lessons_by_user)
+        )
+    }
+    missing = [uid for uid in lessons_by_user if uid not in summaries]
+    if missing:
+        rebuild_progress_summaries(missing)
+    if not summaries:
+        return
+
+    field = COUNTER_FIELDS[kind]
+    values = count_solved_by_user(kind, summaries)
+    for user_id, summary in summaries.items():
+        value = values.get(user_id, 0)
+        if value == getattr(summary, field):
+            continue
+        setattr(summary, field, value)
+        update_fields = [field, "updated_at"]
+        course_ids = {
+            lesson_course_id(lesson)
+            for lesson in lessons_by_user[user_id]
+            if lesson is not None
+        }
+        refreshed = [
+            _refresh_course(summary, course_id)
+            for course_id in sorted(c for c in course_ids if c)
+        ]
+        if any(refreshed):
+            update_fields.append("completed_course_ids")
+        summary.save(update_fields=update_fields)
+
+
+def _is_solved(instance) -> bool:
+    if isinstance(instance, UserLessonTheoryRead):
+        return True
+    if isinstance(instance, CodeSubmission):
+        return instance.status == CodeSubmission.STATUS_COMPLETED
+    return bool(instance.is_correct)
+
+
+def handle_progress_row_saved(instance, created: bool, update_fields) -> None:
+    """
+    ``post_save`` строки прогресса: новая неверная попытка счётчики не
+    меняет; обновление учитываем, если могла измениться правильность.
+    """
+    kind, lesson_attr, correctness_fields = _TRACKED[type(instance)]
+    if created and not _is_solved(instance):
+        return
+    if (
+        not created
+        and update_fields is not None
+        and not set(update_fields) & set(correctness_fields)
+    ):
+        return
+    apply_progress_change(
+        instance.user_id, kind, getattr(instance, lesson_attr)
+    )
+
+
+def handle_progress_row_deleted(instance) -> None:
+    kind, lesson_attr, _fields = _TRACKED[type(instance)]
+    if not UserProgressSummary.objects.filter(
+        user_id=instance.user_id
+    ).exists():
+        return
+    lesson_id = getattr(instance, f"{lesson_attr}_id")
+    lesson_model = type(instance)._meta.get_field(lesson_attr).related_model
+    lesson = lesson_model.objects.filter(pk=lesson_id).first()
+    apply_progress_change(instance.user_id, kind, lesson)
+
+
+def _course_learners_filter(course: Course) -> Q:
+    """Пользователи с записью на курс или засчитанным шагом в нём."""
+    from education.models import Enrollment
+
+    condition = Q(
+        user_id__in=Enrollment.objects.filter(course=course).values("user_id")
+    )
+    # Все шаги, включая неактивные: после деактивации шага или контейнера
+    # завершённость меняется и у тех, кто решал только его.
+    pks: dict[str, list[int]] = {kind: [] for kind in LESSON_KINDS}
+    for entry in get_course_manifest(course).lessons:
+        pks[entry.kind].append(entry.pk)
+    for qs, _field, _kind in _solved_sources(None, pks):
+        condition |= Q(user_id__in=qs.values("user_id"))
+    return condition
+
+
+def mark_completed_courses_stale(course_ids, batch_size: int = 1000) -> int:
+    """
+    Структура курсов изменилась — пересчитать их завершённость лениво.
+
+    Помечаются только сводки учеников этих курсов (запись на курс или
+    засчитанный шаг); при чтении пересчитываются только эти курсы.
+    Вызывается задачей Celery ``progress.mark_completed_courses_stale``
+    после коммита правки курса.
+    """
+    updated = 0
+    for course in Course.objects.filter(pk__in=set(course_ids)).only("id"):
+        summaries = (
+            UserProgressSummary.objects.filter(_course_learners_filter(course))
+            .only("pk", "stale_course_ids")
+            .order_by("pk")
+        )
+        batch = []
+        for summary in summaries.iterator(chunk_size=batch_size):
+            if course.pk in summary.stale_course_ids:
+                continue
+            summary.stale_course_ids = [*summary.stale_course_ids, course.pk]
+            batch.append(summary)
+            if len(batch) >= batch_size:
+                UserProgressSummary.objects.bulk_update(
+                    batch, ["stale_course_ids"]
+                )
+                updated += len(batch)
+                batch = []
+        if batch:
+            UserProgressSummary.objects.bulk_update(
+                batch, ["stale_course_ids"]
+            )
+            updated += len(batch)
+    if updated:
+        logger.info(
+            "Сводки прогресса: завершённые курсы помечены к пересчёту (%s).",
+            updated,
+        )
+    return updated
@@ -0,0 +1,29 @@
+"""
+Celery: досылка отправок кода из outbox в Kafka, чистка вердиктов,
+пометка сводок прогресса после изменения структуры курсов.
+"""
+
+from __future__ import annotations
+
+from celery import shared_task
+
+
+@shared_task(name="progress.relay_code_submission_outbox")
+def relay_code_submission_outbox() -> dict:
+    from progress.kafka_outbox import relay_outbox
+
+    return relay_outbox()
+
+
+@shared_task(name="progress.purge_expired_verdicts")
+def purge_expired_verdicts() -> dict:
+    from progress.verdict_cache import purge_expired_verdicts as purge
+
+    return {"deleted": purge()}
+
+
+@shared_task(name="progress.mark_completed_courses_stale")
+def mark_completed_courses_stale(course_ids: list[int]) -> dict:
+    from progress.summary import mark_completed_courses_stale as mark
+
+    return {"marked": mark(course_ids)}
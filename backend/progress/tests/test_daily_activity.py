@@ -0,0 +1,114 @@
+"""Дневная сводка активности (UserDailyActivity): streak и календарь."""
+
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+from notify.study_reminders import send_abandoned_and_streak_reminders
+import pytest
+
+from communication.models import UserNotification
+from content.models import LessonTheory
+from progress.activity import streaks_by_user
+from progress.models import (
+    CodeSubmission,
+    UserAnswerRadio,
+    UserDailyActivity,
+    UserLessonTheoryRead,
+)
+from progress.stats import compute_streak_days, get_daily_activity_counts
+
+
+@pytest.mark.django_db
+class TestUserDailyActivity:
+    def test_correct_answers_update_today(
+        self, student_user, radio_question, radio_answers
+    ):
+        correct = next(a for a in radio_answers if a.is_correct)
+        wrong = next(a for a in radio_answers if not a.is_correct)
+        for answer in (wrong, correct, correct):
+            UserAnswerRadio.objects.create(
+                user=student_user,
+                question=radio_question,
+                selected_answer=answer,
+            )
+
+        today = timezone.localdate()
+        row = UserDailyActivity.objects.get(user=student_user)
+        assert (row.date, row.count) == (today, 2)
+        days = get_daily_activity_counts(student_user)
+        assert len(days) == 30
+        assert days[-1] == {
+            "date": today.isoformat(),
+            "label": f"{today.day}.{today.month}",
+            "count": 2,
+        }
+        assert compute_streak_days(student_user) == 1
+
+    def test_code_submission_counts_after_verdict(
+        self, student_user, coding_challenge
+    ):
+        sub = CodeSubmission.objects.create(
+            user=student_user,
+            challenge=coding_challenge,
+            code="print(1)",
+            status="pending",
+        )
+        assert not UserDailyActivity.objects.filter(user=student_user).exists()
+
+        sub.status = CodeSubmission.STATUS_COMPLETED
+        sub.save()
+        assert UserDailyActivity.objects.get(user=student_user).count == 1
+
+        sub.delete()
+        assert not UserDailyActivity.objects.filter(user=student_user).exists()
+
+    def test_backfill_builds_streak_from_history(self, student_user, module):
+        now = timezone.now()
+        for offset in range(3):
+            lesson = LessonTheory.objects.create(
+                module=module,
+                title=f"Урок {offset}",
+                content="…",
+                order_index=offset + 1,
+            )
+            read = UserLessonTheoryRead.objects.create(
+                user=student_user, lesson=lesson
+            )
+            UserLessonTheoryRead.objects.filter(pk=read.pk).update(
+                read_at=now - timedelta(days=offset + 1)
+            )
+        UserDailyActivity.objects.all().delete()
+
+        call_command("backfill_daily_activity", batch_size=1)
+
+        assert UserDailyActivity.objects.filter(user=student_user).count() == 3
+        assert compute_streak_days(student_user) == 3
+
+    def test_long_streak_extends_window(self, student_user):
+        today = timezone.localdate()
+        UserDailyActivity.objects.bulk_create(
+            UserDailyActivity(
+                user=student_user, date=today - timedelta(days=d), count=1
+            )
+            for d in range(70)
+        )
+
+        assert streaks_by_user([student_user.pk], today) == {
+            student_user.pk: 70
+        }
+
+    def test_streak_reminder_reads_rollup(self, student_user):
+        today = timezone.localdate()
+        for offset in (1, 2):
+            UserDailyActivity.objects.create(
+                user=student_user, date=today - timedelta(days=offset), count=1
+            )
+
+        result = send_abandoned_and_streak_reminders()
+
+        assert result["streak"] == 1
+        notification = UserNotification.objects.get(
+            user=student_user, kind=UserNotification.Kind.STREAK_REMINDER
+        )
+        assert notification.title == "Streak 2 под угрозой"
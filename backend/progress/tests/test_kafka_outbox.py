@@ -0,0 +1,161 @@
+from datetime import timedelta
+
+from django.utils import timezone
+import pytest
+
+from progress import kafka_publisher
+from progress.kafka_outbox import relay_outbox
+from progress.models import CodeSubmission, CodeSubmissionOutbox
+
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.is_done = True
+        self.exception = error
+
+    def succeeded(self):
+        return self.exception is None
+
+    def add_callback(self, fn, *args):
+        if self.exception is None:
+            fn(*args, "metadata")
+        return self
+
+    def add_errback(self, fn, *args):
+        if self.exception is not None:
+            fn(*args, self.exception)
+        return self
+
+
+class FakeProducer:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.sent = []
+        self.flushes = 0
+
+    def send(self, topic, key=None, value=None):
+        self.sent.append((topic, key, value))
+        if key in self.fail_ids:
+            return FakeFuture(RuntimeError("broker down"))
+        return FakeFuture()
+
+    def flush(self, timeout=None):
+        self.flushes += 1
+
+
+@pytest.fixture
+def kafka_on(settings, monkeypatch):
+    settings.KAFKA_BOOTSTRAP_SERVERS = "kafka:9092"
+    settings.CODE_VERDICT_CACHE_TTL = 0
+    enqueued = []
+    monkeypatch.setattr(
+        "progress.signals.enqueue_code_submission",
+        lambda outbox_id, payload: enqueued.append(outbox_id),
+    )
+    return enqueued
+
+
+def _submit(user, challenge, capture):
+    with capture(execute=True):
+        return CodeSubmission.objects.create(
+            user=user, challenge=challenge, code="print(1)", status="pending"
+        )
+
+
+def _use_producer(monkeypatch, producer):
+    monkeypatch.setattr(
+        kafka_publisher, "get_kafka_producer", lambda: producer
+    )
+
+
+@pytest.mark.django_db
+def test_submission_writes_outbox_and_enqueues_after_commit(
+    student_user,
+    coding_challenge,
+    kafka_on,
+    django_capture_on_commit_callbacks,
+):
+    sub = _submit(
+        student_user, coding_challenge, django_capture_on_commit_callbacks
+    )
+
+    row = CodeSubmissionOutbox.objects.get(submission=sub)
+    assert row.payload["submission_public_id"] == str(sub.public_id)
+    assert kafka_on == [row.pk]
+
+
+@pytest.mark.django_db
+def test_background_publisher_deletes_acknowledged_rows(
+    student_user,
+    coding_challenge,
+    kafka_on,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    ok_sub = _submit(
+        student_user, coding_challenge, django_capture_on_commit_callbacks
+    )
+    bad_sub = _submit(
+        student_user, coding_challenge, django_capture_on_commit_callbacks
+    )
+    producer = FakeProducer(fail_ids={str(bad_sub.public_id)})
+    _use_producer(monkeypatch, producer)
+    publisher = kafka_publisher._BackgroundPublisher(10, start=False)
+    for row in CodeSubmissionOutbox.objects.all():
+        assert publisher.submit(row.pk, row.payload)
+
+    publisher.run_once()
+
+    assert len(producer.sent) == 2
+    assert not CodeSubmissionOutbox.objects.filter(submission=ok_sub).exists()
+    failed = CodeSubmissionOutbox.objects.get(submission=bad_sub)
+    assert failed.attempts == 1
+    assert "broker down" in failed.last_error
+    assert failed.next_attempt_at > timezone.now()
+
+
+@pytest.mark.django_db
+def test_full_queue_leaves_row_for_relay(
+    student_user, coding_challenge, kafka_on
+):
+    publisher = kafka_publisher._BackgroundPublisher(1, start=False)
+    assert publisher.submit(1, {})
+    assert not publisher.submit(2, {})
+
+
+@pytest.mark.django_db
+def test_relay_sends_stale_rows_in_one_flush(
+    student_user,
+    coding_challenge,
+    kafka_on,
+    monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    subs = [
+        _submit(
+            student_user, coding_challenge, django_capture_on_commit_callbacks
+        )
+        for _ in range(3)
+    ]
+    fresh = _submit(
+        student_user, coding_challenge, django_capture_on_commit_callbacks
+    )
+    old = timezone.now() - timedelta(minutes=5)
+    CodeSubmissionOutbox.objects.filter(submission__in=subs).update(
+        created_at=old, next_attempt_at=old
+    )
+    producer = FakeProducer(fail_ids={str(subs[2].public_id)})
+    _use_producer(monkeypatch, producer)
+
+    result = relay_outbox()
+
+    assert result == {"sent": 2, "failed": 1}
+    assert producer.flushes == 1
+    assert [key for _t, key, _v in producer.sent] == [
+        str(s.public_id) for s in subs
+    ]
+    left = set(
+        CodeSubmissionOutbox.objects.values_list("submission_id", flat=True)
+    )
+    assert left == {subs[2].pk, fresh.pk}
+    assert relay_outbox() == {"sent": 0, "failed": 0}
@@ -1,11 +1,17 @@
 import uuid
 
+from django.utils import timezone
 import pytest
 
 from progress.kafka_results_consumer import (
     apply_code_submission_result_payload,
+    apply_code_submission_results_batch,
+)
+from progress.models import (
+    CodeSubmission,
+    UserDailyActivity,
+    UserProgressSummary,
 )
-from progress.models import CodeSubmission
 
 
 @pytest.mark.django_db
@@ -176,3 +182,91 @@ def test_apply_result_does_not_overwrite_completed(
     assert sub.tests_passed == 3
     assert sub.error_message == ""
     assert sub.test_results == {}
+
+
+def _pending(user, challenge, n):
+    return [
+        CodeSubmission.objects.create(
+            user=user,
+            challenge=challenge,
+            code=f"print({i})",
+            status="pending",
+        )
+        for i in range(n)
+    ]
+
+
+def _result(sub, status="accepted", passed=2):
+    return {
+        "submission_public_id": str(sub.public_id),
+        "status": status,
+        "message": "ok" if status == "accepted" else "WA",
+        "passed_tests": passed,
+        "total_tests": 2,
+    }
+
+
+@pytest.mark.django_db
+def test_batch_query_count_does_not_grow_with_batch(
+    student_user, coding_challenge, django_assert_max_num_queries
+):
+    small = _pending(student_user, coding_challenge, 2)
+    large = _pending(student_user, coding_challenge, 20)
+    apply_code_submission_results_batch(
+        [_result(s, "wrong_answer", 0) for s in small]
+    )
+
+    with django_assert_max_num_queries(4):
+        apply_code_submission_results_batch(
+            [_result(s, "wrong_answer", 0) for s in large]
+        )
+
+    assert (
+        CodeSubmission.objects.filter(
+            pk__in=[s.pk for s in large], status="error"
+        ).count()
+        == 20
+    )
+
+
+@pytest.mark.django_db
+def test_batch_updates_summary_and_activity(student_user, coding_challenge):
+    subs = _pending(student_user, coding_challenge, 3)
+
+    results = apply_code_submission_results_batch(
+        [
+            _result(subs[0]),
+            _result(subs[1], "wrong_answer", 1),
+            _result(subs[2]),
+        ]
+    )
+
+    assert results == [(True, ""), (True, ""), (True, "")]
+    summary = UserProgressSummary.objects.get(user=student_user)
+    assert summary.coding_solved == 1
+    activity = UserDailyActivity.objects.get(user=student_user)
+    assert activity.count == 2
+    assert activity.date == timezone.localdate()
+
+
+@pytest.mark.django_db
+def test_batch_applies_messages_in_order(student_user, coding_challenge):
+    (sub,) = _pending(student_user, coding_challenge, 1)
+
+    results = apply_code_submission_results_batch(
+        [
+            _result(sub, "wrong_answer", 0),
+            _result(sub),
+            _result(sub, "wrong_answer", 0),
+            {"submission_public_id": "not-a-uuid"},
+            _result(CodeSubmission(public_id=uuid.uuid4())),
+        ]
+    )
+
+    assert results[:3] == [(True, ""), (True, ""), (True, "уже завершена")]
+    assert not results[3][0] and "некорректный" in results[3][1]
+    assert not results[4][0] and "не найдена" in results[4][1]
+    sub.refresh_from_db()
+    assert sub.status == CodeSubmission.STATUS_COMPLETED
+    assert sub.completed_at is not None
+    assert UserDailyActivity.objects.get(user=student_user).count == 1
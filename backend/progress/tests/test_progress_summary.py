@@ -0,0 +1,141 @@
+"""Материализованная сводка прогресса (UserProgressSummary)."""
+
+from django.core.management import call_command
+import pytest
+
+from content.models import Course, LessonTheory, Module
+from progress.models import (
+    CodeSubmission,
+    UserAnswerRadio,
+    UserLessonTheoryRead,
+    UserProgressSummary,
+)
+from progress.stats import get_user_progress_stats
+from progress.summary import get_progress_summary
+
+
+@pytest.mark.django_db
+class TestUserProgressSummary:
+    def test_built_on_first_read(self, student_user, theory_lesson):
+        UserLessonTheoryRead.objects.create(
+            user=student_user, lesson=theory_lesson
+        )
+        UserProgressSummary.objects.all().delete()
+
+        stats = get_user_progress_stats(student_user)
+
+        assert stats["theories_read"] == 1
+        assert stats["courses_completed"] == 1
+        assert UserProgressSummary.objects.filter(user=student_user).exists()
+
+    def test_correct_answer_updates_counter_once(
+        self, student_user, radio_question, radio_answers
+    ):
+        get_progress_summary(student_user)
+        correct = next(a for a in radio_answers if a.is_correct)
+        wrong = next(a for a in radio_answers if not a.is_correct)
+
+        UserAnswerRadio.objects.create(
+            user=student_user, question=radio_question, selected_answer=wrong
+        )
+        assert get_progress_summary(student_user).radio_solved == 0
+
+        for _ in range(2):
+            UserAnswerRadio.objects.create(
+                user=student_user,
+                question=radio_question,
+                selected_answer=correct,
+            )
+        summary = get_progress_summary(student_user)
+        assert summary.radio_solved == 1
+        assert summary.courses_completed == 1
+
+    def test_code_submission_counts_after_verdict(
+        self, student_user, coding_challenge
+    ):
+        get_progress_summary(student_user)
+        sub = CodeSubmission.objects.create(
+            user=student_user,
+            challenge=coding_challenge,
+            code="print(1)",
+            status="pending",
+        )
+        assert get_progress_summary(student_user).coding_solved == 0
+
+        sub.status = CodeSubmission.STATUS_COMPLETED
+        sub.save()
+        assert get_progress_summary(student_user).coding_solved == 1
+
+    def test_new_lesson_marks_completed_courses_stale(
+        self,
+        student_user,
+        module,
+        theory_lesson,
+        settings,
+        django_capture_on_commit_callbacks,
+    ):
+        settings.CELERY_TASK_ALWAYS_EAGER = True
+        UserLessonTheoryRead.objects.create(
+            user=student_user, lesson=theory_lesson
+        )
+        assert get_progress_summary(student_user).courses_completed == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            LessonTheory.objects.create(
+                module=module, title="Ещё урок", content="…", order_index=2
+            )
+            # Сводки помечаются только после коммита, в задаче Celery.
+            summary = UserProgressSummary.objects.get(user=student_user)
+            assert summary.stale_course_ids == []
+
+        summary = UserProgressSummary.objects.get(user=student_user)
+        assert summary.stale_course_ids == [module.course_id]
+        assert get_progress_summary(student_user).courses_completed == 0
+        assert not UserProgressSummary.objects.get(
+            user=student_user
+        ).stale_course_ids
+
+    def test_other_course_change_leaves_summary_alone(
+        self,
+        student_user,
+        module,
+        theory_lesson,
+        settings,
+        django_capture_on_commit_callbacks,
+    ):
+        settings.CELERY_TASK_ALWAYS_EAGER = True
+        UserLessonTheoryRead.objects.create(
+            user=student_user, lesson=theory_lesson
+        )
+        get_progress_summary(student_user)
+        other = Course.objects.create(
+            title="Другой курс", slug="other-course", is_active=True
+        )
+        other_module = Module.objects.create(
+            course=other, title="М", is_active=True
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            LessonTheory.objects.create(
+                module=other_module, title="Урок", content="…", order_index=1
+            )
+
+        summary = UserProgressSummary.objects.get(user=student_user)
+        assert summary.stale_course_ids == []
+        assert summary.completed_course_ids == [module.course_id]
+
+    def test_rebuild_command_repairs_counters(
+        self, student_user, theory_lesson
+    ):
+        UserLessonTheoryRead.objects.create(
+            user=student_user, lesson=theory_lesson
+        )
+        UserProgressSummary.objects.filter(user=student_user).update(
+            theories_read=0, completed_course_ids=[]
+        )
+
+        call_command("rebuild_progress_summaries", batch_size=1)
+
+        summary = UserProgressSummary.objects.get(user=student_user)
+        assert summary.theories_read == 1
+        assert summary.courses_completed == 1
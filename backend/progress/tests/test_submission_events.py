@@ -0,0 +1,158 @@
+"""Поток submission.updated: рассылка после commit и догрузка по курсору."""
+
+from urllib.parse import quote
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.utils import timezone
+import pytest
+from rest_framework_simplejwt.tokens import AccessToken
+from school_platform.asgi import application
+
+from progress.kafka_results_consumer import (
+    apply_code_submission_results_batch,
+)
+from progress.models import CodeSubmission
+from progress.submission_events import (
+    decode_cursor,
+    encode_cursor,
+    user_group,
+)
+
+
+@pytest.fixture(autouse=True)
+def inmemory_channel_layer(settings):
+    settings.CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+    }
+
+
+def _ws_path(user, since=None):
+    token = quote(str(AccessToken.for_user(user)), safe="")
+    path = f"/ws/progress/code/?token={token}"
+    return f"{path}&since={since}" if since else path
+
+
+def _finish(subs, capture, status="accepted"):
+    with capture(execute=True):
+        apply_code_submission_results_batch(
+            [
+                {
+                    "submission_public_id": str(sub.public_id),
+                    "status": status,
+                    "message": "ok",
+                    "passed_tests": 1,
+                    "total_tests": 1,
+                }
+                for sub in subs
+            ]
+        )
+    for sub in subs:
+        sub.refresh_from_db()
+
+
+def _pending(user, challenge, n):
+    return [
+        CodeSubmission.objects.create(
+            user=user,
+            challenge=challenge,
+            code=f"print({i})",
+            status="pending",
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.django_db
+def test_verdict_broadcast_to_user_group_after_commit(
+    student_user, coding_challenge, django_capture_on_commit_callbacks
+):
+    (sub,) = _pending(student_user, coding_challenge, 1)
+    channel_layer = get_channel_layer()
+    channel_name = async_to_sync(channel_layer.new_channel)()
+    async_to_sync(channel_layer.group_add)(
+        user_group(student_user.public_id), channel_name
+    )
+
+    _finish([sub], django_capture_on_commit_callbacks)
+
+    event = async_to_sync(channel_layer.receive)(channel_name)
+    assert event["event"] == "submission.updated"
+    assert event["payload"]["public_id"] == str(sub.public_id)
+    assert event["payload"]["status"] == CodeSubmission.STATUS_COMPLETED
+    assert "code" not in event["payload"]
+    assert event["payload"]["cursor"] == encode_cursor(sub)
+
+
+def test_cursor_round_trip_and_garbage():
+    sub = CodeSubmission(verdict_at=timezone.now())
+
+    assert decode_cursor(encode_cursor(sub)) == (sub.verdict_at, sub.public_id)
+    assert decode_cursor("") is None
+    assert decode_cursor("nope") is None
+    assert decode_cursor("123.not-a-uuid") is None
+
+
+@pytest.mark.django_db
+def test_reconnect_with_since_replays_missed_verdicts(
+    student_user, coding_challenge, django_capture_on_commit_callbacks
+):
+    subs = _pending(student_user, coding_challenge, 3)
+    _finish(subs[:1], django_capture_on_commit_callbacks)
+    since = encode_cursor(subs[0])
+    _finish(subs[1:], django_capture_on_commit_callbacks, "wrong_answer")
+    expected = sorted(subs[1:], key=lambda s: (s.verdict_at, str(s.public_id)))
+
+    async def run():
+        communicator = WebsocketCommunicator(
+            application, _ws_path(student_user, since)
+        )
+        connected, _ = await communicator.connect()
+        assert connected
+        hello = await communicator.receive_json_from()
+        assert hello == {"event": "connected", "payload": {"cursor": since}}
+        replayed = [await communicator.receive_json_from() for _ in range(2)]
+        synced = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return replayed, synced
+
+    replayed, synced = async_to_sync(run)()
+
+    assert [e["payload"]["public_id"] for e in replayed] == [
+        str(s.public_id) for s in expected
+    ]
+    assert {e["payload"]["status"] for e in replayed} == {"error"}
+    assert synced["event"] == "synced"
+    assert synced["payload"] == {
+        "cursor": encode_cursor(expected[-1]),
+        "has_more": False,
+    }
+
+
+@pytest.mark.django_db
+def test_connect_without_since_reports_latest_cursor_and_rejects_bad_since(
+    student_user, coding_challenge, django_capture_on_commit_callbacks
+):
+    (sub,) = _pending(student_user, coding_challenge, 1)
+    _finish([sub], django_capture_on_commit_callbacks)
+
+    async def run():
+        communicator = WebsocketCommunicator(
+            application, _ws_path(student_user)
+        )
+        assert (await communicator.connect())[0]
+        hello = await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        bad = WebsocketCommunicator(
+            application, _ws_path(student_user, "garbage")
+        )
+        assert not (await bad.connect())[0]
+
+        anonymous = WebsocketCommunicator(application, "/ws/progress/code/")
+        assert not (await anonymous.connect())[0]
+        return hello
+
+    hello = async_to_sync(run)()
+    assert hello["payload"]["cursor"] == encode_cursor(sub)
@@ -0,0 +1,222 @@
+from django.core.cache import cache
+from django.utils import timezone
+import pytest
+
+from content.models import TestCase
+from progress.kafka_results_consumer import (
+    apply_code_submission_result_payload,
+)
+from progress.models import CodeSubmission, CodeVerdict, UserDailyActivity
+from progress.summary import get_progress_summary
+from progress.verdict_cache import purge_expired_verdicts, verdict_cache_stats
+
+
+@pytest.fixture
+def published(settings, monkeypatch):
+    settings.KAFKA_BOOTSTRAP_SERVERS = "kafka:9092"
+    sent = []
+    monkeypatch.setattr(
+        "progress.signals.enqueue_code_submission",
+        lambda outbox_id, payload: sent.append(payload),
+    )
+    return sent
+
+
+@pytest.fixture
+def challenge_with_tests(coding_challenge):
+    TestCase.objects.create(
+        challenge=coding_challenge, input_data="1", expected_output="2"
+    )
+    TestCase.objects.create(
+        challenge=coding_challenge, input_data="2", expected_output="3"
+    )
+    return coding_challenge
+
+
+def _submit(user, challenge, code, capture):
+    with capture(execute=True):
+        return CodeSubmission.objects.create(
+            user=user, challenge=challenge, code=code, status="pending"
+        )
+
+
+def _finish(sub, status, passed):
+    ok, _reason = apply_code_submission_result_payload(
+        {
+            "submission_public_id": str(sub.public_id),
+            "status": status,
+            "message": "Все тесты пройдены." if passed == 2 else "WA",
+            "passed_tests": passed,
+            "total_tests": 2,
+        }
+    )
+    assert ok
+
+
+@pytest.mark.django_db
+def test_resubmission_completed_from_cache(
+    student_user,
+    challenge_with_tests,
+    published,
+    django_capture_on_commit_callbacks,
+):
+    first = _submit(
+        student_user,
+        challenge_with_tests,
+        "print(int(input()) + 1)",
+        django_capture_on_commit_callbacks,
+    )
+    assert len(published) == 1
+    _finish(first, "accepted", 2)
+    # вердикт пишет консьюмер Kafka, читает веб-процесс: кэш процесса пуст
+    cache.clear()
+
+    again = _submit(
+        student_user,
+        challenge_with_tests,
+        "print(int(input()) + 1)\r\n\r\n",
+        django_capture_on_commit_callbacks,
+    )
+
+    assert len(published) == 1
+    assert again.status == CodeSubmission.STATUS_COMPLETED
+    assert again.completed_at is not None
+    again.refresh_from_db()
+    assert again.status == CodeSubmission.STATUS_COMPLETED
+    assert again.tests_passed == 2
+    assert again.verdict_cache_key == first.verdict_cache_key
+    assert again.verdict_from_cache
+    assert verdict_cache_stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate_percent": 50,
+    }
+
+
+@pytest.mark.django_db
+def test_changed_tests_or_limits_miss_cache(
+    student_user,
+    challenge_with_tests,
+    published,
+    django_capture_on_commit_callbacks,
+):
+    code = "print(0)"
+    first = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+    _finish(first, "wrong_answer", 0)
+
+    case = challenge_with_tests.test_cases.first()
+    case.expected_output = "0"
+    case.save()
+    second = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+    assert second.status == "pending"
+
+    _finish(second, "wrong_answer", 1)
+    challenge_with_tests.time_limit_ms = 5000
+    challenge_with_tests.save()
+    third = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+
+    assert third.status == "pending"
+    assert len(published) == 3
+    assert verdict_cache_stats()["hits"] == 0
+
+
+@pytest.mark.django_db
+def test_timeout_verdict_not_cached(
+    student_user,
+    challenge_with_tests,
+    published,
+    django_capture_on_commit_callbacks,
+):
+    code = "while True: pass"
+    first = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+    _finish(first, "error", 0)
+
+    second = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+
+    assert second.status == "pending"
+    assert len(published) == 2
+
+
+@pytest.mark.django_db
+def test_expired_verdict_misses_and_is_purged(
+    student_user,
+    challenge_with_tests,
+    published,
+    django_capture_on_commit_callbacks,
+):
+    code = "print(1)"
+    first = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+    _finish(first, "wrong_answer", 0)
+    CodeVerdict.objects.update(expires_at=timezone.now())
+
+    second = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+
+    assert second.status == "pending"
+    assert purge_expired_verdicts() == 1
+    assert not CodeVerdict.objects.exists()
+
+
+@pytest.mark.django_db
+def test_cache_hit_counts_activity_and_summary_once(
+    student_user,
+    challenge_with_tests,
+    published,
+    django_capture_on_commit_callbacks,
+):
+    code = "print(int(input()) + 1)"
+    first = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+    _finish(first, "accepted", 2)
+
+    again = _submit(
+        student_user,
+        challenge_with_tests,
+        code,
+        django_capture_on_commit_callbacks,
+    )
+
+    assert again.verdict_from_cache
+    activity = UserDailyActivity.objects.get(
+        user=student_user, date=timezone.localdate()
+    )
+    assert activity.count == 2
+    assert get_progress_summary(student_user).coding_solved == 1
@@ -0,0 +1,194 @@
+"""
+Кэш вердиктов проверки кода.
+
+Ключ — хэш нормализованного кода и «набора тестов» задачи (тесты в порядке
+``order_index`` + лимиты времени и памяти) ровно в том виде, в каком они
+уходят воркеру. Ключ считается из сообщения Kafka, поэтому при изменении
+``TestCase`` или лимитов задачи он просто меняется — старые записи больше
+не находятся и истекают по TTL, отдельная инвалидация не нужна.
+
+Кэшируются только детерминированные вердикты (``accepted`` и
+``wrong_answer``): таймауты и ошибки выполнения могут зависеть от загрузки
+песочницы. Попадание при создании ``CodeSubmission`` завершает отправку
+сразу, без Kafka и прогона.
+
+Вердикты лежат в таблице ``CodeVerdict``, а не в Django cache: пишет их
+консьюмер результатов Kafka, читает веб-процесс, и кэш в памяти процесса
+между ними не работает. Попадания и промахи считаются по самим отправкам
+(``verdict_from_cache`` / ``verdict_cache_key``).
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import hashlib
+import json
+import logging
+from typing import Any
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_CACHEABLE_VERDICTS = frozenset({"accepted", "wrong_answer"})
+# Поля CodeSubmission, которые заполняет вердикт из кэша.
+_SUBMISSION_FIELDS = (
+    "status",
+    "verdict_at",
+    "tests_passed",
+    "total_tests",
+    "error_message",
+    "test_results",
+    "completed_at",
+    "verdict_cache_key",
+    "verdict_from_cache",
+)
+_VERDICT_FIELDS = (
+    "status",
+    "message",
+    "passed_tests",
+    "total_tests",
+    "failed_test_number",
+    "actual_output",
+    "expected_output",
+)
+
+
+def _ttl() -> int:
+    return int(getattr(settings, "CODE_VERDICT_CACHE_TTL", 0) or 0)
+
+
+def normalize_code(code: str | None) -> str:
+    """Переводы строк к ``\\n`` и без хвостовых пробелов в конце файла."""
+    return (code or "").replace("\r\n", "\n").rstrip()
+
+
+def verdict_cache_key(payload: dict[str, Any]) -> str:
+    """Ключ по сообщению для воркера (``build_code_submission_kafka_payload``)."""
+    code_hash = hashlib.sha256(
+        normalize_code(payload.get("code")).encode("utf-8")
+    ).hexdigest()
+    suite = json.dumps(
+        {
+            "limits": payload.get("limits") or {},
+            "test_cases": payload.get("test_cases") or [],
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    suite_hash = hashlib.sha256(suite.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{code_hash}:{suite_hash}".encode()).hexdigest()
+
+
+def lookup_verdict(key: str) -> dict[str, Any] | None:
+    """Непросроченный вердикт по ключу или ``None``."""
+    from progress.models import CodeVerdict
+
+    if not key or _ttl() <= 0:
+        return None
+    return (
+        CodeVerdict.objects.filter(key=key, expires_at__gt=timezone.now())
+        .values_list("verdict", flat=True)
+        .first()
+    )
+
+
+def remember_verdict(submission, payload: dict[str, Any]) -> None:
+    """Сохранить вердикт воркера под ключом, посчитанным при отправке."""
+    key = submission.verdict_cache_key
+    status = (payload.get("status") or "").strip().lower()
+    if not key or _ttl() <= 0 or status not in _CACHEABLE_VERDICTS:
+        return
+    from progress.models import CodeVerdict
+
+    verdict = {f: payload[f] for f in _VERDICT_FIELDS if f in payload}
+    verdict["status"] = status
+    CodeVerdict.objects.update_or_create(
+        key=key,
+        defaults={
+            "verdict": verdict,
+            "expires_at": timezone.now() + timedelta(seconds=_ttl()),
+        },
+    )
+
+
+def complete_from_cache(submission, payload: dict[str, Any]) -> bool:
+    """
+    Новая отправка: запомнить ключ и, если вердикт уже известен, сразу
+    завершить её. ``False`` — нужно отправлять на проверку.
+
+    Вызывается из ``post_save`` создания, поэтому вердикт пишется
+    ``update()`` без вложенного ``save()``, а сводка и активность
+    учитываются здесь один раз (``_progress_counted`` — обработчики
+    ``post_save`` создания строку уже не считают).
+    """
+    from progress.activity import bump_activity
+    from progress.kafka_results_consumer import _set_verdict
+    from progress.models import CodeSubmission
+    from progress.summary import KIND_CODING, apply_progress_change
+
+    if _ttl() <= 0:
+        return False
+    key = verdict_cache_key(payload)
+    submission.verdict_cache_key = key
+    verdict = lookup_verdict(key)
+    if verdict is None:
+        CodeSubmission.objects.filter(pk=submission.pk).update(
+            verdict_cache_key=key
+        )
+        return False
+    submission.verdict_from_cache = True
+    _set_verdict(submission, verdict)
+    CodeSubmission.objects.filter(pk=submission.pk).update(
+        **{field: getattr(submission, field) for field in _SUBMISSION_FIELDS}
+    )
+    submission._progress_counted = True
+    if submission.status == CodeSubmission.STATUS_COMPLETED:
+        apply_progress_change(
+            submission.user_id, KIND_CODING, submission.challenge
+        )
+        bump_activity(
+            submission.user_id, timezone.localdate(submission.completed_at)
+        )
+    if submission.exam_attempt_id:
+        from exams.services import record_coding_submission
+
+        record_coding_submission(submission.exam_attempt, submission)
+    logger.info(
+        "Отправка кода %s: вердикт %r из кэша, тесты %s/%s.",
+        submission.public_id,
+        verdict.get("status"),
+        submission.tests_passed,
+        submission.total_tests,
+    )
+    return True
+
+
+def purge_expired_verdicts() -> int:
+    """Удалить просроченные вердикты; возвращает число удалённых строк."""
+    from progress.models import CodeVerdict
+
+    deleted, _ = CodeVerdict.objects.filter(
+        expires_at__lte=timezone.now()
+    ).delete()
+    return deleted
+
+
+def verdict_cache_stats() -> dict[str, int]:
+    """Попадания и промахи по всем отправкам, прошедшим через кэш."""
+    from progress.models import CodeSubmission
+
+    counts = CodeSubmission.objects.exclude(verdict_cache_key="").aggregate(
+        total=Count("pk"),
+        hits=Count("pk", filter=Q(verdict_from_cache=True)),
+    )
+    total = counts["total"]
+    hits = counts["hits"]
+    misses = total - hits
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate_percent": round(hits * 100 / total) if total else 0,
+    }
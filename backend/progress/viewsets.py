@@ -189,6 +189,9 @@ class UserCodeSubmissionViewSet(
     3. Создаётся запись со статусом ``pending``; при настроенном Kafka сообщение
        уходит в воркер, а ответ из топика результатов подхватывает
        ``consume_code_submission_results`` (вердикт ``accepted`` → ``completed``).
+       Вердикт приходит событием ``submission.updated`` в WebSocket
+       ``ws/progress/code/?token=<JWT>`` (``?since=<cursor>`` — пропущенные
+       после переподключения), опрашивать ``GET`` не нужно.
 
     **Чтение**
 
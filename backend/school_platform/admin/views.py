@@ -9,6 +9,25 @@ from django.utils.translation import gettext as _
 User = get_user_model()
 
 
+def _average_active_progress() -> int:
+    """Средний прогресс активных записей: пачка на курс, не запрос на запись."""
+    from content.models import Course
+    from education.models import Enrollment
+    from progress.stats import get_course_progress_bulk
+
+    by_course: dict[int, list[int]] = {}
+    for course_id, user_id in Enrollment.objects.filter(
+        status=Enrollment.Status.ACTIVE, course__is_active=True
+    ).values_list("course_id", "user_id"):
+        by_course.setdefault(course_id, []).append(user_id)
+
+    percents: list[int] = []
+    for course in Course.objects.filter(pk__in=by_course):
+        progress = get_course_progress_bulk(course, by_course[course.pk])
+        percents.extend(row["percent"] for row in progress.values())
+    return round(sum(percents) / len(percents)) if percents else 0
+
+
 def dashboard_callback(request, context):
     now = timezone.now()
     month_ago = now - timedelta(days=30)
@@ -19,9 +38,11 @@ def dashboard_callback(request, context):
     total_courses = 0
     active_students = 0
     completed_courses = 0
+    avg_progress_percent = 0
     pro_active = 0
     exam_attempts_7d = 0
     submissions_7d = 0
+    verdict_cache = {"hits": 0, "misses": 0, "hit_rate_percent": 0}
     course_names = []
     course_counts = []
     call_stats_7d = None
@@ -34,6 +55,7 @@ def dashboard_callback(request, context):
         from content.models import Course
         from education.models import Enrollment
         from progress.models import CodeSubmission
+        from progress.verdict_cache import verdict_cache_stats
         from subscriptions.models import Entitlement
 
         call_stats_7d = build_call_stats(days=7)
@@ -50,6 +72,8 @@ def dashboard_callback(request, context):
             status=Enrollment.Status.COMPLETED
         ).count()
 
+        avg_progress_percent = _average_active_progress()
+
         top = (
             Enrollment.objects.values("course__title")
             .annotate(c=Count("id"))
@@ -64,6 +88,7 @@ def dashboard_callback(request, context):
         submissions_7d = CodeSubmission.objects.filter(
             submitted_at__gte=week_ago
         ).count()
+        verdict_cache = verdict_cache_stats()
 
         pro_active = (
             Entitlement.objects.filter(
@@ -110,9 +135,11 @@ def dashboard_callback(request, context):
             "total_courses": total_courses,
             "active_students": active_students,
             "completed_courses": completed_courses,
+            "avg_progress_percent": avg_progress_percent,
             "pro_active": pro_active,
             "exam_attempts_7d": exam_attempts_7d,
             "submissions_7d": submissions_7d,
+            "verdict_cache": verdict_cache,
             "months_json": json.dumps(months, ensure_ascii=False),
             "activity_data_json": json.dumps(activity_data),
             "course_names_json": json.dumps(course_names, ensure_ascii=False),
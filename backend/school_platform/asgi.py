@@ -7,12 +7,21 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "school_platform.settings")
 
 django_asgi_app = get_asgi_application()
 
-from communication.routing import websocket_urlpatterns  # noqa: E402
+from communication.routing import (  # noqa: E402
+    websocket_urlpatterns as chat_websocket_urlpatterns,
+)
 from communication.ws_auth import JWTAuthMiddlewareStack  # noqa: E402
+from progress.routing import (  # noqa: E402
+    websocket_urlpatterns as progress_websocket_urlpatterns,
+)
 
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
-        "websocket": JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns)),
+        "websocket": JWTAuthMiddlewareStack(
+            URLRouter(
+                chat_websocket_urlpatterns + progress_websocket_urlpatterns
+            )
+        ),
     }
 )
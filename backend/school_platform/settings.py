@@ -307,10 +307,43 @@ CACHES = {
             "CACHE_BACKEND",
             default="django.core.cache.backends.locmem.LocMemCache",
         ),
-        "LOCATION": "school-platform-cache",
-    }
+        "LOCATION": config("CACHE_LOCATION", default="school-platform-cache"),
+    },
+    # Общий для всех процессов (daphne, celery, beat, консьюмер Kafka):
+    # версии манифестов и ответов каталога, токены WebSocket, лимит VK API.
+    # В docker-compose — Redis; LocMem годится только для одного процесса
+    # (тесты, runserver).
+    "shared": {
+        "BACKEND": config(
+            "SHARED_CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config(
+            "SHARED_CACHE_LOCATION", default="school-platform-shared"
+        ),
+    },
 }
 
+# Манифест уроков курса (content.lesson_manifest): TTL в общем cache и
+# размер LRU в памяти процесса.
+LESSON_MANIFEST_CACHE_TTL = config(
+    "LESSON_MANIFEST_CACHE_TTL", default=86400, cast=int
+)
+LESSON_MANIFEST_LRU_SIZE = config(
+    "LESSON_MANIFEST_LRU_SIZE", default=128, cast=int
+)
+# Анонимные ответы каталога и оглавления курса (content.response_cache),
+# секунды; 0 — выкл.
+CONTENT_RESPONSE_CACHE_TTL = config(
+    "CONTENT_RESPONSE_CACHE_TTL", default=600, cast=int
+)
+
+# Кэш вердиктов проверки кода (progress.verdict_cache, таблица
+# CodeVerdict), срок жизни записи в секундах; 0 — выкл.
+CODE_VERDICT_CACHE_TTL = config(
+    "CODE_VERDICT_CACHE_TTL", default=7 * 86400, cast=int
+)
+
 AUTH_PASSWORD_VALIDATORS: list[dict[str, Any]] = [
     # {
     #     "NAME": "users.validators.CustomPasswordValidator",
@@ -423,7 +456,24 @@ CELERY_BEAT_SCHEDULE = {
         "task": "notify.send_study_reminders",
         "schedule": crontab(hour=18, minute=0),
     },
+    "relay-code-submission-outbox": {
+        "task": "progress.relay_code_submission_outbox",
+        "schedule": crontab(),
+    },
+    "purge-expired-code-verdicts": {
+        "task": "progress.purge_expired_verdicts",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "expire-overdue-exam-attempts": {
+        "task": "exams.expire_overdue_attempts",
+        "schedule": crontab(),
+    },
 }
+# Сколько просроченных попыток КР завершать за одну транзакцию
+# (exams.services.expire_overdue_attempts).
+EXAM_EXPIRY_BATCH_SIZE = config(
+    "EXAM_EXPIRY_BATCH_SIZE", default=200, cast=int
+)
 
 # LiveKit (видеоконференции ментор ↔ участник)
 LIVEKIT_URL = config("LIVEKIT_URL", default="").strip()
@@ -438,6 +488,26 @@ CONFERENCE_WAITING_TTL_HOURS = config(
 CONFERENCE_MENTOR_ABSENCE_MINUTES = config(
     "CONFERENCE_MENTOR_ABSENCE_MINUTES", default=5, cast=int
 )
+# События чата в WebSocket: очередь фоновой рассылки после commit
+# (communication.chat_broadcast); 0 — отправка в потоке запроса.
+CHAT_WS_DISPATCH_QUEUE_SIZE = config(
+    "CHAT_WS_DISPATCH_QUEUE_SIZE", default=1000, cast=int
+)
+# Кэш проверки JWT при подключении WebSocket (communication.ws_auth), сек.;
+# 0 — пользователь читается из БД при каждом подключении.
+WS_AUTH_CACHE_TTL = config("WS_AUTH_CACHE_TTL", default=60, cast=int)
+# Сокет пользователя ``ws/chat/`` (communication.consumers.UserChatConsumer):
+# очередь исходящих кадров одного соединения (при переполнении — resync),
+# закрытие без кадров от клиента и интервал пересылки «печатает».
+CHAT_WS_USER_QUEUE_SIZE = config(
+    "CHAT_WS_USER_QUEUE_SIZE", default=200, cast=int
+)
+CHAT_WS_IDLE_TIMEOUT_SEC = config(
+    "CHAT_WS_IDLE_TIMEOUT_SEC", default=90, cast=float
+)
+CHAT_WS_TYPING_INTERVAL_SEC = config(
+    "CHAT_WS_TYPING_INTERVAL_SEC", default=2, cast=float
+)
 
 WHITEBOARD_SYNC_SECRET = config("WHITEBOARD_SYNC_SECRET", default="").strip()
 WHITEBOARD_ENABLED = config("WHITEBOARD_ENABLED", default=True, cast=bool)
@@ -462,11 +532,27 @@ VK_CALLBACK_CONFIRMATION = config(
     "VK_CALLBACK_CONFIRMATION", default=""
 ).strip()
 VK_CALLBACK_SECRET = config("VK_CALLBACK_SECRET", default="").strip()
+# Клиент VK API (notify.vk_api): адрес, запросов в секунду на ключ
+# сообщества — общий лимит всех процессов через cache "shared" (0 — без
+# ограничения), повторы при ошибках 6/9 и сетевых сбоях.
+VK_API_URL = config("VK_API_URL", default="https://api.vk.com/method").strip()
+VK_API_RATE_PER_SEC = config("VK_API_RATE_PER_SEC", default=20, cast=float)
+VK_API_MAX_RETRIES = config("VK_API_MAX_RETRIES", default=3, cast=int)
+VK_API_RETRY_BACKOFF_SEC = config(
+    "VK_API_RETRY_BACKOFF_SEC", default=0.5, cast=float
+)
 VAPID_PUBLIC_KEY = config("VAPID_PUBLIC_KEY", default="").strip()
 VAPID_PRIVATE_KEY = config("VAPID_PRIVATE_KEY", default="").strip()
 VAPID_ADMIN_EMAIL = config(
     "VAPID_ADMIN_EMAIL", default="mailto:admin@bervinov-academy.local"
 ).strip()
+# Массовые уведомления (notify.dispatch.create_and_deliver_many): сколько
+# получателей в одной задаче доставки и сколько Web Push / соединений к VK
+# одновременно.
+NOTIFY_DELIVERY_BATCH_SIZE = config(
+    "NOTIFY_DELIVERY_BATCH_SIZE", default=500, cast=int
+)
+NOTIFY_PUSH_WORKERS = config("NOTIFY_PUSH_WORKERS", default=16, cast=int)
 
 # Kafka (опционально: пустой KAFKA_BOOTSTRAP_SERVERS — не публикуем)
 KAFKA_BOOTSTRAP_SERVERS = config("KAFKA_BOOTSTRAP_SERVERS", default="").strip()
@@ -482,6 +568,43 @@ KAFKA_GROUP_CODE_RESULTS = config(
 KAFKA_RESULTS_AUTO_OFFSET_RESET = config(
     "KAFKA_RESULTS_AUTO_OFFSET_RESET", default="earliest"
 ).strip()
+# Consumer результатов: пачка сообщений на транзакцию и пауза после сбоя БД.
+KAFKA_RESULTS_BATCH_SIZE = config(
+    "KAFKA_RESULTS_BATCH_SIZE", default=100, cast=int
+)
+KAFKA_RESULTS_RETRY_BACKOFF_SEC = config(
+    "KAFKA_RESULTS_RETRY_BACKOFF_SEC", default=5, cast=int
+)
+# Поток submission.updated (ws/progress/code/): сколько пропущенных
+# вердиктов отдаётся при переподключении с ?since=.
+CODE_SUBMISSION_WS_REPLAY_LIMIT = config(
+    "CODE_SUBMISSION_WS_REPLAY_LIMIT", default=100, cast=int
+)
+# Публикация отправок: фоновый producer + outbox (progress.kafka_outbox).
+KAFKA_PRODUCER_LINGER_MS = config(
+    "KAFKA_PRODUCER_LINGER_MS", default=50, cast=int
+)
+KAFKA_PRODUCER_BATCH_BYTES = config(
+    "KAFKA_PRODUCER_BATCH_BYTES", default=65536, cast=int
+)
+KAFKA_PRODUCER_COMPRESSION = config(
+    "KAFKA_PRODUCER_COMPRESSION", default="gzip"
+).strip()
+KAFKA_PRODUCER_MAX_BLOCK_MS = config(
+    "KAFKA_PRODUCER_MAX_BLOCK_MS", default=10000, cast=int
+)
+KAFKA_PUBLISH_QUEUE_SIZE = config(
+    "KAFKA_PUBLISH_QUEUE_SIZE", default=1000, cast=int
+)
+KAFKA_OUTBOX_BATCH_SIZE = config(
+    "KAFKA_OUTBOX_BATCH_SIZE", default=200, cast=int
+)
+KAFKA_OUTBOX_RELAY_GRACE_SEC = config(
+    "KAFKA_OUTBOX_RELAY_GRACE_SEC", default=30, cast=int
+)
+KAFKA_OUTBOX_FLUSH_TIMEOUT_SEC = config(
+    "KAFKA_OUTBOX_FLUSH_TIMEOUT_SEC", default=30, cast=int
+)
 
 # Логирование (уровень: DEBUG, INFO, WARNING, ERROR)
 _LOG_LEVEL_RAW = config("DJANGO_LOG_LEVEL", default="INFO").upper()
@@ -0,0 +1,20 @@
+"""Cache ``shared``: в продакшене он не должен жить в памяти процесса."""
+
+from common.shared_cache import check_shared_cache
+from django.test import override_settings
+
+_REDIS = {
+    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+    "LOCATION": "redis://redis:6379/2",
+}
+_LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+
+def test_process_local_shared_cache_warns_in_production():
+    with override_settings(DEBUG=False, CACHES={"shared": _LOCMEM}):
+        assert [w.id for w in check_shared_cache()] == ["common.W001"]
+
+
+def test_redis_shared_cache_passes_check():
+    with override_settings(DEBUG=False, CACHES={"shared": _REDIS}):
+        assert check_shared_cache() == []
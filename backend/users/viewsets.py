@@ -1,4 +1,5 @@
 from common.drf import UUID_LOOKUP_REGEX
+from django.contrib.auth.signals import user_logged_out
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import (
@@ -196,6 +197,12 @@ class UserLogoutViewSet(viewsets.GenericViewSet):
             if refresh_token:
                 token = RefreshToken(refresh_token)
                 token.blacklist()
+            # Отзыв текущего access-токена (кэш аутентификации WebSocket).
+            user_logged_out.send(
+                sender=request.user.__class__,
+                request=request,
+                user=request.user,
+            )
             return Response(
                 {"message": "Выход выполнен успешно"},
                 status=status.HTTP_200_OK,
@@ -23,6 +23,18 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if raw is None or not str(raw).strip():
+        return default
+    return str(raw).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_judge_mode(name: str) -> str:
+    mode = _env(name, "subprocess").lower()
+    return mode if mode in ("subprocess", "fork") else "subprocess"
+
+
 @dataclass(frozen=True)
 class Settings:
     kafka_bootstrap_servers: str
@@ -37,6 +49,16 @@ class Settings:
     sandbox_cpu_period: int
     sandbox_cpu_quota: int
     sandbox_pids_limit: int
+    # Пул «тёплых» контейнеров песочницы; 0 — контейнер на каждую отправку.
+    sandbox_pool_size: int
+    sandbox_pool_max_runs: int
+    sandbox_pool_recycle_on_error: bool
+    # Сколько ждать проверки в работе при остановке воркера.
+    shutdown_drain_timeout_sec: int
+    # Режим judge: ``subprocess`` (процесс на тест) или ``fork``.
+    judge_mode: str
+    # Тестов одновременно внутри песочницы (не больше CPU по квоте).
+    judge_workers: int
 
 
 def load_settings() -> Settings:
@@ -63,4 +85,14 @@ def load_settings() -> Settings:
             1000, _env_int("SANDBOX_CPU_QUOTA", 100_000)
         ),
         sandbox_pids_limit=max(8, _env_int("SANDBOX_PIDS_LIMIT", 128)),
+        sandbox_pool_size=max(0, _env_int("SANDBOX_POOL_SIZE", 2)),
+        sandbox_pool_max_runs=max(1, _env_int("SANDBOX_POOL_MAX_RUNS", 50)),
+        sandbox_pool_recycle_on_error=_env_bool(
+            "SANDBOX_POOL_RECYCLE_ON_ERROR", True
+        ),
+        shutdown_drain_timeout_sec=max(
+            1, _env_int("SHUTDOWN_DRAIN_TIMEOUT_SEC", 120)
+        ),
+        judge_mode=_env_judge_mode("JUDGE_MODE"),
+        judge_workers=max(1, _env_int("JUDGE_WORKERS", 1)),
     )
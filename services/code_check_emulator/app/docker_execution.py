@@ -1,5 +1,6 @@
 """
-Сборка manifest, запуск одного контейнера песочницы, разбор JSON-результата.
+Сборка manifest, запуск контейнера песочницы (одноразового или из пула),
+разбор JSON-результата.
 """
 
 from __future__ import annotations
@@ -11,6 +12,12 @@ import logging
 import tarfile
 from typing import Any
 
+from app.sandbox_pool import (
+    SandboxPool,
+    get_sandbox_pool,
+    sandbox_container_kwargs,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,8 +28,16 @@ def normalize_stdout_for_compare(s: str | None) -> str:
     return str(s).rstrip("\n")
 
 
-def build_manifest_from_payload(incoming: dict[str, Any]) -> dict[str, Any]:
-    """Упорядочить тесты по ``order_index`` и вынести лимиты из payload."""
+def build_manifest_from_payload(
+    incoming: dict[str, Any],
+    judge_mode: str = "subprocess",
+    judge_workers: int = 1,
+) -> dict[str, Any]:
+    """
+    Упорядочить тесты по ``order_index`` и вынести лимиты из payload.
+    ``judge_mode`` и ``judge_workers`` — как judge запускает решение и
+    сколько тестов одновременно (см. ``judge.py``).
+    """
     code = incoming.get("code")
     if code is None:
         code = ""
@@ -64,6 +79,8 @@ def build_manifest_from_payload(incoming: dict[str, Any]) -> dict[str, Any]:
         "test_cases": cases,
         "time_limit_ms": max(time_limit_ms, 1),
         "memory_limit_mb": max(memory_limit_mb, 32),
+        "judge_mode": judge_mode,
+        "judge_workers": max(1, int(judge_workers)),
     }
 
 
@@ -154,6 +171,143 @@ def _manifest_tar_for_put_archive(manifest: dict[str, Any]) -> bytes:
     return buf.getvalue()
 
 
+def _error_payload(
+    submission_id: str, total_cases: int, message: str
+) -> dict[str, Any]:
+    return build_kafka_payload_from_sandbox(
+        submission_id,
+        {
+            "status": "error",
+            "passed_tests": 0,
+            "total_tests": total_cases,
+            "message": message,
+        },
+    )
+
+
+def _payload_from_judge_run(
+    submission_id: str,
+    total_cases: int,
+    exit_code: int,
+    stdout: str,
+    stderr: str,
+) -> dict[str, Any]:
+    """Итог прогона judge (код выхода + stdout) → payload результата."""
+    if exit_code != 0:
+        logger.warning(
+            "Контейнер песочницы завершился с ошибкой submission=%s "
+            "exit=%s stderr_tail=%r",
+            submission_id,
+            exit_code,
+            (stderr or "")[-400:],
+        )
+        try:
+            parsed = parse_judge_stdout(stdout)
+            sandbox = _validate_sandbox_result(parsed)
+        except (ValueError, json.JSONDecodeError, TypeError):
+            sandbox = {
+                "status": "error",
+                "passed_tests": 0,
+                "total_tests": total_cases,
+                "message": "Песочница завершилась с ошибкой без результата.",
+            }
+        return build_kafka_payload_from_sandbox(submission_id, sandbox)
+
+    try:
+        parsed = parse_judge_stdout(stdout)
+        sandbox = _validate_sandbox_result(parsed)
+    except (ValueError, json.JSONDecodeError, TypeError) as e:
+        logger.warning(
+            "Не удалось разобрать stdout песочницы submission=%s: %s",
+            submission_id,
+            e,
+        )
+        sandbox = {
+            "status": "error",
+            "passed_tests": 0,
+            "total_tests": total_cases,
+            "message": "Некорректный ответ песочницы.",
+        }
+    return build_kafka_payload_from_sandbox(submission_id, sandbox)
+
+
+def _outer_timeout(manifest: dict[str, Any], settings: Any) -> int:
+    time_ms = int(manifest["time_limit_ms"])
+    outer_timeout = int(time_ms / 1000) + int(
+        settings.docker_run_timeout_buffer_sec
+    )
+    return max(outer_timeout, 5)
+
+
+def run_submission_in_pool(
+    incoming: dict[str, Any],
+    settings: Any,
+    pool: SandboxPool,
+) -> dict[str, Any]:
+    """
+    Прогон в тёплом контейнере пула: manifest через ``put_archive``, judge
+    через ``exec`` под ``timeout``. Контейнер возвращается в пул только
+    после чистого прогона (и, при ``sandbox_pool_recycle_on_error``, если
+    вердикт не ``error``).
+    """
+    submission_id = str(incoming.get("submission_public_id") or "")
+    manifest = build_manifest_from_payload(
+        incoming,
+        judge_mode=settings.judge_mode,
+        judge_workers=settings.judge_workers,
+    )
+    total_cases = len(manifest["test_cases"])
+    manifest_tar = _manifest_tar_for_put_archive(manifest)
+    outer_timeout = _outer_timeout(manifest, settings)
+
+    try:
+        sandbox = pool.acquire(int(manifest["memory_limit_mb"]))
+    except Exception as e:
+        logger.exception(
+            "Пул песочниц: нет контейнера для submission=%s",
+            submission_id,
+        )
+        return _error_payload(
+            submission_id, total_cases, f"Ошибка Docker: {e}"
+        )
+
+    healthy = False
+    try:
+        try:
+            run = pool.run(sandbox, manifest_tar, outer_timeout)
+        except Exception as e:
+            logger.exception(
+                "Ошибка Docker при прогоне в пуле, submission=%s",
+                submission_id,
+            )
+            return _error_payload(
+                submission_id, total_cases, f"Ошибка Docker: {e}"
+            )
+        if run.killed:
+            logger.warning(
+                "Таймаут ожидания песочницы submission=%s", submission_id
+            )
+            return _error_payload(
+                submission_id,
+                total_cases,
+                "Превышено время ожидания проверки (Docker).",
+            )
+        payload = _payload_from_judge_run(
+            submission_id,
+            total_cases,
+            run.exit_code,
+            run.stdout,
+            run.stderr,
+        )
+        healthy = run.exit_code == 0 and not (
+            settings.sandbox_pool_recycle_on_error
+            and payload["status"] == "error"
+        )
+        return payload
+    finally:
+        pool.release(sandbox, healthy)
+
+
 def run_submission_in_docker(
     incoming: dict[str, Any],
     settings: Any,
@@ -162,42 +316,32 @@ def run_submission_in_docker(
     Один контейнер песочницы на отправку. Manifest передаётся через API
     ``put_archive`` в ``/work``. При ``read_only`` rootfs запись в ``/work`` из
     слоя образа невозможна, поэтому на ``/work`` вешается анонимный volume.
+
+    При ``sandbox_pool_size > 0`` прогон идёт в тёплом контейнере пула
+    (``run_submission_in_pool``).
     """
+    pool = get_sandbox_pool(settings)
+    if pool is not None:
+        return run_submission_in_pool(incoming, settings, pool)
+
     import docker
     from docker.errors import APIError, DockerException
-    from docker.types import Mount
     from requests.exceptions import ReadTimeout
 
     submission_id = str(incoming.get("submission_public_id") or "")
-    manifest = build_manifest_from_payload(incoming)
+    manifest = build_manifest_from_payload(
+        incoming,
+        judge_mode=settings.judge_mode,
+        judge_workers=settings.judge_workers,
+    )
     total_cases = len(manifest["test_cases"])
     manifest_tar = _manifest_tar_for_put_archive(manifest)
-
-    mem_mb = int(manifest["memory_limit_mb"])
-    time_ms = int(manifest["time_limit_ms"])
-    outer_timeout = int(time_ms / 1000) + int(
-        settings.docker_run_timeout_buffer_sec
-    )
-    outer_timeout = max(outer_timeout, 5)
+    outer_timeout = _outer_timeout(manifest, settings)
 
     client = docker.from_env()
-    run_kw: dict[str, Any] = {
-        "network_mode": "none",
-        "read_only": True,
-        # Writable /work for put_archive while rootfs stays read-only.
-        "mounts": [Mount("/work", None, type="volume")],
-        "tmpfs": {
-            "/tmp": "rw,nosuid,nodev,size=64m",
-        },
-        "mem_limit": f"{mem_mb}m",
-        "memswap_limit": f"{mem_mb}m",
-        "cpu_period": int(settings.sandbox_cpu_period),
-        "cpu_quota": int(settings.sandbox_cpu_quota),
-        "cap_drop": ["ALL"],
-        "security_opt": ["no-new-privileges:true"],
-        "pids_limit": int(settings.sandbox_pids_limit),
-        "user": "1000:1000",
-    }
+    run_kw = sandbox_container_kwargs(
+        settings, int(manifest["memory_limit_mb"])
+    )
     container = None
     try:
         try:
@@ -281,47 +425,13 @@ def run_submission_in_docker(
             exit_code = int(wait_out.get("StatusCode", -1))
             stdout_b = container.logs(stdout=True, stderr=False) or b""
             stderr_b = container.logs(stdout=False, stderr=True) or b""
-            stdout = stdout_b.decode("utf-8", errors="replace")
-            stderr = stderr_b.decode("utf-8", errors="replace")
-
-            if exit_code != 0:
-                logger.warning(
-                    "Контейнер песочницы завершился с ошибкой submission=%s "
-                    "exit=%s stderr_tail=%r",
-                    submission_id,
-                    exit_code,
-                    (stderr or "")[-400:],
-                )
-                try:
-                    parsed = parse_judge_stdout(stdout)
-                    sandbox = _validate_sandbox_result(parsed)
-                except (ValueError, json.JSONDecodeError, TypeError):
-                    sandbox = {
-                        "status": "error",
-                        "passed_tests": 0,
-                        "total_tests": total_cases,
-                        "message": (
-                            "Песочница завершилась с ошибкой без результата."
-                        ),
-                    }
-                return build_kafka_payload_from_sandbox(submission_id, sandbox)
-
-            try:
-                parsed = parse_judge_stdout(stdout)
-                sandbox = _validate_sandbox_result(parsed)
-            except (ValueError, json.JSONDecodeError, TypeError) as e:
-                logger.warning(
-                    "Не удалось разобрать stdout песочницы submission=%s: %s",
-                    submission_id,
-                    e,
-                )
-                sandbox = {
-                    "status": "error",
-                    "passed_tests": 0,
-                    "total_tests": total_cases,
-                    "message": "Некорректный ответ песочницы.",
-                }
-            return build_kafka_payload_from_sandbox(submission_id, sandbox)
+            return _payload_from_judge_run(
+                submission_id,
+                total_cases,
+                exit_code,
+                stdout_b.decode("utf-8", errors="replace"),
+                stderr_b.decode("utf-8", errors="replace"),
+            )
         except APIError as e:
             logger.exception(
                 "Ошибка Docker при ожидании контейнера или чтении логов, submission=%s",
@@ -0,0 +1,101 @@
+"""
+Параллельная обработка сообщений Kafka с ручным commit.
+
+``InFlightSet`` ограничивает число одновременных проверок, ``OffsetTracker``
+для каждой партиции отдаёт к commit только непрерывный префикс
+обработанных offset'ов: сообщение, результат которого ещё не отправлен
+(или не отправился), не даёт закоммитить ни его, ни более поздние — после
+падения они будут прочитаны заново.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetTracker:
+    def __init__(self) -> None:
+        self._pending: dict[Hashable, deque[int]] = {}
+        self._done: dict[Hashable, set[int]] = {}
+
+    def started(self, partition: Hashable, offset: int) -> None:
+        """Сообщение взято в работу (offset'ы партиции идут по возрастанию)."""
+        self._pending.setdefault(partition, deque()).append(offset)
+
+    def finished(self, partition: Hashable, offset: int) -> None:
+        """Результат по сообщению отправлен."""
+        if partition in self._pending:
+            self._done.setdefault(partition, set()).add(offset)
+
+    def take_commit(self) -> dict[Hashable, int]:
+        """``{partition: следующий offset}`` там, где есть что коммитить."""
+        commits: dict[Hashable, int] = {}
+        for partition, pending in self._pending.items():
+            done = self._done.get(partition)
+            last = None
+            while pending and done and pending[0] in done:
+                last = pending.popleft()
+                done.discard(last)
+            if last is not None:
+                commits[partition] = last + 1
+        return commits
+
+    def in_progress(self) -> int:
+        return sum(len(p) for p in self._pending.values())
+
+    def forget(self, partitions) -> None:
+        """Партиции отозваны при ребалансе — их offset'ы больше не наши."""
+        for partition in partitions:
+            self._pending.pop(partition, None)
+            self._done.pop(partition, None)
+
+
+class InFlightSet:
+    """Не больше ``limit`` задач одновременно; ошибка задачи запоминается."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self._tasks: set[asyncio.Task] = set()
+        self._error: BaseException | None = None
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.limit - len(self._tasks))
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None and self._error is None:
+            self._error = exc
+
+    async def wait_for_slot(self) -> None:
+        while self._tasks and not self.free_slots:
+            await asyncio.wait(
+                set(self._tasks), return_when=asyncio.FIRST_COMPLETED
+            )
+
+    async def drain(self) -> None:
+        """Дождаться всех задач (новые в это время не запускаются)."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    def raise_if_failed(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -1,13 +1,18 @@
-"""FastAPI: health + Kafka consumer → один Docker-run на отправку → результат."""
+"""FastAPI: health + Kafka consumer → прогон в песочнице Docker → результат."""
 
 from __future__ import annotations
 
 import asyncio
 import json
 import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import (
+    AIOKafkaConsumer,
+    AIOKafkaProducer,
+    ConsumerRebalanceListener,
+)
 from fastapi import FastAPI
 
 from app.config import Settings, load_settings
@@ -15,6 +20,8 @@ from app.docker_execution import (
     build_kafka_payload_from_sandbox,
     run_submission_check,
 )
+from app.inflight import InFlightSet, OffsetTracker
+from app.sandbox_pool import close_sandbox_pool, get_sandbox_pool
 
 logger = logging.getLogger(__name__)
 
@@ -27,18 +34,25 @@ async def _handle_message(
     raw: bytes | None,
     producer: AIOKafkaProducer,
     settings: Settings,
-    semaphore: asyncio.Semaphore,
-) -> None:
+    executor: Executor | None = None,
+) -> bool:
+    """
+    Проверить отправку и опубликовать результат.
+
+    ``True`` — сообщение обработано (результат отправлен или сообщение
+    битое и пропущено), его offset можно коммитить; ``False`` — результат
+    не ушёл в Kafka.
+    """
     if raw is None:
-        return
+        return True
     try:
         incoming = json.loads(raw.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError):
         logger.exception("Некорректный JSON в сообщении Kafka, пропуск")
-        return
+        return True
     if not isinstance(incoming, dict):
         logger.warning("Ожидался объект JSON, получено: %s", type(incoming))
-        return
+        return True
 
     user_id = incoming.get("user_public_id", "?")
     challenge_id = incoming.get("challenge_public_id", "?")
@@ -50,33 +64,30 @@ async def _handle_message(
         challenge_id,
     )
 
-    async with semaphore:
-        try:
-            payload = await asyncio.to_thread(
-                run_submission_check, incoming, settings
-            )
-        except Exception:
-            logger.exception(
-                "Ошибка проверки submission=%s",
-                sub_id,
-            )
-            raw_cases = incoming.get("test_cases") or []
-            total = (
-                len(raw_cases) if isinstance(raw_cases, list) else 0
-            )
-            sid = str(incoming.get("submission_public_id") or "")
-            payload = build_kafka_payload_from_sandbox(
-                sid,
-                {
-                    "status": "error",
-                    "passed_tests": 0,
-                    "total_tests": total,
-                    "message": (
-                        "Исключение воркера при проверке "
-                        "(см. логи code-check-runner)."
-                    ),
-                },
-            )
+    try:
+        payload = await asyncio.get_running_loop().run_in_executor(
+            executor, run_submission_check, incoming, settings
+        )
+    except Exception:
+        logger.exception(
+            "Ошибка проверки submission=%s",
+            sub_id,
+        )
+        raw_cases = incoming.get("test_cases") or []
+        total = len(raw_cases) if isinstance(raw_cases, list) else 0
+        sid = str(incoming.get("submission_public_id") or "")
+        payload = build_kafka_payload_from_sandbox(
+            sid,
+            {
+                "status": "error",
+                "passed_tests": 0,
+                "total_tests": total,
+                "message": (
+                    "Исключение воркера при проверке "
+                    "(см. логи code-check-runner)."
+                ),
+            },
+        )
     try:
         await producer.send_and_wait(settings.kafka_topic_out, payload)
     except Exception:
@@ -84,49 +95,121 @@ async def _handle_message(
             "Не удалось отправить результат в Kafka для submission=%s",
             sub_id,
         )
+        return False
+    return True
 
 
-async def _consume_once(settings: Settings) -> None:
-    """Один цикл подключения к Kafka. Падает при обрыве — вызывающий ретраит."""
+class _DrainOnRevoke(ConsumerRebalanceListener):
+    """Перед отзывом партиций дождаться их проверок и закоммитить offset'ы."""
+
+    def __init__(self, consumer, tracker, inflight) -> None:
+        self._consumer = consumer
+        self._tracker = tracker
+        self._inflight = inflight
+
+    async def on_partitions_revoked(self, revoked) -> None:
+        await self._inflight.drain()
+        await _commit_done(self._consumer, self._tracker)
+        self._tracker.forget(revoked)
+
+    async def on_partitions_assigned(self, assigned) -> None:
+        pass
+
+
+async def _commit_done(consumer: AIOKafkaConsumer, tracker) -> None:
+    offsets = tracker.take_commit()
+    if offsets:
+        await consumer.commit(offsets)
+
+
+async def _process_record(record, tp, producer, settings, executor, tracker):
+    if not await _handle_message(record.value, producer, settings, executor):
+        raise RuntimeError(
+            "Результат не отправлен: "
+            f"{tp.topic}[{tp.partition}]@{record.offset}"
+        )
+    tracker.finished(tp, record.offset)
+
+
+async def _consume_once(settings: Settings, stop: asyncio.Event) -> None:
+    """
+    Один цикл подключения к Kafka. Падает при обрыве — вызывающий ретраит.
+
+    До ``max_concurrent_runs`` проверок идут параллельно. Offset сообщения
+    коммитится вручную только после отправки результата (и всех более
+    ранних в партиции), поэтому после падения непроверенные сообщения
+    будут прочитаны снова. При ``stop`` новые сообщения не берутся,
+    текущие проверки дорабатывают.
+    """
     hosts = _bootstrap_list(settings.kafka_bootstrap_servers)
-    semaphore = asyncio.Semaphore(settings.max_concurrent_runs)
     consumer = AIOKafkaConsumer(
-        settings.kafka_topic_in,
         bootstrap_servers=hosts,
         group_id=settings.kafka_group_id,
         auto_offset_reset=settings.kafka_auto_offset_reset,
-        enable_auto_commit=True,
+        enable_auto_commit=False,
     )
     producer = AIOKafkaProducer(
         bootstrap_servers=hosts,
-        value_serializer=lambda v: json.dumps(
-            v, ensure_ascii=False
-        ).encode("utf-8"),
+        value_serializer=lambda v: json.dumps(v, ensure_ascii=False).encode(
+            "utf-8"
+        ),
+    )
+    tracker = OffsetTracker()
+    inflight = InFlightSet(settings.max_concurrent_runs)
+    executor = ThreadPoolExecutor(
+        max_workers=inflight.limit, thread_name_prefix="code-check"
+    )
+    consumer.subscribe(
+        [settings.kafka_topic_in],
+        listener=_DrainOnRevoke(consumer, tracker, inflight),
     )
     await consumer.start()
     await producer.start()
     logger.info(
-        "Kafka consumer готов: topic=%s group=%s",
+        "Kafka consumer готов: topic=%s group=%s, параллельно до %s проверок",
         settings.kafka_topic_in,
         settings.kafka_group_id,
+        inflight.limit,
     )
     try:
-        async for msg in consumer:
-            await _handle_message(
-                msg.value, producer, settings, semaphore
+        while not stop.is_set():
+            await inflight.wait_for_slot()
+            inflight.raise_if_failed()
+            batches = await consumer.getmany(
+                timeout_ms=500, max_records=inflight.free_slots
             )
+            for tp, records in batches.items():
+                for record in records:
+                    tracker.started(tp, record.offset)
+                    inflight.spawn(
+                        _process_record(
+                            record, tp, producer, settings, executor, tracker
+                        )
+                    )
+            await _commit_done(consumer, tracker)
+        logger.info(
+            "Остановка consumer: дожидаемся проверок в работе (%s)…",
+            len(inflight),
+        )
     finally:
+        await inflight.drain()
+        try:
+            await _commit_done(consumer, tracker)
+        except Exception:
+            logger.exception("Не удалось закоммитить offset'ы при остановке")
+        executor.shutdown(wait=False)
         await producer.stop()
         await consumer.stop()
         logger.info("Kafka consumer/producer остановлены.")
+    inflight.raise_if_failed()
 
 
-async def _consume_loop(settings: Settings) -> None:
+async def _consume_loop(settings: Settings, stop: asyncio.Event) -> None:
     """Держит consumer живым: после ребута Kafka / сетевых сбоев переподключается."""
     delay = 3.0
-    while True:
+    while not stop.is_set():
         try:
-            await _consume_once(settings)
+            await _consume_once(settings, stop)
             delay = 3.0
         except asyncio.CancelledError:
             logger.info("Остановка consumer…")
@@ -137,7 +220,10 @@ async def _consume_loop(settings: Settings) -> None:
                 "(health остаётся ок — без ретрая проверки зависают)",
                 delay,
             )
-            await asyncio.sleep(delay)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
             delay = min(delay * 1.5, 30.0)
 
 
@@ -148,14 +234,36 @@ async def lifespan(app: FastAPI):
         level=getattr(logging, settings.log_level, logging.INFO),
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
-    task = asyncio.create_task(_consume_loop(settings))
+    pool = None
+    try:
+        pool = get_sandbox_pool(settings)
+    except Exception:
+        logger.exception("Не удалось создать пул песочниц")
+    if pool is not None:
+        # Прогрев в фоне: health и consumer не ждут создания контейнеров.
+        asyncio.get_running_loop().run_in_executor(None, pool.warm)
+    stop = asyncio.Event()
+    task = asyncio.create_task(_consume_loop(settings, stop))
     app.state.consumer_task = task
     yield
-    task.cancel()
+    # Мягкая остановка: новые сообщения не читаем, проверки в работе
+    # доводим до результата и commit; по таймауту — отмена.
+    stop.set()
     try:
-        await task
-    except asyncio.CancelledError:
-        pass
+        await asyncio.wait_for(
+            asyncio.shield(task), timeout=settings.shutdown_drain_timeout_sec
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Проверки не завершились за %s с, отмена consumer",
+            settings.shutdown_drain_timeout_sec,
+        )
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await asyncio.to_thread(close_sandbox_pool)
 
 
 app = FastAPI(title="Code check runner", lifespan=lifespan)
@@ -0,0 +1,301 @@
+"""
+Пул «тёплых» контейнеров песочницы.
+
+Контейнер пула создаётся с теми же ограничениями, что и одноразовый (без
+сети, read_only rootfs, cap_drop ALL, no-new-privileges, pids_limit,
+user 1000), но PID 1 в нём просто спит, а judge запускается через
+``exec`` на каждую отправку. После прогона ``/tmp``, ``/work`` и
+``/dev/shm`` очищаются; если в контейнере остались посторонние процессы,
+очистка не удалась или прогон завершился сбоем — контейнер удаляется и
+заменяется новым. Также контейнер заменяется после
+``sandbox_pool_max_runs`` прогонов.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "bervinov-academy.sandbox-pool"
+_KEEPER_CMD = ["python", "-c", "import signal; signal.pause()"]
+_JUDGE_CMD = ["python", "/judge/judge.py"]
+_CLEANUP_CMD = [
+    "find",
+    "/tmp",
+    "/work",
+    "/dev/shm",
+    "-mindepth",
+    "1",
+    "-delete",
+]
+_SANDBOX_USER = "1000:1000"
+# Код выхода ``timeout -s KILL`` / SIGKILL.
+_KILLED_EXIT_CODE = 137
+_DEFAULT_MEMORY_MB = 256
+
+
+def sandbox_container_kwargs(settings: Any, mem_mb: int) -> dict[str, Any]:
+    """Ограничения контейнера песочницы (общие для пула и одноразового)."""
+    from docker.types import Mount
+
+    return {
+        "network_mode": "none",
+        "read_only": True,
+        # Writable /work for put_archive while rootfs stays read-only.
+        "mounts": [Mount("/work", None, type="volume")],
+        "tmpfs": {
+            "/tmp": "rw,nosuid,nodev,size=64m",
+        },
+        "mem_limit": f"{mem_mb}m",
+        "memswap_limit": f"{mem_mb}m",
+        "cpu_period": int(settings.sandbox_cpu_period),
+        "cpu_quota": int(settings.sandbox_cpu_quota),
+        "cap_drop": ["ALL"],
+        "security_opt": ["no-new-privileges:true"],
+        "pids_limit": int(settings.sandbox_pids_limit),
+        "user": _SANDBOX_USER,
+    }
+
+
+@dataclass
+class PooledSandbox:
+    container: Any
+    mem_mb: int
+    runs: int = 0
+
+
+@dataclass(frozen=True)
+class ExecResult:
+    exit_code: int
+    stdout: str
+    stderr: str
+
+    @property
+    def killed(self) -> bool:
+        return self.exit_code == _KILLED_EXIT_CODE
+
+
+class SandboxPool:
+    """Потокобезопасный пул; ``acquire`` / ``release`` из рабочих потоков."""
+
+    def __init__(self, client: Any, settings: Any):
+        self._client = client
+        self._settings = settings
+        self._size = int(settings.sandbox_pool_size)
+        self._max_runs = int(settings.sandbox_pool_max_runs)
+        self._idle: deque[PooledSandbox] = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._closed = False
+
+    # --- жизненный цикл ----------------------------------------------------
+
+    def warm(self) -> None:
+        """Удалить контейнеры прошлого запуска и заполнить пул."""
+        try:
+            stale = self._client.containers.list(
+                all=True, filters={"label": POOL_LABEL}
+            )
+        except Exception:
+            logger.exception("Пул песочниц: не удалось получить контейнеры")
+            stale = []
+        for container in stale:
+            self._remove(container)
+        self._refill()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for sandbox in idle:
+            self._remove(sandbox.container)
+
+    def idle_count(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    # --- выдача / возврат -------------------------------------------------
+
+    def acquire(self, mem_mb: int) -> PooledSandbox:
+        """Готовый запущенный контейнер с нужным лимитом памяти."""
+        while True:
+            with self._lock:
+                sandbox = self._idle.pop() if self._idle else None
+            if sandbox is None:
+                self._schedule_refill()
+                return self._create(mem_mb)
+            if not self._is_running(sandbox) or not self._set_memory(
+                sandbox, mem_mb
+            ):
+                self._remove(sandbox.container)
+                self._schedule_refill()
+                continue
+            return sandbox
+
+    def release(self, sandbox: PooledSandbox, healthy: bool) -> None:
+        """
+        Вернуть контейнер после прогона. Нездоровый, отработавший лимит
+        прогонов или не прошедший очистку контейнер удаляется.
+        """
+        sandbox.runs += 1
+        keep = (
+            healthy and sandbox.runs < self._max_runs and self._reset(sandbox)
+        )
+        if keep:
+            with self._lock:
+                if not self._closed and len(self._idle) < self._size:
+                    self._idle.append(sandbox)
+                    return
+        self._remove(sandbox.container)
+        self._schedule_refill()
+
+    # --- прогон -----------------------------------------------------------
+
+    def run(
+        self,
+        sandbox: PooledSandbox,
+        manifest_tar: bytes,
+        timeout_sec: int,
+    ) -> ExecResult:
+        """Положить manifest в ``/work`` и выполнить judge с таймаутом."""
+        container = sandbox.container
+        if not container.put_archive("/work", manifest_tar):
+            raise RuntimeError("put_archive(/work) вернул False")
+        cmd = ["timeout", "-s", "KILL", str(int(timeout_sec)), *_JUDGE_CMD]
+        return self._exec(container, cmd)
+
+    # --- внутреннее -------------------------------------------------------
+
+    def _exec(self, container: Any, cmd: list[str]) -> ExecResult:
+        api = self._client.api
+        exec_id = api.exec_create(container.id, cmd, user=_SANDBOX_USER)
+        stdout_b, stderr_b = api.exec_start(exec_id, demux=True)
+        exit_code = api.exec_inspect(exec_id).get("ExitCode")
+        return ExecResult(
+            exit_code=int(exit_code if exit_code is not None else -1),
+            stdout=(stdout_b or b"").decode("utf-8", errors="replace"),
+            stderr=(stderr_b or b"").decode("utf-8", errors="replace"),
+        )
+
+    def _create(self, mem_mb: int) -> PooledSandbox:
+        kwargs = sandbox_container_kwargs(self._settings, mem_mb)
+        container = self._client.containers.create(
+            self._settings.sandbox_image,
+            entrypoint=_KEEPER_CMD,
+            labels={POOL_LABEL: "1"},
+            **kwargs,
+        )
+        try:
+            container.start()
+        except Exception:
+            self._remove(container)
+            raise
+        return PooledSandbox(container=container, mem_mb=mem_mb)
+
+    def _is_running(self, sandbox: PooledSandbox) -> bool:
+        try:
+            sandbox.container.reload()
+        except Exception:
+            return False
+        return sandbox.container.status == "running"
+
+    def _set_memory(self, sandbox: PooledSandbox, mem_mb: int) -> bool:
+        if sandbox.mem_mb == mem_mb:
+            return True
+        try:
+            sandbox.container.update(
+                mem_limit=f"{mem_mb}m", memswap_limit=f"{mem_mb}m"
+            )
+        except Exception:
+            logger.info(
+                "Пул песочниц: не удалось сменить лимит памяти на %s МБ",
+                mem_mb,
+                exc_info=True,
+            )
+            return False
+        sandbox.mem_mb = mem_mb
+        return True
+
+    def _reset(self, sandbox: PooledSandbox) -> bool:
+        """Очистить рабочие каталоги и убедиться, что жив только PID 1."""
+        try:
+            cleanup = self._exec(sandbox.container, _CLEANUP_CMD)
+            if cleanup.exit_code != 0:
+                return False
+            top = sandbox.container.top()
+        except Exception:
+            logger.info("Пул песочниц: очистка не удалась", exc_info=True)
+            return False
+        return len(top.get("Processes") or []) == 1
+
+    def _remove(self, container: Any) -> None:
+        try:
+            container.remove(force=True)
+        except Exception:
+            logger.debug(
+                "Не удалось удалить контейнер песочницы", exc_info=True
+            )
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) >= self._size:
+                    self._refilling = False
+                    return
+            try:
+                sandbox = self._create(_DEFAULT_MEMORY_MB)
+            except Exception:
+                logger.exception("Пул песочниц: не удалось создать контейнер")
+                with self._lock:
+                    self._refilling = False
+                return
+            with self._lock:
+                if self._closed or len(self._idle) >= self._size:
+                    extra = sandbox
+                else:
+                    self._idle.append(sandbox)
+                    extra = None
+            if extra is not None:
+                self._remove(extra.container)
+
+    def _schedule_refill(self) -> None:
+        with self._lock:
+            if self._refilling or self._closed:
+                return
+            self._refilling = True
+        threading.Thread(
+            target=self._refill, name="sandbox-pool-refill", daemon=True
+        ).start()
+
+
+_pool: SandboxPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool(settings: Any) -> SandboxPool | None:
+    """Общий пул процесса; ``None``, если пул выключен (размер 0)."""
+    global _pool
+    if int(settings.sandbox_pool_size) <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            import docker
+
+            # Ожидание exec ограничено ``timeout`` внутри контейнера;
+            # таймаут клиента — только страховка от зависшего демона.
+            _pool = SandboxPool(docker.from_env(timeout=300), settings)
+        return _pool
+
+
+def close_sandbox_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
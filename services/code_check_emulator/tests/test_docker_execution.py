@@ -66,6 +66,15 @@ def test_build_manifest_defaults_and_skips_bad_cases() -> None:
     assert m["time_limit_ms"] >= 1
     assert m["memory_limit_mb"] >= 32
     assert len(m["test_cases"]) == 2
+    assert m["judge_mode"] == "subprocess"
+
+
+def test_build_manifest_passes_judge_mode() -> None:
+    m = build_manifest_from_payload(
+        {"code": "print(1)"}, judge_mode="fork", judge_workers=4
+    )
+    assert m["judge_mode"] == "fork"
+    assert m["judge_workers"] == 4
 
 
 def test_parse_judge_stdout_last_line_json() -> None:
@@ -0,0 +1,76 @@
+"""Ограничение параллельных проверок и commit только готового префикса."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.inflight import InFlightSet, OffsetTracker
+
+
+def test_commit_waits_for_earlier_offsets() -> None:
+    tracker = OffsetTracker()
+    for offset in (10, 11, 12):
+        tracker.started("p0", offset)
+
+    tracker.finished("p0", 11)
+    tracker.finished("p0", 12)
+    assert tracker.take_commit() == {}
+
+    tracker.finished("p0", 10)
+    assert tracker.take_commit() == {"p0": 13}
+    assert tracker.take_commit() == {}
+    assert tracker.in_progress() == 0
+
+
+def test_partitions_are_independent_and_forgettable() -> None:
+    tracker = OffsetTracker()
+    tracker.started("p0", 1)
+    tracker.started("p1", 5)
+    tracker.finished("p1", 5)
+    assert tracker.take_commit() == {"p1": 6}
+
+    tracker.forget(["p0"])
+    tracker.finished("p0", 1)
+    assert tracker.take_commit() == {}
+    assert tracker.in_progress() == 0
+
+
+def test_inflight_runs_up_to_limit_concurrently() -> None:
+    async def scenario() -> int:
+        inflight = InFlightSet(3)
+        running = 0
+        peak = 0
+
+        async def job() -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for _ in range(7):
+            await inflight.wait_for_slot()
+            assert len(inflight) < 3
+            inflight.spawn(job())
+        await inflight.drain()
+        assert len(inflight) == 0
+        return peak
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_inflight_surfaces_task_error() -> None:
+    async def scenario() -> None:
+        inflight = InFlightSet(2)
+
+        async def boom() -> None:
+            raise RuntimeError("send failed")
+
+        inflight.spawn(boom())
+        await inflight.drain()
+        inflight.raise_if_failed()
+
+    with pytest.raises(RuntimeError, match="send failed"):
+        asyncio.run(scenario())
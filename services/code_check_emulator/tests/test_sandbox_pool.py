@@ -0,0 +1,232 @@
+"""Пул тёплых песочниц на фейковом Docker-клиенте."""
+
+from __future__ import annotations
+
+import itertools
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app.sandbox_pool as sandbox_pool
+from app.docker_execution import run_submission_in_pool
+from app.sandbox_pool import SandboxPool
+
+
+class FakeContainer:
+    _ids = itertools.count(1)
+
+    def __init__(self, kwargs: dict) -> None:
+        self.id = f"c{next(self._ids)}"
+        self.kwargs = kwargs
+        self.status = "created"
+        self.removed = False
+        self.archives: list[bytes] = []
+        self.extra_processes = 0
+        self.mem = kwargs.get("mem_limit")
+
+    def start(self) -> None:
+        self.status = "running"
+
+    def reload(self) -> None:
+        pass
+
+    def put_archive(self, path: str, data: bytes) -> bool:
+        self.archives.append(data)
+        return True
+
+    def update(self, **kw) -> None:
+        self.mem = kw["mem_limit"]
+
+    def top(self) -> dict:
+        return {"Processes": [["1"]] * (1 + self.extra_processes)}
+
+    def remove(self, force: bool = False) -> None:
+        self.removed = True
+
+
+class FakeApi:
+    def __init__(self, client: "FakeClient") -> None:
+        self.client = client
+        self._execs: dict[str, int] = {}
+        self._n = itertools.count(1)
+
+    def exec_create(self, container_id: str, cmd: list[str], user: str):
+        exec_id = f"e{next(self._n)}"
+        self.client.exec_log.append((container_id, cmd, user))
+        if cmd[0] == "find":
+            self._execs[exec_id] = 0
+            self._pending = (b"", b"")
+        else:
+            code, out = self.client.judge_result
+            self._execs[exec_id] = code
+            self._pending = (out.encode(), b"")
+        return exec_id
+
+    def exec_start(self, exec_id: str, demux: bool = False):
+        return self._pending
+
+    def exec_inspect(self, exec_id: str) -> dict:
+        return {"ExitCode": self._execs[exec_id]}
+
+
+class FakeContainers:
+    def __init__(self) -> None:
+        self.created: list[FakeContainer] = []
+
+    def create(self, image: str, **kwargs) -> FakeContainer:
+        container = FakeContainer(kwargs)
+        self.created.append(container)
+        return container
+
+    def list(self, all: bool = False, filters: dict | None = None):
+        return []
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.containers = FakeContainers()
+        self.api = FakeApi(self)
+        self.exec_log: list[tuple] = []
+        self.judge_result = (
+            0,
+            json.dumps(
+                {
+                    "status": "accepted",
+                    "passed_tests": 1,
+                    "total_tests": 1,
+                    "message": "ok",
+                }
+            ),
+        )
+
+
+def _settings(**overrides) -> SimpleNamespace:
+    base = dict(
+        sandbox_image="sandbox:test",
+        sandbox_pool_size=1,
+        sandbox_pool_max_runs=3,
+        sandbox_pool_recycle_on_error=True,
+        sandbox_cpu_period=100_000,
+        sandbox_cpu_quota=100_000,
+        sandbox_pids_limit=128,
+        docker_run_timeout_buffer_sec=5,
+        judge_mode="subprocess",
+        judge_workers=1,
+    )
+    base.update(overrides)
+    return SimpleNamespace(**base)
+
+
+@pytest.fixture(autouse=True)
+def _no_docker_types(monkeypatch):
+    # docker.types.Mount не нужен фейковому клиенту.
+    monkeypatch.setattr(
+        sandbox_pool,
+        "sandbox_container_kwargs",
+        lambda settings, mem_mb: {
+            "network_mode": "none",
+            "read_only": True,
+            "cap_drop": ["ALL"],
+            "pids_limit": settings.sandbox_pids_limit,
+            "user": "1000:1000",
+            "mem_limit": f"{mem_mb}m",
+        },
+    )
+    monkeypatch.setattr(SandboxPool, "_schedule_refill", lambda self: None)
+
+
+_INCOMING = {
+    "submission_public_id": "sub-1",
+    "code": "print(1)",
+    "test_cases": [{"order_index": 1, "expected_output": "1"}],
+}
+
+
+def test_container_reused_and_recycled_after_max_runs() -> None:
+    client = FakeClient()
+    settings = _settings()
+    pool = SandboxPool(client, settings)
+    pool.warm()
+    first = client.containers.created[0]
+    assert first.kwargs["network_mode"] == "none"
+    assert first.kwargs["user"] == "1000:1000"
+    assert first.kwargs["labels"] == {sandbox_pool.POOL_LABEL: "1"}
+
+    for _ in range(3):
+        payload = run_submission_in_pool(_INCOMING, settings, pool)
+        assert payload["status"] == "accepted"
+
+    assert len(client.containers.created) == 1
+    assert first.removed
+    assert pool.idle_count() == 0
+    judge_cmds = [
+        cmd for _cid, cmd, _u in client.exec_log if "judge" in cmd[-1]
+    ]
+    assert judge_cmds[0][:3] == ["timeout", "-s", "KILL"]
+    assert all(user == "1000:1000" for *_rest, user in client.exec_log)
+
+
+def test_error_verdict_replaces_container() -> None:
+    client = FakeClient()
+    client.judge_result = (
+        0,
+        json.dumps(
+            {
+                "status": "error",
+                "passed_tests": 0,
+                "total_tests": 1,
+                "message": "Ошибка выполнения на тесте № 1 (код 1).",
+            }
+        ),
+    )
+    settings = _settings()
+    pool = SandboxPool(client, settings)
+    pool.warm()
+
+    payload = run_submission_in_pool(_INCOMING, settings, pool)
+
+    assert payload["status"] == "error"
+    assert client.containers.created[0].removed
+    assert pool.idle_count() == 0
+
+
+def test_timeout_kill_replaces_container() -> None:
+    client = FakeClient()
+    client.judge_result = (137, "")
+    settings = _settings(sandbox_pool_recycle_on_error=False)
+    pool = SandboxPool(client, settings)
+    pool.warm()
+
+    payload = run_submission_in_pool(_INCOMING, settings, pool)
+
+    assert payload["status"] == "error"
+    assert "время" in payload["message"]
+    assert client.containers.created[0].removed
+
+
+def test_leftover_process_discards_container() -> None:
+    client = FakeClient()
+    settings = _settings()
+    pool = SandboxPool(client, settings)
+    pool.warm()
+    client.containers.created[0].extra_processes = 1
+
+    run_submission_in_pool(_INCOMING, settings, pool)
+
+    assert client.containers.created[0].removed
+    assert pool.idle_count() == 0
+
+
+def test_memory_limit_updated_on_reuse() -> None:
+    client = FakeClient()
+    settings = _settings()
+    pool = SandboxPool(client, settings)
+    pool.warm()
+
+    incoming = dict(_INCOMING, limits={"memory_limit_mb": 128})
+    run_submission_in_pool(incoming, settings, pool)
+
+    container = client.containers.created[0]
+    assert container.mem == "128m"
+    assert pool.idle_count() == 1
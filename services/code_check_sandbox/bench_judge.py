@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Сравнение режимов judge: ``subprocess`` (интерпретатор на тест) и ``fork``.
+
+Запускает ``judge.py`` локально на одном и том же manifest в обоих режимах,
+печатает медиану времени прогона и проверяет, что вердикты совпадают::
+
+    python services/code_check_sandbox/bench_judge.py --tests 40 --repeat 5
+
+``--workers N`` — то же с параллельным прогоном тестов.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+JUDGE = Path(__file__).resolve().with_name("judge.py")
+
+_SOLUTION = """\
+import collections
+import math
+
+n = int(input())
+nums = list(map(int, input().split()))
+top = collections.Counter(nums).most_common(1)[0][0]
+print(sum(nums), math.gcd(*nums), top)
+"""
+
+
+def _manifest(tests: int) -> dict:
+    cases = []
+    for i in range(1, tests + 1):
+        nums = [i * k for k in range(1, 6)]
+        cases.append(
+            {
+                "order_index": i,
+                "input_data": f"{len(nums)}\n{' '.join(map(str, nums))}\n",
+                "expected_output": f"{sum(nums)} {i} {nums[0]}",
+                "is_hidden": i % 3 == 0,
+            }
+        )
+    return {
+        "version": 1,
+        "code": _SOLUTION,
+        "test_cases": cases,
+        "time_limit_ms": 60_000,
+        "memory_limit_mb": 256,
+    }
+
+
+def _run(
+    workdir: Path, manifest: dict, mode: str, workers: int
+) -> tuple[float, dict]:
+    path = workdir / f"manifest-{mode}.json"
+    path.write_text(
+        json.dumps(
+            dict(manifest, judge_mode=mode, judge_workers=workers),
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    env = dict(
+        os.environ,
+        MANIFEST_PATH=str(path),
+        SOLUTION_PATH=str(workdir / "solution.py"),
+    )
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, str(JUDGE)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tests", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="judge_workers (ограничено CPU по квоте)",
+    )
+    args = parser.parse_args()
+
+    manifest = _manifest(args.tests)
+    timings: dict[str, list[float]] = {"subprocess": [], "fork": []}
+    verdicts: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for _ in range(args.repeat):
+            for mode in timings:
+                elapsed, verdict = _run(workdir, manifest, mode, args.workers)
+                timings[mode].append(elapsed)
+                verdicts[mode] = verdict
+
+    for mode, values in timings.items():
+        median = statistics.median(values)
+        print(
+            f"{mode:>10}: {median * 1000:8.1f} мс на прогон, "
+            f"{median * 1000 / args.tests:6.2f} мс на тест "
+            f"({verdicts[mode]['status']})"
+        )
+    speedup = statistics.median(timings["subprocess"]) / statistics.median(
+        timings["fork"]
+    )
+    print(f"ускорение fork: x{speedup:.1f}")
+    if verdicts["subprocess"] != verdicts["fork"]:
+        print("Вердикты режимов различаются:", verdicts, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
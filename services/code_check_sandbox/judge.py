@@ -1,18 +1,53 @@
 #!/usr/bin/env python3
-"""Trusted judge: sequential tests, stop on first failure. Final line = JSON."""
+"""Trusted judge: sequential tests, stop on first failure. Final line = JSON.
+
+Режимы запуска решения (``judge_mode`` в manifest или ``JUDGE_MODE``):
+
+* ``subprocess`` (по умолчанию) — новый ``python -u solution.py`` на тест;
+* ``fork`` — решение компилируется один раз, каждый тест выполняется в
+  ``fork()`` от уже запущенного judge: без старта интерпретатора и
+  повторного импорта stdlib. stdin/stdout/stderr теста — отдельные файлы,
+  лимиты времени и JSON-вердикт те же.
+
+``judge_workers`` / ``JUDGE_WORKERS`` > 1 — тесты идут параллельно (не
+больше, чем CPU по квоте контейнера); вердикт тот же, что у
+последовательного прогона: первый по номеру упавший тест.
+"""
 from __future__ import annotations
 
+import builtins
+import io
+import math
 import json
 import os
+import select
+import signal
 import subprocess
 import sys
+import tempfile
 import time
+import traceback
+import types
+from collections.abc import Callable, Iterable
 from pathlib import Path
 
 MANIFEST = Path(os.environ.get("MANIFEST_PATH", "/work/manifest.json"))
-SOLUTION = Path("/tmp/solution.py")
+SOLUTION = Path(os.environ.get("SOLUTION_PATH", "/tmp/solution.py"))
 # Максимум символов вывода в JSON для API (stdout/stderr/ожидаемый ответ).
 _MAX_FEEDBACK_CHARS = 8000
+# Импортируются в judge до fork — решениям они достаются готовыми.
+_PREWARM_MODULES = (
+    "bisect",
+    "collections",
+    "decimal",
+    "fractions",
+    "functools",
+    "heapq",
+    "itertools",
+    "math",
+    "re",
+    "string",
+)
 
 
 def _clip(s: str, limit: int = _MAX_FEEDBACK_CHARS) -> str:
@@ -44,6 +79,455 @@ def _valid_tests(raw: object) -> list[dict]:
     )
 
 
+def _run_subprocess(inp: str, timeout_sec: float):
+    return subprocess.run(
+        [sys.executable, "-u", str(SOLUTION)],
+        input=inp,
+        capture_output=True,
+        text=True,
+        timeout=timeout_sec,
+        cwd=str(SOLUTION.parent),
+    )
+
+
+def _decode_output(raw: bytes) -> str:
+    # Как ``text=True`` у subprocess: универсальные переводы строк.
+    text = raw.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _system_exit_code(exc: SystemExit) -> int:
+    """Код выхода процесса, как его считает интерпретатор."""
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    try:
+        print(code, file=sys.stderr)
+    except Exception:
+        pass
+    return 1
+
+
+def _unbuffered_text(fd: int, errors: str = "strict"):
+    return io.TextIOWrapper(
+        io.FileIO(fd, "w", closefd=False),
+        encoding="utf-8",
+        errors=errors,
+        write_through=True,
+    )
+
+
+def _kill_group(pid: int, only_group: bool = False) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        if only_group:
+            # Процесс уже собран — его pid мог достаться другому.
+            return
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class _RunningTest:
+    """
+    Тест, запущенный в дочернем процессе ``fork()`` (своя группа процессов,
+    stdin/stdout/stderr — временные файлы). ``body`` выполняется в потомке
+    и возвращает код выхода (или сам заменяет процесс через ``exec``).
+    """
+
+    def __init__(self, inp: str, body: Callable[[], int]) -> None:
+        self._files = [tempfile.TemporaryFile() for _ in range(3)]
+        f_in = self._files[0]
+        f_in.write(inp.encode("utf-8"))
+        f_in.seek(0)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.returncode: int | None = None
+        self.pid = os.fork()
+        if self.pid == 0:
+            self._child(body)
+        try:
+            self.pidfd: int | None = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            self.pidfd = None
+
+    def _child(self, body: Callable[[], int]) -> None:
+        exit_code = 1
+        try:
+            os.setpgid(0, 0)
+            for fd, f in enumerate(self._files):
+                os.dup2(f.fileno(), fd)
+            os.chdir(SOLUTION.parent)
+            sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+            # Как ``python -u``: без буфера, вывод не теряется при os._exit.
+            sys.stdout = _unbuffered_text(1)
+            sys.stderr = _unbuffered_text(2, errors="backslashreplace")
+            exit_code = body()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)
+
+    def poll(self) -> int | None:
+        if self.returncode is None:
+            done, status = os.waitpid(self.pid, os.WNOHANG)
+            if done:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout_sec: float) -> int | None:
+        """Код выхода или ``None``, если тест убит по таймауту."""
+        deadline = time.monotonic() + timeout_sec
+        while self.poll() is None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                self.kill()
+                return None
+            _wait_any([self], left)
+        return self.returncode
+
+    def kill(self) -> None:
+        if self.returncode is None:
+            _kill_group(self.pid)
+            os.waitpid(self.pid, 0)
+            self.returncode = -signal.SIGKILL
+
+    def result(self):
+        f_out, f_err = self._files[1], self._files[2]
+        f_out.seek(0)
+        f_err.seek(0)
+        return subprocess.CompletedProcess(
+            [sys.executable, str(SOLUTION)],
+            self.returncode,
+            _decode_output(f_out.read()),
+            _decode_output(f_err.read()),
+        )
+
+    def close(self) -> None:
+        self.kill()
+        # Процессы, запущенные решением и пережившие его.
+        _kill_group(self.pid, only_group=True)
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+        for f in self._files:
+            f.close()
+
+
+def _wait_any(tests: Iterable[_RunningTest], timeout_sec: float) -> None:
+    """Ждать завершения любого из тестов не дольше ``timeout_sec``."""
+    tests = list(tests)
+    fds = [t.pidfd for t in tests if t.pidfd is not None]
+    if fds and len(fds) == len(tests):
+        select.select(fds, [], [], max(timeout_sec, 0))
+    else:
+        time.sleep(min(max(timeout_sec, 0), 0.002))
+
+
+class _ForkRunner:
+    """
+    Решение компилируется один раз, каждый тест выполняется в ``fork()``
+    от judge как новый модуль ``__main__``. По таймауту убивается вся
+    группа процессов теста (как и лишние процессы после выхода).
+    """
+
+    def __init__(self, code: str) -> None:
+        for name in _PREWARM_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+        self._compile_error: str | None = None
+        try:
+            self._code = compile(code, str(SOLUTION), "exec")
+        except (SyntaxError, ValueError) as e:
+            # Текст как у ``python solution.py`` при синтаксической ошибке.
+            self._code = None
+            self._compile_error = "".join(
+                traceback.format_exception_only(type(e), e)
+            )
+
+    def __call__(self, inp: str, timeout_sec: float):
+        test = self.start(inp)
+        try:
+            if test.wait(timeout_sec) is None:
+                raise subprocess.TimeoutExpired(
+                    [sys.executable, str(SOLUTION)], timeout_sec
+                )
+            return test.result()
+        finally:
+            test.close()
+
+    def start(self, inp: str) -> _RunningTest:
+        return _RunningTest(inp, self._exec_solution)
+
+    def _exec_solution(self) -> int:
+        if self._code is None:
+            sys.stderr.write(self._compile_error or "")
+            return 1
+        workdir = str(SOLUTION.parent)
+        module = types.ModuleType("__main__")
+        module.__file__ = str(SOLUTION)
+        module.__builtins__ = builtins
+        sys.modules["__main__"] = module
+        sys.argv = [str(SOLUTION)]
+        sys.path[0] = workdir
+        try:
+            exec(self._code, module.__dict__)
+        except SystemExit as e:
+            return _system_exit_code(e)
+        except BaseException:
+            etype, value, tb = sys.exc_info()
+            # Без кадра judge — трассировка как у отдельного процесса.
+            traceback.print_exception(etype, value, tb.tb_next)
+            return 1
+        return 0
+
+
+class _ExecRunner:
+    """Режим ``subprocess`` для параллельного прогона: fork + exec python."""
+
+    def start(self, inp: str) -> _RunningTest:
+        return _RunningTest(inp, self._exec_python)
+
+    @staticmethod
+    def _exec_python() -> int:
+        os.execv(sys.executable, [sys.executable, "-u", str(SOLUTION)])
+        return 127
+
+
+def _cpu_limit() -> int:
+    """Сколько CPU доступно контейнеру (квота cgroup или affinity)."""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        quota_us = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period_us = int(
+            Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text()
+        )
+        if quota_us > 0 and period_us > 0:
+            return max(1, math.ceil(quota_us / period_us))
+    except (OSError, ValueError):
+        pass
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _total_limit_verdict(n: int, total: int) -> dict:
+    return {
+        "status": "error",
+        "passed_tests": n - 1,
+        "total_tests": total,
+        "message": f"Превышен общий лимит времени (тест № {n}).",
+        "failed_test_number": n,
+        "actual_output": None,
+        "expected_output": None,
+    }
+
+
+def _failure_verdict(n: int, total: int, tc: dict, proc) -> dict | None:
+    """
+    Вердикт для упавшего теста № ``n`` или ``None``, если тест пройден.
+    ``proc`` — ``CompletedProcess`` или ``None`` при таймауте теста.
+    """
+    passed = n - 1
+    hidden = bool(tc.get("is_hidden"))
+    exp = tc.get("expected_output")
+    if exp is None:
+        exp = ""
+    elif not isinstance(exp, str):
+        exp = str(exp)
+
+    if proc is None:
+        msg = (
+            f"Превышен лимит времени на скрытом тесте № {n}."
+            if hidden
+            else f"Превышен лимит времени на тесте № {n}."
+        )
+        return {
+            "status": "error",
+            "passed_tests": passed,
+            "total_tests": total,
+            "message": msg,
+            "failed_test_number": n,
+            "actual_output": None,
+            "expected_output": None,
+        }
+
+    if proc.returncode != 0:
+        err_text = proc.stderr or ""
+        out_text = proc.stdout or ""
+        if hidden:
+            msg = f"Ошибка выполнения на скрытом тесте № {n}."
+            act: str | None = None
+        else:
+            msg = (
+                f"Ошибка выполнения на тесте № {n} "
+                f"(код {proc.returncode})."
+            )
+            act = _clip(err_text if err_text.strip() else out_text)
+        return {
+            "status": "error",
+            "passed_tests": passed,
+            "total_tests": total,
+            "message": msg,
+            "failed_test_number": n,
+            "actual_output": act,
+            "expected_output": None,
+        }
+
+    got = _normalize(proc.stdout)
+    want = _normalize(exp)
+    if got != want:
+        if hidden:
+            msg = f"Неверный ответ на скрытом тесте № {n}."
+            act_out: str | None = None
+            exp_out: str | None = None
+        else:
+            msg = f"Неверный ответ на тесте № {n}."
+            act_out = _clip(got)
+            exp_out = _clip(want)
+        return {
+            "status": "wrong_answer",
+            "passed_tests": passed,
+            "total_tests": total,
+            "message": msg,
+            "failed_test_number": n,
+            "actual_output": act_out,
+            "expected_output": exp_out,
+        }
+    return None
+
+
+def _test_input(tc: dict) -> str:
+    inp = tc.get("input_data")
+    if inp is None:
+        return ""
+    return inp if isinstance(inp, str) else str(inp)
+
+
+def _test_timeout(remaining: float) -> float:
+    return max(min(remaining, 60.0), 0.001)
+
+
+def _accepted_verdict(total: int) -> dict:
+    return {
+        "status": "accepted",
+        "passed_tests": total,
+        "total_tests": total,
+        "message": "Все тесты пройдены.",
+    }
+
+
+def _run_sequential(
+    tests: list[dict], run_test: Callable, deadline: float
+) -> dict:
+    total = len(tests)
+    for n, tc in enumerate(tests, start=1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return _total_limit_verdict(n, total)
+        try:
+            proc = run_test(_test_input(tc), _test_timeout(remaining))
+        except subprocess.TimeoutExpired:
+            proc = None
+        verdict = _failure_verdict(n, total, tc, proc)
+        if verdict is not None:
+            return verdict
+    return _accepted_verdict(total)
+
+
+def _run_parallel(
+    tests: list[dict], runner, workers: int, deadline: float
+) -> dict:
+    """
+    До ``workers`` тестов одновременно. Вердикт — как у последовательного
+    прогона: первый по номеру упавший тест. Как только известно, что все
+    тесты до упавшего пройдены, остальные прогоны прерываются; тесты с
+    номером больше уже найденного упавшего не запускаются и снимаются.
+    """
+    total = len(tests)
+    verdicts: dict[int, dict | None] = {}
+    running: dict[int, tuple[_RunningTest, float]] = {}
+    first_fail = total
+    settled = 0
+    next_i = 0
+
+    def finish(i: int, proc) -> None:
+        nonlocal first_fail
+        verdicts[i] = _failure_verdict(i + 1, total, tests[i], proc)
+        if verdicts[i] is not None:
+            first_fail = min(first_fail, i)
+
+    try:
+        while True:
+            while settled in verdicts and verdicts[settled] is None:
+                settled += 1
+            if settled >= first_fail:
+                break
+
+            while len(running) < workers and next_i < first_fail:
+                now = time.monotonic()
+                remaining = deadline - now
+                if remaining <= 0:
+                    verdicts[next_i] = _total_limit_verdict(next_i + 1, total)
+                    first_fail = next_i
+                    break
+                test = runner.start(_test_input(tests[next_i]))
+                running[next_i] = (test, now + _test_timeout(remaining))
+                next_i += 1
+
+            for i in [i for i in running if i > first_fail]:
+                running.pop(i)[0].close()
+            if not running:
+                continue
+
+            now = time.monotonic()
+            soonest = min(limit for _test, limit in running.values())
+            _wait_any((t for t, _limit in running.values()), soonest - now)
+
+            now = time.monotonic()
+            for i, (test, limit) in list(running.items()):
+                if test.poll() is None:
+                    if now < limit:
+                        continue
+                    test.kill()
+                    proc = None
+                else:
+                    proc = test.result()
+                test.close()
+                del running[i]
+                finish(i, proc)
+    finally:
+        for test, _limit in running.values():
+            test.close()
+
+    if first_fail < total:
+        return verdicts[first_fail]
+    return _accepted_verdict(total)
+
+
+def _judge_workers(data: dict, total: int) -> int:
+    raw = data.get("judge_workers") or os.environ.get("JUDGE_WORKERS") or 1
+    try:
+        workers = int(raw)
+    except (TypeError, ValueError):
+        workers = 1
+    return max(1, min(workers, _cpu_limit(), total))
+
+
 def main() -> int:
     """
     Всегда завершаемся с кодом 0, если напечатан итоговый JSON — иначе
@@ -96,129 +580,18 @@ def main() -> int:
         )
         return 0
 
-    passed = 0
-    for tc in tests_sorted:
-        remaining = deadline - time.monotonic()
-        if remaining <= 0:
-            n = passed + 1
-            _emit(
-                {
-                    "status": "error",
-                    "passed_tests": passed,
-                    "total_tests": total,
-                    "message": f"Превышен общий лимит времени (тест № {n}).",
-                    "failed_test_number": n,
-                    "actual_output": None,
-                    "expected_output": None,
-                }
-            )
-            return 0
-
-        hidden = bool(tc.get("is_hidden"))
-        inp = tc.get("input_data")
-        exp = tc.get("expected_output")
-        if inp is None:
-            inp = ""
-        elif not isinstance(inp, str):
-            inp = str(inp)
-        if exp is None:
-            exp = ""
-        elif not isinstance(exp, str):
-            exp = str(exp)
-
-        timeout_sec = max(min(remaining, 60.0), 0.001)
-        try:
-            proc = subprocess.run(
-                [sys.executable, "-u", str(SOLUTION)],
-                input=inp,
-                capture_output=True,
-                text=True,
-                timeout=timeout_sec,
-                cwd="/tmp",
-            )
-        except subprocess.TimeoutExpired:
-            n = passed + 1
-            msg = (
-                f"Превышен лимит времени на скрытом тесте № {n}."
-                if hidden
-                else f"Превышен лимит времени на тесте № {n}."
-            )
-            _emit(
-                {
-                    "status": "error",
-                    "passed_tests": passed,
-                    "total_tests": total,
-                    "message": msg,
-                    "failed_test_number": n,
-                    "actual_output": None,
-                    "expected_output": None,
-                }
-            )
-            return 0
-
-        if proc.returncode != 0:
-            n = passed + 1
-            err_text = proc.stderr or ""
-            out_text = proc.stdout or ""
-            if hidden:
-                msg = f"Ошибка выполнения на скрытом тесте № {n}."
-                act: str | None = None
-            else:
-                msg = (
-                    f"Ошибка выполнения на тесте № {n} "
-                    f"(код {proc.returncode})."
-                )
-                act = _clip(
-                    err_text if err_text.strip() else out_text
-                )
-            _emit(
-                {
-                    "status": "error",
-                    "passed_tests": passed,
-                    "total_tests": total,
-                    "message": msg,
-                    "failed_test_number": n,
-                    "actual_output": act,
-                    "expected_output": None,
-                }
-            )
-            return 0
-
-        got = _normalize(proc.stdout)
-        want = _normalize(exp)
-        if got != want:
-            n = passed + 1
-            if hidden:
-                msg = f"Неверный ответ на скрытом тесте № {n}."
-                act_out: str | None = None
-                exp_out: str | None = None
-            else:
-                msg = f"Неверный ответ на тесте № {n}."
-                act_out = _clip(got)
-                exp_out = _clip(want)
-            _emit(
-                {
-                    "status": "wrong_answer",
-                    "passed_tests": passed,
-                    "total_tests": total,
-                    "message": msg,
-                    "failed_test_number": n,
-                    "actual_output": act_out,
-                    "expected_output": exp_out,
-                }
-            )
-            return 0
-
-        passed += 1
-
-    _emit(
-        {
-            "status": "accepted",
-            "passed_tests": passed,
-            "total_tests": total,
-            "message": "Все тесты пройдены.",
-        }
-    )
+    mode = str(data.get("judge_mode") or os.environ.get("JUDGE_MODE") or "")
+    workers = _judge_workers(data, total)
+    if not hasattr(os, "fork"):
+        verdict = _run_sequential(tests_sorted, _run_subprocess, deadline)
+    elif workers > 1:
+        runner = _ForkRunner(code) if mode == "fork" else _ExecRunner()
+        verdict = _run_parallel(tests_sorted, runner, workers, deadline)
+    elif mode == "fork":
+        verdict = _run_sequential(tests_sorted, _ForkRunner(code), deadline)
+    else:
+        verdict = _run_sequential(tests_sorted, _run_subprocess, deadline)
+    _emit(verdict)
     return 0
 
 
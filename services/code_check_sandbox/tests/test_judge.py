@@ -0,0 +1,205 @@
+"""Режимы judge: fork совпадает с subprocess, параллельный — с последовательным."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+import time
+
+import pytest
+
+import judge
+
+
+def _case(inp: str, expected: str, **extra) -> dict:
+    return {"input_data": inp, "expected_output": expected, **extra}
+
+
+def _run(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture,
+    code: str,
+    tests: list[dict],
+    mode: str = "subprocess",
+    workers: int = 1,
+    time_limit_ms: int = 5000,
+) -> dict:
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "code": code,
+                "test_cases": [
+                    {"order_index": n, **tc} for n, tc in enumerate(tests)
+                ],
+                "time_limit_ms": time_limit_ms,
+                "judge_mode": mode,
+                "judge_workers": workers,
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(judge, "MANIFEST", manifest)
+    monkeypatch.setattr(judge, "SOLUTION", tmp_path / "solution.py")
+    assert judge.main() == 0
+    return json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+
+
+PARITY_CASES = {
+    "wrong_answer": (
+        "print(int(input()) * 2)\n",
+        [_case("2", "4"), _case("3", "7")],
+    ),
+    "runtime_error": (
+        "n = int(input())\nraise ValueError(f'boom {n}')\n",
+        [_case("1", "1")],
+    ),
+    "system_exit_code": (
+        "import sys\nprint('partial')\nsys.exit(3)\n",
+        [_case("", "partial")],
+    ),
+    "system_exit_message": (
+        "import sys\nsys.exit('bye')\n",
+        [_case("", "")],
+    ),
+    "system_exit_zero": (
+        "import sys\nprint('ok')\nsys.exit(0)\n",
+        [_case("", "ok")],
+    ),
+    "eof": (
+        "a = input()\nb = input()\nprint(a, b)\n",
+        [_case("1", "1 2")],
+    ),
+    "file_and_argv": (
+        "import os, sys\n"
+        "print(os.path.basename(__file__), __name__)\n"
+        "print(len(sys.argv), os.path.basename(sys.argv[0]))\n",
+        [_case("", "solution.py __main__\n1 solution.py")],
+    ),
+    "hidden_runtime_error": (
+        "print(1 / int(input()))\n",
+        [_case("1", "1.0"), _case("0", "", is_hidden=True)],
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(PARITY_CASES))
+def test_fork_verdict_matches_subprocess(
+    name, tmp_path, monkeypatch, capsys
+) -> None:
+    code, tests = PARITY_CASES[name]
+
+    expected = _run(tmp_path, monkeypatch, capsys, code, tests)
+    got = _run(tmp_path, monkeypatch, capsys, code, tests, mode="fork")
+
+    assert got == expected
+
+
+def test_runtime_error_traceback_has_no_judge_frames(
+    tmp_path, monkeypatch, capsys
+) -> None:
+    code, tests = PARITY_CASES["runtime_error"]
+
+    verdict = _run(tmp_path, monkeypatch, capsys, code, tests, mode="fork")
+
+    assert verdict["status"] == "error"
+    assert "ValueError: boom 1" in verdict["actual_output"]
+    assert "judge.py" not in verdict["actual_output"]
+
+
+@pytest.mark.parametrize("mode", ["subprocess", "fork"])
+def test_timeout_verdict(mode, tmp_path, monkeypatch, capsys) -> None:
+    verdict = _run(
+        tmp_path,
+        monkeypatch,
+        capsys,
+        "print(input())\nwhile True:\n    pass\n",
+        [_case("1", "1")],
+        mode=mode,
+        time_limit_ms=300,
+    )
+
+    assert verdict == {
+        "status": "error",
+        "passed_tests": 0,
+        "total_tests": 1,
+        "message": "Превышен лимит времени на тесте № 1.",
+        "failed_test_number": 1,
+        "actual_output": None,
+        "expected_output": None,
+    }
+
+
+# Тест 1 падает позже теста 2: вердикт — всё равно тест 1.
+_SLOW_FIRST_FAILURE = (
+    "import time\n"
+    "n = int(input())\n"
+    "if n == 1:\n"
+    "    time.sleep(0.3)\n"
+    "print(n)\n",
+    [_case("1", "0"), _case("2", "0"), _case("3", "3")],
+)
+
+
+@pytest.mark.parametrize("mode", ["subprocess", "fork"])
+def test_parallel_reports_lowest_failing_test(
+    mode, tmp_path, monkeypatch, capsys
+) -> None:
+    monkeypatch.setattr(judge, "_cpu_limit", lambda: 4)
+    code, tests = _SLOW_FIRST_FAILURE
+
+    sequential = _run(tmp_path, monkeypatch, capsys, code, tests, mode=mode)
+    parallel = _run(
+        tmp_path, monkeypatch, capsys, code, tests, mode=mode, workers=3
+    )
+
+    assert parallel["failed_test_number"] == 1
+    assert parallel == sequential
+
+
+@pytest.mark.parametrize("mode", ["subprocess", "fork"])
+def test_parallel_aborts_later_tests_after_failure(
+    mode, tmp_path, monkeypatch, capsys
+) -> None:
+    monkeypatch.setattr(judge, "_cpu_limit", lambda: 4)
+    code = "n = int(input())\nwhile n == 3:\n    pass\nprint(n)\n"
+    tests = [_case("1", "1"), _case("2", "0"), _case("3", "3")]
+
+    started = time.monotonic()
+    verdict = _run(
+        tmp_path,
+        monkeypatch,
+        capsys,
+        code,
+        tests,
+        mode=mode,
+        workers=3,
+        time_limit_ms=10000,
+    )
+
+    # Зависший тест 3 снят, не дожидаясь лимита времени.
+    assert time.monotonic() - started < 5
+    assert verdict["status"] == "wrong_answer"
+    assert verdict["failed_test_number"] == 2
+    assert verdict["passed_tests"] == 1
+
+
+@pytest.mark.parametrize("mode", ["subprocess", "fork"])
+def test_parallel_accepts_like_sequential(
+    mode, tmp_path, monkeypatch, capsys
+) -> None:
+    monkeypatch.setattr(judge, "_cpu_limit", lambda: 4)
+    tests = [_case(str(n), str(n * n)) for n in range(1, 7)]
+
+    verdict = _run(
+        tmp_path,
+        monkeypatch,
+        capsys,
+        "n = int(input())\nprint(n * n)\n",
+        tests,
+        mode=mode,
+        workers=3,
+    )
+
+    assert verdict == judge._accepted_verdict(6)